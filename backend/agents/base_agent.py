@@ -1,11 +1,9 @@
-import ssl
-import certifi
-import urllib.request
-import urllib.error
 import json
 import os
-import socket
-from openai import OpenAI
+from typing import AsyncIterator
+
+import httpx
+from agents.provider_clients import provider_clients
 from core.config import settings
 
 
@@ -24,6 +22,7 @@ class BaseAgent:
         self.default_model     = "claude-haiku-4-5-20251001"
         self.default_openai_model = "gpt-4.1-mini"
         self.provider_timeout_seconds = float(os.getenv("AI_PROVIDER_TIMEOUT_SECONDS", "20"))
+        self.stream_max_tokens = max(256, int(os.getenv("AI_STREAM_MAX_TOKENS", "2048")))
         self.allowed_models = {
             "claude-haiku-4-5-20251001",
             "claude-sonnet-4-5-20250929",
@@ -57,21 +56,20 @@ class BaseAgent:
             return normalized
         return self.default_model
 
-    def run(
+    def _anthropic_headers(self) -> dict[str, str]:
+        return {
+            "Content-Type":      "application/json",
+            "x-api-key":         self.anthropic_api_key,
+            "anthropic-version": "2023-06-01",
+        }
+
+    def _build_prompt(
         self,
         user_message: str,
-        context: str = "",
-        model: str | None = None,
-        provider: str | None = None,
-        temperature: float | None = None,
-        extra_system_instructions: str | None = None,
-        user_blocks: list[dict] | None = None,
-        timeout_seconds: float | None = None,
-    ) -> str:
-        """Send a message to Claude with optional real data context."""
-
-        provider_name = self._resolve_provider(provider)
-        request_timeout = float(timeout_seconds or self.provider_timeout_seconds)
+        context: str,
+        extra_system_instructions: str | None,
+        user_blocks: list[dict] | None,
+    ) -> tuple[str, list[dict]]:
         base_system = self.system_prompt
         if extra_system_instructions and extra_system_instructions.strip():
             base_system = f"{base_system}\n\nADDITIONAL SECTION-SPECIFIC INSTRUCTIONS:\n{extra_system_instructions.strip()}"
@@ -92,22 +90,36 @@ class BaseAgent:
             content_blocks.append({"type": "text", "text": user_message})
         if user_blocks:
             content_blocks.extend(user_blocks)
+        return full_system, content_blocks
 
+    def run(
+        self,
+        user_message: str,
+        context: str = "",
+        model: str | None = None,
+        provider: str | None = None,
+        temperature: float | None = None,
+        extra_system_instructions: str | None = None,
+        user_blocks: list[dict] | None = None,
+        timeout_seconds: float | None = None,
+    ) -> str:
+        """Send a message to Claude with optional real data context."""
+
+        provider_name = self._resolve_provider(provider)
+        request_timeout = float(timeout_seconds or self.provider_timeout_seconds)
+        full_system, content_blocks = self._build_prompt(user_message, context, extra_system_instructions, user_blocks)
         selected_model = self._resolve_model(model, provider_name)
 
         if provider_name == "openai":
             if not self.openai_api_key:
                 raise Exception("OpenAI API key is not configured.")
-            client = OpenAI(
-                api_key=self.openai_api_key,
-                timeout=request_timeout,
-                max_retries=1,
-            )
+            client = provider_clients.openai(self.openai_api_key)
             user_text = user_message.strip()
             if not user_text:
                 user_text = "Use the available context and provide a concise answer."
             completion = client.chat.completions.create(
                 model=selected_model,
+                timeout=request_timeout,
                 max_tokens=1024,
                 temperature=temperature if temperature is not None else 0.2,
                 messages=[
@@ -129,32 +141,107 @@ class BaseAgent:
             ]
         }
 
-        data = json.dumps(payload).encode("utf-8")
+        try:
+            response = provider_clients.post_json(
+                self.anthropic_api_url,
+                payload,
+                self._anthropic_headers(),
+                request_timeout,
+            )
+        except httpx.TimeoutException:
+            raise Exception("Claude API request timed out.")
+        except httpx.TransportError as e:
+            raise Exception(f"Claude API connection error: {e}")
 
-        req = urllib.request.Request(
-            self.anthropic_api_url,
-            data=data,
-            headers={
-                "Content-Type":      "application/json",
-                "x-api-key":         self.anthropic_api_key,
-                "anthropic-version": "2023-06-01"
-            },
-            method="POST"
-        )
+        if response.status_code >= 400:
+            raise Exception(f"Claude API error {response.status_code}: {response.text}")
+        result = response.json()
+        return result["content"][0]["text"]
 
-        try:
-            with urllib.request.urlopen(
-                req,
-                context=ssl.create_default_context(cafile=certifi.where()),
+    async def astream(
+        self,
+        user_message: str,
+        context: str = "",
+        model: str | None = None,
+        provider: str | None = None,
+        temperature: float | None = None,
+        extra_system_instructions: str | None = None,
+        user_blocks: list[dict] | None = None,
+        timeout_seconds: float | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Same request as `run`, streamed: yields text deltas as the provider produces them.
+        `timeout_seconds` bounds connecting and each wait for the next chunk.
+        """
+
+        provider_name = self._resolve_provider(provider)
+        request_timeout = float(timeout_seconds or self.provider_timeout_seconds)
+        full_system, content_blocks = self._build_prompt(user_message, context, extra_system_instructions, user_blocks)
+        selected_model = self._resolve_model(model, provider_name)
+
+        if provider_name == "openai":
+            if not self.openai_api_key:
+                raise Exception("OpenAI API key is not configured.")
+            client = provider_clients.async_openai(self.openai_api_key)
+            user_text = user_message.strip() or "Use the available context and provide a concise answer."
+            stream = await client.chat.completions.create(
+                model=selected_model,
                 timeout=request_timeout,
-            ) as response:
-                result = json.loads(response.read().decode("utf-8"))
-                return result["content"][0]["text"]
-
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode("utf-8")
-            raise Exception(f"Claude API error {e.code}: {error_body}")
-        except urllib.error.URLError as e:
-            raise Exception(f"Claude API connection error: {e.reason}")
-        except socket.timeout:
+                max_tokens=self.stream_max_tokens,
+                temperature=temperature if temperature is not None else 0.2,
+                messages=[
+                    {"role": "system", "content": full_system},
+                    {"role": "user", "content": user_text},
+                ],
+                stream=True,
+            )
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+            return
+
+        if not self.anthropic_api_key:
+            raise Exception("Anthropic API key is not configured.")
+
+        payload = {
+            "model":      selected_model,
+            "max_tokens": self.stream_max_tokens,
+            "system":     full_system,
+            "messages":   [{"role": "user", "content": content_blocks}],
+            "stream":     True,
+        }
+
+        try:
+            response = await provider_clients.open_stream(
+                self.anthropic_api_url,
+                payload,
+                self._anthropic_headers(),
+                request_timeout,
+            )
+            try:
+                if response.status_code >= 400:
+                    error_body = (await response.aread()).decode("utf-8", errors="replace")
+                    raise Exception(f"Claude API error {response.status_code}: {error_body}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:].strip() or "{}")
+                    event_type = event.get("type")
+                    if event_type == "content_block_delta":
+                        delta = event.get("delta") or {}
+                        if delta.get("type") == "text_delta" and delta.get("text"):
+                            yield delta["text"]
+                    elif event_type == "error":
+                        error = event.get("error") or {}
+                        raise Exception(f"Claude API error {error.get('type', 'stream')}: {error.get('message', '')}")
+                    elif event_type == "message_stop":
+                        return
+            finally:
+                await response.aclose()
+        except httpx.TimeoutException:
             raise Exception("Claude API request timed out.")
+        except httpx.TransportError as e:
+            raise Exception(f"Claude API connection error: {e}")
@@ -0,0 +1,175 @@
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+
+AGENT_CONTEXT_TOKEN_BUDGET = max(1000, int(os.getenv("AGENT_CONTEXT_TOKEN_BUDGET", "8000")))
+
+# Shorter lines are headers and labels, too generic to count as a repeated fact.
+_MIN_FACT_CHARS = 24
+# Rows of the compact "a|b|c" tables: two identical rows are two records, not a repeated fact.
+_TABLE_CELL_SEPARATOR = "|"
+_LONG_LINE_CHARS = 160
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?;])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly 4 characters per token for Latin text and 2 for Cyrillic and other scripts."""
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+
+def _fact_key(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+@dataclass(slots=True)
+class ContextBlock:
+    """One source of prompt context; lower `priority` is kept first when the budget is tight."""
+
+    name: str
+    text: str
+    priority: int
+    min_tokens: int = 0
+
+
+@dataclass(slots=True)
+class AssembledContext:
+    text: str
+    tokens: int
+    raw_tokens: int
+    duplicates_removed: int = 0
+    trimmed_tokens: dict[str, int] = field(default_factory=dict)
+
+
+class ContextAssembler:
+    """
+    Fit section data, trainer knowledge and attachments into one prompt token budget.
+
+    Each block is deduplicated against the blocks of higher priority, so a fact repeated by a
+    trainer document or an attachment is only sent once, with the most trusted source. A block
+    is never deduplicated against itself and table rows are left alone, since repeated rows of
+    live data are separate records. When the rest still exceeds the budget every block first
+    gets its `min_tokens` floor and the remainder goes to blocks by priority. Blocks are cut
+    at line boundaries from the bottom, where the fetchers and the trainer ranking put the
+    least important lines.
+    """
+
+    def __init__(self, budget_tokens: int = AGENT_CONTEXT_TOKEN_BUDGET):
+        self.budget_tokens = budget_tokens
+        self._lock = threading.Lock()
+        self._stats = {"assembled": 0, "raw_tokens": 0, "tokens": 0, "duplicates_removed": 0, "trimmed_blocks": 0}
+
+    def _dedupe(self, text: str, seen: set[str]) -> tuple[str, int, set[str]]:
+        """Drop facts already in `seen`; also returns this block's facts for lower priorities."""
+        kept_lines: list[str] = []
+        facts: set[str] = set()
+        removed = 0
+        for line in text.splitlines():
+            if not line.strip() or line.count(_TABLE_CELL_SEPARATOR) >= 2:
+                kept_lines.append(line)
+                continue
+            parts = _SENTENCE_SPLIT_RE.split(line) if len(line) > _LONG_LINE_CHARS else [line]
+            kept_parts: list[str] = []
+            for part in parts:
+                key = _fact_key(part)
+                if len(key) >= _MIN_FACT_CHARS:
+                    if key in seen:
+                        removed += 1
+                        continue
+                    facts.add(key)
+                kept_parts.append(part)
+            if len(kept_parts) == len(parts):
+                kept_lines.append(line)
+            elif kept_parts:
+                kept_lines.append(" ".join(part.strip() for part in kept_parts))
+        return "\n".join(kept_lines).strip(), removed, facts
+
+    @staticmethod
+    def _truncate(text: str, allowance: int) -> str:
+        kept: list[str] = []
+        used = 0
+        lines = text.splitlines()
+        for index, line in enumerate(lines):
+            cost = estimate_tokens(line) + 1
+            if used + cost <= allowance:
+                kept.append(line)
+                used += cost
+                continue
+            room = allowance - used
+            if room >= 50 and len(line) > 1:
+                # A single long paragraph: keep its beginning rather than nothing at all.
+                chars = int(len(line) * room / cost)
+                kept.append(line[:chars].rsplit(" ", 1)[0] + " …")
+            omitted = len(lines) - index
+            kept.append(f"[{omitted} more line{'s' if omitted != 1 else ''} omitted to fit the prompt budget]")
+            break
+        return "\n".join(kept).strip()
+
+    def assemble(self, blocks: list[ContextBlock], budget_tokens: int | None = None) -> AssembledContext:
+        budget = self.budget_tokens if budget_tokens is None else budget_tokens
+        blocks = [block for block in blocks if block.text and block.text.strip()]
+        raw_tokens = sum(estimate_tokens(block.text) for block in blocks)
+        by_priority = sorted(range(len(blocks)), key=lambda index: blocks[index].priority)
+
+        seen: set[str] = set()
+        texts: dict[int, str] = {}
+        duplicates = 0
+        for index in by_priority:
+            texts[index], removed, facts = self._dedupe(blocks[index].text, seen)
+            seen |= facts
+            duplicates += removed
+        costs = {index: estimate_tokens(text) for index, text in texts.items()}
+
+        trimmed: dict[str, int] = {}
+        if sum(costs.values()) > budget:
+            allowances = {index: 0 for index in texts}
+            remaining = budget
+            for index in by_priority:
+                allowances[index] = min(costs[index], blocks[index].min_tokens, remaining)
+                remaining -= allowances[index]
+            for index in by_priority:
+                extra = min(costs[index] - allowances[index], remaining)
+                allowances[index] += extra
+                remaining -= extra
+            for index in by_priority:
+                if allowances[index] >= costs[index]:
+                    continue
+                texts[index] = self._truncate(texts[index], allowances[index]) if allowances[index] > 0 else ""
+                trimmed[blocks[index].name] = costs[index] - estimate_tokens(texts[index])
+
+        text = "\n\n".join(texts[index] for index in range(len(blocks)) if texts[index]).strip()
+        assembled = AssembledContext(
+            text=text,
+            tokens=estimate_tokens(text),
+            raw_tokens=raw_tokens,
+            duplicates_removed=duplicates,
+            trimmed_tokens=trimmed,
+        )
+        with self._lock:
+            self._stats["assembled"] += 1
+            self._stats["raw_tokens"] += assembled.raw_tokens
+            self._stats["tokens"] += assembled.tokens
+            self._stats["duplicates_removed"] += duplicates
+            self._stats["trimmed_blocks"] += len(trimmed)
+        return assembled
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            assembled = self._stats["assembled"]
+            raw_tokens = self._stats["raw_tokens"]
+            return {
+                "budget_tokens": self.budget_tokens,
+                "assembled": assembled,
+                "duplicates_removed": self._stats["duplicates_removed"],
+                "trimmed_blocks": self._stats["trimmed_blocks"],
+                "raw_tokens_avg": round(raw_tokens / assembled, 1) if assembled else 0.0,
+                "tokens_avg": round(self._stats["tokens"] / assembled, 1) if assembled else 0.0,
+                "tokens_saved_ratio": round(1 - self._stats["tokens"] / raw_tokens, 3) if raw_tokens else 0.0,
+            }
+
+
+context_assembler = ContextAssembler()
@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+AGENT_CONTEXT_CACHE_TTL_SECONDS = max(0.0, float(os.getenv("AGENT_CONTEXT_CACHE_TTL_SECONDS", "60")))
+AGENT_CONTEXT_CACHE_MAX_ENTRIES = max(1, int(os.getenv("AGENT_CONTEXT_CACHE_MAX_ENTRIES", "2000")))
+
+_PENDING_TABLES_KEY = "agent_context_cache:tables"
+
+
+@dataclass(slots=True)
+class _Snapshot:
+    text: str
+    tables: frozenset[str]
+    token: tuple[int, ...]
+    expires_at: float
+
+
+class ContextSnapshotCache:
+    """
+    Pre-rendered agent context text, keyed by fetcher and company.
+
+    Each snapshot remembers the write version of the tables it was built from. A commit
+    that touches one of those tables bumps its version and the snapshot stops matching,
+    so only the fetchers that depend on changed data are re-run. The TTL bounds staleness
+    for data that changes without an ORM write (clock-based attendance figures, writes
+    from other replicas).
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = AGENT_CONTEXT_CACHE_TTL_SECONDS,
+        max_entries: int = AGENT_CONTEXT_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _Snapshot] = OrderedDict()
+        self._last_used: dict[Hashable, tuple[float, frozenset[str]]] = {}
+        self._versions: dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "invalidations": 0}
+
+    def _token(self, tables: frozenset[str]) -> tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in sorted(tables))
+
+    def token(self, tables: frozenset[str]) -> tuple[int, ...]:
+        """Capture before fetching; a write that lands mid-fetch makes the stored snapshot stale."""
+        with self._lock:
+            return self._token(tables)
+
+    def get(self, key: Hashable, tables: frozenset[str]) -> str | None:
+        with self._lock:
+            now = self._clock()
+            self._last_used[key] = (now, tables)
+            snapshot = self._entries.get(key)
+            if snapshot is None or snapshot.expires_at <= now or snapshot.token != self._token(snapshot.tables):
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return snapshot.text
+
+    def put(self, key: Hashable, tables: frozenset[str], text: str, token: tuple[int, ...]) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if token != self._token(tables):
+                return
+            self._entries[key] = _Snapshot(text, tables, token, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            self._stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._last_used.pop(evicted, None)
+
+    def invalidate_tables(self, tables: Iterable[str]) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            self._stats["invalidations"] += 1
+
+    def keys_to_warm(self, active_within_seconds: float, refresh_ahead_seconds: float) -> list[Hashable]:
+        """Recently requested keys whose snapshot is missing, stale, or about to expire."""
+        with self._lock:
+            now = self._clock()
+            due: list[Hashable] = []
+            for key, (last_used_at, tables) in list(self._last_used.items()):
+                if now - last_used_at > active_within_seconds:
+                    del self._last_used[key]
+                    continue
+                snapshot = self._entries.get(key)
+                if (
+                    snapshot is None
+                    or snapshot.expires_at - now <= refresh_ahead_seconds
+                    or snapshot.token != self._token(tables)
+                ):
+                    due.append(key)
+            return due
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "active_keys": len(self._last_used),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._last_used.clear()
+
+
+context_snapshots = ContextSnapshotCache()
+
+
+def _pending_tables(session: Session) -> set[str]:
+    return session.info.setdefault(_PENDING_TABLES_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_tables(session: Session, flush_context) -> None:
+    for rows in (session.new, session.dirty, session.deleted):
+        for row in rows:
+            table_name = getattr(type(row), "__tablename__", None)
+            if table_name:
+                _pending_tables(session).add(table_name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_written_tables(orm_execute_state) -> None:
+    # query.update()/delete() and ORM insert() statements skip the flush.
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _pending_tables(orm_execute_state.session).add(mapper.local_table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session: Session) -> None:
+    tables = session.info.pop(_PENDING_TABLES_KEY, None)
+    if tables:
+        context_snapshots.invalidate_tables(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_tables(session: Session) -> None:
+    session.info.pop(_PENDING_TABLES_KEY, None)
@@ -0,0 +1,113 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_FETCH_MAX_WORKERS = max(1, int(os.getenv("CONTEXT_FETCH_MAX_WORKERS", "8")))
+
+_fetch_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("context_fetch_deadline", default=None)
+
+
+class ContextFetchCancelled(Exception):
+    """Raised inside a fetcher whose shared deadline has already passed."""
+
+
+def bind_fetch_deadline(db: Session) -> Session:
+    """
+    Tie a fetcher's session to the deadline of the `gather` that started it.
+
+    A fetcher that only starts after the deadline never opens a connection. On PostgreSQL
+    the remaining time becomes the transaction's `statement_timeout`, so a query that
+    outlives the deadline is cancelled by the server and the session is released by the
+    fetcher's own `finally: db.close()` instead of holding a pooled connection.
+    """
+    deadline = _fetch_deadline.get()
+    if deadline is None:
+        return db
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        db.close()
+        raise ContextFetchCancelled("Context fetch deadline passed before the query started.")
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}"))
+    except Exception:
+        db.close()
+        raise
+    return db
+
+
+class ContextFetchPool:
+    """
+    Process-wide bounded executor for agent context fetchers.
+
+    `gather` runs independent fetchers concurrently under one deadline and returns the
+    results that finished in time; queued fetchers that never started are cancelled.
+    """
+
+    def __init__(self, max_workers: int = CONTEXT_FETCH_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agent-context")
+            return self._executor
+
+    @staticmethod
+    def _timed(name: str, fetcher: Callable[[], str]) -> str:
+        started_at = time.monotonic()
+        try:
+            return fetcher()
+        finally:
+            logger.info("Context fetcher %s finished in %.0fms", name, (time.monotonic() - started_at) * 1000)
+
+    def gather(
+        self,
+        fetchers: dict[str, Callable[[], str]],
+        timeout_seconds: float,
+    ) -> tuple[dict[str, str], dict[str, str]]:
+        """Return `(results, failures)`; failures map a fetcher name to "timed out" or its error."""
+        deadline = time.monotonic() + timeout_seconds
+        executor = self._get_executor()
+        futures: dict[str, Future] = {}
+        for name, fetcher in fetchers.items():
+            run_context = contextvars.copy_context()
+            run_context.run(_fetch_deadline.set, deadline)
+            futures[name] = executor.submit(run_context.run, self._timed, name, fetcher)
+
+        wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+
+        results: dict[str, str] = {}
+        failures: dict[str, str] = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                failures[name] = "timed out"
+                logger.warning("Context fetcher %s timed out after %.1fs", name, timeout_seconds)
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as exc:
+                failures[name] = str(exc)
+                logger.warning("Context fetcher %s failed: %s", name, str(exc))
+        return results, failures
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+context_fetch_pool = ContextFetchPool()
@@ -1,9 +1,17 @@
+import os
+from dataclasses import dataclass
 from datetime import date
+from typing import Callable
 
+from agents.context_cache import context_snapshots
+from agents.context_pool import bind_fetch_deadline, context_fetch_pool
 from database.connection import SessionLocal
 from database import crud
-from database.onec_models import OneCImportJob, OneCRecord
+from database.onec_models import OneCImportJob
 from integrations.attendance.attendance_service import attendance_service
+from integrations.onec.summary import company_onec_summary
+
+AGENT_CONTEXT_TIMEOUT_SECONDS = max(1.0, float(os.getenv("AGENT_CONTEXT_TIMEOUT_SECONDS", "6")))
 
 
 def _fmt_money(value) -> str:
@@ -37,49 +45,69 @@ def _fmt_date(value) -> str:
         return str(value)
 
 
+def _compact_table(columns: list[str], rows: list[list], empty: str) -> str:
+    """One header line and one pipe-separated line per row; a fraction of the tokens of labelled bullets."""
+    if not rows:
+        return f"  {empty}"
+
+    def cell(value) -> str:
+        if value is None or value == "":
+            return "-"
+        return " ".join(str(value).replace("|", "/").split())
+
+    return "\n".join(["|".join(columns), *("|".join(cell(value) for value in row) for row in rows)])
+
+
+def _fmt_amount(value) -> str | None:
+    return None if value is None else f"{float(value):.2f}"
+
+
 def get_finance_context(company_id: int | None = None) -> str:
     """Fetch real finance data and format as text context for Claude."""
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         summary = crud.get_finance_summary(db, company_id=company_id)
-        transactions = crud.get_transactions(db, company_id=company_id)
-        invoices = crud.get_invoices(db, company_id=company_id)
-
-        tx_lines = []
-        for tx in transactions[:20]:
-            tx_lines.append(
-                f"  - {_fmt_date(tx.date)}: {tx.description} | {str(tx.type).upper()} | "
-                f"{_fmt_money(tx.amount)} | {tx.category} | {tx.status}"
-            )
-
-        inv_lines = []
-        for inv in invoices[:10]:
-            inv_lines.append(
-                f"  - {inv.invoice_number}: {inv.client_name} | "
-                f"{_fmt_money(inv.amount)} | Due: {_fmt_date(inv.due_date)} | {inv.status}"
-            )
+        transactions = crud.get_transactions(db, limit=20, company_id=company_id)
+        invoices = crud.get_invoices(db, limit=10, company_id=company_id)
+
+        tx_table = _compact_table(
+            ["date", "description", "type", "amount_usd", "category", "status"],
+            [
+                [_fmt_date(tx.date), tx.description, getattr(tx.type, "value", tx.type), _fmt_amount(tx.amount), tx.category, tx.status]
+                for tx in transactions
+            ],
+            "No transactions found.",
+        )
+        inv_table = _compact_table(
+            ["number", "client", "amount_usd", "due", "status"],
+            [
+                [inv.invoice_number, inv.client_name, _fmt_amount(inv.amount), _fmt_date(inv.due_date), inv.status]
+                for inv in invoices
+            ],
+            "No invoices found.",
+        )
 
         return f"""
 REAL FINANCE DATA (live from database):
 
 Summary:
-  Total Income:       {_fmt_money(summary.get('total_income', 0))}
-  Total Expenses:     {_fmt_money(summary.get('total_expenses', 0))}
-  Net Profit:         {_fmt_money(summary.get('net_profit', 0))}
-  Pending Invoices:   {summary.get('pending_invoices', 0)}
+  Total Income: {_fmt_money(summary.get('total_income', 0))}
+  Total Expenses: {_fmt_money(summary.get('total_expenses', 0))}
+  Net Profit: {_fmt_money(summary.get('net_profit', 0))}
+  Pending Invoices: {summary.get('pending_invoices', 0)}
 
-Recent Transactions (last 20):
-{chr(10).join(tx_lines) if tx_lines else "  No transactions found."}
+Recent Transactions (last 20, newest first):
+{tx_table}
 
-Recent Invoices (last 10):
-{chr(10).join(inv_lines) if inv_lines else "  No invoices found."}
+Recent Invoices (last 10, newest first):
+{inv_table}
 """.strip()
     finally:
         db.close()
 
 
 def get_onec_context(company_id: int) -> str:
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         latest_job = (
             db.query(OneCImportJob)
@@ -94,33 +122,13 @@ def get_onec_context(company_id: int) -> str:
         if not latest_job:
             return ""
 
-        records = (
-            db.query(OneCRecord)
-            .filter(OneCRecord.company_id == company_id, OneCRecord.row_status.in_(["ready", "imported"]))
-            .order_by(OneCRecord.created_at.desc())
-            .limit(500)
-            .all()
-        )
-        if not records:
+        summary = company_onec_summary(db, company_id)
+        if not summary:
             return ""
 
-        trial_balance = [record.normalized_data for record in records if record.record_type == "trial_balance"]
-        transactions = [record.normalized_data for record in records if record.record_type == "transaction"]
-        invoices = [record.normalized_data for record in records if record.record_type == "invoice"]
-        inventory = [record.normalized_data for record in records if record.record_type == "inventory_item"]
-        payroll = [record.normalized_data for record in records if record.record_type == "employee"]
-
-        cash_total = sum(float(item.get("closing_balance") or 0) for item in trial_balance if str(item.get("account") or "").startswith(("50", "51")))
-        receivables_total = sum(float(item.get("closing_balance") or 0) for item in trial_balance if str(item.get("account") or "").startswith("40"))
-        payables_total = sum(float(item.get("closing_balance") or 0) for item in trial_balance if str(item.get("account") or "").startswith("60"))
-        revenue_total = sum(float(item.get("amount") or 0) for item in invoices)
-        payroll_total = sum(float(item.get("net_pay") or item.get("salary") or 0) for item in payroll)
-        low_stock = sum(1 for item in inventory if float(item.get("closing_stock") or 0) <= 0)
-        counterparties = {}
-        for item in invoices:
-            name = item.get("client_name") or "Unknown"
-            counterparties[name] = counterparties.get(name, 0.0) + float(item.get("amount") or 0)
-        top_customer = max(counterparties.items(), key=lambda value: value[1]) if counterparties else None
+        counts = summary["counts"]
+        customers = summary["revenue_by_customer"]
+        top_customer = max(customers.items(), key=lambda value: value[1]) if customers else None
         top_customer_line = (
             f"- Top customer: {top_customer[0]} — {_fmt_uzs(top_customer[1])}"
             if top_customer
@@ -131,69 +139,53 @@ def get_onec_context(company_id: int) -> str:
 1C INTEGRATION DATA (last synced: {_fmt_date(latest_job.completed_at)}):
 
 ACCOUNT BALANCES:
-- Cash and bank accounts: {_fmt_uzs(cash_total)}
-- Accounts receivable: {_fmt_uzs(receivables_total)}
-- Accounts payable: {_fmt_uzs(payables_total)}
+- Cash and bank accounts: {_fmt_uzs(summary["cash_total"])}
+- Accounts receivable: {_fmt_uzs(summary["receivables_total"])}
+- Accounts payable: {_fmt_uzs(summary["payables_total"])}
 
 RECENT ACTIVITY:
-- Revenue from imported sales docs: {_fmt_uzs(revenue_total)} ({len(invoices)} invoices)
+- Revenue from imported sales docs: {_fmt_uzs(summary["revenue_total"])} ({counts["invoice"]} invoices)
 {top_customer_line}
-- Imported transaction rows: {len(transactions)}
+- Imported transaction rows: {counts["transaction"]}
 
 INVENTORY:
-- Imported inventory rows: {len(inventory)}
-- Low stock alerts: {low_stock}
+- Imported inventory rows: {counts["inventory_item"]}
+- Low stock alerts: {summary["low_stock"]}
 
 PAYROLL:
-- Imported payroll rows: {len(payroll)}
-- Payroll disbursed: {_fmt_uzs(payroll_total)}
+- Imported payroll rows: {counts["employee"]}
+- Payroll disbursed: {_fmt_uzs(summary["payroll_total"])}
 """.strip()
     finally:
         db.close()
 
 
 def get_onec_anomalies(company_id: int) -> str:
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
-        records = (
-            db.query(OneCRecord)
-            .filter(OneCRecord.company_id == company_id, OneCRecord.row_status.in_(["ready", "imported"]))
-            .order_by(OneCRecord.created_at.desc())
-            .limit(500)
-            .all()
-        )
+        summary = company_onec_summary(db, company_id)
+        if not summary:
+            return ""
         findings: list[str] = []
-        for record in records:
-            data = record.normalized_data or {}
-            if record.record_type == "transaction":
-                amount = float(data.get("amount") or 0)
-                if amount and abs(amount) % 1000 == 0:
-                    findings.append("Round-number transactions were found in imported 1C movements.")
-                if not data.get("source_counterparty") and not data.get("counterparty"):
-                    findings.append("Some imported 1C transactions do not include counterparties.")
-            if record.record_type == "inventory_item" and float(data.get("closing_stock") or 0) < 0:
-                findings.append("Negative inventory balances exist in imported 1C stock snapshots.")
-        return "\n".join(dict.fromkeys(findings))
+        if summary["round_transactions"]:
+            findings.append("Round-number transactions were found in imported 1C movements.")
+        if summary["transactions_without_counterparty"]:
+            findings.append("Some imported 1C transactions do not include counterparties.")
+        if summary["negative_stock"]:
+            findings.append("Negative inventory balances exist in imported 1C stock snapshots.")
+        return "\n".join(findings)
     finally:
         db.close()
 
 
 def get_onec_cashflow_forecast(company_id: int) -> str:
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
-        records = (
-            db.query(OneCRecord)
-            .filter(OneCRecord.company_id == company_id, OneCRecord.record_type == "transaction", OneCRecord.row_status.in_(["ready", "imported"]))
-            .order_by(OneCRecord.created_at.desc())
-            .limit(180)
-            .all()
-        )
-        if not records:
+        summary = company_onec_summary(db, company_id)
+        if not summary or not summary["counts"]["transaction"]:
             return ""
-        inflow = [float(item.normalized_data.get("amount") or 0) for item in records if item.normalized_data.get("type") == "income"]
-        outflow = [float(item.normalized_data.get("amount") or 0) for item in records if item.normalized_data.get("type") == "expense"]
-        avg_inflow = sum(inflow) / max(len(inflow), 1)
-        avg_outflow = sum(outflow) / max(len(outflow), 1)
+        avg_inflow = summary["inflow_total"] / max(summary["inflow_count"], 1)
+        avg_outflow = summary["outflow_total"] / max(summary["outflow_count"], 1)
         net = avg_inflow - avg_outflow
         return (
             f"1C CASH FLOW FORECAST:\n"
@@ -207,7 +199,7 @@ def get_onec_cashflow_forecast(company_id: int) -> str:
 
 def get_hr_context(company_id: int | None = None) -> str:
     """Fetch real HR data and format as text context for Claude."""
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         summary = crud.get_hr_summary(db, company_id=company_id)
         employees = crud.get_employees(db, company_id=company_id)
@@ -251,7 +243,7 @@ def get_attendance_context(company_id: int | None = None) -> str:
     if company_id is None:
         return ""
 
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         today = date.today()
         today_stats = attendance_service.get_todays_presence(db, company_id)
@@ -291,7 +283,7 @@ PAYROLL STATUS:
 
 def get_projects_context() -> str:
     """Fetch real projects/kanban data."""
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         from database.models import Project, KanbanTask, KanbanColumn
 
@@ -332,7 +324,7 @@ Tasks ({len(tasks)} total):
 
 def get_marketing_context() -> str:
     """Fetch live marketing operations data."""
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         summary = crud.get_marketing_summary(db)
         funnel = crud.get_marketing_funnel(db)
@@ -407,7 +399,7 @@ Channel Metrics:
 
 def get_legal_context() -> str:
     """Fetch live legal operations and compliance data."""
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         summary = crud.get_legal_summary(db)
         documents = crud.get_legal_documents(db, limit=20)
@@ -473,7 +465,7 @@ Compliance Tasks:
 
 def get_admin_context() -> str:
     """Fetch platform-wide admin data."""
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         from database.admin_crud import get_platform_summary, get_clients_with_subscriptions
 
@@ -515,70 +507,149 @@ Clients:
         db.close()
 
 
+@dataclass(frozen=True, slots=True)
+class _ContextFetcher:
+    fetch: Callable[[int | None], str]
+    # Writes to these tables invalidate the fetcher's cached snapshot.
+    tables: frozenset[str]
+    per_company: bool = True
+
+
+_ONEC_TABLES = frozenset({"onec_import_jobs", "onec_raw_records"})
+_CONTEXT_FETCHERS: dict[str, _ContextFetcher] = {
+    "finance": _ContextFetcher(
+        lambda company_id: get_finance_context(company_id=company_id),
+        frozenset({"transactions", "invoices"}),
+    ),
+    "onec": _ContextFetcher(lambda company_id: get_onec_context(company_id), _ONEC_TABLES),
+    "onec_anomalies": _ContextFetcher(lambda company_id: get_onec_anomalies(company_id), _ONEC_TABLES),
+    "onec_forecast": _ContextFetcher(lambda company_id: get_onec_cashflow_forecast(company_id), _ONEC_TABLES),
+    "hr": _ContextFetcher(
+        lambda company_id: get_hr_context(company_id=company_id),
+        frozenset({"employees", "positions", "departments"}),
+    ),
+    "attendance": _ContextFetcher(
+        lambda company_id: get_attendance_context(company_id=company_id),
+        frozenset({"employees", "attendance_records", "leave_requests", "payroll_records", "uzbek_holidays"}),
+    ),
+    "projects": _ContextFetcher(
+        lambda _: get_projects_context(),
+        frozenset({"projects", "kanban_columns", "kanban_tasks"}),
+        per_company=False,
+    ),
+    "marketing": _ContextFetcher(
+        lambda _: get_marketing_context(),
+        frozenset({"marketing_campaigns", "marketing_content_items", "marketing_leads", "marketing_channel_metrics"}),
+        per_company=False,
+    ),
+    "legal": _ContextFetcher(
+        lambda _: get_legal_context(),
+        frozenset({"legal_documents", "legal_contracts", "legal_compliance_tasks"}),
+        per_company=False,
+    ),
+    "admin": _ContextFetcher(
+        lambda _: get_admin_context(),
+        frozenset({"client_orgs", "subscriptions", "payments", "payment_methods"}),
+        per_company=False,
+    ),
+}
+
+
+def _section_fetchers(section: str, company_id: int | None = None, include_onec: bool = True) -> list[str] | None:
+    """Independent fetchers for a section, in the order their text appears in the context."""
+    onec = ["onec", "onec_anomalies", "onec_forecast"] if include_onec and company_id is not None else []
+    if section == "dashboard":
+        return ["finance", *onec, "hr", "attendance", "projects"]
+    if section == "finance":
+        return ["finance", *onec]
+    if section == "hr":
+        return ["hr", "attendance"]
+    if section in {"projects", "marketing", "legal", "admin"}:
+        return [section]
+    return None
+
+
+def _snapshot_key(name: str, company_id: int | None) -> tuple[str, int | None]:
+    return name, company_id if _CONTEXT_FETCHERS[name].per_company else None
+
+
+def _fetch_snapshots(
+    keys: list[tuple[str, int | None]],
+    timeout_seconds: float,
+) -> tuple[dict[tuple[str, int | None], str], dict[str, str]]:
+    """Run the fetchers for `keys` together and store each result as a snapshot."""
+    tokens = {key: context_snapshots.token(_CONTEXT_FETCHERS[key[0]].tables) for key in keys}
+    labels = {f"{name}:{company_id}": (name, company_id) for name, company_id in keys}
+    results, failures = context_fetch_pool.gather(
+        {
+            label: (lambda fetcher=_CONTEXT_FETCHERS[key[0]], company_id=key[1]: fetcher.fetch(company_id))
+            for label, key in labels.items()
+        },
+        timeout_seconds,
+    )
+    fetched: dict[tuple[str, int | None], str] = {}
+    for label, text in results.items():
+        key = labels[label]
+        context_snapshots.put(key, _CONTEXT_FETCHERS[key[0]].tables, text, tokens[key])
+        fetched[key] = text
+    return fetched, {labels[label][0]: reason for label, reason in failures.items()}
+
+
+def _gather_context(names: list[str], company_id: int | None, timeout_seconds: float) -> str:
+    texts: dict[str, str] = {}
+    missing: list[tuple[str, int | None]] = []
+    for name in names:
+        key = _snapshot_key(name, company_id)
+        cached = context_snapshots.get(key, _CONTEXT_FETCHERS[name].tables)
+        if cached is None:
+            missing.append(key)
+        else:
+            texts[name] = cached
+
+    failures: dict[str, str] = {}
+    if missing:
+        fetched, failures = _fetch_snapshots(missing, timeout_seconds)
+        texts.update({name: text for (name, _), text in fetched.items()})
+
+    context = "\n\n".join(texts[name] for name in names if texts.get(name)).strip()
+    if not failures:
+        return context
+    if not texts:
+        if all(reason == "timed out" for reason in failures.values()):
+            return (
+                "Note: Live context fetch timed out. "
+                "Provide a concise answer based on available message and attachments."
+            )
+        reason = next(reason for reason in failures.values() if reason != "timed out")
+        return f"Note: Could not fetch live data ({reason}). Answering based on general knowledge."
+    missing_parts = ", ".join(f"{name} ({reason})" for name, reason in failures.items())
+    return f"{context}\n\nNote: Some live data is missing: {missing_parts}.".strip()
+
+
+def warm_context_snapshots(active_within_seconds: float, refresh_ahead_seconds: float) -> int:
+    """Rebuild snapshots that recently served requests before they are needed again."""
+    keys = context_snapshots.keys_to_warm(active_within_seconds, refresh_ahead_seconds)
+    if not keys:
+        return 0
+    fetched, _ = _fetch_snapshots(keys, AGENT_CONTEXT_TIMEOUT_SECONDS)
+    return len(fetched)
+
+
 def get_dashboard_context(company_id: int | None = None, include_onec: bool = True) -> str:
     """Combine finance + HR + projects for a full dashboard overview."""
-    finance = get_finance_context(company_id=company_id)
-    if include_onec and company_id is not None:
-        extras = "\n\n".join(
-            part
-            for part in [
-                get_onec_context(company_id),
-                get_onec_anomalies(company_id),
-                get_onec_cashflow_forecast(company_id),
-            ]
-            if part
-        )
-        if extras:
-            finance = f"{finance}\n\n{extras}".strip()
-    hr = get_hr_context(company_id=company_id)
-    attendance = get_attendance_context(company_id=company_id)
-    projects = get_projects_context()
-    return "\n\n".join(part for part in [finance, hr, attendance, projects] if part).strip()
+    return _gather_context(_section_fetchers("dashboard", company_id, include_onec), company_id, AGENT_CONTEXT_TIMEOUT_SECONDS)
 
 
-def get_context_for_section(section: str, company_id: int | None = None, include_onec: bool = True) -> str:
+def get_context_for_section(
+    section: str,
+    company_id: int | None = None,
+    include_onec: bool = True,
+    timeout_seconds: float = AGENT_CONTEXT_TIMEOUT_SECONDS,
+) -> str:
     """Main entry point - returns the right context for any section."""
-    if section == "dashboard":
-        try:
-            return get_dashboard_context(company_id=company_id, include_onec=include_onec)
-        except Exception as exc:
-            return f"Note: Could not fetch live data ({str(exc)}). Answering based on general knowledge."
-
-    if section == "finance":
-        try:
-            context = get_finance_context(company_id=company_id)
-            if include_onec and company_id is not None:
-                extras = "\n\n".join(
-                    part
-                    for part in [
-                        get_onec_context(company_id),
-                        get_onec_anomalies(company_id),
-                        get_onec_cashflow_forecast(company_id),
-                    ]
-                    if part
-                )
-                if extras:
-                    context = f"{context}\n\n{extras}".strip()
-            return context
-        except Exception as exc:
-            return f"Note: Could not fetch live data ({str(exc)}). Answering based on general knowledge."
-
-    fetchers = {
-        "hr": lambda: "\n\n".join(
-            part for part in [get_hr_context(company_id=company_id), get_attendance_context(company_id=company_id)] if part
-        ).strip(),
-        "projects": get_projects_context,
-        "marketing": get_marketing_context,
-        "legal": get_legal_context,
-        "admin": get_admin_context,
-    }
-
-    fetcher = fetchers.get(section)
-    if fetcher:
-        try:
-            return fetcher()
-        except Exception as exc:
-            return f"Note: Could not fetch live data ({str(exc)}). Answering based on general knowledge."
+    names = _section_fetchers(section, company_id, include_onec)
+    if names:
+        return _gather_context(names, company_id, timeout_seconds)
 
     return (
         f"Note: Live data integration for {section} is not yet configured. "
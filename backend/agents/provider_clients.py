@@ -0,0 +1,206 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import ssl
+import threading
+import time
+import weakref
+from functools import lru_cache
+
+import certifi
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+logger = logging.getLogger(__name__)
+
+AI_PROVIDER_MAX_RETRIES = max(0, int(os.getenv("AI_PROVIDER_MAX_RETRIES", "2")))
+AI_PROVIDER_RETRY_BASE_SECONDS = max(0.05, float(os.getenv("AI_PROVIDER_RETRY_BASE_SECONDS", "0.5")))
+AI_PROVIDER_RETRY_MAX_SECONDS = max(0.1, float(os.getenv("AI_PROVIDER_RETRY_MAX_SECONDS", "8")))
+AI_PROVIDER_POOL_MAX_CONNECTIONS = max(1, int(os.getenv("AI_PROVIDER_POOL_MAX_CONNECTIONS", "50")))
+AI_PROVIDER_POOL_MAX_KEEPALIVE = max(1, int(os.getenv("AI_PROVIDER_POOL_MAX_KEEPALIVE", "20")))
+AI_PROVIDER_POOL_KEEPALIVE_SECONDS = max(1.0, float(os.getenv("AI_PROVIDER_POOL_KEEPALIVE_SECONDS", "90")))
+
+# HTTP/2 needs the optional `h2` package; without it the pool speaks HTTP/1.1 keep-alive.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504, 529})
+
+
+@lru_cache(maxsize=1)
+def provider_ssl_context() -> ssl.SSLContext:
+    """CA bundle is parsed once per process instead of once per request."""
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def retry_delay(attempt: int, retry_after: str | None = None) -> float:
+    """Full-jitter exponential backoff, honouring a numeric Retry-After when the provider sends one."""
+    if retry_after:
+        try:
+            return min(AI_PROVIDER_RETRY_MAX_SECONDS, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+    return random.uniform(0, min(AI_PROVIDER_RETRY_MAX_SECONDS, AI_PROVIDER_RETRY_BASE_SECONDS * (2 ** attempt)))
+
+
+class _AsyncClients:
+    def __init__(self, http: httpx.AsyncClient):
+        self.http = http
+        self.openai: dict[str, AsyncOpenAI] = {}
+
+
+class ProviderClientPool:
+    """
+    Long-lived HTTP clients for the AI providers, shared by every agent.
+
+    One sync client serves `BaseAgent.run`; async clients are kept per event loop because
+    httpx connections cannot cross loops. Requests that hit 429/5xx are retried with
+    jittered backoff while the caller's time budget allows. `stats` reports how often a
+    request reused a pooled connection instead of opening a new one.
+    """
+
+    def __init__(self, max_retries: int = AI_PROVIDER_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+        self._openai: dict[str, OpenAI] = {}
+        self._async: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncClients] = weakref.WeakKeyDictionary()
+        self._stats = {"requests": 0, "new_connections": 0, "retries": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _client_options(self) -> dict:
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "verify": provider_ssl_context(),
+            "limits": httpx.Limits(
+                max_connections=AI_PROVIDER_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=AI_PROVIDER_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=AI_PROVIDER_POOL_KEEPALIVE_SECONDS,
+            ),
+        }
+
+    # httpcore reports each new TCP connection through the per-request "trace" extension.
+    def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._count("new_connections")
+
+    def _on_request(self, request: httpx.Request) -> None:
+        self._count("requests")
+        request.extensions["trace"] = self._trace
+
+    async def _atrace(self, event_name: str, info: dict) -> None:
+        self._trace(event_name, info)
+
+    async def _on_async_request(self, request: httpx.Request) -> None:
+        self._count("requests")
+        request.extensions["trace"] = self._atrace
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(event_hooks={"request": [self._on_request]}, **self._client_options())
+            return self._client
+
+    def _async_clients(self) -> _AsyncClients:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async.get(loop)
+            if clients is None:
+                clients = _AsyncClients(
+                    httpx.AsyncClient(event_hooks={"request": [self._on_async_request]}, **self._client_options())
+                )
+                self._async[loop] = clients
+            return clients
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        return self._async_clients().http
+
+    def openai(self, api_key: str) -> OpenAI:
+        http_client = self.client
+        with self._lock:
+            client = self._openai.get(api_key)
+            if client is None:
+                client = OpenAI(api_key=api_key, http_client=http_client, max_retries=self.max_retries)
+                self._openai[api_key] = client
+            return client
+
+    def async_openai(self, api_key: str) -> AsyncOpenAI:
+        clients = self._async_clients()
+        with self._lock:
+            client = clients.openai.get(api_key)
+            if client is None:
+                client = AsyncOpenAI(api_key=api_key, http_client=clients.http, max_retries=self.max_retries)
+                clients.openai[api_key] = client
+            return client
+
+    def _retry_wait(self, response: httpx.Response, attempt: int, deadline: float) -> float | None:
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+            return None
+        delay = retry_delay(attempt, response.headers.get("retry-after"))
+        # Leave at least a second for the retried request itself.
+        if time.monotonic() + delay + 1.0 >= deadline:
+            return None
+        logger.warning("AI provider returned %s; retrying in %.2fs (attempt %s)", response.status_code, delay, attempt + 1)
+        self._count("retries")
+        return delay
+
+    def post_json(self, url: str, payload: dict, headers: dict[str, str], timeout_seconds: float) -> httpx.Response:
+        deadline = time.monotonic() + timeout_seconds
+        attempt = 0
+        while True:
+            response = self.client.post(
+                url, json=payload, headers=headers, timeout=max(1.0, deadline - time.monotonic())
+            )
+            delay = self._retry_wait(response, attempt, deadline)
+            if delay is None:
+                return response
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    async def open_stream(
+        self, url: str, payload: dict, headers: dict[str, str], timeout_seconds: float
+    ) -> httpx.Response:
+        """Send a streaming POST and return the open response; the caller must `aclose` it."""
+        client = self.async_client
+        deadline = time.monotonic() + timeout_seconds
+        attempt = 0
+        while True:
+            request = client.build_request("POST", url, json=payload, headers=headers, timeout=timeout_seconds)
+            response = await client.send(request, stream=True)
+            delay = self._retry_wait(response, attempt, deadline)
+            if delay is None:
+                return response
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            async_pools = len(self._async)
+        requests = stats["requests"]
+        reused = max(0, requests - stats["new_connections"])
+        return {
+            **stats,
+            "reused_connections": reused,
+            "reuse_rate": round(reused / requests, 3) if requests else 0.0,
+            "http2": HTTP2_AVAILABLE,
+            "async_pools": async_pools,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+            self._openai.clear()
+            self._async = weakref.WeakKeyDictionary()
+        if client is not None:
+            client.close()
+
+
+provider_clients = ProviderClientPool()
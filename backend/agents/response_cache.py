@@ -0,0 +1,174 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+AGENT_RESPONSE_CACHE_ENABLED = os.getenv("AGENT_RESPONSE_CACHE_ENABLED", "false").strip().lower() in {"1", "true", "yes", "on"}
+AGENT_RESPONSE_CACHE_TTL_SECONDS = max(0.0, float(os.getenv("AGENT_RESPONSE_CACHE_TTL_SECONDS", "300")))
+AGENT_RESPONSE_CACHE_MAX_ENTRIES = max(1, int(os.getenv("AGENT_RESPONSE_CACHE_MAX_ENTRIES", "1000")))
+
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_message(message: str) -> str:
+    """Case, punctuation and spacing do not change what is being asked."""
+    return " ".join(_NON_WORD_RE.sub(" ", (message or "").casefold()).split())
+
+
+def context_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update((part or "").encode("utf-8", "surrogatepass"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class ResponseCacheKey:
+    section: str
+    company_id: int | None
+    data_source: str
+    message: str
+    provider: str
+    model: str
+    context_hash: str
+    data_hash: str
+    profile_version: str
+
+    @property
+    def scope(self) -> tuple[str, int | None, str]:
+        return self.section, self.company_id, self.data_source
+
+
+@dataclass(slots=True)
+class _CachedResponse:
+    response: str
+    provider_ms: float
+    expires_at: float
+
+
+class AgentResponseCache:
+    """
+    Finished agent answers for repeated questions against unchanged data.
+
+    Dashboards and the Telegram bot ask the same questions over and over; a hit skips the
+    provider round trip entirely. The key carries the hash of the full rendered context, so
+    any change to what the provider would see is a miss. Invalidation follows only the live
+    data: the first lookup that sees a new data hash for a section, company and data source
+    drops the answers built on the old one, while context that varies per question, such as
+    trainer chunks, never evicts other questions' answers. Entries are scoped by company so
+    one tenant can never be served another tenant's answer.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = AGENT_RESPONSE_CACHE_ENABLED,
+        ttl_seconds: float = AGENT_RESPONSE_CACHE_TTL_SECONDS,
+        max_entries: int = AGENT_RESPONSE_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.enabled = enabled and ttl_seconds > 0
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[ResponseCacheKey, _CachedResponse] = OrderedDict()
+        self._scope_hashes: dict[tuple[str, int | None, str], str] = {}
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "invalidations": 0, "bypassed": 0}
+        self._saved_provider_ms = 0.0
+
+    def key(
+        self,
+        section: str,
+        company_id: int | None,
+        message: str,
+        provider: str,
+        model: str | None,
+        context: str,
+        profile_version: str = "",
+        *,
+        data: str | None = None,
+        data_source: str = "",
+    ) -> ResponseCacheKey | None:
+        """
+        None when the question has nothing to match on.
+
+        `data` is the live data part of `context` that invalidation follows; by default the
+        whole context.
+        """
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+        full_hash = context_hash(context)
+        return ResponseCacheKey(
+            section=section,
+            company_id=company_id,
+            data_source=data_source,
+            message=normalized,
+            provider=provider,
+            model=(model or "").strip().lower(),
+            context_hash=full_hash,
+            data_hash=full_hash if data is None else context_hash(data),
+            profile_version=profile_version,
+        )
+
+    def _drop_scope(self, scope: tuple[str, int | None, str], keep_hash: str) -> None:
+        stale = [key for key in self._entries if key.scope == scope and key.data_hash != keep_hash]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._stats["invalidations"] += 1
+
+    def get(self, key: ResponseCacheKey) -> str | None:
+        with self._lock:
+            if self._scope_hashes.get(key.scope) != key.data_hash:
+                self._drop_scope(key.scope, key.data_hash)
+                self._scope_hashes[key.scope] = key.data_hash
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= self._clock():
+                self._entries.pop(key, None)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            self._saved_provider_ms += entry.provider_ms
+            return entry.response
+
+    def put(self, key: ResponseCacheKey, response: str, provider_ms: float) -> None:
+        with self._lock:
+            if self._scope_hashes.get(key.scope, key.data_hash) != key.data_hash:
+                # The data changed while the provider was answering.
+                return
+            self._entries[key] = _CachedResponse(response, provider_ms, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            self._stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def stats(self) -> dict[str, int | float | bool]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "enabled": self.enabled,
+                **self._stats,
+                "entries": len(self._entries),
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "saved_provider_ms": round(self._saved_provider_ms, 1),
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._scope_hashes.clear()
+
+
+agent_responses = AgentResponseCache()
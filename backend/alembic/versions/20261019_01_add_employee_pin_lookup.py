@@ -0,0 +1,53 @@
+"""add employee pin lookup digest
+
+Revision ID: 20261019_01
+Revises: 20260317_02
+Create Date: 2026-10-19 09:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_01"
+down_revision = "20260317_02"
+branch_labels = None
+depends_on = None
+
+
+def _table_names(inspector: sa.Inspector) -> set[str]:
+    return set(inspector.get_table_names())
+
+
+def _column_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def _index_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "employees" not in _table_names(inspector):
+        return
+    if "employee_pin_lookup" not in _column_names(inspector, "employees"):
+        with op.batch_alter_table("employees") as batch_op:
+            batch_op.add_column(sa.Column("employee_pin_lookup", sa.String(length=64), nullable=True))
+    inspector = sa.inspect(bind)
+    if "ix_employees_employee_pin_lookup" not in _index_names(inspector, "employees"):
+        op.create_index("ix_employees_employee_pin_lookup", "employees", ["employee_pin_lookup"], unique=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "employees" not in _table_names(inspector):
+        return
+    if "ix_employees_employee_pin_lookup" in _index_names(inspector, "employees"):
+        op.drop_index("ix_employees_employee_pin_lookup", table_name="employees")
+    if "employee_pin_lookup" in _column_names(sa.inspect(bind), "employees"):
+        with op.batch_alter_table("employees") as batch_op:
+            batch_op.drop_column("employee_pin_lookup")
@@ -0,0 +1,44 @@
+"""add onec import job ai summary
+
+Revision ID: 20261019_02
+Revises: 20261019_01
+Create Date: 2026-10-19 12:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_02"
+down_revision = "20261019_01"
+branch_labels = None
+depends_on = None
+
+
+def _table_names(inspector: sa.Inspector) -> set[str]:
+    return set(inspector.get_table_names())
+
+
+def _column_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "onec_import_jobs" not in _table_names(inspector):
+        return
+    if "ai_summary" not in _column_names(inspector, "onec_import_jobs"):
+        with op.batch_alter_table("onec_import_jobs") as batch_op:
+            batch_op.add_column(sa.Column("ai_summary", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "onec_import_jobs" not in _table_names(inspector):
+        return
+    if "ai_summary" in _column_names(inspector, "onec_import_jobs"):
+        with op.batch_alter_table("onec_import_jobs") as batch_op:
+            batch_op.drop_column("ai_summary")
@@ -0,0 +1,82 @@
+"""add ai trainer inverted index
+
+Revision ID: 20261019_03
+Revises: 20261019_02
+Create Date: 2026-10-19 15:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261019_03"
+down_revision = "20261019_02"
+branch_labels = None
+depends_on = None
+
+
+def _table_names(inspector: sa.Inspector) -> set[str]:
+    return set(inspector.get_table_names())
+
+
+def _column_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def _index_names(inspector: sa.Inspector, table_name: str) -> set[str]:
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = _table_names(inspector)
+    if "ai_trainer_chunks" not in tables:
+        return
+
+    # Existing chunks keep term_count NULL until the app backfills their postings on startup.
+    if "term_count" not in _column_names(inspector, "ai_trainer_chunks"):
+        with op.batch_alter_table("ai_trainer_chunks") as batch_op:
+            batch_op.add_column(sa.Column("term_count", sa.Integer(), nullable=True))
+
+    if "ai_trainer_postings" not in tables:
+        op.create_table(
+            "ai_trainer_postings",
+            sa.Column("term", sa.String(length=64), primary_key=True),
+            sa.Column(
+                "chunk_id",
+                sa.Integer(),
+                sa.ForeignKey("ai_trainer_chunks.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column(
+                "source_id",
+                sa.Integer(),
+                sa.ForeignKey("ai_trainer_sources.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("section", sa.String(length=50), nullable=False),
+            sa.Column("term_frequency", sa.Integer(), nullable=False, server_default="1"),
+        )
+
+    inspector = sa.inspect(bind)
+    existing_indexes = _index_names(inspector, "ai_trainer_postings")
+    for index_name, columns in (
+        ("ix_ai_trainer_postings_section_term", ["section", "term"]),
+        ("ix_ai_trainer_postings_chunk_id", ["chunk_id"]),
+        ("ix_ai_trainer_postings_source_id", ["source_id"]),
+    ):
+        if index_name not in existing_indexes:
+            op.create_index(index_name, "ai_trainer_postings", columns, unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = _table_names(inspector)
+    if "ai_trainer_postings" in tables:
+        op.drop_table("ai_trainer_postings")
+    if "ai_trainer_chunks" in tables and "term_count" in _column_names(inspector, "ai_trainer_chunks"):
+        with op.batch_alter_table("ai_trainer_chunks") as batch_op:
+            batch_op.drop_column("term_count")
@@ -6,6 +6,7 @@ from uuid import uuid4
 from PIL import Image, ImageOps, UnidentifiedImageError
 
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from sqlalchemy import func
@@ -34,6 +35,7 @@ from api.client_account import (
     _recompute_onboarding_completion,
     _sync_client_org_and_subscription,
 )
+from integrations.ai_trainer.ingestion import ai_trainer_ingestion
 from integrations.posthog.service import get_admin_posthog_analytics
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -1761,9 +1763,12 @@ def add_ai_trainer_source_url(
     db: Session = Depends(get_db),
 ):
     try:
-        return crud.create_ai_trainer_source_from_url(db, data)
+        source = crud.create_ai_trainer_source_from_url(db, data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if ai_trainer_ingestion.submit(source.id):
+        return source
+    return crud.ingest_ai_trainer_source(db, source.id)
 
 
 @router.post("/ai-trainer/sources/text", response_model=admin_schemas.AITrainerSourceOut)
@@ -1788,16 +1793,18 @@ async def add_ai_trainer_source_file(
     if not payload:
         raise HTTPException(status_code=400, detail="Uploaded file is empty.")
     try:
-        return crud.create_ai_trainer_source_from_file(
+        source = crud.create_ai_trainer_source_from_file(
             db,
             section=section,
             file_name=file.filename or "source.bin",
             mime_type=file.content_type,
-            payload=payload,
             title=title,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if ai_trainer_ingestion.submit(source.id, payload):
+        return source
+    return await run_in_threadpool(crud.ingest_ai_trainer_source, db, source.id, payload)
 
 
 @router.post("/ai-trainer/sources/{source_id}/reindex", response_model=admin_schemas.AITrainerSourceOut)
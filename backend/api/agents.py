@@ -1,14 +1,20 @@
+import asyncio
 import base64
+import hashlib
+import json
 import logging
 import os
 import socket
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
-from typing import Literal
+from typing import Any, AsyncIterator, Literal
 
 from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from openai import (
     APIConnectionError,
     APIStatusError,
@@ -20,12 +26,19 @@ from openai import (
 from pydantic import BaseModel, Field
 
 from agents.base_agent import BaseAgent
-from agents.data_fetcher import get_context_for_section
+from agents.context_budget import ContextBlock, context_assembler
+from agents.context_cache import context_snapshots
+from agents.context_pool import bind_fetch_deadline, context_fetch_pool
+from agents.data_fetcher import AGENT_CONTEXT_TIMEOUT_SECONDS, get_context_for_section
 from agents.finance_agent import FinanceAgent
+from agents.provider_clients import provider_clients
+from agents.response_cache import agent_responses
+from api.chat import _assert_session_access
 from core.config import settings
-from database import admin_crud
+from database import admin_crud, crud
 from database.connection import SessionLocal, get_db
 from integrations.onec.service import audit_onec_ai_query, resolve_company_account
+from integrations.transcription.service import transcription_queue
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -39,11 +52,11 @@ MAX_BASE64_CHARS = 16000000
 MAX_AUDIO_FILE_BYTES = 25 * 1024 * 1024
 OPENAI_TRANSCRIBE_MODEL = os.getenv("OPENAI_TRANSCRIBE_MODEL", "gpt-4o-mini-transcribe").strip() or "gpt-4o-mini-transcribe"
 AGENT_PROVIDER_FAILOVER_ENABLED = os.getenv("AGENT_PROVIDER_FAILOVER_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
-AGENT_CONTEXT_TIMEOUT_SECONDS = max(1.0, float(os.getenv("AGENT_CONTEXT_TIMEOUT_SECONDS", "6")))
 AI_TRAINER_CONTEXT_TIMEOUT_SECONDS = max(1.0, float(os.getenv("AI_TRAINER_CONTEXT_TIMEOUT_SECONDS", "4")))
 AI_TRAINER_RUNTIME_CONTEXT_MAX_CHARS = max(2000, int(os.getenv("AI_TRAINER_RUNTIME_CONTEXT_MAX_CHARS", "12000")))
 AI_PROVIDER_TIMEOUT_SECONDS = max(3.0, float(os.getenv("AI_PROVIDER_TIMEOUT_SECONDS", "15")))
 AI_ROUTE_TIMEOUT_SECONDS = max(8.0, float(os.getenv("AI_ROUTE_TIMEOUT_SECONDS", "35")))
+TRANSCRIPTION_WAIT_SECONDS = max(5.0, float(os.getenv("AGENT_TRANSCRIPTION_WAIT_SECONDS", "60")))
 
 
 class AgentAttachment(BaseModel):
@@ -61,6 +74,7 @@ class TaskRequest(BaseModel):
     provider: str | None = None
     data_source: Literal["benela", "onec_combined"] | None = None
     attachments: list[AgentAttachment] = Field(default_factory=list)
+    session_id: str | None = None
 
 
 class TaskResponse(BaseModel):
@@ -81,7 +95,42 @@ def _probe_https_host(host: str, timeout_seconds: float = 2.5) -> tuple[bool, st
         return False, str(exc)
 
 
+# The section comes from the URL, so only the app's own modules get a shared instance.
+_SHARED_AGENT_SECTIONS = frozenset(
+    {
+        "dashboard",
+        "projects",
+        "finance",
+        "hr",
+        "sales",
+        "support",
+        "legal",
+        "marketing",
+        "supply_chain",
+        "procurement",
+        "insights",
+        "settings",
+        "marketplace",
+        "admin",
+    }
+)
+_agents: dict[str, BaseAgent] = {}
+_agents_lock = threading.Lock()
+
+
 def get_agent(section: str) -> BaseAgent:
+    """Agents hold no per-request state, so one instance per known section is shared."""
+    if section not in _SHARED_AGENT_SECTIONS:
+        return _build_agent(section)
+    with _agents_lock:
+        agent = _agents.get(section)
+        if agent is None:
+            agent = _build_agent(section)
+            _agents[section] = agent
+        return agent
+
+
+def _build_agent(section: str) -> BaseAgent:
     if section == "finance":
         return FinanceAgent()
     if section == "hr":
@@ -146,22 +195,11 @@ def _infer_provider_from_model(model: str | None) -> str | None:
 
 def _safe_get_section_context(section: str, company_id: int | None = None, include_onec: bool = True) -> str:
     """Protect agent requests from slow/stuck DB context fetches."""
-    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-context")
-    future = executor.submit(get_context_for_section, section, company_id, include_onec)
     try:
-        return future.result(timeout=AGENT_CONTEXT_TIMEOUT_SECONDS)
-    except FutureTimeoutError:
-        logger.warning("Context fetch timed out for section=%s after %.1fs", section, AGENT_CONTEXT_TIMEOUT_SECONDS)
-        future.cancel()
-        return (
-            "Note: Live context fetch timed out. "
-            "Provide a concise answer based on available message and attachments."
-        )
+        return get_context_for_section(section, company_id, include_onec, timeout_seconds=AGENT_CONTEXT_TIMEOUT_SECONDS)
     except Exception as exc:
         logger.warning("Context fetch failed for section=%s: %s", section, str(exc))
         return f"Note: Live context fetch failed ({str(exc)}). Provide a concise fallback answer."
-    finally:
-        executor.shutdown(wait=False, cancel_futures=True)
 
 
 def _alternate_provider(provider: str) -> str | None:
@@ -177,7 +215,7 @@ def _load_training_context(
     max_context_chars: int,
     max_chunks: int = 8,
 ) -> str:
-    db = SessionLocal()
+    db = bind_fetch_deadline(SessionLocal())
     try:
         return admin_crud.get_ai_trainer_training_context(
             db=db,
@@ -196,23 +234,11 @@ def _safe_get_training_context(
     max_context_chars: int,
     max_chunks: int = 8,
 ) -> str:
-    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-trainer")
-    future = executor.submit(_load_training_context, section, query, max_context_chars, max_chunks)
-    try:
-        return future.result(timeout=AI_TRAINER_CONTEXT_TIMEOUT_SECONDS)
-    except FutureTimeoutError:
-        logger.warning(
-            "Trainer context fetch timed out for section=%s after %.1fs",
-            section,
-            AI_TRAINER_CONTEXT_TIMEOUT_SECONDS,
-        )
-        future.cancel()
-        return ""
-    except Exception as exc:
-        logger.warning("Trainer context fetch failed for section=%s: %s", section, str(exc))
-        return ""
-    finally:
-        executor.shutdown(wait=False, cancel_futures=True)
+    results, _ = context_fetch_pool.gather(
+        {"trainer": lambda: _load_training_context(section, query, max_context_chars, max_chunks)},
+        AI_TRAINER_CONTEXT_TIMEOUT_SECONDS,
+    )
+    return results.get("trainer", "")
 
 
 def _same_provider_fast_fallback_model(provider: str, model: str | None) -> str | None:
@@ -237,7 +263,7 @@ def _remaining_agent_budget(started_at: float) -> float:
 def _get_openai_client() -> OpenAI:
     if not settings.OPENAI_API_KEY:
         raise HTTPException(status_code=503, detail="Transcription is not configured. Add OPENAI_API_KEY.")
-    return OpenAI(api_key=settings.OPENAI_API_KEY)
+    return provider_clients.openai(settings.OPENAI_API_KEY)
 
 
 def _normalize_base64_data(raw: str | None) -> str:
@@ -297,6 +323,14 @@ def _transcribe_audio_bytes(payload: bytes, file_name: str, mime_type: str | Non
     return (getattr(result, "text", "") or "").strip()
 
 
+def _submit_transcription(payload: bytes, file_name: str, mime_type: str | None):
+    """Transcribe through the shared capped queue; identical audio is transcribed once."""
+    return transcription_queue.submit(
+        hashlib.sha256(payload).hexdigest(),
+        lambda: _transcribe_audio_bytes(payload, file_name, mime_type),
+    )
+
+
 def _extract_pdf_text(payload: bytes) -> str:
     if not payload:
         return ""
@@ -325,6 +359,16 @@ def _build_attachment_context(attachments: list[AgentAttachment]) -> tuple[str,
     total_chars = 0
     multimodal_blocks: list[dict] = []
 
+    # Start every audio transcription up front so several voice notes are transcribed in parallel.
+    transcriptions = {}
+    for idx, attachment in enumerate(attachments[:MAX_ATTACHMENTS], start=1):
+        mime = attachment.mime_type.strip() if attachment.mime_type else "application/octet-stream"
+        if not (attachment.text_content or "").strip() and mime.startswith("audio/"):
+            binary_payload = _decode_base64_data(attachment.base64_data)
+            if binary_payload:
+                name = attachment.file_name.strip() or f"file-{idx}"
+                transcriptions[idx] = _submit_transcription(binary_payload, name, mime)
+
     for idx, attachment in enumerate(attachments[:MAX_ATTACHMENTS], start=1):
         name = attachment.file_name.strip() or f"file-{idx}"
         mime = attachment.mime_type.strip() if attachment.mime_type else "application/octet-stream"
@@ -338,7 +382,7 @@ def _build_attachment_context(attachments: list[AgentAttachment]) -> tuple[str,
 
         if not content and mime.startswith("audio/") and binary_payload:
             try:
-                transcript = _transcribe_audio_bytes(binary_payload, name, mime)
+                transcript = transcriptions[idx].result(timeout=TRANSCRIPTION_WAIT_SECONDS) if idx in transcriptions else ""
                 if transcript:
                     content = f"[Audio transcription]\n{transcript}"
                 else:
@@ -407,6 +451,11 @@ def agents_health():
             "context_timeout_seconds": AGENT_CONTEXT_TIMEOUT_SECONDS,
             "route_timeout_seconds": AI_ROUTE_TIMEOUT_SECONDS,
         },
+        "streaming": agent_stream_stats.snapshot(),
+        "connection_pool": provider_clients.stats(),
+        "context_cache": context_snapshots.stats(),
+        "response_cache": agent_responses.stats(),
+        "prompt_context": context_assembler.stats(),
         "advice": (
             "At least one provider must be configured and reachable. "
             "If configured=true but https_reachable=false, check outbound network/DNS in cloud runtime."
@@ -416,15 +465,13 @@ def agents_health():
 
 @router.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio(file: UploadFile = File(...)):
-    payload = await file.read()
+    payload = await file.read(MAX_AUDIO_FILE_BYTES + 1)
     if not payload:
         raise HTTPException(status_code=400, detail="Audio file is empty.")
 
     try:
-        text = _transcribe_audio_bytes(
-            payload=payload,
-            file_name=file.filename or "voice-note.webm",
-            mime_type=file.content_type,
+        text = await asyncio.wrap_future(
+            _submit_transcription(payload, file.filename or "voice-note.webm", file.content_type)
         )
     except HTTPException:
         raise
@@ -472,6 +519,199 @@ async def transcribe_audio(file: UploadFile = File(...)):
     return TranscriptionResponse(text=text)
 
 
+@dataclass(slots=True)
+class _AgentRunPlan:
+    agent: BaseAgent
+    context: str
+    runtime_provider: str
+    runtime_model: str | None
+    runtime_temperature: float | None
+    runtime_instructions: str
+    multimodal_blocks: list[dict]
+    providers_to_try: list[str]
+    section_context: str = ""
+    trainer_profile_version: str = ""
+
+
+def _resolve_agent_company(section: str, http_request: Request, db: Session) -> tuple[int | None, str | None]:
+    if section not in {"finance", "dashboard"}:
+        return None, None
+    try:
+        account = resolve_company_account(http_request, db)
+        return account.client_org_id, account.user_id
+    except Exception:
+        return None, None
+
+
+def _prepare_agent_run(
+    agent: BaseAgent,
+    section: str,
+    payload: TaskRequest,
+    db: Session,
+    company_id: int | None,
+    include_onec: bool,
+) -> _AgentRunPlan:
+    """Gather context, trainer settings and attachments, and order the providers to try."""
+    section_context = _safe_get_section_context(section, company_id=company_id, include_onec=include_onec)
+    trained_context = ""
+    requested_provider = (payload.provider or "").strip().lower()
+    explicit_user_selection = bool((payload.provider or "").strip()) or bool((payload.model or "").strip())
+    if requested_provider in {"anthropic", "openai"}:
+        runtime_provider = requested_provider
+    else:
+        runtime_provider = _infer_provider_from_model(payload.model) or _pick_first_available_provider("anthropic")
+    runtime_model = payload.model
+    runtime_temperature: float | None = None
+    runtime_instructions = ""
+    trainer_profile_version = ""
+
+    trainer_profile = admin_crud.get_ai_trainer_runtime_profile(db, section)
+    if trainer_profile and trainer_profile.is_enabled:
+        trainer_profile_version = f"{trainer_profile.id}:{trainer_profile.updated_at or trainer_profile.created_at}"
+        runtime_instructions = (trainer_profile.system_instructions or "").strip()
+        runtime_temperature = float(trainer_profile.temperature or 0.2)
+        if trainer_profile.model:
+            runtime_model = trainer_profile.model
+
+        preferred_provider = (trainer_profile.provider or "auto").strip().lower()
+        if preferred_provider in {"anthropic", "openai"}:
+            runtime_provider = preferred_provider
+        else:
+            model_hint = (runtime_model or "").strip().lower()
+            runtime_provider = "openai" if model_hint.startswith("gpt-") else "anthropic"
+
+        trained_context = _safe_get_training_context(
+            section=section,
+            query=payload.message,
+            max_context_chars=min(
+                int(trainer_profile.max_context_chars or 12000),
+                AI_TRAINER_RUNTIME_CONTEXT_MAX_CHARS,
+            ),
+            max_chunks=8,
+        )
+
+    attachment_context, multimodal_blocks = _build_attachment_context(payload.attachments)
+    # Live data wins duplicates and keeps the largest share; trainer chunks are cut first.
+    context = context_assembler.assemble(
+        [
+            ContextBlock("section", section_context, priority=0, min_tokens=1500),
+            ContextBlock("trainer", trained_context, priority=2, min_tokens=800),
+            ContextBlock("attachments", attachment_context, priority=1, min_tokens=1500),
+        ]
+    ).text
+
+    providers_to_try: list[str] = []
+    if _provider_is_configured(runtime_provider):
+        providers_to_try.append(runtime_provider)
+    fallback_provider = (
+        _alternate_provider(runtime_provider)
+        if AGENT_PROVIDER_FAILOVER_ENABLED and not explicit_user_selection
+        else None
+    )
+    if fallback_provider and fallback_provider not in providers_to_try:
+        providers_to_try.append(fallback_provider)
+    if not providers_to_try:
+        raise HTTPException(
+            status_code=503,
+            detail="No AI provider is configured. Add ANTHROPIC_API_KEY and/or OPENAI_API_KEY.",
+        )
+    if providers_to_try[0] != runtime_provider:
+        logger.warning(
+            "Primary AI provider is not configured for section=%s: requested=%s using=%s",
+            section,
+            runtime_provider,
+            providers_to_try[0],
+        )
+
+    return _AgentRunPlan(
+        agent=agent,
+        context=context,
+        runtime_provider=runtime_provider,
+        runtime_model=runtime_model,
+        runtime_temperature=runtime_temperature,
+        runtime_instructions=runtime_instructions,
+        multimodal_blocks=multimodal_blocks,
+        providers_to_try=providers_to_try,
+        section_context=section_context,
+        trainer_profile_version=trainer_profile_version,
+    )
+
+
+def _audit_agent_onec_query(
+    include_onec: bool,
+    company_id: int | None,
+    user_id: str | None,
+    section: str,
+    prompt: str,
+    success: bool,
+    error_message: str | None = None,
+) -> None:
+    if not include_onec or company_id is None:
+        return
+    audit_onec_ai_query(
+        company_id=company_id,
+        user_id=user_id,
+        section=section,
+        prompt=prompt,
+        success=success,
+        error_message=error_message,
+    )
+
+
+def _agent_http_error(e: Exception, section: str) -> HTTPException:
+    """Map a provider failure onto the status and message shown to the user."""
+    error_msg = str(e)
+    lower_error = error_msg.lower()
+
+    if "not configured" in lower_error and ("api key" in lower_error or "provider" in lower_error):
+        return HTTPException(
+            status_code=503,
+            detail="AI provider is not configured. Add ANTHROPIC_API_KEY and/or OPENAI_API_KEY.",
+        )
+
+    if "timeout" in lower_error or "timed out" in lower_error:
+        return HTTPException(
+            status_code=503,
+            detail="AI provider timeout. Please retry in a few seconds.",
+        )
+
+    if "connection" in lower_error and ("failed" in lower_error or "error" in lower_error):
+        return HTTPException(
+            status_code=503,
+            detail="AI provider is unreachable from backend. Verify outbound network and DNS.",
+        )
+
+    if "insufficient_quota" in lower_error or "quota" in lower_error:
+        return HTTPException(
+            status_code=503,
+            detail="AI provider quota is exhausted. Add billing/credits for the selected provider.",
+        )
+
+    if "529" in error_msg or "overloaded" in lower_error:
+        return HTTPException(
+            status_code=503,
+            detail="AI is temporarily busy. Please try again in a moment.",
+        )
+
+    if "401" in error_msg or "authentication" in lower_error:
+        return HTTPException(
+            status_code=401,
+            detail="AI authentication failed. Check your API key.",
+        )
+
+    if "429" in error_msg or "rate limit" in lower_error:
+        return HTTPException(
+            status_code=429,
+            detail="Too many requests. Please wait a moment.",
+        )
+
+    logger.exception("Unhandled agent error for section=%s", section)
+    return HTTPException(
+        status_code=500,
+        detail="Something went wrong. Please try again.",
+    )
+
+
 @router.post("/{section}", response_model=TaskResponse)
 def run_agent(section: str, payload: TaskRequest, http_request: Request, db: Session = Depends(get_db)):
     """Send a message to the AI agent with real data context."""
@@ -480,92 +720,47 @@ def run_agent(section: str, payload: TaskRequest, http_request: Request, db: Ses
         raise HTTPException(status_code=400, detail="Message cannot be empty")
 
     request_started_at = time.monotonic()
+    include_onec = payload.data_source != "benela"
+    company_id: int | None = None
+    onec_audit_user_id: str | None = None
 
     try:
         # 1) Pick the right agent
         agent = get_agent(section)
-
-        company_id: int | None = None
-        onec_audit_user_id: str | None = None
-        if section in {"finance", "dashboard"}:
-            try:
-                account = resolve_company_account(http_request, db)
-                company_id = account.client_org_id
-                onec_audit_user_id = account.user_id
-            except Exception:
-                company_id = None
-
-        include_onec = payload.data_source != "benela"
+        company_id, onec_audit_user_id = _resolve_agent_company(section, http_request, db)
 
         # 2) Pull live context for this section
-        context = _safe_get_section_context(section, company_id=company_id, include_onec=include_onec)
-        requested_provider = (payload.provider or "").strip().lower()
-        explicit_user_selection = bool((payload.provider or "").strip()) or bool((payload.model or "").strip())
-        if requested_provider in {"anthropic", "openai"}:
-            runtime_provider = requested_provider
-        else:
-            runtime_provider = _infer_provider_from_model(payload.model) or _pick_first_available_provider("anthropic")
-        runtime_model = payload.model
-        runtime_temperature: float | None = None
-        runtime_instructions = ""
-
-        trainer_profile = admin_crud.get_ai_trainer_runtime_profile(db, section)
-        if trainer_profile and trainer_profile.is_enabled:
-            runtime_instructions = (trainer_profile.system_instructions or "").strip()
-            runtime_temperature = float(trainer_profile.temperature or 0.2)
-            if trainer_profile.model:
-                runtime_model = trainer_profile.model
-
-            preferred_provider = (trainer_profile.provider or "auto").strip().lower()
-            if preferred_provider in {"anthropic", "openai"}:
-                runtime_provider = preferred_provider
+        plan = _prepare_agent_run(agent, section, payload, db, company_id, include_onec)
+
+        # 3) Answer repeated questions about unchanged data from the response cache
+        cache_key = None
+        if agent_responses.enabled:
+            if payload.attachments:
+                agent_responses.record_bypass()
             else:
-                model_hint = (runtime_model or "").strip().lower()
-                runtime_provider = "openai" if model_hint.startswith("gpt-") else "anthropic"
-
-            trained_context = _safe_get_training_context(
-                section=section,
-                query=payload.message,
-                max_context_chars=min(
-                    int(trainer_profile.max_context_chars or 12000),
-                    AI_TRAINER_RUNTIME_CONTEXT_MAX_CHARS,
-                ),
-                max_chunks=8,
-            )
-            if trained_context:
-                context = f"{context}\n\n{trained_context}".strip()
-
-        attachment_context, multimodal_blocks = _build_attachment_context(payload.attachments)
-        if attachment_context:
-            context = f"{context}\n\n{attachment_context}"
-
-        # 3) Run model with injected context
-        providers_to_try: list[str] = []
-        if _provider_is_configured(runtime_provider):
-            providers_to_try.append(runtime_provider)
-        fallback_provider = (
-            _alternate_provider(runtime_provider)
-            if AGENT_PROVIDER_FAILOVER_ENABLED and not explicit_user_selection
-            else None
-        )
-        if fallback_provider and fallback_provider not in providers_to_try:
-            providers_to_try.append(fallback_provider)
-        if not providers_to_try:
-            raise HTTPException(
-                status_code=503,
-                detail="No AI provider is configured. Add ANTHROPIC_API_KEY and/or OPENAI_API_KEY.",
-            )
-        if providers_to_try[0] != runtime_provider:
-            logger.warning(
-                "Primary AI provider is not configured for section=%s: requested=%s using=%s",
-                section,
-                runtime_provider,
-                providers_to_try[0],
-            )
+                cache_key = agent_responses.key(
+                    section,
+                    company_id,
+                    payload.message,
+                    plan.runtime_provider,
+                    plan.runtime_model,
+                    plan.context,
+                    plan.trainer_profile_version,
+                    data=plan.section_context,
+                    data_source="onec_combined" if include_onec else "benela",
+                )
+        if cache_key is not None:
+            cached_response = agent_responses.get(cache_key)
+            if cached_response is not None:
+                _audit_agent_onec_query(include_onec, company_id, onec_audit_user_id, section, payload.message, success=True)
+                return TaskResponse(agent=agent.name, message=payload.message, response=cached_response)
 
+        # 4) Run model with injected context
         response: str | None = None
         last_error: Exception | None = None
-        for provider_name in providers_to_try:
+        served_as_planned = False
+        provider_started_at = time.monotonic()
+        for provider_name in plan.providers_to_try:
             remaining_budget = _remaining_agent_budget(request_started_at)
             if remaining_budget <= 2.0:
                 last_error = TimeoutError("AI request timed out before provider execution could complete.")
@@ -574,19 +769,20 @@ def run_agent(section: str, payload: TaskRequest, http_request: Request, db: Ses
             try:
                 response = agent.run(
                     payload.message,
-                    context=context,
-                    model=runtime_model,
+                    context=plan.context,
+                    model=plan.runtime_model,
                     provider=provider_name,
-                    temperature=runtime_temperature,
-                    extra_system_instructions=runtime_instructions,
-                    user_blocks=multimodal_blocks,
+                    temperature=plan.runtime_temperature,
+                    extra_system_instructions=plan.runtime_instructions,
+                    user_blocks=plan.multimodal_blocks,
                     timeout_seconds=provider_timeout,
                 )
-                if provider_name != runtime_provider:
+                served_as_planned = provider_name == plan.runtime_provider
+                if provider_name != plan.runtime_provider:
                     logger.warning(
                         "AI provider failover used for section=%s: primary=%s fallback=%s",
                         section,
-                        runtime_provider,
+                        plan.runtime_provider,
                         provider_name,
                     )
                 break
@@ -595,7 +791,7 @@ def run_agent(section: str, payload: TaskRequest, http_request: Request, db: Ses
                 fallback_model = None
                 error_text = str(exc).lower()
                 if "timeout" in error_text or "timed out" in error_text:
-                    fallback_model = _same_provider_fast_fallback_model(provider_name, runtime_model)
+                    fallback_model = _same_provider_fast_fallback_model(provider_name, plan.runtime_model)
                 if fallback_model:
                     fallback_remaining = _remaining_agent_budget(request_started_at)
                     if fallback_remaining > 3.0:
@@ -603,19 +799,19 @@ def run_agent(section: str, payload: TaskRequest, http_request: Request, db: Ses
                         try:
                             response = agent.run(
                                 payload.message,
-                                context=context,
+                                context=plan.context,
                                 model=fallback_model,
                                 provider=provider_name,
-                                temperature=runtime_temperature,
-                                extra_system_instructions=runtime_instructions,
-                                user_blocks=multimodal_blocks,
+                                temperature=plan.runtime_temperature,
+                                extra_system_instructions=plan.runtime_instructions,
+                                user_blocks=plan.multimodal_blocks,
                                 timeout_seconds=fallback_timeout,
                             )
                             logger.warning(
                                 "AI same-provider model fallback used for section=%s provider=%s primary_model=%s fallback_model=%s",
                                 section,
                                 provider_name,
-                                runtime_model,
+                                plan.runtime_model,
                                 fallback_model,
                             )
                             break
@@ -635,14 +831,11 @@ def run_agent(section: str, payload: TaskRequest, http_request: Request, db: Ses
                 raise last_error
             raise RuntimeError("No AI response produced.")
 
-        if include_onec and company_id is not None:
-            audit_onec_ai_query(
-                company_id=company_id,
-                user_id=onec_audit_user_id,
-                section=section,
-                prompt=payload.message,
-                success=True,
-            )
+        # Failover answers come from a different model than the key names.
+        if cache_key is not None and served_as_planned:
+            agent_responses.put(cache_key, response, (time.monotonic() - provider_started_at) * 1000)
+
+        _audit_agent_onec_query(include_onec, company_id, onec_audit_user_id, section, payload.message, success=True)
 
         return TaskResponse(
             agent=agent.name,
@@ -651,72 +844,266 @@ def run_agent(section: str, payload: TaskRequest, http_request: Request, db: Ses
         )
 
     except HTTPException:
-        if "include_onec" in locals() and include_onec and "company_id" in locals() and company_id is not None:
-            audit_onec_ai_query(
-                company_id=company_id,
-                user_id=locals().get("onec_audit_user_id"),
-                section=section,
-                prompt=payload.message,
-                success=False,
-            )
+        _audit_agent_onec_query(include_onec, company_id, onec_audit_user_id, section, payload.message, success=False)
         raise
     except Exception as e:
-        if "include_onec" in locals() and include_onec and "company_id" in locals() and company_id is not None:
-            audit_onec_ai_query(
-                company_id=company_id,
-                user_id=locals().get("onec_audit_user_id"),
-                section=section,
-                prompt=payload.message,
-                success=False,
-                error_message=str(e),
-            )
-        error_msg = str(e)
-        lower_error = error_msg.lower()
+        _audit_agent_onec_query(
+            include_onec,
+            company_id,
+            onec_audit_user_id,
+            section,
+            payload.message,
+            success=False,
+            error_message=str(e),
+        )
+        raise _agent_http_error(e, section)
+
+
+class _AgentStreamStats:
+    """Counters and time-to-first-token for streamed agent replies, reported by /agents/health."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.ttft_ms_last = 0.0
+        self.ttft_ms_max = 0.0
+        self._ttft_ms_total = 0.0
+
+    def record_start(self, ttft_ms: float) -> None:
+        with self._lock:
+            self.started += 1
+            self.ttft_ms_last = ttft_ms
+            self.ttft_ms_max = max(self.ttft_ms_max, ttft_ms)
+            self._ttft_ms_total += ttft_ms
+
+    def record_end(self, success: bool) -> None:
+        with self._lock:
+            if success:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self) -> dict[str, float | int]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "completed": self.completed,
+                "failed": self.failed,
+                "ttft_ms_last": round(self.ttft_ms_last, 1),
+                "ttft_ms_max": round(self.ttft_ms_max, 1),
+                "ttft_ms_avg": round(self._ttft_ms_total / self.started, 1) if self.started else 0.0,
+            }
+
+
+agent_stream_stats = _AgentStreamStats()
+
+
+def _sse_event(event: str, payload: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+async def _first_stream_chunk(
+    plan: _AgentRunPlan,
+    message: str,
+    provider_name: str,
+    model: str | None,
+    timeout_seconds: float,
+) -> tuple[AsyncIterator[str] | None, str]:
+    stream = plan.agent.astream(
+        message,
+        context=plan.context,
+        model=model,
+        provider=provider_name,
+        temperature=plan.runtime_temperature,
+        extra_system_instructions=plan.runtime_instructions,
+        user_blocks=plan.multimodal_blocks,
+        timeout_seconds=timeout_seconds,
+    )
+    try:
+        first_chunk = await asyncio.wait_for(anext(stream), timeout=timeout_seconds)
+    except StopAsyncIteration:
+        return None, ""
+    except asyncio.TimeoutError:
+        await stream.aclose()
+        raise TimeoutError("AI provider timed out before the first token.")
+    except BaseException:
+        await stream.aclose()
+        raise
+    return stream, first_chunk
 
-        if "not configured" in lower_error and ("api key" in lower_error or "provider" in lower_error):
-            raise HTTPException(
-                status_code=503,
-                detail="AI provider is not configured. Add ANTHROPIC_API_KEY and/or OPENAI_API_KEY.",
-            )
 
-        if "timeout" in lower_error or "timed out" in lower_error:
-            raise HTTPException(
-                status_code=503,
-                detail="AI provider timeout. Please retry in a few seconds.",
+async def _open_agent_stream(
+    plan: _AgentRunPlan,
+    message: str,
+    section: str,
+    request_started_at: float,
+) -> tuple[AsyncIterator[str] | None, str, str, str | None]:
+    """
+    Start streaming from the first provider that produces a token.
+
+    Failover and the same-provider fast fallback follow `run_agent`, but only up to the
+    first token; once text has been sent to the client the provider is fixed.
+    """
+    last_error: Exception | None = None
+    for provider_name in plan.providers_to_try:
+        remaining_budget = _remaining_agent_budget(request_started_at)
+        if remaining_budget <= 2.0:
+            last_error = TimeoutError("AI request timed out before provider execution could complete.")
+            break
+        provider_timeout = min(AI_PROVIDER_TIMEOUT_SECONDS, max(3.0, remaining_budget - 1.0))
+        try:
+            stream, first_chunk = await _first_stream_chunk(plan, message, provider_name, plan.runtime_model, provider_timeout)
+            if provider_name != plan.runtime_provider:
+                logger.warning(
+                    "AI provider failover used for section=%s: primary=%s fallback=%s",
+                    section,
+                    plan.runtime_provider,
+                    provider_name,
+                )
+            return stream, first_chunk, provider_name, plan.runtime_model
+        except Exception as exc:
+            last_error = exc
+            fallback_model = None
+            error_text = str(exc).lower()
+            if "timeout" in error_text or "timed out" in error_text:
+                fallback_model = _same_provider_fast_fallback_model(provider_name, plan.runtime_model)
+            if fallback_model:
+                fallback_remaining = _remaining_agent_budget(request_started_at)
+                if fallback_remaining > 3.0:
+                    fallback_timeout = min(max(3.0, fallback_remaining - 1.0), max(4.0, provider_timeout - 2.0))
+                    try:
+                        stream, first_chunk = await _first_stream_chunk(
+                            plan, message, provider_name, fallback_model, fallback_timeout
+                        )
+                        logger.warning(
+                            "AI same-provider model fallback used for section=%s provider=%s primary_model=%s fallback_model=%s",
+                            section,
+                            provider_name,
+                            plan.runtime_model,
+                            fallback_model,
+                        )
+                        return stream, first_chunk, provider_name, fallback_model
+                    except Exception as fallback_exc:
+                        last_error = fallback_exc
+            logger.warning(
+                "AI provider stream failed for section=%s provider=%s timeout=%.1fs error=%s",
+                section,
+                provider_name,
+                provider_timeout,
+                str(last_error),
             )
+    if last_error is not None:
+        raise last_error
+    raise RuntimeError("No AI response produced.")
 
-        if "connection" in lower_error and ("failed" in lower_error or "error" in lower_error):
-            raise HTTPException(
-                status_code=503,
-                detail="AI provider is unreachable from backend. Verify outbound network and DNS.",
-            )
 
-        if "insufficient_quota" in lower_error or "quota" in lower_error:
-            raise HTTPException(
-                status_code=503,
-                detail="AI provider quota is exhausted. Add billing/credits for the selected provider.",
-            )
+def _save_streamed_exchange(session_id: str, section: str, message: str, response: str) -> None:
+    db = SessionLocal()
+    try:
+        crud.save_chat_exchange(db, session_id, section, message, response)
+    finally:
+        db.close()
 
-        if "529" in error_msg or "overloaded" in lower_error:
-            raise HTTPException(
-                status_code=503,
-                detail="AI is temporarily busy. Please try again in a moment.",
-            )
 
-        if "401" in error_msg or "authentication" in lower_error:
-            raise HTTPException(
-                status_code=401,
-                detail="AI authentication failed. Check your API key.",
-            )
+@router.post("/{section}/stream")
+async def stream_agent(section: str, payload: TaskRequest, http_request: Request, db: Session = Depends(get_db)):
+    """
+    Stream the agent's reply as Server-Sent Events: `start`, then `delta` events with
+    text as it is generated, then `done` with the full response (or `error`).
 
-        if "429" in error_msg or "rate limit" in lower_error:
-            raise HTTPException(
-                status_code=429,
-                detail="Too many requests. Please wait a moment.",
-            )
+    Setup errors and failures before the first token return a normal HTTP error. With a
+    `session_id`, the exchange is saved to chat history once the stream completes.
+    """
 
-        logger.exception("Unhandled agent error for section=%s", section)
-        raise HTTPException(
-            status_code=500,
-            detail="Something went wrong. Please try again.",
+    if not payload.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    if payload.session_id:
+        _assert_session_access(http_request, section, payload.session_id)
+
+    request_started_at = time.monotonic()
+    include_onec = payload.data_source != "benela"
+    company_id: int | None = None
+    onec_audit_user_id: str | None = None
+
+    try:
+        agent = get_agent(section)
+        company_id, onec_audit_user_id = await run_in_threadpool(_resolve_agent_company, section, http_request, db)
+        plan = await run_in_threadpool(_prepare_agent_run, agent, section, payload, db, company_id, include_onec)
+        stream, first_chunk, provider_name, model_name = await _open_agent_stream(
+            plan, payload.message, section, request_started_at
+        )
+    except HTTPException:
+        await run_in_threadpool(
+            _audit_agent_onec_query, include_onec, company_id, onec_audit_user_id, section, payload.message, False
         )
+        raise
+    except Exception as e:
+        await run_in_threadpool(
+            _audit_agent_onec_query,
+            include_onec,
+            company_id,
+            onec_audit_user_id,
+            section,
+            payload.message,
+            False,
+            str(e),
+        )
+        raise _agent_http_error(e, section)
+
+    ttft_ms = (time.monotonic() - request_started_at) * 1000
+    agent_stream_stats.record_start(ttft_ms)
+    logger.info("Agent stream section=%s provider=%s ttft_ms=%.0f", section, provider_name, ttft_ms)
+
+    async def events():
+        parts = [first_chunk] if first_chunk else []
+        yield _sse_event("start", {"agent": agent.name, "provider": provider_name, "model": model_name})
+        if first_chunk:
+            yield _sse_event("delta", {"text": first_chunk})
+        try:
+            if stream is not None:
+                async for delta in stream:
+                    parts.append(delta)
+                    yield _sse_event("delta", {"text": delta})
+        except Exception as exc:
+            agent_stream_stats.record_end(success=False)
+            await run_in_threadpool(
+                _audit_agent_onec_query,
+                include_onec,
+                company_id,
+                onec_audit_user_id,
+                section,
+                payload.message,
+                False,
+                str(exc),
+            )
+            error = _agent_http_error(exc, section)
+            yield _sse_event("error", {"status_code": error.status_code, "detail": error.detail})
+            return
+        finally:
+            if stream is not None:
+                await stream.aclose()
+
+        response = "".join(parts).strip()
+        if payload.session_id:
+            await run_in_threadpool(_save_streamed_exchange, payload.session_id, section, payload.message, response)
+        await run_in_threadpool(
+            _audit_agent_onec_query, include_onec, company_id, onec_audit_user_id, section, payload.message, True
+        )
+        agent_stream_stats.record_end(success=True)
+        yield _sse_event(
+            "done",
+            {
+                "agent": agent.name,
+                "message": payload.message,
+                "response": response,
+                "ttft_ms": round(ttft_ms),
+            },
+        )
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
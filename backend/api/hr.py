@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from database.connection import get_db
 from database import crud, schemas
 from typing import List
+from integrations.attendance.presence_board import presence_board
 from integrations.onec.service import resolve_company_account
 
 router = APIRouter(prefix="/hr", tags=["HR"])
@@ -27,13 +28,24 @@ def list_employees(
 @router.post("/employees", response_model=schemas.EmployeeOut)
 def add_employee(request: Request, data: schemas.EmployeeCreate, company_id: int | None = Query(default=None), db: Session = Depends(get_db)):
     account = resolve_company_account(request, db, company_id=company_id)
-    return crud.create_employee(db, data, company_id=account.client_org_id)
+    try:
+        emp = crud.create_employee(db, data, company_id=account.client_org_id)
+    except ValueError as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(exc))
+    presence_board.invalidate(account.client_org_id)
+    return emp
 
 @router.put("/employees/{id}", response_model=schemas.EmployeeOut)
 def edit_employee(id: int, request: Request, data: schemas.EmployeeUpdate, company_id: int | None = Query(default=None), db: Session = Depends(get_db)):
     account = resolve_company_account(request, db, company_id=company_id)
-    emp = crud.update_employee(db, id, data, company_id=account.client_org_id)
+    try:
+        emp = crud.update_employee(db, id, data, company_id=account.client_org_id)
+    except ValueError as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(exc))
     if not emp: raise HTTPException(status_code=404, detail="Employee not found")
+    presence_board.invalidate(account.client_org_id)
     return emp
 
 @router.delete("/employees/{id}")
@@ -41,6 +53,7 @@ def remove_employee(id: int, request: Request, company_id: int | None = Query(de
     account = resolve_company_account(request, db, company_id=company_id)
     if not crud.delete_employee(db, id, company_id=account.client_org_id):
         raise HTTPException(status_code=404, detail="Employee not found")
+    presence_board.invalidate(account.client_org_id)
     return {"ok": True}
 
 # ── Positions ─────────────────────────────────────────
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import json
 from datetime import date, datetime, timedelta
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
@@ -36,9 +39,10 @@ from database.attendance_schemas import (
     TodayPresenceOut,
     VerifySessionOut,
 )
-from database.connection import get_db
+from database.connection import SessionLocal, get_db
 from integrations.attendance.attendance_service import attendance_service
 from integrations.attendance.payroll_engine import payroll_engine
+from integrations.attendance.presence_board import presence_board
 from integrations.attendance.qr_engine import (
     ExpiredTokenError,
     InvalidAttendanceAccessError,
@@ -206,7 +210,57 @@ def get_today_presence(
     _: object = Depends(require_authenticated_user),
 ):
     account = resolve_company_account(request, db, company_id=company_id)
-    return attendance_service.get_todays_presence(db, account.client_org_id)
+    return presence_board.snapshot(db, account.client_org_id)
+
+
+PRESENCE_STREAM_HEARTBEAT_SECONDS = 15.0
+
+
+def _sse_event(event: str, payload: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@router.get("/attendance/today/stream")
+async def stream_today_presence(
+    request: Request,
+    company_id: int | None = Query(default=None),
+    _: object = Depends(require_authenticated_user),
+):
+    def _resolve_company() -> int:
+        with SessionLocal() as db:
+            return resolve_company_account(request, db, company_id=company_id).client_org_id
+
+    def _snapshot(resolved_company_id: int) -> dict[str, Any]:
+        with SessionLocal() as db:
+            board = presence_board.snapshot(db, resolved_company_id).model_dump(mode="json")
+        return {**board, "version": (presence_board.summary(resolved_company_id) or {}).get("version", 0)}
+
+    resolved_company_id = await run_in_threadpool(_resolve_company)
+    queue = presence_board.subscribe(resolved_company_id)
+
+    async def _events():
+        try:
+            # Subscribed before the snapshot is taken, so no delta can fall between the two;
+            # clients drop deltas whose version is not newer than the snapshot's.
+            yield _sse_event("snapshot", await run_in_threadpool(_snapshot, resolved_company_id))
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=PRESENCE_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield _sse_event("summary", presence_board.summary(resolved_company_id) or {})
+                    continue
+                if payload.get("type") == "resync":
+                    yield _sse_event("snapshot", await run_in_threadpool(_snapshot, resolved_company_id))
+                else:
+                    yield _sse_event("delta", payload)
+        finally:
+            presence_board.unsubscribe(resolved_company_id, queue)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/attendance/records", response_model=AttendanceRecordPage)
@@ -541,6 +595,7 @@ def approve_leave_request(
     row.approved_at = attendance_service.utcnow()
     db.commit()
     db.refresh(row)
+    presence_board.invalidate(account.client_org_id)
     employee = db.query(models.Employee).filter(models.Employee.id == row.employee_id).first()
     return LeaveRequestOut.model_validate({**row.__dict__, "employee_name": employee.full_name if employee else None})
 
@@ -561,6 +616,7 @@ def reject_leave_request(
     row.status = "rejected"
     db.commit()
     db.refresh(row)
+    presence_board.invalidate(account.client_org_id)
     employee = db.query(models.Employee).filter(models.Employee.id == row.employee_id).first()
     return LeaveRequestOut.model_validate({**row.__dict__, "employee_name": employee.full_name if employee else None})
 
@@ -1,46 +1,80 @@
 import os
 import re
+import hmac
 import json
+import asyncio
+import threading
 import base64
 import logging
 import time
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
 from typing import Any
 from datetime import datetime, timedelta, timezone
 from io import BytesIO
 from pathlib import Path
-from urllib import error as urllib_error
 from urllib import parse as urllib_parse
 from urllib import request as urllib_request
-from uuid import uuid4
 from zoneinfo import ZoneInfo
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
-from fastapi.responses import FileResponse
-from openai import OpenAI
-from sqlalchemy import func, or_
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, selectinload
 
 from agents.base_agent import BaseAgent
+from agents.provider_clients import provider_clients
 from core.config import settings
 from core.auth import assert_request_user_matches
 from database import models, schemas
 from database.attendance_models import AttendanceRecord
-from database.connection import get_db
+from database.connection import SessionLocal, get_db
 from integrations.attendance.attendance_service import attendance_service
 from integrations.attendance.qr_engine import qr_token_engine
+from integrations.internal_chat.access_cache import JUDITH_USER_ID, OWNER_USER_ID, thread_access_cache, thread_readers
+from integrations.internal_chat.attachment_storage import (
+    UploadTooLarge,
+    blob_key,
+    build_attachment_storage,
+    parse_byte_range,
+    stage_upload,
+)
+from integrations.internal_chat.judith_queue import (
+    JudithJob,
+    defer_side_effect,
+    hold_side_effects,
+    judith_queue,
+    pop_side_effects,
+)
+from integrations.internal_chat.realtime import chat_hub, publish_thread_cleared
+from integrations.internal_chat.reminders import (
+    park_notification as park_reminder_notification,
+    pop_notifications as pop_reminder_notifications,
+    reminder_stats,
+    schedule_wakeup as schedule_reminder_wakeup,
+)
+from integrations.internal_chat.state_store import telegram_state
+from integrations.internal_chat.telegram_sender import TELEGRAM_MAX_QUEUE_WAIT_SECONDS, telegram_sender
+from integrations.internal_chat.thread_summary import mark_thread_read, message_preview, reset_thread_summary
+from integrations.transcription.service import transcription_queue
 
 router = APIRouter(prefix="/internal-chat", tags=["Internal Chat"])
+# Telegram calls the webhook without a user session; it authenticates with the secret token header.
+telegram_webhook_router = APIRouter(prefix="/internal-chat/telegram", tags=["Internal Chat"])
 logger = logging.getLogger("uvicorn.error")
 
-OWNER_USER_ID = "benela-owner"
 OWNER_EMAIL = "owner@benela.ai"
 OWNER_NAME = "Benela Owner"
 OWNER_ROLE = "super_admin"
 
-JUDITH_USER_ID = "judith-ai"
 JUDITH_EMAIL = "judith@benela.ai"
 JUDITH_NAME = "Judith"
 JUDITH_ROLE = "assistant"
+STREAM_HEARTBEAT_SECONDS = 15.0
+STREAM_RESUME_LIMIT = max(20, min(1000, int(os.getenv("INTERNAL_CHAT_STREAM_RESUME_LIMIT", "200"))))
 TELEGRAM_BOT_USERNAME = (os.getenv("TELEGRAM_BOT_USERNAME", "judith_aibot").strip().lstrip("@") or "judith_aibot")
 
 UZ_TZ = ZoneInfo("Asia/Tashkent")
@@ -56,6 +90,12 @@ JUDITH_TASK_FALLBACK_MODELS = os.getenv(
 ).strip()
 JUDITH_TASK_MAX_ITEMS = max(1, min(20, int(os.getenv("JUDITH_TASK_MAX_ITEMS", "12"))))
 JUDITH_TASK_MAX_ATTEMPTS = max(1, min(5, int(os.getenv("JUDITH_TASK_MAX_ATTEMPTS", "3"))))
+JUDITH_ASYNC_ENABLED = os.getenv("JUDITH_ASYNC_ENABLED", "True") == "True"
+TRANSCRIPTION_PENDING = "transcribing"
+TRANSCRIPTION_DONE = "done"
+TRANSCRIPTION_FAILED = "failed"
+REMINDER_DISPATCH_BATCH_SIZE = max(10, int(os.getenv("INTERNAL_CHAT_REMINDER_BATCH_SIZE", "200")))
+REMINDER_DISPATCH_MAX_BATCHES = max(1, int(os.getenv("INTERNAL_CHAT_REMINDER_MAX_BATCHES", "20")))
 UPLOAD_ROOT = Path(
     os.getenv(
         "INTERNAL_CHAT_UPLOAD_DIR",
@@ -63,6 +103,8 @@ UPLOAD_ROOT = Path(
     )
 )
 UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
+attachment_storage = build_attachment_storage(UPLOAD_ROOT)
+ATTACHMENT_CACHE_MAX_AGE_SECONDS = max(0, int(os.getenv("INTERNAL_CHAT_ATTACHMENT_CACHE_SECONDS", "86400")))
 _TELEGRAM_CONFLICT_LOG_COOLDOWN_SECONDS = int(os.getenv("TELEGRAM_CONFLICT_LOG_COOLDOWN_SECONDS", "300"))
 _telegram_conflict_last_logged_monotonic = 0.0
 _TELEGRAM_POLL_FAILURE_LOG_COOLDOWN_SECONDS = int(
@@ -71,7 +113,12 @@ _TELEGRAM_POLL_FAILURE_LOG_COOLDOWN_SECONDS = int(
 _telegram_poll_failure_last_logged_monotonic = 0.0
 _telegram_webhook_cleanup_attempted = False
 _telegram_bot_commands_initialized = False
-_telegram_pending_actions: dict[str, dict[str, Any]] = {}
+_telegram_webhook_registered = False
+TELEGRAM_WEBHOOK_URL = (settings.TELEGRAM_WEBHOOK_URL or "").strip()
+TELEGRAM_WEBHOOK_SECRET = (settings.TELEGRAM_WEBHOOK_SECRET or "").strip()
+_TELEGRAM_WEBHOOK_SEEN_LIMIT = 2_000
+_telegram_webhook_seen_ids: deque[int] = deque(maxlen=_TELEGRAM_WEBHOOK_SEEN_LIMIT)
+_telegram_webhook_seen_lock = threading.Lock()
 
 TELEGRAM_BTN_GET_UPDATES = "Get Updates"
 TELEGRAM_BTN_ADD_TASK = "Add New Task"
@@ -79,6 +126,9 @@ TELEGRAM_BTN_UPCOMING_3H = "Upcoming Tasks (in the next 3 hours)"
 TELEGRAM_BTN_ATTENDANCE = "Attendance Link"
 TELEGRAM_BTN_ATTENDANCE_STATUS = "Attendance Status"
 _TELEGRAM_PENDING_TTL_MINUTES = int(os.getenv("TELEGRAM_PENDING_ACTION_TTL_MINUTES", "20"))
+_TELEGRAM_COMMANDS_STATE_KEY = "telegram:bot_commands"
+TELEGRAM_POLLER_LEASE = "telegram-poller"
+TELEGRAM_OFFSET_STATE_KEY = "telegram:updates_offset"
 
 ZOOM_ACCOUNT_ID = (os.getenv("ZOOM_ACCOUNT_ID", "") or "").strip()
 ZOOM_CLIENT_ID = (os.getenv("ZOOM_CLIENT_ID", "") or "").strip()
@@ -280,41 +330,11 @@ def _deactivate_conflicting_telegram_links(db: Session) -> int:
 
 
 def _telegram_api_post(token: str, method: str, payload: dict, timeout: int = 10) -> dict:
-    if not token:
-        return {"ok": False, "description": "Missing telegram bot token"}
-    url = f"https://api.telegram.org/bot{token}/{method}"
-    data = json.dumps(payload).encode("utf-8")
-    req = urllib_request.Request(
-        url=url,
-        data=data,
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    try:
-        with urllib_request.urlopen(req, timeout=timeout) as response:
-            body = response.read().decode("utf-8", errors="ignore")
-        parsed = json.loads(body or "{}")
-        if isinstance(parsed, dict):
-            return parsed
-    except (urllib_error.HTTPError, urllib_error.URLError, TimeoutError, ValueError) as exc:
-        return {"ok": False, "description": str(exc)}
-    return {"ok": False, "description": "Invalid Telegram response"}
+    return telegram_sender.call(token, method, payload, timeout=timeout)
 
 
 def _telegram_api_get(token: str, method: str, timeout: int = 10) -> dict:
-    if not token:
-        return {"ok": False, "description": "Missing telegram bot token"}
-    url = f"https://api.telegram.org/bot{token}/{method}"
-    req = urllib_request.Request(url=url, method="GET")
-    try:
-        with urllib_request.urlopen(req, timeout=timeout) as response:
-            body = response.read().decode("utf-8", errors="ignore")
-        parsed = json.loads(body or "{}")
-        if isinstance(parsed, dict):
-            return parsed
-    except (urllib_error.HTTPError, urllib_error.URLError, TimeoutError, ValueError) as exc:
-        return {"ok": False, "description": str(exc)}
-    return {"ok": False, "description": "Invalid Telegram response"}
+    return telegram_sender.call(token, method, {}, timeout=timeout)
 
 
 def _log_telegram_poll_conflict(message: str):
@@ -642,42 +662,58 @@ def _telegram_task_card_text(task: models.InternalChatTask) -> str:
     return f"{task.title[:220]}\nDue: {due_label}\nStatus: {status_label}"
 
 
-def _cleanup_telegram_pending_actions():
-    now_utc = datetime.utcnow()
-    threshold = now_utc - timedelta(minutes=max(5, _TELEGRAM_PENDING_TTL_MINUTES))
-    stale_keys = [
-        key
-        for key, value in _telegram_pending_actions.items()
-        if not isinstance(value, dict) or value.get("created_at", threshold) < threshold
-    ]
-    for key in stale_keys:
-        _telegram_pending_actions.pop(key, None)
+def _telegram_pending_key(chat_id: str) -> str:
+    return f"telegram:pending:{chat_id}"
 
 
 def _set_telegram_pending_action(chat_id: str, mode: str, thread_id: int, task_id: int | None = None):
-    _cleanup_telegram_pending_actions()
-    _telegram_pending_actions[chat_id] = {
-        "mode": mode,
-        "thread_id": thread_id,
-        "task_id": task_id,
-        "created_at": datetime.utcnow(),
-    }
+    telegram_state.set(
+        _telegram_pending_key(chat_id),
+        {"mode": mode, "thread_id": thread_id, "task_id": task_id},
+        ttl_seconds=max(5, _TELEGRAM_PENDING_TTL_MINUTES) * 60,
+    )
 
 
 def _pop_telegram_pending_action(chat_id: str) -> dict[str, Any] | None:
-    _cleanup_telegram_pending_actions()
-    return _telegram_pending_actions.pop(chat_id, None)
+    return telegram_state.pop(_telegram_pending_key(chat_id))
 
 
 def _peek_telegram_pending_action(chat_id: str) -> dict[str, Any] | None:
-    _cleanup_telegram_pending_actions()
-    return _telegram_pending_actions.get(chat_id)
+    return telegram_state.get(_telegram_pending_key(chat_id))
+
+
+def _ensure_telegram_webhook(token: str):
+    global _telegram_webhook_registered
+    if _telegram_webhook_registered or not TELEGRAM_WEBHOOK_URL:
+        return
+    if not TELEGRAM_WEBHOOK_SECRET:
+        _log_telegram_poll_failure("TELEGRAM_WEBHOOK_URL is set without TELEGRAM_WEBHOOK_SECRET; webhook not registered.")
+        return
+    response = _telegram_api_post(
+        token=token,
+        method="setWebhook",
+        payload={
+            "url": TELEGRAM_WEBHOOK_URL,
+            "secret_token": TELEGRAM_WEBHOOK_SECRET,
+            "allowed_updates": ["message", "edited_message", "channel_post", "callback_query"],
+            "max_connections": 40,
+        },
+    )
+    if response.get("ok"):
+        _telegram_webhook_registered = True
+        logger.info("Telegram webhook registered at %s", TELEGRAM_WEBHOOK_URL)
+        return
+    _log_telegram_poll_failure(f"Telegram setWebhook failed: {response.get('description') or 'unknown'}")
 
 
 def _ensure_telegram_bot_commands(token: str):
     global _telegram_bot_commands_initialized
     if _telegram_bot_commands_initialized:
         return
+    if telegram_state.get(_TELEGRAM_COMMANDS_STATE_KEY):
+        # Another replica already registered the command list.
+        _telegram_bot_commands_initialized = True
+        return
     commands = [
         {"command": "start", "description": "Connect bot and show your chat ID"},
         {"command": "updates", "description": "Get latest Judith updates"},
@@ -702,22 +738,16 @@ def _ensure_telegram_bot_commands(token: str):
     )
     if response.get("ok"):
         _telegram_bot_commands_initialized = True
+        telegram_state.set(_TELEGRAM_COMMANDS_STATE_KEY, {"ok": True}, ttl_seconds=24 * 3600)
 
 
 def _discover_telegram_chat_ids(token: str) -> list[str]:
-    if not token:
-        return []
-    url = f"https://api.telegram.org/bot{token}/getUpdates?limit=100&timeout=1"
-    req = urllib_request.Request(url=url, method="GET")
-    try:
-        with urllib_request.urlopen(req, timeout=10) as response:
-            body = response.read().decode("utf-8", errors="ignore")
-            parsed = json.loads(body or "{}")
-    except (urllib_error.HTTPError, urllib_error.URLError, TimeoutError, ValueError) as exc:
-        logger.warning("Telegram chat auto-discovery failed: %s", exc)
+    if not token or TELEGRAM_WEBHOOK_URL:
+        # getUpdates is unavailable while a webhook is registered.
         return []
-
+    parsed = _telegram_api_post(token=token, method="getUpdates", payload={"limit": 100, "timeout": 1}, timeout=10)
     if not parsed.get("ok"):
+        logger.warning("Telegram chat auto-discovery failed: %s", parsed.get("description") or "unknown")
         return []
 
     chat_ids: list[str] = []
@@ -750,9 +780,21 @@ def _send_telegram_reminder(
     *,
     thread_id: int | None = None,
     user_id: str | None = None,
+    wait: bool = True,
 ) -> int:
+    """
+    Send to every chat linked to the workspace/thread concurrently through the shared sender.
+
+    With wait=False the sends are only queued and the queued count is returned. Inside a
+    Judith job the call is held until the job commits and 0 is returned.
+    """
     if not settings.INTERNAL_CHAT_TELEGRAM_ENABLED:
         return 0
+    deferred = partial(
+        _send_telegram_reminder, db, workspace_id, message_text, thread_id=thread_id, user_id=user_id, wait=wait
+    )
+    if defer_side_effect(db, deferred):
+        return 0
 
     token = (settings.TELEGRAM_BOT_TOKEN or "").strip()
     if not token:
@@ -770,10 +812,26 @@ def _send_telegram_reminder(
         logger.info("Telegram bot token exists but no chat IDs configured for workspace=%s", workspace_id or "-")
         return 0
 
+    futures = [
+        telegram_sender.submit(
+            token,
+            "sendMessage",
+            {"chat_id": chat_id, "text": message_text[:3900], "disable_web_page_preview": True},
+        )
+        for chat_id in chat_ids
+    ]
+    if not wait:
+        return len(futures)
     sent_count = 0
-    for chat_id in chat_ids:
-        if _telegram_send_message(token=token, chat_id=chat_id, text=message_text):
+    for chat_id, future in zip(chat_ids, futures):
+        try:
+            response = future.result(timeout=10 + TELEGRAM_MAX_QUEUE_WAIT_SECONDS)
+        except Exception as exc:
+            response = {"ok": False, "description": str(exc) or "timed out"}
+        if response.get("ok"):
             sent_count += 1
+        else:
+            logger.warning("Telegram sendMessage failed for chat_id=%s: %s", chat_id, response.get("description") or "unknown")
     return sent_count
 
 
@@ -788,6 +846,20 @@ def _send_telegram_task_update(
     task_id: int | None = None,
     user_id: str | None = None,
 ):
+    deferred = partial(
+        _send_telegram_task_update,
+        db,
+        workspace_id,
+        thread_id,
+        title,
+        status_label,
+        due_at,
+        notes=notes,
+        task_id=task_id,
+        user_id=user_id,
+    )
+    if defer_side_effect(db, deferred):
+        return
     due_label = _to_uz_datetime_label(due_at) if due_at else "No deadline"
     message = (
         "Benela Judith Update\n"
@@ -1425,25 +1497,19 @@ def process_telegram_bot_updates_job(db: Session, last_update_id: int | None) ->
 
     _ensure_telegram_bot_commands(token)
 
-    params = ["limit=50", "timeout=1"]
-    if last_update_id is not None:
-        params.append(f"offset={int(last_update_id)}")
-    url = f"https://api.telegram.org/bot{token}/getUpdates?{'&'.join(params)}"
-    req = urllib_request.Request(url=url, method="GET")
-    try:
-        with urllib_request.urlopen(req, timeout=12) as response:
-            payload = json.loads(response.read().decode("utf-8", errors="ignore") or "{}")
-    except urllib_error.HTTPError as exc:
-        if exc.code == 409:
-            _handle_telegram_polling_conflict(token)
-            return last_update_id
-        _log_telegram_poll_failure(f"Telegram updates polling failed: {exc}")
-        return last_update_id
-    except (urllib_error.URLError, TimeoutError, ValueError) as exc:
-        _log_telegram_poll_failure(f"Telegram updates polling failed: {exc}")
+    if TELEGRAM_WEBHOOK_URL:
+        # Updates arrive on the webhook route; polling would fight the webhook with 409s.
+        _ensure_telegram_webhook(token)
         return last_update_id
 
+    params: dict[str, Any] = {"limit": 50, "timeout": 1}
+    if last_update_id is not None:
+        params["offset"] = int(last_update_id)
+    payload = _telegram_api_post(token=token, method="getUpdates", payload=params, timeout=12)
     if not payload.get("ok"):
+        if payload.get("error_code") == 409:
+            _handle_telegram_polling_conflict(token)
+            return last_update_id
         _log_telegram_poll_failure(
             f"Telegram getUpdates returned not ok: {payload.get('description') or 'unknown'}"
         )
@@ -1457,106 +1523,171 @@ def process_telegram_bot_updates_job(db: Session, last_update_id: int | None) ->
             candidate = update_id + 1
             if next_update_id is None or candidate > next_update_id:
                 next_update_id = candidate
+        _process_telegram_update(db, token, update)
 
-        callback_query = update.get("callback_query")
-        if callback_query:
-            _handle_telegram_callback_query(db=db, token=token, callback_query=callback_query)
-            continue
+    return next_update_id
 
-        message = update.get("message") or update.get("edited_message") or update.get("channel_post")
-        if not message:
-            continue
 
-        chat = message.get("chat") or {}
-        chat_id_value = chat.get("id")
-        if chat_id_value is None:
-            continue
-        chat_id = str(chat_id_value).strip()
-        if not chat_id:
-            continue
+def run_telegram_poll_cycle(db: Session, holder: str, lease_seconds: float) -> bool:
+    """
+    Run one getUpdates cycle if this replica holds the poller lease; False when another does.
 
-        text = str(message.get("text") or "").strip()
-        if not text:
-            continue
+    The offset is kept in the shared state store and saved only after the cycle commits,
+    so a new leader resumes where the previous one stopped.
+    """
+    if not telegram_state.acquire_lease(TELEGRAM_POLLER_LEASE, holder, lease_seconds):
+        db.rollback()
+        return False
+    offset = (telegram_state.get(TELEGRAM_OFFSET_STATE_KEY) or {}).get("offset")
+    next_offset = process_telegram_bot_updates_job(db, offset)
+    force_commit = bool(db.info.pop("force_commit", False))
+    if db.new or db.dirty or db.deleted or force_commit:
+        db.commit()
+    else:
+        db.rollback()
+    if next_offset != offset:
+        telegram_state.set(TELEGRAM_OFFSET_STATE_KEY, {"offset": next_offset})
+    return True
 
-        from_user = message.get("from") or {}
-        username = str(from_user.get("username") or "").strip() or None
-        first_name = str(from_user.get("first_name") or "").strip() or None
-        now_utc = datetime.utcnow()
 
-        if text.lower().startswith("/start"):
-            links = (
-                db.query(models.InternalChatTelegramLink)
-                .filter(
-                    models.InternalChatTelegramLink.telegram_chat_id == chat_id,
-                    models.InternalChatTelegramLink.is_active.is_(True),
-                )
-                .all()
+def _process_telegram_update(db: Session, token: str, update: dict) -> None:
+    callback_query = update.get("callback_query")
+    if callback_query:
+        _handle_telegram_callback_query(db=db, token=token, callback_query=callback_query)
+        return
+
+    message = update.get("message") or update.get("edited_message") or update.get("channel_post")
+    if not message:
+        return
+
+    chat = message.get("chat") or {}
+    chat_id_value = chat.get("id")
+    if chat_id_value is None:
+        return
+    chat_id = str(chat_id_value).strip()
+    if not chat_id:
+        return
+
+    text = str(message.get("text") or "").strip()
+    if not text:
+        return
+
+    from_user = message.get("from") or {}
+    username = str(from_user.get("username") or "").strip() or None
+    first_name = str(from_user.get("first_name") or "").strip() or None
+    now_utc = datetime.utcnow()
+
+    if text.lower().startswith("/start"):
+        links = (
+            db.query(models.InternalChatTelegramLink)
+            .filter(
+                models.InternalChatTelegramLink.telegram_chat_id == chat_id,
+                models.InternalChatTelegramLink.is_active.is_(True),
             )
+            .all()
+        )
 
-            if links:
-                newly_verified_threads: set[int] = set()
-                for link in links:
-                    is_first_verification = link.last_seen_at is None
-                    link.telegram_username = username or link.telegram_username
-                    link.telegram_first_name = first_name or link.telegram_first_name
-                    link.last_seen_at = now_utc
-                    link.updated_at = now_utc
-                    if is_first_verification:
-                        newly_verified_threads.add(link.thread_id)
+        if links:
+            newly_verified_threads: set[int] = set()
+            for link in links:
+                is_first_verification = link.last_seen_at is None
+                link.telegram_username = username or link.telegram_username
+                link.telegram_first_name = first_name or link.telegram_first_name
+                link.last_seen_at = now_utc
+                link.updated_at = now_utc
+                if is_first_verification:
+                    newly_verified_threads.add(link.thread_id)
 
-                _telegram_send_message(
-                    token=token,
-                    chat_id=chat_id,
-                    text=(
-                        "Judith is connected with your Benela workspace.\n"
-                        + (
-                            "Use buttons below to manage tasks quickly.\n\n" + _attendance_help_text()
-                            if settings.ATTENDANCE_TELEGRAM_ENABLED
-                            else "Use buttons below to manage tasks quickly."
-                        )
-                    ),
-                    reply_markup=_telegram_main_keyboard(),
-                )
-                for thread_id in newly_verified_threads:
-                    _create_judith_message(
-                        db,
-                        thread_id=thread_id,
-                        body="Telegram bot connected. Task updates and reminders are active.",
-                    )
-            else:
-                _telegram_send_message(
-                    token=token,
-                    chat_id=chat_id,
-                    text=(
-                        f"{_build_telegram_start_instruction(chat_id)}\n\n{_attendance_help_text()}"
+            _telegram_send_message(
+                token=token,
+                chat_id=chat_id,
+                text=(
+                    "Judith is connected with your Benela workspace.\n"
+                    + (
+                        "Use buttons below to manage tasks quickly.\n\n" + _attendance_help_text()
                         if settings.ATTENDANCE_TELEGRAM_ENABLED
-                        else _build_telegram_start_instruction(chat_id)
-                    ),
-                    reply_markup=_telegram_main_keyboard(),
+                        else "Use buttons below to manage tasks quickly."
+                    )
+                ),
+                reply_markup=_telegram_main_keyboard(),
+            )
+            for thread_id in newly_verified_threads:
+                _create_judith_message(
+                    db,
+                    thread_id=thread_id,
+                    body="Telegram bot connected. Task updates and reminders are active.",
                 )
-            continue
+        else:
+            _telegram_send_message(
+                token=token,
+                chat_id=chat_id,
+                text=(
+                    f"{_build_telegram_start_instruction(chat_id)}\n\n{_attendance_help_text()}"
+                    if settings.ATTENDANCE_TELEGRAM_ENABLED
+                    else _build_telegram_start_instruction(chat_id)
+                ),
+                reply_markup=_telegram_main_keyboard(),
+            )
+        return
 
-        if _handle_telegram_attendance_message(
-            db=db,
-            token=token,
-            chat_id=chat_id,
-            text=text,
-            username=username,
-            first_name=first_name,
-        ):
-            continue
+    if _handle_telegram_attendance_message(
+        db=db,
+        token=token,
+        chat_id=chat_id,
+        text=text,
+        username=username,
+        first_name=first_name,
+    ):
+        return
 
-        _handle_telegram_linked_text_message(
-            db=db,
-            token=token,
-            chat_id=chat_id,
-            text=text,
-            username=username,
-            first_name=first_name,
-        )
+    _handle_telegram_linked_text_message(
+        db=db,
+        token=token,
+        chat_id=chat_id,
+        text=text,
+        username=username,
+        first_name=first_name,
+    )
 
-    return next_update_id
+
+def _telegram_webhook_is_duplicate(update_id: Any) -> bool:
+    if not isinstance(update_id, int):
+        return False
+    with _telegram_webhook_seen_lock:
+        if update_id in _telegram_webhook_seen_ids:
+            return True
+        _telegram_webhook_seen_ids.append(update_id)
+    return False
+
+
+def _process_telegram_webhook_update(update: dict) -> None:
+    token = (settings.TELEGRAM_BOT_TOKEN or "").strip()
+    db = SessionLocal()
+    try:
+        _process_telegram_update(db, token, update)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Telegram webhook update %s failed", update.get("update_id"))
+    finally:
+        db.close()
+
+
+@telegram_webhook_router.post("/webhook")
+async def telegram_webhook(request: Request, background_tasks: BackgroundTasks):
+    provided = request.headers.get("X-Telegram-Bot-Api-Secret-Token") or ""
+    if not TELEGRAM_WEBHOOK_SECRET or not hmac.compare_digest(provided, TELEGRAM_WEBHOOK_SECRET):
+        raise HTTPException(status_code=403, detail="Invalid webhook secret.")
+    try:
+        update = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid update payload.")
+    if not isinstance(update, dict):
+        raise HTTPException(status_code=400, detail="Invalid update payload.")
+    # Acknowledge at once so Telegram does not redeliver while Judith is thinking.
+    if not _telegram_webhook_is_duplicate(update.get("update_id")):
+        background_tasks.add_task(_process_telegram_webhook_update, update)
+    return {"ok": True}
 
 
 def _parse_due_at_from_text(text: str) -> datetime | None:
@@ -1912,43 +2043,12 @@ def _create_meeting_task_from_instruction(
     if not _contains_meeting_intent(title):
         title = f"Meeting: {title}"
 
-    notes_parts: list[str] = []
     cleaned_source = source_text.strip()
-    if cleaned_source:
-        notes_parts.append(cleaned_source[:3000])
-
-    zoom_join_url: str | None = None
-    zoom_start_url: str | None = None
-    zoom_error: str | None = None
-
-    if use_zoom:
-        linked_zoom = _get_active_zoom_link(
-            db,
-            thread_id=thread.id,
-            user_id=sender_user_id,
-        )
-        effective_fallback_zoom_url = (
-            linked_zoom.zoom_join_base_url.strip()
-            if linked_zoom and linked_zoom.zoom_join_base_url
-            else ZOOM_MEETING_BASE_URL
-        )
-        zoom_join_url, zoom_start_url, zoom_error = _zoom_create_meeting(
-            title=title,
-            due_at_utc=due_at,
-            agenda=cleaned_source,
-            fallback_url=effective_fallback_zoom_url,
-        )
-
-        if zoom_join_url:
-            notes_parts.append(f"Zoom join link: {zoom_join_url}")
-        if zoom_start_url:
-            notes_parts.append(f"Zoom host link: {zoom_start_url}")
-
     task = models.InternalChatTask(
         thread_id=thread.id,
         workspace_id=thread.workspace_id,
         title=title[:255],
-        notes=("\n".join(notes_parts).strip() or None),
+        notes=(cleaned_source[:3000] or None),
         due_at=due_at,
         created_by_user_id=sender_user_id,
     )
@@ -1956,6 +2056,13 @@ def _create_meeting_task_from_instruction(
     db.flush()
     _schedule_reminder_for_task(db, task)
 
+    if use_zoom:
+        # Creating the Zoom meeting is an outside call too, so a Judith job holds it until commit.
+        attach = partial(_attach_zoom_meeting, db, task_id=task.id, sender_user_id=sender_user_id, agenda=cleaned_source)
+        if not defer_side_effect(db, attach):
+            attach()
+        return True
+
     _send_telegram_task_update(
         db,
         workspace_id=task.workspace_id,
@@ -1967,26 +2074,67 @@ def _create_meeting_task_from_instruction(
         task_id=task.id,
         user_id=sender_user_id,
     )
+    _create_judith_message(db, thread_id=thread.id, body=_build_judith_ack(1, due_at)[:6000])
+    return True
 
-    if use_zoom:
-        if zoom_join_url:
-            ack_body = (
-                f"Meeting task added. Zoom link: {zoom_join_url}"
-                if not due_at
-                else f"Meeting task added for {_to_uz_datetime_label(due_at)}. Zoom link: {zoom_join_url}"
-            )
-        else:
-            setup_hint = "Open Judith Zoom setup and save your Zoom meeting URL."
-            ack_body = (
-                f"Meeting task added. I could not generate a Zoom link automatically. {setup_hint}"
-                if not zoom_error
-                else f"Meeting task added. Zoom link generation failed ({zoom_error}). {setup_hint}"
-            )
-    else:
-        ack_body = _build_judith_ack(1, due_at)
 
-    _create_judith_message(db, thread_id=thread.id, body=ack_body[:6000])
-    return True
+def _attach_zoom_meeting(db: Session, *, task_id: int, sender_user_id: str, agenda: str) -> None:
+    """Create the Zoom meeting for a new meeting task, add its links to the notes and acknowledge it."""
+    task = db.get(models.InternalChatTask, task_id)
+    if not task:
+        return
+    linked_zoom = _get_active_zoom_link(
+        db,
+        thread_id=task.thread_id,
+        user_id=sender_user_id,
+    )
+    effective_fallback_zoom_url = (
+        linked_zoom.zoom_join_base_url.strip()
+        if linked_zoom and linked_zoom.zoom_join_base_url
+        else ZOOM_MEETING_BASE_URL
+    )
+    zoom_join_url, zoom_start_url, zoom_error = _zoom_create_meeting(
+        title=task.title,
+        due_at_utc=task.due_at,
+        agenda=agenda,
+        fallback_url=effective_fallback_zoom_url,
+    )
+
+    notes_parts = [task.notes] if task.notes else []
+    if zoom_join_url:
+        notes_parts.append(f"Zoom join link: {zoom_join_url}")
+    if zoom_start_url:
+        notes_parts.append(f"Zoom host link: {zoom_start_url}")
+    task.notes = "\n".join(notes_parts).strip() or None
+    db.flush()
+
+    _send_telegram_task_update(
+        db,
+        workspace_id=task.workspace_id,
+        thread_id=task.thread_id,
+        title=task.title,
+        status_label="Added",
+        due_at=task.due_at,
+        notes=task.notes,
+        task_id=task.id,
+        user_id=sender_user_id,
+    )
+
+    due_at = task.due_at
+    if zoom_join_url:
+        ack_body = (
+            f"Meeting task added. Zoom link: {zoom_join_url}"
+            if not due_at
+            else f"Meeting task added for {_to_uz_datetime_label(due_at)}. Zoom link: {zoom_join_url}"
+        )
+    else:
+        setup_hint = "Open Judith Zoom setup and save your Zoom meeting URL."
+        ack_body = (
+            f"Meeting task added. I could not generate a Zoom link automatically. {setup_hint}"
+            if not zoom_error
+            else f"Meeting task added. Zoom link generation failed ({zoom_error}). {setup_hint}"
+        )
+    _create_judith_message(db, thread_id=task.thread_id, body=ack_body[:6000])
 
 
 def _handle_judith_meeting_instruction(
@@ -2691,7 +2839,7 @@ def _transcribe_audio_bytes(payload: bytes, file_name: str, mime_type: str | Non
 
     audio_file = BytesIO(payload)
     audio_file.name = safe_name
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    client = provider_clients.openai(settings.OPENAI_API_KEY)
 
     try:
         result = client.audio.transcriptions.create(
@@ -2712,6 +2860,135 @@ def _transcribe_audio_bytes(payload: bytes, file_name: str, mime_type: str | Non
     return (getattr(result, "text", "") or "").strip()
 
 
+def _cached_transcript(db: Session, content_hash: str) -> str | None:
+    """Transcript for audio with this hash, from the process cache or an earlier attachment."""
+    transcript = transcription_queue.cached(content_hash)
+    if transcript:
+        return transcript
+    transcript = (
+        db.query(models.InternalChatAttachment.transcript)
+        .filter(
+            models.InternalChatAttachment.content_sha256 == content_hash,
+            models.InternalChatAttachment.transcript.isnot(None),
+        )
+        .limit(1)
+        .scalar()
+    )
+    if transcript:
+        transcription_queue.remember(content_hash, transcript)
+    return transcript
+
+
+def _queue_attachment_transcription(attachment: models.InternalChatAttachment) -> None:
+    attachment_id = attachment.id
+    storage_key = attachment.storage_key
+    file_name = attachment.file_name
+    mime_type = attachment.mime_type
+    size_bytes = attachment.size_bytes
+
+    def transcribe() -> str:
+        payload = b"".join(attachment_storage.iter_range(storage_key, 0, size_bytes - 1))
+        return _transcribe_audio_bytes(payload, file_name, mime_type)
+
+    future = transcription_queue.submit(attachment.content_sha256, transcribe)
+    future.add_done_callback(lambda done: _apply_attachment_transcript(attachment_id, done))
+
+
+def _apply_attachment_transcript(attachment_id: int, future) -> None:
+    try:
+        transcript = future.result()
+    except Exception:
+        logger.exception("Transcription failed for attachment=%s", attachment_id)
+        transcript = ""
+
+    db = SessionLocal()
+    try:
+        attachment = (
+            db.query(models.InternalChatAttachment)
+            .filter(models.InternalChatAttachment.id == attachment_id)
+            .first()
+        )
+        if not attachment:
+            # The message was deleted while it was being transcribed.
+            return
+        claimed = (
+            db.query(models.InternalChatAttachment)
+            .filter(
+                models.InternalChatAttachment.id == attachment_id,
+                models.InternalChatAttachment.transcription_status == TRANSCRIPTION_PENDING,
+            )
+            .update(
+                {
+                    models.InternalChatAttachment.transcription_status: (
+                        TRANSCRIPTION_DONE if transcript else TRANSCRIPTION_FAILED
+                    ),
+                    models.InternalChatAttachment.transcript: transcript or None,
+                },
+                synchronize_session=False,
+            )
+        )
+        if not claimed:
+            # Recovery requeued this attachment and the other run already applied its result.
+            db.rollback()
+            return
+        message = (
+            db.query(models.InternalChatMessage)
+            .options(selectinload(models.InternalChatMessage.attachments))
+            .filter(models.InternalChatMessage.id == attachment.message_id)
+            .first()
+        )
+        instruction_text = message.body
+        if transcript:
+            message.body = f"{message.body}\nTranscript: {transcript}"[:6000]
+            instruction_text = transcript
+            db.query(models.InternalChatThread).filter(
+                models.InternalChatThread.id == message.thread_id,
+                models.InternalChatThread.last_message_id == message.id,
+            ).update({models.InternalChatThread.last_message_preview: message_preview(message.body)}, synchronize_session=False)
+        thread = _get_thread_or_404(db, message.thread_id)
+        # The body and attachment status changed in place; moving updated_at changes the
+        # messages ETag so pollers that already hold this message fetch it again.
+        thread.updated_at = datetime.utcnow()
+        db.commit()
+
+        if thread.scope == "judith_assistant" and message.sender_user_id != JUDITH_USER_ID:
+            _queue_judith_instruction(db, thread=thread, sender_user_id=message.sender_user_id, body=instruction_text)
+    except Exception:
+        db.rollback()
+        logger.exception("Could not apply transcript to attachment=%s", attachment_id)
+    finally:
+        db.close()
+
+
+def recover_pending_transcriptions() -> int:
+    """
+    Pick up attachments left "transcribing" when the process that owned them stopped.
+
+    The transcription queue only lives in memory, so these rows are queued again; without
+    a provider key they are marked failed and Judith gets the caption or fallback text.
+    """
+    db = SessionLocal()
+    try:
+        stranded = (
+            db.query(models.InternalChatAttachment)
+            .filter(models.InternalChatAttachment.transcription_status == TRANSCRIPTION_PENDING)
+            .order_by(models.InternalChatAttachment.id.asc())
+            .all()
+        )
+        db.expunge_all()
+    finally:
+        db.close()
+
+    for attachment in stranded:
+        if settings.OPENAI_API_KEY:
+            _queue_attachment_transcription(attachment)
+            continue
+        no_transcript: Future = Future()
+        no_transcript.set_result("")
+        _apply_attachment_transcript(attachment.id, no_transcript)
+    return len(stranded)
+
+
 def _serialize_attachment(row: models.InternalChatAttachment) -> schemas.InternalChatAttachmentOut:
     return schemas.InternalChatAttachmentOut(
         id=row.id,
@@ -2719,6 +2996,7 @@ def _serialize_attachment(row: models.InternalChatAttachment) -> schemas.Interna
         file_name=row.file_name,
         mime_type=row.mime_type,
         size_bytes=row.size_bytes,
+        transcription_status=row.transcription_status,
         created_at=row.created_at,
         download_url=f"/internal-chat/attachments/{row.id}",
     )
@@ -2750,14 +3028,12 @@ def _serialize_message(row: models.InternalChatMessage) -> schemas.InternalChatM
 
 def _serialize_thread(
     row: models.InternalChatThread,
-    latest_message: models.InternalChatMessage | None = None,
+    viewer_user_id: str | None = None,
 ) -> schemas.InternalChatThreadOut:
-    preview = None
-    last_message_at = None
-    if latest_message:
-        body = (latest_message.body or "").strip()
-        preview = f"{body[:117]}..." if len(body) > 120 else body
-        last_message_at = latest_message.created_at
+    unread_count = 0
+    if viewer_user_id:
+        viewer = next((item for item in row.participants if item.user_id == viewer_user_id), None)
+        unread_count = int(viewer.unread_count or 0) if viewer else 0
 
     return schemas.InternalChatThreadOut(
         id=row.id,
@@ -2765,8 +3041,11 @@ def _serialize_thread(
         scope=row.scope,
         title=row.title,
         participants=[_serialize_participant(item) for item in row.participants],
-        last_message_preview=preview,
-        last_message_at=last_message_at,
+        last_message_id=row.last_message_id,
+        last_message_preview=row.last_message_preview,
+        last_sender=row.last_sender,
+        last_message_at=row.last_message_at,
+        unread_count=unread_count,
         created_at=row.created_at,
         updated_at=row.updated_at,
     )
@@ -2783,58 +3062,49 @@ def _ensure_participant(
     email: str | None,
     display_name: str | None,
     role: str,
-):
-    row = (
-        db.query(models.InternalChatParticipant)
-        .filter(
+) -> None:
+    normalized_email = email.strip() if email else None
+    normalized_name = _normalize_display_name(display_name, email, user_id)
+    normalized_role = _normalize_role(role)
+
+    # Most calls re-assert an unchanged membership; answer those from the access cache.
+    access = thread_access_cache.get(db, thread_id)
+    known = access.participants.get(user_id) if access else None
+    if (
+        known
+        and known.display_name == normalized_name
+        and known.role == normalized_role
+        and (normalized_email is None or known.email == normalized_email)
+    ):
+        return
+
+    row = (
+        db.query(models.InternalChatParticipant)
+        .filter(
             models.InternalChatParticipant.thread_id == thread_id,
             models.InternalChatParticipant.user_id == user_id,
         )
         .first()
     )
-    normalized_name = _normalize_display_name(display_name, email, user_id)
-    normalized_role = _normalize_role(role)
 
     if row:
-        row.email = email.strip() if email else row.email
-        row.display_name = normalized_name
-        row.role = normalized_role
-        return row
-
-    row = models.InternalChatParticipant(
-        thread_id=thread_id,
-        user_id=user_id,
-        email=email.strip() if email else None,
-        display_name=normalized_name,
-        role=normalized_role,
-    )
-    db.add(row)
-    return row
-
+        if normalized_email is not None and row.email != normalized_email:
+            row.email = normalized_email
+        if row.display_name != normalized_name:
+            row.display_name = normalized_name
+        if row.role != normalized_role:
+            row.role = normalized_role
+        return
 
-def _latest_messages_by_thread(
-    db: Session,
-    thread_ids: list[int],
-) -> dict[int, models.InternalChatMessage]:
-    if not thread_ids:
-        return {}
-
-    latest_subquery = (
-        db.query(
-            models.InternalChatMessage.thread_id.label("thread_id"),
-            func.max(models.InternalChatMessage.id).label("latest_id"),
+    db.add(
+        models.InternalChatParticipant(
+            thread_id=thread_id,
+            user_id=user_id,
+            email=normalized_email,
+            display_name=normalized_name,
+            role=normalized_role,
         )
-        .filter(models.InternalChatMessage.thread_id.in_(thread_ids))
-        .group_by(models.InternalChatMessage.thread_id)
-        .subquery()
-    )
-
-    rows = (
-        db.query(models.InternalChatMessage)
-        .join(latest_subquery, models.InternalChatMessage.id == latest_subquery.c.latest_id)
-        .all()
     )
-    return {row.thread_id: row for row in rows}
 
 
 def _get_thread_or_404(
@@ -2867,32 +3137,18 @@ def _assert_thread_access(
     if is_super_admin:
         return
 
-    membership = (
-        db.query(models.InternalChatParticipant)
-        .filter(
-            models.InternalChatParticipant.thread_id == thread_id,
-            models.InternalChatParticipant.user_id == user_id,
-        )
-        .first()
-    )
-    if not membership:
-        raise HTTPException(status_code=403, detail="You do not have access to this conversation.")
-
-    thread = (
-        db.query(models.InternalChatThread)
-        .options(selectinload(models.InternalChatThread.participants))
-        .filter(models.InternalChatThread.id == thread_id)
-        .first()
-    )
-    if not thread:
+    access = thread_access_cache.get(db, thread_id)
+    if not access:
         raise HTTPException(status_code=404, detail="Thread not found.")
+    if user_id not in access.participants:
+        raise HTTPException(status_code=403, detail="You do not have access to this conversation.")
 
-    participant_ids = _participant_id_set(thread)
-    if thread.scope == "judith_assistant":
+    participant_ids = access.participant_ids
+    if access.scope == "judith_assistant":
         expected = {user_id, JUDITH_USER_ID}
         if participant_ids != expected:
             raise HTTPException(status_code=403, detail="You do not have access to this conversation.")
-    if thread.scope == "owner_direct":
+    if access.scope == "owner_direct":
         expected = {user_id, OWNER_USER_ID}
         if participant_ids != expected:
             raise HTTPException(status_code=403, detail="You do not have access to this conversation.")
@@ -2900,6 +3156,26 @@ def _assert_thread_access(
     return
 
 
+def _accessible_thread_ids(db: Session, user_id: str) -> list[int]:
+    member_thread_ids = (
+        db.query(models.InternalChatParticipant.thread_id)
+        .filter(models.InternalChatParticipant.user_id == user_id)
+        .subquery()
+    )
+    rows = (
+        db.query(models.InternalChatThread.id, models.InternalChatThread.scope, models.InternalChatParticipant.user_id)
+        .join(models.InternalChatParticipant, models.InternalChatParticipant.thread_id == models.InternalChatThread.id)
+        .filter(models.InternalChatThread.id.in_(db.query(member_thread_ids.c.thread_id)))
+        .all()
+    )
+    scopes: dict[int, str] = {}
+    members: dict[int, set[str]] = {}
+    for thread_id, scope, participant_id in rows:
+        scopes[thread_id] = scope
+        members.setdefault(thread_id, set()).add(participant_id)
+    return [thread_id for thread_id, scope in scopes.items() if user_id in thread_readers(scope, members[thread_id])]
+
+
 def _assert_thread_scope(thread: models.InternalChatThread, allowed_scopes: set[str]):
     if thread.scope not in allowed_scopes:
         raise HTTPException(status_code=400, detail="This operation is only available for Judith chat.")
@@ -2988,6 +3264,7 @@ def _schedule_reminder_for_task(
             remind_at=task.due_at,
         )
     )
+    schedule_reminder_wakeup(db, remind_at)
 
 
 def _suggest_judith_response_for_question(
@@ -3166,6 +3443,15 @@ def _handle_task_control_command(
             )
             or 0
         )
+        # Same as completing a single task: its pending reminders are settled, not left due.
+        (
+            db.query(models.InternalChatTaskReminder)
+            .filter(
+                models.InternalChatTaskReminder.thread_id == thread.id,
+                models.InternalChatTaskReminder.sent_at.is_(None),
+            )
+            .update({models.InternalChatTaskReminder.sent_at: now_utc}, synchronize_session=False)
+        )
 
     if reopen_all:
         reopened_count = (
@@ -3564,13 +3850,105 @@ def _process_judith_instruction(
     return True
 
 
+def _run_judith_job(job: JudithJob, sender_user_id: str, body: str) -> None:
+    if job.cancelled.is_set():
+        return
+    db = SessionLocal()
+    try:
+        thread = db.query(models.InternalChatThread).filter(models.InternalChatThread.id == job.thread_id).first()
+        if not thread:
+            return
+        hold_side_effects(db)
+        _process_judith_instruction(db, thread=thread, sender_user_id=sender_user_id, body=body)
+        if job.cancelled.is_set():
+            # The queue already moved on and told the user; keep this late result out of the thread.
+            db.rollback()
+            return
+        thread.updated_at = datetime.utcnow()
+        db.commit()
+        _flush_judith_side_effects(db, job)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _flush_judith_side_effects(db: Session, job: JudithJob) -> int:
+    """Run the Telegram and Zoom calls a committed job held back, unless the job was cancelled."""
+    calls = pop_side_effects(db)
+    ran = 0
+    for call in calls:
+        if job.cancelled.is_set():
+            logger.info("Dropping %s held Judith call(s) for cancelled thread=%s", len(calls) - ran, job.thread_id)
+            break
+        try:
+            call()
+        except Exception:
+            logger.exception("Held Judith call failed for thread=%s", job.thread_id)
+        ran += 1
+    if ran:
+        # The Zoom step writes the meeting links and its acknowledgement.
+        db.commit()
+    return ran
+
+
+def _post_judith_timeout_notice(job: JudithJob) -> None:
+    db = SessionLocal()
+    try:
+        thread = db.query(models.InternalChatThread).filter(models.InternalChatThread.id == job.thread_id).first()
+        if not thread:
+            return
+        _create_judith_message(
+            db,
+            thread_id=thread.id,
+            body="Sorry, I could not finish processing that message in time. Please send it again.",
+        )
+        thread.updated_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _queue_judith_instruction(
+    db: Session,
+    thread: models.InternalChatThread,
+    sender_user_id: str,
+    body: str,
+) -> None:
+    """
+    Hand Judith's reply to the worker pool once the user's message is committed.
+
+    Falls back to inline processing when async handling is disabled or the backlog is full.
+    """
+    if JUDITH_ASYNC_ENABLED:
+        job = JudithJob(
+            thread_id=thread.id,
+            run=lambda item: _run_judith_job(item, sender_user_id, body),
+            on_timeout=_post_judith_timeout_notice,
+        )
+        if judith_queue.submit(job):
+            return
+        logger.warning("Judith queue is full; processing thread=%s inline", thread.id)
+    _process_judith_instruction(db, thread=thread, sender_user_id=sender_user_id, body=body)
+    thread.updated_at = datetime.utcnow()
+    db.commit()
+
+
 def _dispatch_due_reminders(
     db: Session,
     workspace_id: str | None,
     for_user_id: str | None = None,
+    batch_size: int = REMINDER_DISPATCH_BATCH_SIZE,
 ) -> int:
-    _deactivate_conflicting_telegram_links(db)
+    """
+    Claim and process one batch of due reminders; the caller commits.
 
+    Rows are claimed with FOR UPDATE SKIP LOCKED so concurrent dispatchers on other
+    replicas take disjoint batches. Tasks, threads and pending follow-up reminders are
+    loaded in bulk, and Telegram notifications are parked on the session until
+    `_flush_reminder_notifications` runs after the commit.
+    """
     now_utc = datetime.utcnow()
     query = (
         db.query(models.InternalChatTaskReminder)
@@ -3590,22 +3968,47 @@ def _dispatch_due_reminders(
             models.InternalChatParticipant.thread_id == models.InternalChatTaskReminder.thread_id,
         ).filter(models.InternalChatParticipant.user_id == for_user_id)
 
-    due_reminders = query.limit(50).all()
-    touched_threads: set[int] = set()
+    due_reminders = (
+        query.with_for_update(skip_locked=True, of=models.InternalChatTaskReminder).limit(batch_size).all()
+    )
+    if not due_reminders:
+        return 0
+
+    task_ids = {reminder.task_id for reminder in due_reminders}
+    tasks = {
+        row.id: row
+        for row in db.query(models.InternalChatTask).filter(models.InternalChatTask.id.in_(task_ids)).all()
+    }
+    threads = {
+        row.id: row
+        for row in db.query(models.InternalChatThread)
+        .options(selectinload(models.InternalChatThread.participants))
+        .filter(models.InternalChatThread.id.in_({task.thread_id for task in tasks.values()}))
+        .all()
+    }
+    claimed_ids = {reminder.id for reminder in due_reminders}
+    pending_by_task: dict[int, list[datetime]] = {}
+    for task_id, remind_at in (
+        db.query(models.InternalChatTaskReminder.task_id, models.InternalChatTaskReminder.remind_at)
+        .filter(
+            models.InternalChatTaskReminder.task_id.in_(task_ids),
+            models.InternalChatTaskReminder.sent_at.is_(None),
+            models.InternalChatTaskReminder.id.notin_(claimed_ids),
+        )
+        .all()
+    ):
+        pending_by_task.setdefault(task_id, []).append(remind_at)
+
+    lags: list[float] = []
     processed = 0
 
     for reminder in due_reminders:
-        task = db.query(models.InternalChatTask).filter(models.InternalChatTask.id == reminder.task_id).first()
+        task = tasks.get(reminder.task_id)
         if not task or task.is_completed:
             reminder.sent_at = now_utc
             continue
 
-        thread = (
-            db.query(models.InternalChatThread)
-            .options(selectinload(models.InternalChatThread.participants))
-            .filter(models.InternalChatThread.id == task.thread_id)
-            .first()
-        )
+        thread = threads.get(task.thread_id)
         if not thread:
             reminder.sent_at = now_utc
             continue
@@ -3638,35 +4041,30 @@ def _dispatch_due_reminders(
                 f"Task: {task.title}\n"
                 f"Due: {due_label}"
             )
+        # The thread summary hook bumps the thread's updated_at for this message.
         _create_judith_message(db, thread_id=task.thread_id, body=reminder_body)
-        _send_telegram_reminder(
+        park_reminder_notification(
             db,
-            task.workspace_id,
-            telegram_message,
-            thread_id=task.thread_id,
-            user_id=next(
-                (
-                    participant.user_id
-                    for participant in (thread.participants or [])
-                    if participant.user_id != JUDITH_USER_ID
+            {
+                "workspace_id": task.workspace_id,
+                "message_text": telegram_message,
+                "thread_id": task.thread_id,
+                "user_id": next(
+                    (
+                        participant.user_id
+                        for participant in (thread.participants or [])
+                        if participant.user_id != JUDITH_USER_ID
+                    ),
+                    None,
                 ),
-                None,
-            ),
+            }
         )
 
         # Backfill: for old tasks that only had one pre-deadline reminder,
         # ensure a due-at reminder is still scheduled.
         if task.due_at and not is_deadline_trigger and reminder.remind_at < task.due_at:
-            has_due_pending = (
-                db.query(models.InternalChatTaskReminder.id)
-                .filter(
-                    models.InternalChatTaskReminder.task_id == task.id,
-                    models.InternalChatTaskReminder.sent_at.is_(None),
-                    models.InternalChatTaskReminder.remind_at >= (task.due_at - timedelta(minutes=1)),
-                )
-                .first()
-            )
-            if not has_due_pending:
+            deadline_floor = task.due_at - timedelta(minutes=1)
+            if not any(remind_at >= deadline_floor for remind_at in pending_by_task.get(task.id, [])):
                 db.add(
                     models.InternalChatTaskReminder(
                         task_id=task.id,
@@ -3675,25 +4073,53 @@ def _dispatch_due_reminders(
                         remind_at=task.due_at,
                     )
                 )
+                pending_by_task.setdefault(task.id, []).append(task.due_at)
+                schedule_reminder_wakeup(db, task.due_at)
 
         reminder.sent_at = now_utc
-        touched_threads.add(task.thread_id)
+        lags.append(max(0.0, (now_utc - reminder.remind_at).total_seconds()))
         processed += 1
 
-    for thread_id in touched_threads:
-        row = db.query(models.InternalChatThread).filter(models.InternalChatThread.id == thread_id).first()
-        if row:
-            row.updated_at = now_utc
-
+    reminder_stats.record(lags)
     return processed
 
 
-def dispatch_due_reminders_job(db: Session) -> int:
+def _flush_reminder_notifications(db: Session) -> int:
+    """Queue the Telegram sends parked by committed reminder batches without waiting on them."""
+    outbox = pop_reminder_notifications(db)
+    for item in outbox:
+        _send_telegram_reminder(db, wait=False, **item)
+    return len(outbox)
+
+
+def next_reminder_due_at(db: Session) -> datetime | None:
+    """Earliest reminder `_dispatch_due_reminders` would pick up, with the same task filter."""
+    return (
+        db.query(func.min(models.InternalChatTaskReminder.remind_at))
+        .join(models.InternalChatTask, models.InternalChatTask.id == models.InternalChatTaskReminder.task_id)
+        .filter(
+            models.InternalChatTaskReminder.sent_at.is_(None),
+            models.InternalChatTask.is_completed.is_(False),
+        )
+        .scalar()
+    )
+
+
+def dispatch_due_reminders_job(db: Session, max_batches: int = REMINDER_DISPATCH_MAX_BATCHES) -> int:
     """
     Process due Judith reminders across all workspaces.
-    Returns number of reminders dispatched.
+    Commits after each batch and returns the number of reminders dispatched.
     """
-    return _dispatch_due_reminders(db, workspace_id=None)
+    _deactivate_conflicting_telegram_links(db)
+    total = 0
+    for _ in range(max_batches):
+        processed = _dispatch_due_reminders(db, workspace_id=None, batch_size=REMINDER_DISPATCH_BATCH_SIZE)
+        db.commit()
+        _flush_reminder_notifications(db)
+        total += processed
+        if processed < REMINDER_DISPATCH_BATCH_SIZE:
+            break
+    return total
 
 
 @router.get(
@@ -4077,41 +4503,75 @@ def list_threads(
     auth_user = _resolve_verified_actor(request, user_id=user_id, role=user_role)
     super_admin = auth_user.is_admin
 
-    query = (
-        db.query(models.InternalChatThread)
-        .options(selectinload(models.InternalChatThread.participants))
-        .order_by(models.InternalChatThread.updated_at.desc(), models.InternalChatThread.id.desc())
-    )
-
-    if workspace_id:
-        query = query.filter(models.InternalChatThread.workspace_id == workspace_id)
+    if super_admin:
+        query = (
+            db.query(models.InternalChatThread)
+            .options(selectinload(models.InternalChatThread.participants))
+            .order_by(models.InternalChatThread.updated_at.desc(), models.InternalChatThread.id.desc())
+        )
+    else:
+        # Walks ix_internal_chat_participants_user_id_thread_updated_at; Judith and owner-direct
+        # threads must contain exactly the caller and the counterpart.
+        others = models.InternalChatParticipant.__table__.alias("other_participants")
+
+        def _exact_pair(scope: str, counterpart_id: str):
+            return and_(
+                models.InternalChatThread.scope == scope,
+                exists().where(others.c.thread_id == models.InternalChatThread.id, others.c.user_id == counterpart_id),
+                ~exists().where(
+                    others.c.thread_id == models.InternalChatThread.id,
+                    others.c.user_id.notin_([user_id, counterpart_id]),
+                ),
+            )
 
-    if not super_admin:
         query = (
-            query.join(
+            db.query(models.InternalChatThread)
+            .join(
                 models.InternalChatParticipant,
                 models.InternalChatParticipant.thread_id == models.InternalChatThread.id,
             )
+            .options(selectinload(models.InternalChatThread.participants))
             .filter(models.InternalChatParticipant.user_id == user_id)
-            .distinct()
+            .filter(
+                or_(
+                    models.InternalChatThread.scope.notin_(["judith_assistant", "owner_direct"]),
+                    _exact_pair("judith_assistant", JUDITH_USER_ID),
+                    _exact_pair("owner_direct", OWNER_USER_ID),
+                )
+            )
+            .order_by(
+                models.InternalChatParticipant.thread_updated_at.desc(),
+                models.InternalChatParticipant.thread_id.desc(),
+            )
         )
 
+    if workspace_id:
+        query = query.filter(models.InternalChatThread.workspace_id == workspace_id)
+
     rows = query.limit(limit).all()
-    if not super_admin:
-        expected_judith_ids = {user_id, JUDITH_USER_ID}
-        expected_owner_direct_ids = {user_id, OWNER_USER_ID}
-        filtered: list[models.InternalChatThread] = []
-        for row in rows:
-            participant_ids = _participant_id_set(row)
-            if row.scope == "judith_assistant" and participant_ids != expected_judith_ids:
-                continue
-            if row.scope == "owner_direct" and participant_ids != expected_owner_direct_ids:
-                continue
-            filtered.append(row)
-        rows = filtered
+    return [_serialize_thread(row, user_id) for row in rows]
 
-    latest_by_thread = _latest_messages_by_thread(db, [row.id for row in rows])
-    return [_serialize_thread(row, latest_by_thread.get(row.id)) for row in rows]
+
+@router.post("/threads/{thread_id}/read", response_model=schemas.InternalChatThreadOut)
+def mark_thread_as_read(
+    request: Request,
+    thread_id: int,
+    user_id: str = Query(...),
+    user_role: str = Query("client"),
+    db: Session = Depends(get_db),
+):
+    auth_user = _resolve_verified_actor(request, user_id=user_id, role=user_role)
+    thread = _get_thread_or_404(db, thread_id)
+    _assert_thread_access(
+        db,
+        thread_id=thread.id,
+        user_id=user_id,
+        is_super_admin=auth_user.is_admin,
+    )
+    mark_thread_read(db, thread.id, user_id)
+    db.commit()
+    row = _get_thread_or_404(db, thread.id, include_participants=True)
+    return _serialize_thread(row, user_id)
 
 
 @router.post("/threads/bridge", response_model=schemas.InternalChatThreadOut)
@@ -4173,8 +4633,7 @@ def open_workspace_bridge(
     db.commit()
     db.refresh(thread)
     row = _get_thread_or_404(db, thread.id, include_participants=True)
-    latest_by_thread = _latest_messages_by_thread(db, [row.id])
-    return _serialize_thread(row, latest_by_thread.get(row.id))
+    return _serialize_thread(row, requester_user_id)
 
 
 @router.post("/threads/owner-direct", response_model=schemas.InternalChatThreadOut)
@@ -4246,8 +4705,7 @@ def open_owner_direct(
     db.commit()
     db.refresh(thread)
     row = _get_thread_or_404(db, thread.id, include_participants=True)
-    latest_by_thread = _latest_messages_by_thread(db, [row.id])
-    return _serialize_thread(row, latest_by_thread.get(row.id))
+    return _serialize_thread(row, requester_user_id)
 
 
 @router.post("/threads/judith", response_model=schemas.InternalChatThreadOut)
@@ -4341,8 +4799,7 @@ def open_judith_thread(
     db.commit()
     db.refresh(thread)
     row = _get_thread_or_404(db, thread.id, include_participants=True)
-    latest_by_thread = _latest_messages_by_thread(db, [row.id])
-    return _serialize_thread(row, latest_by_thread.get(row.id))
+    return _serialize_thread(row, requester_user_id)
 
 
 @router.post("/threads/direct", response_model=schemas.InternalChatThreadOut)
@@ -4416,35 +4873,144 @@ def create_direct_thread(
     db.commit()
     db.refresh(thread)
     row = _get_thread_or_404(db, thread.id, include_participants=True)
-    latest_by_thread = _latest_messages_by_thread(db, [row.id])
-    return _serialize_thread(row, latest_by_thread.get(row.id))
+    return _serialize_thread(row, requester_user_id)
+
+
+def _messages_etag(thread: models.InternalChatThread, latest_id: int, *params: Any) -> str:
+    # updated_at moves on every send and delete, so removing an older message changes the tag too.
+    stamp = thread.updated_at.isoformat() if thread.updated_at else ""
+    return f'W/"{thread.id}-{latest_id}-{stamp}-{":".join(str(item) for item in params)}"'
 
 
 @router.get("/threads/{thread_id}/messages", response_model=list[schemas.InternalChatMessageOut])
 def list_messages(
     request: Request,
+    response: Response,
     thread_id: int,
     user_id: str = Query(...),
     user_role: str = Query("client"),
     limit: int = Query(200, ge=1, le=500),
+    since_id: int | None = Query(None, ge=0),
+    before_id: int | None = Query(None, ge=1),
     db: Session = Depends(get_db),
 ):
+    """
+    Newest `limit` messages, or a cursor page: `since_id` returns messages after that id
+    (oldest first), `before_id` the `limit` messages just before it.
+    """
     auth_user = _resolve_verified_actor(request, user_id=user_id, role=user_role)
-    _get_thread_or_404(db, thread_id)
+    thread = _get_thread_or_404(db, thread_id)
     _assert_thread_access(db, thread_id=thread_id, user_id=user_id, is_super_admin=auth_user.is_admin)
 
-    rows = (
+    latest_id = (
+        db.query(func.max(models.InternalChatMessage.id))
+        .filter(models.InternalChatMessage.thread_id == thread_id)
+        .scalar()
+        or 0
+    )
+    etag = _messages_etag(thread, latest_id, limit, since_id, before_id)
+    if etag in {item.strip() for item in (request.headers.get("if-none-match") or "").split(",")}:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if since_id is not None and since_id >= latest_id:
+        return []
+
+    query = (
         db.query(models.InternalChatMessage)
         .options(selectinload(models.InternalChatMessage.attachments))
         .filter(models.InternalChatMessage.thread_id == thread_id)
-        .order_by(models.InternalChatMessage.created_at.desc(), models.InternalChatMessage.id.desc())
-        .limit(limit)
-        .all()
     )
+    if since_id is not None:
+        rows = (
+            query.filter(models.InternalChatMessage.id > since_id)
+            .order_by(models.InternalChatMessage.id.asc())
+            .limit(limit)
+            .all()
+        )
+        return [_serialize_message(row) for row in rows]
+    if before_id is not None:
+        query = query.filter(models.InternalChatMessage.id < before_id)
+    rows = query.order_by(models.InternalChatMessage.id.desc()).limit(limit).all()
     rows.reverse()
     return [_serialize_message(row) for row in rows]
 
 
+def _stream_resume_events(user_id: str, is_admin: bool, since_id: int) -> list[dict[str, Any]]:
+    with SessionLocal() as db:
+        query = (
+            db.query(models.InternalChatMessage)
+            .options(selectinload(models.InternalChatMessage.attachments))
+            .filter(models.InternalChatMessage.id > since_id)
+        )
+        if not is_admin:
+            thread_ids = _accessible_thread_ids(db, user_id)
+            if not thread_ids:
+                return []
+            query = query.filter(models.InternalChatMessage.thread_id.in_(thread_ids))
+        rows = query.order_by(models.InternalChatMessage.id.asc()).limit(STREAM_RESUME_LIMIT + 1).all()
+    if len(rows) > STREAM_RESUME_LIMIT:
+        # Too far behind to replay; the client reloads its threads instead.
+        return [{"type": "resync"}]
+    return [
+        {
+            "type": "message",
+            "thread_id": row.thread_id,
+            "message_id": row.id,
+            "message": _serialize_message(row).model_dump(mode="json"),
+        }
+        for row in rows
+    ]
+
+
+def _sse_event(payload: dict[str, Any]) -> str:
+    event_id = f"id: {payload['message_id']}\n" if payload.get("type") == "message" else ""
+    return f"{event_id}event: {payload.get('type', 'message')}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    user_id: str = Query(...),
+    user_role: str = Query("client"),
+    since_id: int | None = Query(None, ge=0),
+):
+    """
+    Server-sent events for every thread the user can read.
+
+    Message events carry the message id as the SSE id, so a reconnecting EventSource sends
+    it back as Last-Event-ID and only the gap is replayed.
+    """
+    normalized_user_id = (user_id or "").strip()
+    auth_user = _resolve_verified_actor(request, user_id=normalized_user_id, role=user_role)
+    last_event_id = (request.headers.get("last-event-id") or "").strip()
+    resume_from = since_id if since_id is not None else (int(last_event_id) if last_event_id.isdigit() else None)
+    queue = chat_hub.subscribe(normalized_user_id, is_admin=auth_user.is_admin)
+
+    async def _events():
+        try:
+            # Subscribed before the replay query, so nothing committed in between is lost;
+            # clients drop message ids they already have.
+            if resume_from is not None:
+                for payload in await run_in_threadpool(_stream_resume_events, normalized_user_id, auth_user.is_admin, resume_from):
+                    yield _sse_event(payload)
+            yield _sse_event({"type": "ready"})
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse_event(payload)
+        finally:
+            chat_hub.unsubscribe(normalized_user_id, queue)
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.delete("/threads/{thread_id}/messages")
 def clear_thread_messages(
     request: Request,
@@ -4463,14 +5029,18 @@ def clear_thread_messages(
     )
     _assert_thread_scope(thread, {"judith_assistant"})
 
-    attachment_paths = [
-        Path(row.storage_key)
+    storage_keys = {
+        row.storage_key
         for row in db.query(models.InternalChatAttachment.storage_key)
         .filter(models.InternalChatAttachment.thread_id == thread.id)
         .all()
         if row.storage_key
-    ]
+    }
 
+    # Deleted explicitly rather than via the FK cascade so the blob reference check below is accurate.
+    db.query(models.InternalChatAttachment).filter(models.InternalChatAttachment.thread_id == thread.id).delete(
+        synchronize_session=False
+    )
     deleted_messages = (
         db.query(models.InternalChatMessage)
         .filter(models.InternalChatMessage.thread_id == thread.id)
@@ -4478,15 +5048,10 @@ def clear_thread_messages(
         or 0
     )
     thread.updated_at = datetime.utcnow()
+    reset_thread_summary(db, thread.id)
     db.commit()
-
-    # Best-effort file cleanup for attachment blobs.
-    for path in attachment_paths:
-        try:
-            if path.exists() and path.is_file():
-                path.unlink()
-        except Exception:
-            continue
+    publish_thread_cleared(db, thread.id)
+    _release_attachment_blobs(db, storage_keys)
 
     return {"ok": True, "deleted_messages": deleted_messages}
 
@@ -4527,18 +5092,11 @@ def delete_message(
                 detail="You can remove only your own or Judith assistant messages.",
             )
 
-    attachment_paths = [Path(item.storage_key) for item in (message.attachments or []) if item.storage_key]
+    storage_keys = {item.storage_key for item in (message.attachments or []) if item.storage_key}
     db.delete(message)
     thread.updated_at = datetime.utcnow()
     db.commit()
-
-    # Best-effort file cleanup for attachment blobs.
-    for path in attachment_paths:
-        try:
-            if path.exists() and path.is_file():
-                path.unlink()
-        except Exception:
-            continue
+    _release_attachment_blobs(db, storage_keys)
 
     return {"ok": True}
 
@@ -4590,12 +5148,12 @@ def send_message(
     )
     db.add(row)
 
-    if thread.scope == "judith_assistant" and sender_user_id != JUDITH_USER_ID:
-        _process_judith_instruction(db, thread=thread, sender_user_id=sender_user_id, body=body)
-
     thread.updated_at = datetime.utcnow()
     db.commit()
 
+    if thread.scope == "judith_assistant" and sender_user_id != JUDITH_USER_ID:
+        _queue_judith_instruction(db, thread=thread, sender_user_id=sender_user_id, body=body)
+
     fresh = (
         db.query(models.InternalChatMessage)
         .options(selectinload(models.InternalChatMessage.attachments))
@@ -4637,19 +5195,18 @@ async def send_attachment_message(
         is_super_admin=auth_user.is_admin,
     )
 
-    payload = await file.read(MAX_UPLOAD_BYTES + 1)
-    if len(payload) > MAX_UPLOAD_BYTES:
+    try:
+        staged = await stage_upload(file, attachment_storage.staging_dir, MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
         raise HTTPException(status_code=413, detail=f"File too large. Max size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
-    if not payload:
+    if not staged.size_bytes:
+        staged.discard()
         raise HTTPException(status_code=400, detail="Attachment file is empty.")
 
     display_name = (file.filename or "attachment").strip()[:255] or "attachment"
-    extension = Path(display_name).suffix[:15]
-    storage_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{uuid4().hex}{extension}"
-    thread_folder = UPLOAD_ROOT / str(thread.id)
-    thread_folder.mkdir(parents=True, exist_ok=True)
-    storage_path = thread_folder / storage_name
-    storage_path.write_bytes(payload)
+    is_audio = (file.content_type or "").lower().startswith("audio/")
+    # Created before this request writes anything: on SQLite the side transaction needs the write lock.
+    _ensure_blob_row(db, blob_key(staged.sha256))
 
     _ensure_participant(
         db=db,
@@ -4662,18 +5219,23 @@ async def send_attachment_message(
 
     body = (caption or "").strip() or f"Sent an attachment: {display_name}"
     instruction_text = body
-    is_audio = (file.content_type or "").lower().startswith("audio/")
     has_transcript = "transcript:" in body.lower()
     if has_transcript:
         # Prefer explicit transcript content over metadata lines like "Voice message".
         transcript_line = re.search(r"transcript:\s*(.+)", body, flags=re.IGNORECASE)
         if transcript_line:
             instruction_text = transcript_line.group(1).strip()
+    transcript = None
+    transcription_status = None
     if is_audio and not has_transcript:
-        transcript = _transcribe_audio_bytes(payload, display_name, file.content_type)
+        transcript = _cached_transcript(db, staged.sha256)
         if transcript:
             instruction_text = transcript
             body = f"{body}\nTranscript: {transcript}"
+            transcription_status = TRANSCRIPTION_DONE
+        elif settings.OPENAI_API_KEY:
+            # Post now; the transcript (and Judith's instruction) follow from the transcription queue.
+            transcription_status = TRANSCRIPTION_PENDING
 
     message = models.InternalChatMessage(
         thread_id=thread.id,
@@ -4686,22 +5248,38 @@ async def send_attachment_message(
     db.add(message)
     db.flush()
 
+    # Held until the attachment row commits, so a release on any replica that finds this blob
+    # unreferenced waits for the commit instead of deleting the blob under this upload.
+    _lock_attachment_blob(db, blob_key(staged.sha256))
+    try:
+        # Identical files resolve to the same key, so a re-upload reuses the stored blob.
+        storage_key = await run_in_threadpool(attachment_storage.put_file, staged.path, staged.sha256)
+    except Exception:
+        staged.discard()
+        logger.exception("Could not store attachment for thread=%s", thread.id)
+        raise HTTPException(status_code=500, detail="Could not store attachment.")
+
     attachment = models.InternalChatAttachment(
         message_id=message.id,
         thread_id=thread.id,
         file_name=display_name,
         mime_type=file.content_type,
-        size_bytes=len(payload),
-        storage_key=str(storage_path),
+        size_bytes=staged.size_bytes,
+        storage_key=storage_key,
+        content_sha256=staged.sha256,
+        transcription_status=transcription_status,
+        transcript=transcript,
     )
     db.add(attachment)
 
-    if thread.scope == "judith_assistant" and normalized_sender != JUDITH_USER_ID:
-        _process_judith_instruction(db, thread=thread, sender_user_id=normalized_sender, body=instruction_text)
-
     thread.updated_at = datetime.utcnow()
     db.commit()
 
+    if transcription_status == TRANSCRIPTION_PENDING:
+        _queue_attachment_transcription(attachment)
+    elif thread.scope == "judith_assistant" and normalized_sender != JUDITH_USER_ID:
+        _queue_judith_instruction(db, thread=thread, sender_user_id=normalized_sender, body=instruction_text)
+
     fresh = (
         db.query(models.InternalChatMessage)
         .options(selectinload(models.InternalChatMessage.attachments))
@@ -4733,17 +5311,89 @@ def download_attachment(
         is_super_admin=auth_user.is_admin,
     )
 
-    file_path = Path(attachment.storage_key)
-    if not file_path.exists() or not file_path.is_file():
+    media_type = attachment.mime_type or "application/octet-stream"
+    headers = {"Cache-Control": f"private, max-age={ATTACHMENT_CACHE_MAX_AGE_SECONDS}"}
+    if attachment.content_sha256:
+        # Blobs are content-addressed, so the hash is a stable strong validator.
+        etag = f'"{attachment.content_sha256}"'
+        headers["ETag"] = etag
+        if_none_match = request.headers.get("if-none-match") or ""
+        if etag in {item.strip() for item in if_none_match.split(",")} or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+
+    file_path = attachment_storage.local_path(attachment.storage_key)
+    if file_path is not None:
+        if not file_path.is_file():
+            raise HTTPException(status_code=404, detail="Attachment file is missing.")
+        # FileResponse handles Range/If-Range and hands the file to the server via sendfile/pathsend.
+        return FileResponse(path=file_path, media_type=media_type, filename=attachment.file_name, headers=headers)
+
+    size = attachment_storage.size(attachment.storage_key)
+    if size is None:
         raise HTTPException(status_code=404, detail="Attachment file is missing.")
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Disposition"] = f"attachment; filename*=utf-8''{urllib_parse.quote(attachment.file_name)}"
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == headers.get("ETag"):
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), size)
+        except ValueError:
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable.", headers={"Content-Range": f"bytes */{size}"})
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        attachment_storage.iter_range(attachment.storage_key, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def _ensure_blob_row(db: Session, key: str) -> None:
+    """Create the blob's lock row in a side transaction so the caller's own stays free of writes."""
+    with Session(bind=db.get_bind()) as side:
+        if side.get(models.InternalChatBlob, key) is not None:
+            return
+        side.add(models.InternalChatBlob(storage_key=key))
+        try:
+            side.commit()
+        except IntegrityError:
+            side.rollback()
 
-    return FileResponse(
-        path=file_path,
-        media_type=attachment.mime_type or "application/octet-stream",
-        filename=attachment.file_name,
+
+def _lock_attachment_blob(db: Session, key: str) -> None:
+    """Hold the blob's row lock (the database write lock on SQLite) until the caller's transaction ends."""
+    db.query(models.InternalChatBlob).filter(models.InternalChatBlob.storage_key == key).update(
+        {models.InternalChatBlob.locked_at: func.now()}, synchronize_session=False
     )
 
 
+def _release_attachment_blobs(db: Session, storage_keys: set[str]) -> None:
+    """Delete blobs that no attachment references any more; deduplicated uploads share one blob."""
+    for key in sorted(storage_keys):
+        _ensure_blob_row(db, key)
+        try:
+            # An upload that reuses this blob holds the lock until its row commits, so the
+            # recount below runs after that commit and sees the new reference.
+            _lock_attachment_blob(db, key)
+            still_used = (
+                db.query(models.InternalChatAttachment.id)
+                .filter(models.InternalChatAttachment.storage_key == key)
+                .first()
+                is not None
+            )
+            if not still_used:
+                attachment_storage.delete(key)
+            db.commit()
+        except Exception:
+            # Best-effort cleanup; a leftover blob is harmless.
+            db.rollback()
+            logger.warning("Could not delete attachment blob %s", key, exc_info=True)
+
+
 @router.get("/threads/{thread_id}/judith/tasks", response_model=list[schemas.InternalChatTaskOut])
 def list_judith_tasks(
     request: Request,
@@ -4946,6 +5596,43 @@ def delete_judith_task(
     return {"ok": True}
 
 
+@router.get("/judith/queue-stats")
+def judith_queue_stats(
+    request: Request,
+    user_id: str = Query(...),
+    user_role: str = Query("client"),
+):
+    auth_user = _resolve_verified_actor(request, user_id=user_id, role=user_role)
+    if not auth_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only platform admins can view Judith queue stats.")
+    return judith_queue.stats()
+
+
+@router.get("/judith/reminders/stats")
+def judith_reminder_stats(
+    request: Request,
+    user_id: str = Query(...),
+    user_role: str = Query("client"),
+    db: Session = Depends(get_db),
+):
+    auth_user = _resolve_verified_actor(request, user_id=user_id, role=user_role)
+    if not auth_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only platform admins can view reminder stats.")
+    oldest_due = (
+        db.query(func.min(models.InternalChatTaskReminder.remind_at))
+        .filter(
+            models.InternalChatTaskReminder.sent_at.is_(None),
+            models.InternalChatTaskReminder.remind_at <= datetime.utcnow(),
+        )
+        .scalar()
+    )
+    return {
+        **reminder_stats.snapshot(),
+        # Backlog lag: how overdue the oldest unsent reminder is right now.
+        "backlog_lag_seconds": round((datetime.utcnow() - oldest_due).total_seconds(), 2) if oldest_due else 0.0,
+    }
+
+
 @router.get("/judith/reminders", response_model=list[schemas.InternalChatTaskOut])
 def list_judith_reminders(
     request: Request,
@@ -4960,8 +5647,10 @@ def list_judith_reminders(
     now_utc = datetime.utcnow()
     horizon = now_utc + timedelta(hours=48)
 
+    _deactivate_conflicting_telegram_links(db)
     _dispatch_due_reminders(db, workspace_id=workspace_id, for_user_id=None if super_admin else user_id)
     db.commit()
+    _flush_reminder_notifications(db)
 
     query = (
         db.query(models.InternalChatTask)
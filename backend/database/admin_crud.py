@@ -1,15 +1,18 @@
+from collections import Counter
 from datetime import datetime, timedelta
 import hashlib
+import heapq
 import html as html_lib
 import json
+import math
 import os
 import re
 import secrets
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 import httpx
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from sqlalchemy import func, case, insert
 
 from database.models import (
     ClientOrg,
@@ -34,8 +37,10 @@ from database.models import (
     AITrainerProfile,
     AITrainerSource,
     AITrainerChunk,
+    AITrainerPosting,
 )
 from database import admin_schemas
+from services.semantic_index import SEMANTIC_SEARCH_ENABLED, semantic_index
 
 _PAYMENT_METHODS_SEEDED = False
 
@@ -1596,6 +1601,64 @@ def _tokenize_text(value: str) -> list[str]:
     return [token for token in re.split(r"\W+", (value or "").lower()) if len(token) > 2]
 
 
+_BM25_K1 = 1.2
+_RRF_K = 60
+_BM25_B = 0.75
+_AI_TRAINER_TERM_MAX_CHARS = 64
+_AI_TRAINER_MAX_QUERY_TERMS = 32
+
+
+def _index_terms(text: str) -> Counter:
+    return Counter(
+        token[:_AI_TRAINER_TERM_MAX_CHARS] for token in _tokenize_text(text) if token not in _STOPWORDS
+    )
+
+
+def _posting_rows(chunk_id: int, source_id: int, section: str, terms: dict[str, int]) -> list[dict]:
+    return [
+        {
+            "term": term,
+            "chunk_id": chunk_id,
+            "source_id": source_id,
+            "section": section,
+            "term_frequency": frequency,
+        }
+        for term, frequency in terms.items()
+    ]
+
+
+def _index_ai_trainer_chunks(db: Session, chunks: list[AITrainerChunk]) -> None:
+    """Write postings for flushed chunks and record each chunk's indexed length."""
+    postings: list[dict] = []
+    for chunk in chunks:
+        terms = _index_terms(chunk.content)
+        chunk.term_count = sum(terms.values())
+        postings.extend(_posting_rows(chunk.id, chunk.source_id, chunk.section, terms))
+    if postings:
+        db.execute(insert(AITrainerPosting.__table__), postings)
+
+
+def backfill_ai_trainer_index(db: Session, batch_size: int = 500) -> int:
+    """Index chunks stored before the inverted index existed; returns how many were indexed."""
+    indexed = 0
+    while True:
+        chunks = (
+            db.query(AITrainerChunk)
+            .filter(AITrainerChunk.term_count.is_(None))
+            .order_by(AITrainerChunk.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not chunks:
+            return indexed
+        db.query(AITrainerPosting).filter(
+            AITrainerPosting.chunk_id.in_([chunk.id for chunk in chunks])
+        ).delete(synchronize_session=False)
+        _index_ai_trainer_chunks(db, chunks)
+        db.commit()
+        indexed += len(chunks)
+
+
 def _normalize_section(section: str) -> str:
     normalized = (section or "").strip().lower()
     if normalized not in _AI_TRAINER_SECTIONS:
@@ -1721,13 +1784,8 @@ def _chunk_text(text: str, max_chars: int = 1200, overlap: int = 180) -> list[st
     return [chunk for chunk in chunks if chunk]
 
 
-def _extract_keywords(text: str, limit: int = 12) -> list[str]:
-    counts: dict[str, int] = {}
-    for token in _tokenize_text(text):
-        if token in _STOPWORDS:
-            continue
-        counts[token] = counts.get(token, 0) + 1
-    ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+def _extract_keywords(terms: dict[str, int], limit: int = 12) -> list[str]:
+    ordered = sorted(terms.items(), key=lambda item: (-item[1], item[0]))
     return [token for token, _ in ordered[:limit]]
 
 
@@ -1751,28 +1809,110 @@ def _mark_profile_trained(db: Session, section: str) -> None:
     profile.last_trained_at = datetime.now()
 
 
-def _rebuild_source_chunks(db: Session, source: AITrainerSource, text: str) -> AITrainerSource:
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def prepare_ai_trainer_chunks(text: str) -> list[dict]:
+    """Chunk text and compute each chunk's keywords and index terms in one tokenising pass."""
+    prepared: list[dict] = []
+    for chunk in _chunk_text(text):
+        terms = dict(_index_terms(chunk))
+        prepared.append(
+            {
+                "content": chunk,
+                "keywords": ",".join(_extract_keywords(terms)),
+                "token_estimate": _estimate_token_count(chunk),
+                "terms": terms,
+            }
+        )
+    return prepared
+
+
+def prepare_ai_trainer_document(
+    kind: str,
+    content: bytes | str,
+    file_name: str = "",
+    mime_type: str | None = None,
+) -> dict:
+    """
+    CPU-bound half of ingestion: extract text from a fetched page ("html") or an uploaded
+    file ("file") and chunk it. Arguments and result are plain data so the ingestion queue
+    can run it in a worker process.
+    """
+    title = ""
+    if kind == "html":
+        title_match = re.search(r"<title[^>]*>(.*?)</title>", content, flags=re.IGNORECASE | re.DOTALL)
+        if title_match:
+            title = re.sub(r"\s+", " ", html_lib.unescape(title_match.group(1))).strip()
+        text = _strip_html(content)
+        if len(text) < 80:
+            raise ValueError("Website fetched, but no readable text content was extracted.")
+    else:
+        text = _extract_text_from_file(content, file_name=file_name, mime_type=mime_type)
+    return {
+        "text": text,
+        "title": title,
+        "content_hash": _content_hash(text),
+        "chunks": prepare_ai_trainer_chunks(text),
+    }
+
+
+def _source_index_is_current(db: Session, source: AITrainerSource) -> bool:
+    indexed_chunks = (
+        db.query(func.count(AITrainerChunk.id))
+        .filter(AITrainerChunk.source_id == source.id, AITrainerChunk.term_count.isnot(None))
+        .scalar()
+    )
+    return bool(source.chunk_count) and indexed_chunks == source.chunk_count
+
+
+def _rebuild_source_chunks(
+    db: Session,
+    source: AITrainerSource,
+    text: str,
+    prepared_chunks: list[dict] | None = None,
+) -> AITrainerSource:
+    content_hash = _content_hash(text)
+    if source.content_hash == content_hash and _source_index_is_current(db, source):
+        # Unchanged content: the stored chunks and postings are already what a rebuild would write.
+        source.status = "ready"
+        source.error_message = None
+        return source
+
+    db.query(AITrainerPosting).filter(AITrainerPosting.source_id == source.id).delete(synchronize_session=False)
     db.query(AITrainerChunk).filter(AITrainerChunk.source_id == source.id).delete(synchronize_session=False)
 
-    chunks = _chunk_text(text)
+    chunks = prepared_chunks if prepared_chunks is not None else prepare_ai_trainer_chunks(text)
     source.chunk_count = len(chunks)
     source.word_count = _word_count(text)
     source.raw_text = text
     source.summary = _source_summary(text, source.title)
-    source.content_hash = hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
-
-    for idx, chunk in enumerate(chunks):
-        keywords = _extract_keywords(chunk)
-        db.add(
-            AITrainerChunk(
-                source_id=source.id,
-                section=source.section,
-                chunk_index=idx,
-                content=chunk,
-                keywords=",".join(keywords),
-                token_estimate=_estimate_token_count(chunk),
-            )
-        )
+    source.content_hash = content_hash
+
+    if chunks:
+        chunk_ids = db.scalars(
+            insert(AITrainerChunk).returning(AITrainerChunk.id, sort_by_parameter_order=True),
+            [
+                {
+                    "source_id": source.id,
+                    "section": source.section,
+                    "chunk_index": idx,
+                    "content": chunk["content"],
+                    "keywords": chunk["keywords"],
+                    "token_estimate": chunk["token_estimate"],
+                    "term_count": sum(chunk["terms"].values()),
+                }
+                for idx, chunk in enumerate(chunks)
+            ],
+        ).all()
+        postings = [
+            row
+            for chunk_id, chunk in zip(chunk_ids, chunks)
+            for row in _posting_rows(chunk_id, source.id, source.section, chunk["terms"])
+        ]
+        if postings:
+            db.execute(insert(AITrainerPosting.__table__), postings)
 
     source.status = "ready"
     source.error_message = None
@@ -1928,6 +2068,7 @@ def create_ai_trainer_source_from_text(
     db.flush()
     _rebuild_source_chunks(db, source, text)
     db.commit()
+    _sync_ai_trainer_semantic_index(db, section)
     db.refresh(source)
     return source
 
@@ -1936,54 +2077,20 @@ def create_ai_trainer_source_from_url(
     db: Session,
     data: admin_schemas.AITrainerSourceCreateURL,
 ) -> AITrainerSource:
+    """Register a website source as "queued"; `ingest_ai_trainer_source` fetches and indexes it."""
     section = _normalize_section(data.section)
     url = (data.url or "").strip()
     if not url.startswith("http://") and not url.startswith("https://"):
         raise ValueError("URL must start with http:// or https://")
 
-    title = (data.title or "").strip() or url
     source = AITrainerSource(
         section=section,
         source_type="url",
-        title=title,
+        title=(data.title or "").strip() or url,
         source_url=url,
-        status="processing",
+        status="queued",
     )
     db.add(source)
-    db.flush()
-
-    try:
-        with httpx.Client(timeout=15.0, follow_redirects=True) as client:
-            response = client.get(
-                url,
-                headers={"User-Agent": "Benela-AI-Trainer/1.0 (+https://benela.dev)"},
-            )
-            response.raise_for_status()
-            body = response.text
-    except Exception as exc:
-        source.status = "failed"
-        source.error_message = f"Could not fetch website: {exc}"
-        db.commit()
-        db.refresh(source)
-        return source
-
-    extracted_title = ""
-    title_match = re.search(r"<title[^>]*>(.*?)</title>", body, flags=re.IGNORECASE | re.DOTALL)
-    if title_match:
-        extracted_title = re.sub(r"\s+", " ", html_lib.unescape(title_match.group(1))).strip()
-
-    text = _strip_html(body)
-    if len(text) < 80:
-        source.status = "failed"
-        source.error_message = "Website fetched, but no readable text content was extracted."
-        db.commit()
-        db.refresh(source)
-        return source
-
-    if not data.title and extracted_title:
-        source.title = extracted_title[:255]
-    source.metadata_json = json.dumps({"source_url": str(response.url), "status_code": response.status_code})
-    _rebuild_source_chunks(db, source, text)
     db.commit()
     db.refresh(source)
     return source
@@ -1994,33 +2101,135 @@ def create_ai_trainer_source_from_file(
     section: str,
     file_name: str,
     mime_type: str | None,
-    payload: bytes,
     title: str | None = None,
 ) -> AITrainerSource:
-    normalized_section = _normalize_section(section)
+    """Register an uploaded file as "queued"; `ingest_ai_trainer_source` extracts and indexes it."""
     source = AITrainerSource(
-        section=normalized_section,
+        section=_normalize_section(section),
         source_type="file",
         title=(title or "").strip() or file_name,
         file_name=file_name,
         mime_type=(mime_type or "").strip() or None,
-        status="processing",
+        status="queued",
     )
     db.add(source)
-    db.flush()
+    db.commit()
+    db.refresh(source)
+    return source
+
+
+def _fetch_ai_trainer_url(url: str) -> httpx.Response:
+    with httpx.Client(timeout=15.0, follow_redirects=True) as client:
+        response = client.get(
+            url,
+            headers={"User-Agent": "Benela-AI-Trainer/1.0 (+https://benela.dev)"},
+        )
+        response.raise_for_status()
+        return response
+
+
+def ingest_ai_trainer_source(
+    db: Session,
+    source_id: int,
+    payload: bytes | None = None,
+    prepare: Callable[..., dict] = prepare_ai_trainer_document,
+) -> AITrainerSource | None:
+    """
+    Fetch or extract a queued source, chunk it and index it: queued -> processing -> ready|failed.
+
+    `prepare` runs the CPU-bound extraction; the ingestion queue passes one that hands it to
+    a worker process. Returns None when the source was deleted before its turn came.
+    """
+    source = db.query(AITrainerSource).filter(AITrainerSource.id == source_id).first()
+    if not source:
+        return None
+    source.status = "processing"
+    source.error_message = None
+    db.commit()
 
     try:
-        text = _extract_text_from_file(payload, file_name=file_name, mime_type=mime_type)
-        _rebuild_source_chunks(db, source, text)
+        if source.source_type == "url":
+            try:
+                response = _fetch_ai_trainer_url(source.source_url)
+            except Exception as exc:
+                raise ValueError(f"Could not fetch website: {exc}") from exc
+            prepared = prepare("html", response.text)
+            if source.title == source.source_url and prepared["title"]:
+                source.title = prepared["title"][:255]
+            source.metadata_json = json.dumps({"source_url": str(response.url), "status_code": response.status_code})
+        else:
+            if not payload:
+                raise ValueError("Uploaded file is no longer available; upload it again.")
+            prepared = prepare("file", payload, source.file_name or "", source.mime_type)
+        _rebuild_source_chunks(db, source, prepared["text"], prepared_chunks=prepared["chunks"])
     except Exception as exc:
+        db.rollback()
+        source = db.query(AITrainerSource).filter(AITrainerSource.id == source_id).first()
+        if not source:
+            return None
         source.status = "failed"
         source.error_message = str(exc)
 
     db.commit()
+    _sync_ai_trainer_semantic_index(db, source.section)
     db.refresh(source)
     return source
 
 
+def touch_ai_trainer_sources(db: Session, source_ids: list[int]) -> None:
+    """Heartbeat for sources this process still holds, so sweeps on any replica leave them alone."""
+    if not source_ids:
+        return
+    db.query(AITrainerSource).filter(
+        AITrainerSource.id.in_(source_ids),
+        AITrainerSource.status.in_(("queued", "processing")),
+    ).update({AITrainerSource.updated_at: func.now()}, synchronize_session=False)
+    db.commit()
+
+
+def fail_interrupted_ai_trainer_sources(db: Session, older_than_seconds: float) -> list[int]:
+    """
+    Settle sources left queued or processing by a process that stopped.
+
+    Uploaded files only lived in the old process's memory, so those sources fail; website
+    sources are returned so the caller can queue them again. Live ingestion keeps its rows
+    fresh through `touch_ai_trainer_sources`, so only sources without a recent heartbeat
+    are taken, each with a conditional update so two sweeping replicas never both claim one.
+    """
+    cutoff = db.query(func.now()).scalar() - timedelta(seconds=older_than_seconds)
+    stuck = (
+        db.query(AITrainerSource.id, AITrainerSource.source_type)
+        .filter(
+            AITrainerSource.status.in_(("queued", "processing")),
+            AITrainerSource.updated_at < cutoff,
+        )
+        .all()
+    )
+    requeue: list[int] = []
+    for source_id, source_type in stuck:
+        if source_type == "url":
+            changes = {AITrainerSource.status: "queued"}
+        else:
+            changes = {
+                AITrainerSource.status: "failed",
+                AITrainerSource.error_message: "Processing was interrupted by a restart; upload the file again.",
+            }
+        claimed = (
+            db.query(AITrainerSource)
+            .filter(
+                AITrainerSource.id == source_id,
+                AITrainerSource.status.in_(("queued", "processing")),
+                AITrainerSource.updated_at < cutoff,
+            )
+            .update({**changes, AITrainerSource.updated_at: func.now()}, synchronize_session=False)
+        )
+        if claimed and source_type == "url":
+            requeue.append(source_id)
+    if stuck:
+        db.commit()
+    return requeue
+
+
 def reindex_ai_trainer_source(db: Session, source_id: int) -> AITrainerSource | None:
     source = db.query(AITrainerSource).filter(AITrainerSource.id == source_id).first()
     if not source:
@@ -2034,6 +2243,7 @@ def reindex_ai_trainer_source(db: Session, source_id: int) -> AITrainerSource |
 
     _rebuild_source_chunks(db, source, source.raw_text)
     db.commit()
+    _sync_ai_trainer_semantic_index(db, source.section)
     db.refresh(source)
     return source
 
@@ -2043,9 +2253,11 @@ def delete_ai_trainer_source(db: Session, source_id: int) -> bool:
     if not source:
         return False
     section = source.section
+    db.query(AITrainerPosting).filter(AITrainerPosting.source_id == source.id).delete(synchronize_session=False)
     db.delete(source)
     _mark_profile_trained(db, section)
     db.commit()
+    semantic_index.mark_stale(_ai_trainer_semantic_namespace(section))
     return True
 
 
@@ -2060,18 +2272,91 @@ def get_ai_trainer_runtime_profile(db: Session, section: str) -> AITrainerProfil
     )
 
 
-def _score_chunk_relevance(content: str, query_tokens: list[str], full_query: str) -> int:
-    if not content:
-        return 0
-    content_lower = content.lower()
-    score = 0
-    if full_query and full_query in content_lower:
-        score += 10
-    for token in query_tokens:
-        hits = content_lower.count(token)
-        if hits:
-            score += min(5, hits)
-    return score
+def _rank_ai_trainer_chunks(db: Session, section: str, query_terms: list[str], limit: int) -> list[tuple[float, int]]:
+    """
+    BM25 over the postings of the query terms only, so the cost follows how common the
+    query terms are rather than the size of the section's corpus.
+    """
+    terms = list(dict.fromkeys(query_terms))[:_AI_TRAINER_MAX_QUERY_TERMS]
+    if not terms:
+        return []
+
+    doc_count, avg_length = (
+        db.query(func.count(AITrainerChunk.id), func.avg(AITrainerChunk.term_count))
+        .join(AITrainerSource, AITrainerSource.id == AITrainerChunk.source_id)
+        .filter(
+            AITrainerChunk.section == section,
+            AITrainerChunk.term_count.isnot(None),
+            AITrainerSource.status == "ready",
+        )
+        .one()
+    )
+    if not doc_count:
+        return []
+    avg_length = float(avg_length or 1.0) or 1.0
+
+    postings = (
+        db.query(
+            AITrainerPosting.term,
+            AITrainerPosting.chunk_id,
+            AITrainerPosting.term_frequency,
+            AITrainerChunk.term_count,
+        )
+        .join(AITrainerChunk, AITrainerChunk.id == AITrainerPosting.chunk_id)
+        .join(AITrainerSource, AITrainerSource.id == AITrainerPosting.source_id)
+        .filter(
+            AITrainerPosting.section == section,
+            AITrainerPosting.term.in_(terms),
+            AITrainerSource.status == "ready",
+        )
+        .all()
+    )
+    document_frequency = Counter(term for term, _, _, _ in postings)
+    scores: dict[int, float] = {}
+    for term, chunk_id, frequency, length in postings:
+        df = document_frequency[term]
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        norm = frequency + _BM25_K1 * (1 - _BM25_B + _BM25_B * (length or 0) / avg_length)
+        scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (_BM25_K1 + 1) / norm
+    return heapq.nlargest(limit, ((score, chunk_id) for chunk_id, score in scores.items()))
+
+
+def _ai_trainer_semantic_namespace(section: str) -> str:
+    return f"ai_trainer:{section}"
+
+
+def _ai_trainer_semantic_loaders(
+    db: Session, section: str
+) -> tuple[Callable[[], dict[int, int]], Callable[[list[int]], dict[int, str]]]:
+    # Chunks are never edited in place (reindexing replaces them); the creation time only
+    # guards against a reused id.
+    def versions() -> dict[int, int]:
+        rows = (
+            db.query(AITrainerChunk.id, AITrainerChunk.created_at)
+            .join(AITrainerSource, AITrainerSource.id == AITrainerChunk.source_id)
+            .filter(AITrainerChunk.section == section, AITrainerSource.status == "ready")
+        )
+        return {chunk_id: int(created_at.timestamp()) if created_at else 0 for chunk_id, created_at in rows}
+
+    def texts(ids: list[int]) -> dict[int, str]:
+        return dict(db.query(AITrainerChunk.id, AITrainerChunk.content).filter(AITrainerChunk.id.in_(ids)).all())
+
+    return versions, texts
+
+
+def _sync_ai_trainer_semantic_index(db: Session, section: str) -> None:
+    """Embed a section's new chunks on the write path so agent requests only have to search."""
+    semantic_index.mark_stale(_ai_trainer_semantic_namespace(section))
+    if SEMANTIC_SEARCH_ENABLED:
+        versions, texts = _ai_trainer_semantic_loaders(db, section)
+        semantic_index.sync(_ai_trainer_semantic_namespace(section), versions, texts)
+
+
+def _semantic_ai_trainer_chunks(db: Session, section: str, query: str, limit: int) -> list[tuple[int, float]]:
+    if not SEMANTIC_SEARCH_ENABLED:
+        return []
+    versions, texts = _ai_trainer_semantic_loaders(db, section)
+    return semantic_index.search(_ai_trainer_semantic_namespace(section), query, limit, versions=versions, texts=texts)
 
 
 def get_ai_trainer_training_context(
@@ -2087,26 +2372,40 @@ def get_ai_trainer_training_context(
 
     query_tokens = [token for token in _tokenize_text(query) if token not in _STOPWORDS]
     query_phrase = " ".join(query_tokens).strip()
-
-    rows = (
-        db.query(
-            AITrainerChunk.content,
-            AITrainerChunk.created_at,
-            AITrainerSource.title,
-            AITrainerSource.source_url,
-        )
-        .join(AITrainerSource, AITrainerSource.id == AITrainerChunk.source_id)
-        .filter(
-            AITrainerChunk.section == normalized_section,
-            AITrainerSource.status == "ready",
+    query_terms = [token[:_AI_TRAINER_TERM_MAX_CHARS] for token in query_tokens]
+
+    # Rank on the lexical and vector indexes, then load bodies only for a short list of
+    # candidates. Reciprocal rank fusion merges the two lists without calibrating scores.
+    candidate_limit = max_chunks * 3
+    lexical_hits = [chunk_id for _, chunk_id in _rank_ai_trainer_chunks(db, normalized_section, query_terms, candidate_limit)]
+    semantic_hits = [chunk_id for chunk_id, _ in _semantic_ai_trainer_chunks(db, normalized_section, query, candidate_limit)]
+    fused_scores: dict[int, float] = {}
+    for hits in (lexical_hits, semantic_hits):
+        for rank, chunk_id in enumerate(hits):
+            fused_scores[chunk_id] = fused_scores.get(chunk_id, 0.0) + 1.0 / (_RRF_K + rank + 1)
+
+    ranked: list[tuple[float, str, str, str | None, datetime | None]] = []
+    if fused_scores:
+        rows = (
+            db.query(
+                AITrainerChunk.id,
+                AITrainerChunk.content,
+                AITrainerChunk.created_at,
+                AITrainerSource.title,
+                AITrainerSource.source_url,
+            )
+            .join(AITrainerSource, AITrainerSource.id == AITrainerChunk.source_id)
+            .filter(
+                AITrainerChunk.id.in_(list(fused_scores)),
+                AITrainerSource.status == "ready",
+            )
+            .all()
         )
-        .all()
-    )
-
-    ranked: list[tuple[int, str, str, str | None, datetime | None]] = []
-    for content, created_at, title, source_url in rows:
-        score = _score_chunk_relevance(content, query_tokens, query_phrase)
-        if score > 0:
+        for chunk_id, content, created_at, title, source_url in rows:
+            score = fused_scores[chunk_id]
+            # An exact phrase match outranks any chunk that only shares separate terms.
+            if len(query_tokens) > 1 and query_phrase in (content or "").lower():
+                score += 1.0
             ranked.append((score, content, title, source_url, created_at))
 
     if not ranked:
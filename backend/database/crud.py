@@ -1,6 +1,10 @@
 from datetime import datetime, timedelta
+import hashlib
+import hmac
+import os
 import re
 from datetime import time as time_value
+from typing import Callable
 
 import bcrypt
 from sqlalchemy.orm import Session, selectinload
@@ -65,6 +69,7 @@ from database.models import (
     ChatAttachment,
 )
 from database import schemas
+from services.semantic_index import SEMANTIC_SEARCH_ENABLED, semantic_index
 
 
 def _month_bounds(now: datetime):
@@ -1324,6 +1329,27 @@ def delete_invoice(db: Session, id: int, company_id: int | None = None):
     return True
 
 # ── HR ────────────────────────────────────────────────
+EMPLOYEE_PIN_LOOKUP_SECRET = os.getenv("ATTENDANCE_PIN_LOOKUP_SECRET", "").strip()
+if not EMPLOYEE_PIN_LOOKUP_SECRET:
+    if os.getenv("APP_ENV", "development").strip().lower() not in {"development", "dev", "local", "test"}:
+        raise RuntimeError("ATTENDANCE_PIN_LOOKUP_SECRET must be set outside development; kiosk PIN digests are keyed with it.")
+    EMPLOYEE_PIN_LOOKUP_SECRET = "dev-attendance-pin-lookup-secret"
+# Keys earlier digests may have been written with: previous lookup secrets (comma-separated)
+# and the secrets the lookup key used to fall back to. Matches are re-digested with the current key.
+EMPLOYEE_PIN_LOOKUP_RETIRED_SECRETS = tuple(
+    dict.fromkeys(
+        value
+        for value in (
+            *(item.strip() for item in os.getenv("ATTENDANCE_PIN_LOOKUP_PREVIOUS_SECRETS", "").split(",")),
+            (os.getenv("ATTENDANCE_QR_SECRET") or "").strip(),
+            (os.getenv("SUPABASE_JWT_SECRET") or "").strip(),
+            "dev-attendance-secret",
+        )
+        if value and value != EMPLOYEE_PIN_LOOKUP_SECRET
+    )
+)
+
+
 def _hash_employee_pin(pin: str | None) -> str | None:
     normalized = (pin or "").strip()
     if not normalized:
@@ -1333,6 +1359,33 @@ def _hash_employee_pin(pin: str | None) -> str | None:
     return bcrypt.hashpw(normalized.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
 
 
+def employee_pin_lookup_digest(
+    company_id: int | None,
+    pin: str | None,
+    secret: str | None = None,
+) -> str | None:
+    """
+    Deterministic keyed digest of (company, PIN) stored next to the bcrypt hash so
+    kiosk PIN logins are a single indexed lookup instead of one bcrypt check per employee.
+    """
+    normalized = (pin or "").strip()
+    if company_id is None or not normalized or normalized.startswith("$2"):
+        return None
+    message = f"{int(company_id)}:{normalized}".encode("utf-8")
+    key = secret or EMPLOYEE_PIN_LOOKUP_SECRET
+    return hmac.new(key.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def _ensure_employee_pin_available(db: Session, pin_lookup: str | None, employee_id: int | None = None) -> None:
+    if not pin_lookup:
+        return
+    query = db.query(Employee.id).filter(Employee.employee_pin_lookup == pin_lookup)
+    if employee_id is not None:
+        query = query.filter(Employee.id != employee_id)
+    if query.first():
+        raise ValueError("This PIN is already in use by another employee. Choose a different PIN.")
+
+
 def _normalize_work_days(days: list[int] | None) -> list[int]:
     values = sorted({int(item) for item in (days or [1, 2, 3, 4, 5]) if 1 <= int(item) <= 7})
     return values or [1, 2, 3, 4, 5]
@@ -1354,6 +1407,8 @@ def get_employee(db: Session, id: int, company_id: int | None = None):
 def create_employee(db: Session, data: schemas.EmployeeCreate, company_id: int | None = None):
     payload = data.model_dump()
     payload["company_id"] = company_id
+    payload["employee_pin_lookup"] = employee_pin_lookup_digest(company_id, payload.get("employee_pin"))
+    _ensure_employee_pin_available(db, payload["employee_pin_lookup"])
     payload["employee_pin"] = _hash_employee_pin(payload.get("employee_pin"))
     payload["work_days"] = _normalize_work_days(payload.get("work_days"))
     payload["shift_start"] = payload.get("shift_start") or time_value(9, 0)
@@ -1370,7 +1425,10 @@ def update_employee(db: Session, id: int, data: schemas.EmployeeUpdate, company_
     if not emp: return None
     for k, v in data.model_dump(exclude_unset=True).items():
         if k == "employee_pin":
+            pin_lookup = employee_pin_lookup_digest(emp.company_id, v)
+            _ensure_employee_pin_available(db, pin_lookup, emp.id)
             setattr(emp, k, _hash_employee_pin(v))
+            emp.employee_pin_lookup = pin_lookup
             continue
         if k == "work_days" and v is not None:
             setattr(emp, k, _normalize_work_days(v))
@@ -3050,6 +3108,7 @@ def create_legal_document(db: Session, data: schemas.LegalDocumentCreate):
     db.add(row)
     db.commit()
     db.refresh(row)
+    _sync_legal_semantic_index(db)
     return row
 
 
@@ -3061,6 +3120,7 @@ def update_legal_document(db: Session, id: int, data: schemas.LegalDocumentUpdat
         setattr(row, key, value)
     db.commit()
     db.refresh(row)
+    _sync_legal_semantic_index(db)
     return row
 
 
@@ -3070,6 +3130,7 @@ def delete_legal_document(db: Session, id: int):
         return False
     db.delete(row)
     db.commit()
+    _sync_legal_semantic_index(db)
     return True
 
 
@@ -3271,6 +3332,45 @@ def get_legal_summary(db: Session):
     }
 
 
+LEGAL_SEMANTIC_NAMESPACE = "legal_documents"
+_LEGAL_SEMANTIC_WEIGHT = 4.0
+
+
+def _legal_semantic_loaders(
+    db: Session,
+) -> tuple[Callable[[], dict[int, int]], Callable[[list[int]], dict[int, str]]]:
+    def versions() -> dict[int, int]:
+        rows = db.query(LegalDocument.id, LegalDocument.updated_at).all()
+        return {row_id: int(updated_at.timestamp()) if updated_at else 0 for row_id, updated_at in rows}
+
+    def texts(ids: list[int]) -> dict[int, str]:
+        rows = db.query(LegalDocument).filter(LegalDocument.id.in_(ids)).all()
+        return {
+            row.id: "\n".join(
+                part for part in (row.title, row.document_number, row.summary, row.tags, row.full_text) if part
+            )
+            for row in rows
+        }
+
+    return versions, texts
+
+
+def _sync_legal_semantic_index(db: Session) -> None:
+    """Embed written documents on the write path so searches do not have to."""
+    semantic_index.mark_stale(LEGAL_SEMANTIC_NAMESPACE)
+    if SEMANTIC_SEARCH_ENABLED:
+        versions, texts = _legal_semantic_loaders(db)
+        semantic_index.sync(LEGAL_SEMANTIC_NAMESPACE, versions, texts)
+
+
+def _legal_semantic_hits(db: Session, query: str, limit: int) -> dict[int, float]:
+    """Paraphrase matches from the local vector index; empty when semantic search is off."""
+    if not SEMANTIC_SEARCH_ENABLED:
+        return {}
+    versions, texts = _legal_semantic_loaders(db)
+    return dict(semantic_index.search(LEGAL_SEMANTIC_NAMESPACE, query, limit, versions=versions, texts=texts))
+
+
 def search_legal_documents(
     db: Session,
     query: str,
@@ -3288,7 +3388,17 @@ def search_legal_documents(
     phrase = cleaned.lower()
     like = f"%{cleaned}%"
 
-    db_query = db.query(LegalDocument).filter(
+    filtered_query = db.query(LegalDocument)
+    if jurisdiction:
+        filtered_query = filtered_query.filter(LegalDocument.jurisdiction.ilike(f"%{jurisdiction.strip()}%"))
+    if category:
+        filtered_query = filtered_query.filter(LegalDocument.category.ilike(f"%{category.strip()}%"))
+    if source:
+        try:
+            filtered_query = filtered_query.filter(LegalDocument.source == LegalDocumentSource(source.strip().lower()))
+        except ValueError:
+            pass
+    db_query = filtered_query.filter(
         or_(
             LegalDocument.title.ilike(like),
             LegalDocument.document_number.ilike(like),
@@ -3297,22 +3407,21 @@ def search_legal_documents(
             LegalDocument.tags.ilike(like),
         )
     )
-    if jurisdiction:
-        db_query = db_query.filter(LegalDocument.jurisdiction.ilike(f"%{jurisdiction.strip()}%"))
-    if category:
-        db_query = db_query.filter(LegalDocument.category.ilike(f"%{category.strip()}%"))
-    if source:
-        try:
-            db_query = db_query.filter(LegalDocument.source == LegalDocumentSource(source.strip().lower()))
-        except ValueError:
-            pass
 
+    candidate_limit = max(limit * 4, 40)
     candidates = (
         db_query.order_by(LegalDocument.updated_at.desc(), LegalDocument.id.desc())
-        .limit(max(limit * 4, 40))
+        .limit(candidate_limit)
         .all()
     )
 
+    # Hybrid ranking: documents the vector index finds join the lexical candidates.
+    similarities = _legal_semantic_hits(db, cleaned, candidate_limit)
+    seen_ids = {row.id for row in candidates}
+    extra_ids = [row_id for row_id in similarities if row_id not in seen_ids]
+    if extra_ids:
+        candidates.extend(filtered_query.filter(LegalDocument.id.in_(extra_ids)).all())
+
     ranked: list[dict] = []
     for row in candidates:
         title = (row.title or "").lower()
@@ -3340,6 +3449,8 @@ def search_legal_documents(
             if token in full_text:
                 score += 0.35
 
+        score += _LEGAL_SEMANTIC_WEIGHT * similarities.get(row.id, 0.0)
+
         if status_value == LegalDocumentStatus.active.value:
             score += 0.3
         if source_value == LegalDocumentSource.lex_uz.value:
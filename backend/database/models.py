@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Enum, Boolean, ForeignKey, UniqueConstraint, JSON, Time
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Enum, Boolean, ForeignKey, Index, UniqueConstraint, JSON, Time
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.connection import Base
@@ -266,6 +266,7 @@ class Employee(Base):
     role         = Column(String(100), nullable=False)
     salary       = Column(Float, nullable=True)
     employee_pin = Column(String(255), nullable=True)
+    employee_pin_lookup = Column(String(64), nullable=True, unique=True, index=True)
     shift_start  = Column(Time, nullable=True)
     shift_end    = Column(Time, nullable=True)
     late_grace_minutes = Column(Integer, nullable=False, default=15)
@@ -1088,10 +1089,25 @@ class AITrainerChunk(Base):
     content       = Column(Text, nullable=False)
     keywords      = Column(String(1000), nullable=True)
     token_estimate = Column(Integer, nullable=False, default=0)
+    term_count    = Column(Integer, nullable=True)  # indexed terms, the BM25 document length
     created_at    = Column(DateTime, default=func.now())
     source        = relationship("AITrainerSource", back_populates="chunks")
 
 
+class AITrainerPosting(Base):
+    """Inverted index entry: how often `term` occurs in one trainer chunk."""
+    __tablename__ = "ai_trainer_postings"
+    __table_args__ = (
+        Index("ix_ai_trainer_postings_section_term", "section", "term"),
+    )
+
+    term           = Column(String(64), primary_key=True)
+    chunk_id       = Column(Integer, ForeignKey("ai_trainer_chunks.id", ondelete="CASCADE"), primary_key=True, index=True)
+    source_id      = Column(Integer, ForeignKey("ai_trainer_sources.id", ondelete="CASCADE"), nullable=False, index=True)
+    section        = Column(String(50), nullable=False)
+    term_frequency = Column(Integer, nullable=False, default=1)
+
+
 # ── Chat Models ───────────────────────────────────────
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
@@ -1133,6 +1149,11 @@ class InternalChatThread(Base):
     scope = Column(String(30), nullable=False, default="workspace_owner", index=True)  # workspace_owner | direct
     title = Column(String(255), nullable=False)
     created_by_user_id = Column(String(120), nullable=False, index=True)
+    # Denormalized summary of the newest message, kept in step by integrations.internal_chat.thread_summary.
+    last_message_id = Column(Integer, nullable=True)
+    last_message_preview = Column(String(160), nullable=True)
+    last_sender = Column(String(120), nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
 
@@ -1154,6 +1175,9 @@ class InternalChatThread(Base):
 
 class InternalChatParticipant(Base):
     __tablename__ = "internal_chat_participants"
+    __table_args__ = (
+        Index("ix_internal_chat_participants_user_id_thread_updated_at", "user_id", "thread_updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     thread_id = Column(
@@ -1168,12 +1192,18 @@ class InternalChatParticipant(Base):
     role = Column(String(40), nullable=False, default="client")  # client | employee | team_member | super_admin
     joined_at = Column(DateTime, default=func.now())
     last_read_at = Column(DateTime, nullable=True)
+    last_read_message_id = Column(Integer, nullable=True)
+    unread_count = Column(Integer, nullable=False, default=0, server_default="0")
+    thread_updated_at = Column(DateTime, nullable=True)  # copy of the thread's updated_at for the per-user list index
 
     thread = relationship("InternalChatThread", back_populates="participants")
 
 
 class InternalChatMessage(Base):
     __tablename__ = "internal_chat_messages"
+    __table_args__ = (
+        Index("ix_internal_chat_messages_thread_id_id", "thread_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     thread_id = Column(
@@ -1218,7 +1248,10 @@ class InternalChatAttachment(Base):
     file_name = Column(String(255), nullable=False)
     mime_type = Column(String(120), nullable=True)
     size_bytes = Column(Integer, nullable=False, default=0)
-    storage_key = Column(String(600), nullable=False)
+    storage_key = Column(String(600), nullable=False, index=True)
+    content_sha256 = Column(String(64), nullable=True, index=True)
+    transcription_status = Column(String(20), nullable=True)
+    transcript = Column(Text, nullable=True)
     created_at = Column(DateTime, default=func.now(), index=True)
 
     message = relationship("InternalChatMessage", back_populates="attachments")
@@ -1326,6 +1359,31 @@ class InternalChatZoomLink(Base):
     thread = relationship("InternalChatThread")
 
 
+class InternalChatBlob(Base):
+    """
+    One row per content-addressed attachment blob. Uploads that store or reuse a blob and
+    releases that delete it lock this row, so their reference checks agree across replicas.
+    """
+
+    __tablename__ = "internal_chat_blobs"
+
+    storage_key = Column(String(600), primary_key=True)
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+
+
+class InternalChatStateEntry(Base):
+    """Shared key/value rows for cross-replica Telegram state: pending actions, poll offset, leases."""
+
+    __tablename__ = "internal_chat_state"
+
+    key = Column(String(200), primary_key=True)
+    value = Column(JSON, nullable=True)
+    holder = Column(String(120), nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
 # ── Marketplace Models ────────────────────────────────
 class PluginCategory(str, enum.Enum):
     finance = "finance"
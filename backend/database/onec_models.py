@@ -24,6 +24,8 @@ class OneCImportJob(Base):
     records_skipped = Column(Integer, nullable=False, default=0)
     records_failed = Column(Integer, nullable=False, default=0)
     anomaly_count = Column(Integer, nullable=False, default=0)
+    # Totals over the job's counted records, see integrations.onec.summary.
+    ai_summary = Column(JSON, nullable=True)
     error_message = Column(Text, nullable=True)
     period_start = Column(Date, nullable=True)
     period_end = Column(Date, nullable=True)
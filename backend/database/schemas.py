@@ -1349,6 +1349,7 @@ class InternalChatAttachmentOut(BaseModel):
     file_name: str
     mime_type: Optional[str]
     size_bytes: int
+    transcription_status: Optional[str] = None
     created_at: datetime
     download_url: str
 
@@ -1381,8 +1382,11 @@ class InternalChatThreadOut(BaseModel):
     scope: str
     title: str
     participants: list[InternalChatParticipantOut] = Field(default_factory=list)
+    last_message_id: Optional[int] = None
     last_message_preview: Optional[str] = None
+    last_sender: Optional[str] = None
     last_message_at: Optional[datetime] = None
+    unread_count: int = 0
     created_at: datetime
     updated_at: datetime
 
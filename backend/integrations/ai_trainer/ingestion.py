@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time as monotonic_clock
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from database import admin_crud
+from database.connection import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+AI_TRAINER_INGEST_WORKERS = max(1, int(os.getenv("AI_TRAINER_INGEST_WORKERS", "2")))
+# 0 extracts in the ingest thread instead of a separate process.
+AI_TRAINER_EXTRACT_PROCESSES = max(0, int(os.getenv("AI_TRAINER_EXTRACT_PROCESSES", "2")))
+AI_TRAINER_INGEST_MAX_PENDING = max(1, int(os.getenv("AI_TRAINER_INGEST_MAX_PENDING", "100")))
+# Sources without a heartbeat for this long belong to a stopped process and are reclaimed.
+AI_TRAINER_INGEST_STALE_SECONDS = max(30.0, float(os.getenv("AI_TRAINER_INGEST_STALE_SECONDS", "300")))
+
+
+class AITrainerIngestionQueue:
+    """
+    Background ingestion for website and file sources of the AI trainer.
+
+    The admin request only registers a "queued" source. Ingest threads fetch the page and
+    write chunks; text extraction and chunking, the CPU-heavy part for large PDFs, run in a
+    process pool so they neither hold the GIL against request threads nor block each
+    other. Uploaded bytes are held in memory until their job runs, hence the bounded backlog.
+
+    While running, the sweeper heartbeats the sources this process holds and reclaims those
+    whose owner stopped, on this replica or any other.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        workers: int = AI_TRAINER_INGEST_WORKERS,
+        processes: int = AI_TRAINER_EXTRACT_PROCESSES,
+        max_pending: int = AI_TRAINER_INGEST_MAX_PENDING,
+    ):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.processes = processes
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: Executor | None = None
+        self._pending = 0
+        self._active: set[int] = set()
+        self._sweeper: threading.Thread | None = None
+        self._sweeper_stop = threading.Event()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "total_run_ms": 0.0}
+
+    def _prepare(self, *args: Any) -> dict:
+        with self._lock:
+            if self._processes is None and self.processes:
+                # "spawn": forking a process that runs server and DB pool threads is unsafe.
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+                )
+            pool = self._processes
+        if pool is None:
+            return admin_crud.prepare_ai_trainer_document(*args)
+        return pool.submit(admin_crud.prepare_ai_trainer_document, *args).result()
+
+    def submit(self, source_id: int, payload: bytes | None = None) -> bool:
+        """Queue a source; False when the backlog is full and the caller should ingest it inline."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                return False
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ai-trainer-ingest")
+            self._pending += 1
+            self._active.add(source_id)
+            self._stats["submitted"] += 1
+            self._threads.submit(self._run, source_id, payload)
+        return True
+
+    def _run(self, source_id: int, payload: bytes | None) -> None:
+        started = monotonic_clock.monotonic()
+        outcome = "failed"
+        db = self.session_factory()
+        try:
+            source = admin_crud.ingest_ai_trainer_source(db, source_id, payload=payload, prepare=self._prepare)
+            if source is not None and source.status == "ready":
+                outcome = "completed"
+            elif source is not None:
+                logger.warning("AI trainer source %s failed to ingest: %s", source_id, source.error_message)
+        except Exception:
+            logger.exception("AI trainer ingestion crashed for source=%s", source_id)
+        finally:
+            db.close()
+            run_ms = (monotonic_clock.monotonic() - started) * 1000
+            with self._lock:
+                self._pending -= 1
+                self._active.discard(source_id)
+                self._stats[outcome] += 1
+                self._stats["total_run_ms"] += run_ms
+            logger.info("AI trainer ingestion source=%s %s run_ms=%.0f", source_id, outcome, run_ms)
+
+    def recover(self, stale_seconds: float = AI_TRAINER_INGEST_STALE_SECONDS) -> int:
+        """Heartbeat this process's sources and queue orphaned websites again; returns how many."""
+        with self._lock:
+            held = sorted(self._active)
+        db = self.session_factory()
+        try:
+            admin_crud.touch_ai_trainer_sources(db, held)
+            requeue = admin_crud.fail_interrupted_ai_trainer_sources(db, stale_seconds)
+        finally:
+            db.close()
+        for source_id in requeue:
+            self.submit(source_id)
+        return len(requeue)
+
+    def start_sweeper(self, stale_seconds: float = AI_TRAINER_INGEST_STALE_SECONDS) -> None:
+        """Run `recover` in the background often enough that live sources never look stale."""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._sweeper_stop.clear()
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, args=(stale_seconds,), name="ai-trainer-sweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def _sweep_loop(self, stale_seconds: float) -> None:
+        while not self._sweeper_stop.wait(stale_seconds / 3):
+            try:
+                requeued = self.recover(stale_seconds)
+            except Exception:
+                logger.exception("AI trainer ingestion sweep failed")
+                continue
+            if requeued:
+                logger.info("Queued %s orphaned AI trainer website sources again", requeued)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            finished = self._stats["completed"] + self._stats["failed"]
+            return {
+                "workers": self.workers,
+                "processes": self.processes,
+                "pending": self._pending,
+                "submitted": self._stats["submitted"],
+                "completed": self._stats["completed"],
+                "failed": self._stats["failed"],
+                "rejected": self._stats["rejected"],
+                "run_ms_avg": round(self._stats["total_run_ms"] / finished, 1) if finished else 0.0,
+            }
+
+    def join(self, timeout: float = 10.0) -> bool:
+        """Wait until the backlog drains; used by shutdown and tests."""
+        deadline = monotonic_clock.monotonic() + timeout
+        while monotonic_clock.monotonic() < deadline:
+            with self._lock:
+                if not self._pending:
+                    return True
+            monotonic_clock.sleep(0.01)
+        return False
+
+    def stop(self, timeout: float = 3.0) -> None:
+        self._sweeper_stop.set()
+        if self._sweeper:
+            self._sweeper.join(timeout=timeout)
+            self._sweeper = None
+        self.join(timeout)
+        with self._lock:
+            threads, self._threads = self._threads, None
+            processes, self._processes = self._processes, None
+        if threads:
+            threads.shutdown(wait=False, cancel_futures=True)
+        if processes:
+            processes.shutdown(wait=False, cancel_futures=True)
+
+
+ai_trainer_ingestion = AITrainerIngestionQueue()
@@ -1,27 +1,49 @@
 from __future__ import annotations
 
+import hmac
 import ipaddress
+import logging
 import math
 import os
+import threading
+import time as monotonic_clock
 from dataclasses import dataclass
 from datetime import UTC, date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Callable
 from zoneinfo import ZoneInfo
 
 import bcrypt
+import numpy as np
+import pandas as pd
 from fastapi import HTTPException
-from sqlalchemy import func
+from sqlalchemy import exists, func, insert, literal, or_, select, union_all
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from database import models
+from database.crud import EMPLOYEE_PIN_LOOKUP_RETIRED_SECRETS, employee_pin_lookup_digest
 from database.attendance_models import AttendanceRecord, AttendanceSource, AttendanceStatus, LeaveRequest, OfficeLocation, QRToken, UzbekHoliday
 from database.attendance_schemas import AttendanceAnalyticsSummaryOut, AttendanceContextSummary, AttendanceRecordOut, EmployeePresenceOut, EmployeeMonthSummaryOut, ScanResult, TodayPresenceOut
 
+if TYPE_CHECKING:
+    from integrations.attendance.hardware_bridge import HardwareEvent
+
+logger = logging.getLogger(__name__)
+
 TASHKENT_TZ = ZoneInfo("Asia/Tashkent")
 DEFAULT_LATE_GRACE_MINUTES = max(0, int(os.getenv("ATTENDANCE_LATE_GRACE_MINUTES", "15")))
 DEFAULT_GEOFENCE_RADIUS_METERS = max(50, int(os.getenv("ATTENDANCE_GEOFENCE_DEFAULT_RADIUS", "300")))
 DEFAULT_BREAK_MINUTES = max(0, int(os.getenv("ATTENDANCE_BREAK_MINUTES", "60")))
 DEFAULT_SHIFT_START = time(9, 0)
 DEFAULT_SHIFT_END = time(18, 0)
+EMPLOYEE_LOOKUP_CACHE_TTL_SECONDS = max(0.0, float(os.getenv("ATTENDANCE_EMPLOYEE_LOOKUP_CACHE_SECONDS", "300")))
+EMPLOYEE_LOOKUP_CACHE_MAX_ENTRIES = 20_000
+ABSENT_CLOSE_BATCH_PARAMS = 5_000
+
+# (kind, scope, value) -> (cached_at_monotonic, employee_id). Hits are re-validated
+# against the primary-key row, so a stale entry only costs one fallback query.
+_employee_lookup_cache: dict[tuple[str, int | None, str], tuple[float, int]] = {}
+_employee_lookup_cache_lock = threading.Lock()
 
 
 @dataclass(slots=True)
@@ -32,7 +54,60 @@ class _ShiftWindow:
     on_leave: bool
 
 
+@dataclass(slots=True)
+class AttendanceRecordChange:
+    """Detached copy of a committed attendance record, handed to record-change listeners."""
+
+    employee_id: int
+    company_id: int
+    work_date: date
+    status: AttendanceStatus
+    clock_in: datetime | None
+    clock_out: datetime | None
+    hours_worked: float | None
+    late_minutes: int
+    overtime_hours: float | None
+
+    @classmethod
+    def from_record(cls, record: AttendanceRecord) -> AttendanceRecordChange:
+        return cls(
+            employee_id=int(record.employee_id),
+            company_id=int(record.company_id),
+            work_date=record.work_date,
+            status=record.status,
+            clock_in=record.clock_in,
+            clock_out=record.clock_out,
+            hours_worked=record.hours_worked,
+            late_minutes=int(record.late_minutes or 0),
+            overtime_hours=record.overtime_hours,
+        )
+
+
+AttendanceRecordListener = Callable[[int, list[AttendanceRecordChange]], None]
+_record_listeners: list[AttendanceRecordListener] = []
+
+
 class AttendanceService:
+    @staticmethod
+    def add_record_listener(listener: AttendanceRecordListener) -> None:
+        if listener not in _record_listeners:
+            _record_listeners.append(listener)
+
+    @staticmethod
+    def remove_record_listener(listener: AttendanceRecordListener) -> None:
+        if listener in _record_listeners:
+            _record_listeners.remove(listener)
+
+    @staticmethod
+    def _notify_record_changes(company_id: int, changes: list[AttendanceRecordChange]) -> None:
+        if not changes:
+            return
+        for listener in list(_record_listeners):
+            try:
+                listener(int(company_id), changes)
+            except Exception:
+                logger.exception("Attendance record listener failed for company %s", company_id)
+
     @staticmethod
     def utcnow() -> datetime:
         return datetime.now(UTC).replace(tzinfo=None)
@@ -103,25 +178,108 @@ class AttendanceService:
         except Exception:
             return False
 
+    def _cached_employee(self, db: Session, key: tuple[str, int | None, str]) -> models.Employee | None:
+        with _employee_lookup_cache_lock:
+            cached = _employee_lookup_cache.get(key)
+        if not cached:
+            return None
+        cached_at, employee_id = cached
+        if monotonic_clock.monotonic() - cached_at > EMPLOYEE_LOOKUP_CACHE_TTL_SECONDS:
+            self._forget_employee_lookup(key)
+            return None
+        employee = db.get(models.Employee, employee_id)
+        kind, scope, value = key
+        valid = (
+            employee is not None
+            and employee.status != models.EmployeeStatus.terminated
+            and (scope is None or int(employee.company_id or 0) == scope)
+            and (
+                (kind == "email" and (employee.email or "").strip().lower() == value)
+                or (kind == "telegram" and (employee.telegram_chat_id or "") == value)
+            )
+        )
+        if not valid:
+            self._forget_employee_lookup(key)
+            return None
+        return employee
+
+    def _remember_employee(self, key: tuple[str, int | None, str], employee: models.Employee | None) -> models.Employee | None:
+        if employee is None or EMPLOYEE_LOOKUP_CACHE_TTL_SECONDS <= 0:
+            return employee
+        with _employee_lookup_cache_lock:
+            if len(_employee_lookup_cache) >= EMPLOYEE_LOOKUP_CACHE_MAX_ENTRIES:
+                _employee_lookup_cache.clear()
+            _employee_lookup_cache[key] = (monotonic_clock.monotonic(), int(employee.id))
+        return employee
+
+    @staticmethod
+    def _forget_employee_lookup(key: tuple[str, int | None, str]) -> None:
+        with _employee_lookup_cache_lock:
+            _employee_lookup_cache.pop(key, None)
+
+    @staticmethod
+    def clear_employee_lookup_cache() -> None:
+        with _employee_lookup_cache_lock:
+            _employee_lookup_cache.clear()
+
     def find_employee_by_pin(self, db: Session, company_id: int, pin: str) -> models.Employee | None:
-        employees = (
+        normalized = (pin or "").strip()
+        pin_lookup = employee_pin_lookup_digest(company_id, normalized)
+        if not pin_lookup:
+            return None
+        employee = (
+            db.query(models.Employee)
+            .filter(
+                models.Employee.employee_pin_lookup == pin_lookup,
+                models.Employee.company_id == company_id,
+                models.Employee.status != models.EmployeeStatus.terminated,
+            )
+            .first()
+        )
+        if employee:
+            return employee
+
+        # PINs hashed before lookup digests existed, or digested under a retired key: those rows
+        # are still found by index, verified with bcrypt once and given the current digest.
+        retired_lookups = [
+            employee_pin_lookup_digest(company_id, normalized, secret) for secret in EMPLOYEE_PIN_LOOKUP_RETIRED_SECRETS
+        ]
+        candidates = (
             db.query(models.Employee)
             .filter(
                 models.Employee.company_id == company_id,
                 models.Employee.status != models.EmployeeStatus.terminated,
+                models.Employee.employee_pin.isnot(None),
+                or_(
+                    models.Employee.employee_pin_lookup.is_(None),
+                    models.Employee.employee_pin_lookup.in_(retired_lookups),
+                ),
             )
             .all()
         )
-        for employee in employees:
-            if self._hash_matches(employee.employee_pin, pin):
+        for employee in candidates:
+            if self._hash_matches(employee.employee_pin, normalized):
+                self._store_pin_lookup(db, employee, pin_lookup)
                 return employee
         return None
 
+    @staticmethod
+    def _store_pin_lookup(db: Session, employee: models.Employee, pin_lookup: str) -> None:
+        employee.employee_pin_lookup = pin_lookup
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+
     def find_employee_by_email(self, db: Session, company_id: int, email: str | None) -> models.Employee | None:
         normalized = (email or "").strip().lower()
         if not normalized:
             return None
-        return (
+        key = ("email", int(company_id), normalized)
+        cached = self._cached_employee(db, key)
+        if cached:
+            return cached
+        employee = (
             db.query(models.Employee)
             .filter(
                 func.lower(models.Employee.email) == normalized,
@@ -130,28 +288,45 @@ class AttendanceService:
             )
             .first()
         )
+        return self._remember_employee(key, employee)
 
     def find_employee_by_email_and_pin(self, db: Session, email: str | None, pin: str | None) -> models.Employee | None:
         normalized = (email or "").strip().lower()
         if not normalized or not pin:
             return None
-        employee = (
-            db.query(models.Employee)
-            .filter(
-                func.lower(models.Employee.email) == normalized,
-                models.Employee.status != models.EmployeeStatus.terminated,
+        key = ("email", None, normalized)
+        employee = self._cached_employee(db, key)
+        if employee is None:
+            employee = self._remember_employee(
+                key,
+                db.query(models.Employee)
+                .filter(
+                    func.lower(models.Employee.email) == normalized,
+                    models.Employee.status != models.EmployeeStatus.terminated,
+                )
+                .first(),
             )
-            .first()
-        )
-        if not employee or not self._hash_matches(employee.employee_pin, pin):
+        if not employee:
             return None
+        pin_lookup = employee_pin_lookup_digest(employee.company_id, pin)
+        if employee.employee_pin_lookup and pin_lookup and hmac.compare_digest(employee.employee_pin_lookup, pin_lookup):
+            return employee
+        # No digest yet, or one written under a retired key: bcrypt decides.
+        if not self._hash_matches(employee.employee_pin, pin):
+            return None
+        if pin_lookup:
+            self._store_pin_lookup(db, employee, pin_lookup)
         return employee
 
     def find_employee_by_telegram_chat(self, db: Session, chat_id: str | None) -> models.Employee | None:
         normalized = (chat_id or "").strip()
         if not normalized:
             return None
-        return (
+        key = ("telegram", None, normalized)
+        cached = self._cached_employee(db, key)
+        if cached:
+            return cached
+        employee = (
             db.query(models.Employee)
             .filter(
                 models.Employee.telegram_chat_id == normalized,
@@ -159,6 +334,7 @@ class AttendanceService:
             )
             .first()
         )
+        return self._remember_employee(key, employee)
 
     def link_employee_telegram(
         self,
@@ -188,6 +364,7 @@ class AttendanceService:
                 synchronize_session=False,
             )
         )
+        self._forget_employee_lookup(("telegram", None, normalized_chat_id))
         employee.telegram_chat_id = normalized_chat_id
         employee.telegram_username = (username or "").strip() or None
         employee.telegram_first_name = (first_name or "").strip() or None
@@ -197,6 +374,7 @@ class AttendanceService:
         return employee
 
     def unlink_employee_telegram(self, db: Session, employee: models.Employee) -> models.Employee:
+        self._forget_employee_lookup(("telegram", None, (employee.telegram_chat_id or "").strip()))
         employee.telegram_chat_id = None
         employee.telegram_username = None
         employee.telegram_first_name = None
@@ -293,6 +471,36 @@ class AttendanceService:
             on_leave=leave is not None,
         )
 
+    def shift_windows_for_date(self, db: Session, employees: list[models.Employee], work_date: date) -> dict[int, _ShiftWindow]:
+        """Batch form of `calculate_shift_for_date`: one holiday and one leave query for all employees."""
+        if not employees:
+            return {}
+        holiday = db.query(UzbekHoliday).filter(UzbekHoliday.date == work_date).first()
+        leave_keys = {
+            (int(employee_id), int(company_id))
+            for employee_id, company_id in db.query(LeaveRequest.employee_id, LeaveRequest.company_id)
+            .filter(
+                LeaveRequest.employee_id.in_([employee.id for employee in employees]),
+                LeaveRequest.status == "approved",
+                LeaveRequest.date_from <= work_date,
+                LeaveRequest.date_to >= work_date,
+            )
+            .all()
+        }
+        windows: dict[int, _ShiftWindow] = {}
+        for employee in employees:
+            if holiday:
+                is_work_day = bool(holiday.is_work_day)
+            else:
+                is_work_day = work_date.isoweekday() in {int(item) for item in (employee.work_days or [1, 2, 3, 4, 5])}
+            windows[employee.id] = _ShiftWindow(
+                shift_start=employee.shift_start or DEFAULT_SHIFT_START,
+                shift_end=employee.shift_end or DEFAULT_SHIFT_END,
+                is_working_day=is_work_day,
+                on_leave=(employee.id, int(employee.company_id or 0)) in leave_keys,
+            )
+        return windows
+
     def _shift_bounds_local(self, work_date: date, shift: _ShiftWindow) -> tuple[datetime, datetime]:
         start = datetime.combine(work_date, shift.shift_start, tzinfo=TASHKENT_TZ)
         end = datetime.combine(work_date, shift.shift_end, tzinfo=TASHKENT_TZ)
@@ -402,6 +610,7 @@ class AttendanceService:
             self._recompute_metrics(db, employee, record)
             db.commit()
             db.refresh(record)
+            self._notify_record_changes(record.company_id, [AttendanceRecordChange.from_record(record)])
             return ScanResult(
                 action="clock_in",
                 employee_name=employee.full_name,
@@ -432,6 +641,7 @@ class AttendanceService:
         self._recompute_metrics(db, employee, record)
         db.commit()
         db.refresh(record)
+        self._notify_record_changes(record.company_id, [AttendanceRecordChange.from_record(record)])
         hours_label = record.hours_worked or 0
         return ScanResult(
             action="clock_out",
@@ -465,8 +675,69 @@ class AttendanceService:
             overtime_hours=record.overtime_hours if record else None,
         )
 
+    def presence_buckets(
+        self,
+        record: AttendanceRecord | AttendanceRecordChange | None,
+        shift: _ShiftWindow,
+        work_date: date,
+        now_local: datetime,
+    ) -> tuple[tuple[str, ...], bool, AttendanceStatus]:
+        """Classify one employee for today's board: (buckets, counts toward expected, fallback status)."""
+        if shift.on_leave:
+            return ("on_leave",), False, AttendanceStatus.on_leave
+        if not shift.is_working_day:
+            return (), False, AttendanceStatus.on_time
+        if record and record.clock_in and not record.clock_out:
+            return ("currently_in",), True, AttendanceStatus.on_time
+        if record and record.clock_in and record.clock_out:
+            if int(record.late_minutes or 0) > 0:
+                return ("clocked_out", "late_arrivals"), True, record.status
+            return ("clocked_out",), True, record.status
+        shift_start_local, _ = self._shift_bounds_local(work_date, shift)
+        if now_local >= shift_start_local:
+            return ("not_arrived",), True, AttendanceStatus.absent
+        return (), True, AttendanceStatus.absent
+
+    @staticmethod
+    def presence_summary(present_count: int, expected_total: int, done_count: int) -> dict[str, float | int]:
+        return {
+            "expected_total": expected_total,
+            "present_count": present_count,
+            "attendance_rate_today": round((present_count / expected_total) * 100, 1) if expected_total else 100.0,
+            "done_count": done_count,
+        }
+
+    def build_presence(
+        self,
+        rows: list[tuple[models.Employee, AttendanceRecord | AttendanceRecordChange | None, _ShiftWindow]],
+        work_date: date,
+        now_local: datetime,
+    ) -> TodayPresenceOut:
+        lists: dict[str, list[EmployeePresenceOut]] = {
+            "currently_in": [],
+            "clocked_out": [],
+            "late_arrivals": [],
+            "not_arrived": [],
+            "on_leave": [],
+        }
+        expected_total = 0
+        for employee, record, shift in rows:
+            buckets, expected, fallback_status = self.presence_buckets(record, shift, work_date, now_local)
+            expected_total += int(expected)
+            if not buckets:
+                continue
+            item = self.serialize_presence(employee, record, fallback_status)
+            for bucket in buckets:
+                lists[bucket].append(item)
+        present_count = len(lists["currently_in"]) + len(lists["clocked_out"])
+        return TodayPresenceOut(
+            **lists,
+            **self.presence_summary(present_count, expected_total, len(lists["clocked_out"])),
+        )
+
     def get_todays_presence(self, db: Session, company_id: int) -> TodayPresenceOut:
-        today = self.local_now().date()
+        now_local = self.local_now()
+        today = now_local.date()
         employees = (
             db.query(models.Employee)
             .filter(models.Employee.company_id == company_id, models.Employee.status != models.EmployeeStatus.terminated)
@@ -479,45 +750,11 @@ class AttendanceService:
             .all()
         )
         record_map = {row.employee_id: row for row in records}
-        currently_in: list[EmployeePresenceOut] = []
-        clocked_out: list[EmployeePresenceOut] = []
-        late_arrivals: list[EmployeePresenceOut] = []
-        not_arrived: list[EmployeePresenceOut] = []
-        on_leave: list[EmployeePresenceOut] = []
-        expected_total = 0
-        now_local = self.local_now()
-        for employee in employees:
-            shift = self.calculate_shift_for_date(db, employee, today)
-            if shift.on_leave:
-                on_leave.append(self.serialize_presence(employee, record_map.get(employee.id), AttendanceStatus.on_leave))
-                continue
-            if not shift.is_working_day:
-                continue
-            expected_total += 1
-            record = record_map.get(employee.id)
-            if record and record.clock_in and not record.clock_out:
-                currently_in.append(self.serialize_presence(employee, record, AttendanceStatus.on_time))
-            elif record and record.clock_in and record.clock_out:
-                item = self.serialize_presence(employee, record, record.status)
-                clocked_out.append(item)
-                if int(record.late_minutes or 0) > 0:
-                    late_arrivals.append(item)
-            else:
-                shift_start_local, _ = self._shift_bounds_local(today, shift)
-                if now_local >= shift_start_local:
-                    not_arrived.append(self.serialize_presence(employee, record, AttendanceStatus.absent))
-        present_count = len(currently_in) + len(clocked_out)
-        attendance_rate = round((present_count / expected_total) * 100, 1) if expected_total else 100.0
-        return TodayPresenceOut(
-            currently_in=currently_in,
-            clocked_out=clocked_out,
-            late_arrivals=late_arrivals,
-            not_arrived=not_arrived,
-            on_leave=on_leave,
-            expected_total=expected_total,
-            present_count=present_count,
-            attendance_rate_today=attendance_rate,
-            done_count=len(clocked_out),
+        shifts = self.shift_windows_for_date(db, employees, today)
+        return self.build_presence(
+            [(employee, record_map.get(employee.id), shifts[employee.id]) for employee in employees],
+            today,
+            now_local,
         )
 
     def get_employee_monthly_summary(self, db: Session, employee: models.Employee, month: int, year: int) -> EmployeeMonthSummaryOut:
@@ -598,6 +835,7 @@ class AttendanceService:
         self._recompute_metrics(db, employee, record)
         db.commit()
         db.refresh(record)
+        self._notify_record_changes(record.company_id, [AttendanceRecordChange.from_record(record)])
         return record
 
     def create_manual_record(
@@ -636,90 +874,334 @@ class AttendanceService:
         self._recompute_metrics(db, employee, record)
         db.commit()
         db.refresh(record)
+        self._notify_record_changes(record.company_id, [AttendanceRecordChange.from_record(record)])
         return record
 
+    def record_hardware_punches(self, db: Session, company_id: int, punches: list[HardwareEvent]) -> dict[str, int]:
+        """
+        Upsert a batch of device punches for one company with a single employee
+        lookup, a single record lookup and a single commit. Punches are merged
+        order-independently (earliest = clock in, latest = clock out), so replayed
+        device events are harmless. HR-corrected records are never overwritten.
+        """
+        stats = {"created": 0, "updated": 0, "ignored": 0}
+        if not punches:
+            return stats
+        employee_ids = {int(item.employee_id) for item in punches}
+        employees = {
+            row.id: row
+            for row in db.query(models.Employee)
+            .filter(
+                models.Employee.id.in_(employee_ids),
+                models.Employee.company_id == company_id,
+                models.Employee.status != models.EmployeeStatus.terminated,
+            )
+            .all()
+        }
+        grouped: dict[tuple[int, date], list[HardwareEvent]] = {}
+        for item in punches:
+            if int(item.employee_id) not in employees:
+                stats["ignored"] += 1
+                continue
+            local = self.utc_to_local(item.punched_at)
+            grouped.setdefault((int(item.employee_id), local.date()), []).append(item)
+        if not grouped:
+            return stats
+
+        work_dates = {work_date for _, work_date in grouped}
+        existing = {
+            (row.employee_id, row.work_date): row
+            for row in db.query(AttendanceRecord)
+            .filter(
+                AttendanceRecord.employee_id.in_({employee_id for employee_id, _ in grouped}),
+                AttendanceRecord.work_date.in_(work_dates),
+            )
+            .all()
+        }
+        changed: list[AttendanceRecord] = []
+        for (employee_id, work_date), items in grouped.items():
+            employee = employees[employee_id]
+            items.sort(key=lambda item: item.punched_at)
+            record = existing.get((employee_id, work_date))
+            if record is not None and record.is_corrected:
+                stats["ignored"] += len(items)
+                continue
+            if record is None:
+                record = AttendanceRecord(
+                    employee_id=employee_id,
+                    company_id=company_id,
+                    location_id=items[0].location_id,
+                    work_date=work_date,
+                    source=AttendanceSource.hardware,
+                    location_verified=True,
+                    is_remote_flag=False,
+                )
+                db.add(record)
+                stats["created"] += 1
+            else:
+                stats["updated"] += 1
+            moments = [value for value in (record.clock_in, record.clock_out) if value is not None]
+            moments.extend(item.punched_at for item in items)
+            first, last = min(moments), max(moments)
+            if record.clock_in != first:
+                record.clock_in = first
+                record.clock_in_device_hash = items[0].device_id
+            if last > first and record.clock_out != last:
+                record.clock_out = last
+                record.clock_out_device_hash = items[-1].device_id
+            record.source = AttendanceSource.hardware
+            self._recompute_metrics(db, employee, record)
+            changed.append(record)
+        changes = [AttendanceRecordChange.from_record(record) for record in changed]
+        db.commit()
+        self._notify_record_changes(company_id, changes)
+        return stats
+
     def bulk_mark_absent(self, db: Session, company_id: int, work_date: date, exclude_employee_ids: list[int] | None = None) -> int:
+        return self.close_attendance_days(db, company_id, work_date, work_date, exclude_employee_ids=exclude_employee_ids)
+
+    def close_attendance_days(
+        self,
+        db: Session,
+        company_id: int,
+        date_from: date,
+        date_to: date,
+        *,
+        exclude_employee_ids: list[int] | None = None,
+    ) -> int:
+        """
+        Insert absent rows for every expected employee-day in the range that has no record yet.
+
+        Expected days come from `expected_day_matrix` (working day, no approved leave), clipped
+        to the employee's start date and the company's creation date; the rows themselves are
+        written set-based with `INSERT ... SELECT ... WHERE NOT EXISTS`, so closing the same
+        (company, date) twice is a no-op and a catch-up over several missed days is a single
+        pass.
+        """
+        if date_to < date_from:
+            return 0
         exclude = set(exclude_employee_ids or [])
-        employees = (
-            db.query(models.Employee)
-            .filter(models.Employee.company_id == company_id, models.Employee.status != models.EmployeeStatus.terminated)
+        employees = [employee for employee in self._active_employees(db, company_id) if employee.id not in exclude]
+        expected = self.expected_day_matrix(db, employees, date_from, date_to)
+        # Nobody owes days from before they were hired or before the company joined.
+        company_created_at = db.query(models.ClientOrg.created_at).filter(models.ClientOrg.id == company_id).scalar()
+        for index, employee in enumerate(employees):
+            first_day = max((value.date() for value in (employee.start_date, company_created_at) if value), default=None)
+            if first_day is not None and first_day > date_from:
+                expected[index, : (first_day - date_from).days] = False
+        employee_ids = np.array([employee.id for employee in employees], dtype=int)
+        day_ids: list[tuple[date, list[int]]] = []
+        for offset in range(expected.shape[1]):
+            ids = employee_ids[expected[:, offset]].tolist()
+            if ids:
+                day_ids.append((date_from + timedelta(days=offset), ids))
+        created_total = 0
+        created: list[tuple[int, date]] = []
+        for batch in self._absent_batches(day_ids):
+            try:
+                count, rows = self._insert_absent_rows(db, company_id, batch)
+                db.commit()
+            except IntegrityError:
+                # Another worker closed the same day concurrently; NOT EXISTS now skips its rows.
+                db.rollback()
+                count, rows = self._insert_absent_rows(db, company_id, batch)
+                db.commit()
+            created_total += count
+            created.extend(rows)
+        self._notify_record_changes(
+            company_id,
+            [
+                AttendanceRecordChange(
+                    employee_id=employee_id,
+                    company_id=company_id,
+                    work_date=work_date,
+                    status=AttendanceStatus.absent,
+                    clock_in=None,
+                    clock_out=None,
+                    hours_worked=None,
+                    late_minutes=0,
+                    overtime_hours=None,
+                )
+                for employee_id, work_date in created
+            ],
+        )
+        return created_total
+
+    @staticmethod
+    def _absent_batches(day_ids: list[tuple[date, list[int]]]) -> list[list[tuple[date, list[int]]]]:
+        # Keeps each statement well under SQLite's bound-parameter limit during long catch-ups.
+        batches: list[list[tuple[date, list[int]]]] = []
+        current: list[tuple[date, list[int]]] = []
+        size = 0
+        for item in day_ids:
+            if current and size + len(item[1]) > ABSENT_CLOSE_BATCH_PARAMS:
+                batches.append(current)
+                current, size = [], 0
+            current.append(item)
+            size += len(item[1])
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _insert_absent_rows(db: Session, company_id: int, day_ids: list[tuple[date, list[int]]]) -> tuple[int, list[tuple[int, date]]]:
+        table = AttendanceRecord.__table__
+        candidates = union_all(
+            *[
+                select(
+                    models.Employee.id.label("employee_id"),
+                    literal(work_date, type_=table.c.work_date.type).label("work_date"),
+                ).where(
+                    models.Employee.company_id == company_id,
+                    models.Employee.status != models.EmployeeStatus.terminated,
+                    models.Employee.id.in_(ids),
+                    ~exists().where(AttendanceRecord.employee_id == models.Employee.id, AttendanceRecord.work_date == work_date),
+                )
+                for work_date, ids in day_ids
+            ]
+        ).subquery("absent_candidates")
+        statement = insert(AttendanceRecord).from_select(
+            ["employee_id", "company_id", "work_date", "source", "status", "notes"],
+            select(
+                candidates.c.employee_id,
+                literal(company_id, type_=table.c.company_id.type),
+                candidates.c.work_date,
+                literal(AttendanceSource.manual, type_=table.c.source.type),
+                literal(AttendanceStatus.absent, type_=table.c.status.type),
+                literal("Automatically marked absent by scheduler.", type_=table.c.notes.type),
+            ),
+        )
+        if db.get_bind().dialect.insert_returning:
+            rows = [(int(employee_id), work_date) for employee_id, work_date in db.execute(statement.returning(table.c.employee_id, table.c.work_date))]
+            return len(rows), rows
+        # Without RETURNING the count is still exact, but listeners are not told which rows were added.
+        return max(int(db.execute(statement).rowcount or 0), 0), []
+
+    def expected_day_matrix(self, db: Session, employees: list[models.Employee], start: date, end: date) -> np.ndarray:
+        """
+        Employees × days boolean matrix of expected working days between `start` and `end`.
+
+        Row `i` is `employees[i]`, column `j` is `start + j days`. A cell is true when
+        `calculate_shift_for_date` would report a working day without approved leave, but the
+        whole range costs one holiday query and one leave query.
+        """
+        day_count = (end - start).days + 1
+        matrix = np.zeros((len(employees), max(day_count, 0)), dtype=bool)
+        if not employees or day_count <= 0:
+            return matrix
+        weekdays = np.array([(start + timedelta(days=offset)).isoweekday() for offset in range(day_count)])
+        holidays = (
+            db.query(UzbekHoliday.date, UzbekHoliday.is_work_day)
+            .filter(UzbekHoliday.date >= start, UzbekHoliday.date <= end)
             .all()
         )
-        created = 0
-        for employee in employees:
-            if employee.id in exclude:
-                continue
-            shift = self.calculate_shift_for_date(db, employee, work_date)
-            if not shift.is_working_day or shift.on_leave:
-                continue
-            exists = (
-                db.query(AttendanceRecord.id)
-                .filter(AttendanceRecord.employee_id == employee.id, AttendanceRecord.work_date == work_date)
-                .first()
+        holiday_offsets = np.array([(holiday_date - start).days for holiday_date, _ in holidays], dtype=int)
+        holiday_values = np.array([bool(is_work_day) for _, is_work_day in holidays], dtype=bool)
+        patterns: dict[tuple[int, ...], np.ndarray] = {}
+        for index, employee in enumerate(employees):
+            key = tuple(sorted({int(item) for item in (employee.work_days or [1, 2, 3, 4, 5])}))
+            pattern = patterns.get(key)
+            if pattern is None:
+                pattern = np.isin(weekdays, key)
+                pattern[holiday_offsets] = holiday_values
+                patterns[key] = pattern
+            matrix[index] = pattern
+        positions = {employee.id: index for index, employee in enumerate(employees)}
+        company_ids = {int(employee.company_id or 0) for employee in employees}
+        leaves = (
+            db.query(LeaveRequest.employee_id, LeaveRequest.company_id, LeaveRequest.date_from, LeaveRequest.date_to)
+            .filter(
+                LeaveRequest.company_id.in_(company_ids),
+                LeaveRequest.status == "approved",
+                LeaveRequest.date_from <= end,
+                LeaveRequest.date_to >= start,
             )
-            if exists:
+            .all()
+        )
+        for employee_id, leave_company_id, date_from, date_to in leaves:
+            index = positions.get(employee_id)
+            if index is None or int(employees[index].company_id or 0) != leave_company_id:
                 continue
-            row = AttendanceRecord(
-                employee_id=employee.id,
-                company_id=company_id,
-                work_date=work_date,
-                source=AttendanceSource.manual,
-                status=AttendanceStatus.absent,
-                notes="Automatically marked absent by scheduler.",
-            )
-            db.add(row)
-            created += 1
-        if created:
-            db.commit()
-        return created
+            matrix[index, max(0, (date_from - start).days) : (date_to - start).days + 1] = False
+        return matrix
 
-    def get_monthly_stats(self, db: Session, company_id: int, month: int, year: int) -> AttendanceContextSummary:
+    @staticmethod
+    def _month_bounds(month: int, year: int) -> tuple[date, date]:
         start = date(year, month, 1)
         end = (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)) - timedelta(days=1)
-        employees = (
+        return start, end
+
+    @staticmethod
+    def _active_employees(db: Session, company_id: int) -> list[models.Employee]:
+        return (
             db.query(models.Employee)
             .filter(models.Employee.company_id == company_id, models.Employee.status != models.EmployeeStatus.terminated)
+            .order_by(models.Employee.id)
             .all()
         )
-        records = (
-            db.query(AttendanceRecord)
+
+    @staticmethod
+    def _records_frame(db: Session, company_id: int, start: date, end: date) -> pd.DataFrame:
+        """The company's records for a date range as columns, in id order, with nulls already defaulted."""
+        columns = ["employee_id", "work_date", "clock_in", "late_minutes", "overtime_hours", "hours_worked", "status"]
+        rows = (
+            db.query(
+                AttendanceRecord.employee_id,
+                AttendanceRecord.work_date,
+                AttendanceRecord.clock_in,
+                AttendanceRecord.late_minutes,
+                AttendanceRecord.overtime_hours,
+                AttendanceRecord.hours_worked,
+                AttendanceRecord.status,
+            )
             .filter(
                 AttendanceRecord.company_id == company_id,
                 AttendanceRecord.work_date >= start,
                 AttendanceRecord.work_date <= end,
             )
+            .order_by(AttendanceRecord.id)
             .all()
         )
-        worked_employee_days = len([row for row in records if row.clock_in])
-        total_expected_days = 0
-        perfect_attendance = 0
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        frame["present"] = frame["clock_in"].notna()
+        frame["late"] = frame["late_minutes"].fillna(0).astype(int) > 0
+        frame["overtime_hours"] = frame["overtime_hours"].fillna(0.0).astype(float)
+        frame["hours_worked"] = frame["hours_worked"].fillna(0.0).astype(float)
+        return frame
+
+    def get_monthly_stats(self, db: Session, company_id: int, month: int, year: int) -> AttendanceContextSummary:
+        start, end = self._month_bounds(month, year)
+        employees = self._active_employees(db, company_id)
+        return self._monthly_stats(db, company_id, employees, self._records_frame(db, company_id, start, end), start, end)
+
+    def _monthly_stats(
+        self,
+        db: Session,
+        company_id: int,
+        employees: list[models.Employee],
+        frame: pd.DataFrame,
+        start: date,
+        end: date,
+    ) -> AttendanceContextSummary:
+        expected = self.expected_day_matrix(db, employees, start, end)
+        expected_by_employee = expected.sum(axis=1)
+        total_expected_days = int(expected_by_employee.sum())
+        remaining = int(expected[:, max(0, (self.local_now().date() - start).days) :].sum())
+        worked_employee_days = int(frame["present"].sum())
+        per_employee = (
+            frame[frame["present"]]
+            .groupby("employee_id")
+            .agg(days=("present", "size"), lates=("late", "sum"), overtime=("overtime_hours", "sum"))
+            .reindex([employee.id for employee in employees], fill_value=0)
+        )
+        present_days = per_employee["days"].to_numpy()
+        perfect_attendance = int(((expected_by_employee > 0) & (present_days == expected_by_employee)).sum())
         late_counter: dict[str, int] = {}
-        total_overtime = 0.0
-        estimated_payroll = 0.0
-        remaining = 0
-        today = self.local_now().date()
-        for employee in employees:
-            employee_working_days = 0
-            employee_present_days = 0
-            current = start
-            while current <= end:
-                shift = self.calculate_shift_for_date(db, employee, current)
-                if shift.is_working_day and not shift.on_leave:
-                    total_expected_days += 1
-                    employee_working_days += 1
-                    if current >= today:
-                        remaining += 1
-                current += timedelta(days=1)
-            employee_records = [row for row in records if row.employee_id == employee.id and row.clock_in]
-            employee_present_days = len(employee_records)
-            if employee_working_days and employee_present_days == employee_working_days:
-                perfect_attendance += 1
-            employee_lates = sum(1 for row in employee_records if int(row.late_minutes or 0) > 0)
-            if employee_lates:
-                late_counter[employee.full_name] = employee_lates
-            total_overtime += sum(float(row.overtime_hours or 0) for row in employee_records)
-            if employee.salary:
-                estimated_payroll += float(employee.salary)
+        for employee, lates in zip(employees, per_employee["lates"].tolist()):
+            if lates:
+                late_counter[employee.full_name] = int(lates)
+        total_overtime = float(per_employee["overtime"].sum())
+        estimated_payroll = sum(float(employee.salary) for employee in employees if employee.salary)
         avg_rate = round((worked_employee_days / total_expected_days) * 100, 1) if total_expected_days else 100.0
         most_late_name = max(late_counter, key=late_counter.get) if late_counter else "N/A"
         most_late_count = late_counter.get(most_late_name, 0) if late_counter else 0
@@ -741,70 +1223,41 @@ class AttendanceService:
         )
 
     def analytics_summary(self, db: Session, company_id: int, month: int, year: int) -> AttendanceAnalyticsSummaryOut:
-        start = date(year, month, 1)
-        end = (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)) - timedelta(days=1)
-        employees = (
-            db.query(models.Employee)
-            .filter(models.Employee.company_id == company_id, models.Employee.status != models.EmployeeStatus.terminated)
-            .all()
-        )
-        records = (
-            db.query(AttendanceRecord)
-            .filter(
-                AttendanceRecord.company_id == company_id,
-                AttendanceRecord.work_date >= start,
-                AttendanceRecord.work_date <= end,
-            )
-            .all()
-        )
-        monthly_stats = self.get_monthly_stats(db, company_id, month, year)
-        overtime_by_employee: dict[str, float] = {}
-        late_by_employee: dict[str, int] = {}
+        start, end = self._month_bounds(month, year)
+        employees = self._active_employees(db, company_id)
+        frame = self._records_frame(db, company_id, start, end)
+        monthly_stats = self._monthly_stats(db, company_id, employees, frame, start, end)
+
+        absent_by_date = frame.loc[frame["status"].isin([AttendanceStatus.absent]), "work_date"].value_counts().to_dict()
         absent_trend: list[dict[str, object]] = []
-        department_counts: dict[str, dict[str, float]] = {}
-        for row in records:
-            employee = next((item for item in employees if item.id == row.employee_id), None)
-            if not employee:
-                continue
-            overtime_by_employee[employee.full_name] = overtime_by_employee.get(employee.full_name, 0.0) + float(row.overtime_hours or 0)
-            late_by_employee[employee.full_name] = late_by_employee.get(employee.full_name, 0) + (1 if int(row.late_minutes or 0) > 0 else 0)
-            dept = employee.department or "Unassigned"
-            bucket = department_counts.setdefault(dept, {"days": 0.0, "worked": 0.0, "hours": 0.0})
-            bucket["days"] += 1
-            if row.clock_in:
-                bucket["worked"] += 1
-                bucket["hours"] += float(row.hours_worked or 0)
         current = max(start, end - timedelta(days=29))
         while current <= end:
-            absent_count = (
-                db.query(func.count(AttendanceRecord.id))
-                .filter(
-                    AttendanceRecord.company_id == company_id,
-                    AttendanceRecord.work_date == current,
-                    AttendanceRecord.status == AttendanceStatus.absent,
-                )
-                .scalar()
-                or 0
-            )
-            absent_trend.append({"date": current.isoformat(), "count": int(absent_count)})
+            absent_trend.append({"date": current.isoformat(), "count": int(absent_by_date.get(current, 0))})
             current += timedelta(days=1)
-        department_breakdown = []
-        for dept, bucket in department_counts.items():
-            days = bucket["days"] or 1.0
-            department_breakdown.append(
-                {
-                    "dept": dept,
-                    "rate": round((bucket["worked"] / days) * 100, 1),
-                    "avg_hours": round(bucket["hours"] / max(bucket["worked"], 1), 2),
-                }
-            )
+
+        rows = frame.assign(
+            name=frame["employee_id"].map({employee.id: employee.full_name for employee in employees}),
+            dept=frame["employee_id"].map({employee.id: employee.department or "Unassigned" for employee in employees}),
+            worked_hours=frame["hours_worked"].where(frame["present"], 0.0),
+        ).dropna(subset=["name"])
+        # Groups keep first-appearance order and the top-5 sorts are stable, so ties rank as before.
+        by_name = rows.groupby("name", sort=False).agg(overtime=("overtime_hours", "sum"), lates=("late", "sum"))
+        by_dept = rows.groupby("dept", sort=False).agg(days=("present", "size"), worked=("present", "sum"), hours=("worked_hours", "sum"))
+        department_breakdown = [
+            {
+                "dept": dept,
+                "rate": round((float(worked) / (days or 1.0)) * 100, 1),
+                "avg_hours": round(float(hours) / max(int(worked), 1), 2),
+            }
+            for dept, days, worked, hours in by_dept.itertuples()
+        ]
         top_overtime = [
             {"name": name, "hours": round(hours, 2)}
-            for name, hours in sorted(overtime_by_employee.items(), key=lambda item: item[1], reverse=True)[:5]
+            for name, hours in sorted(by_name["overtime"].items(), key=lambda item: item[1], reverse=True)[:5]
         ]
         most_late = [
-            {"name": name, "count": count}
-            for name, count in sorted(late_by_employee.items(), key=lambda item: item[1], reverse=True)[:5]
+            {"name": name, "count": int(count)}
+            for name, count in sorted(by_name["lates"].items(), key=lambda item: item[1], reverse=True)[:5]
         ]
         return AttendanceAnalyticsSummaryOut(
             avg_attendance_rate=monthly_stats.avg_rate,
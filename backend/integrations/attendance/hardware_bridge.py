@@ -1,32 +1,354 @@
 from __future__ import annotations
 
-from typing import List
+import asyncio
+import logging
+import os
+import random
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any, Callable, List
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.connection import SessionLocal
+from integrations.attendance.attendance_service import attendance_service
+
+logger = logging.getLogger(__name__)
+
+HARDWARE_QUEUE_SIZE = max(100, int(os.getenv("ATTENDANCE_HARDWARE_QUEUE_SIZE", "5000")))
+HARDWARE_BATCH_SIZE = max(1, int(os.getenv("ATTENDANCE_HARDWARE_BATCH_SIZE", "200")))
+HARDWARE_FLUSH_SECONDS = max(0.05, float(os.getenv("ATTENDANCE_HARDWARE_FLUSH_SECONDS", "1.0")))
+HARDWARE_DEDUP_SECONDS = max(0, int(os.getenv("ATTENDANCE_HARDWARE_DEDUP_SECONDS", "60")))
+
+
+@dataclass(slots=True)
+class HardwareEvent:
+    """Vendor-neutral punch produced by every adapter. `punched_at` is naive UTC."""
+
+    company_id: int
+    employee_id: int
+    punched_at: datetime
+    device_id: str
+    vendor: str
+    location_id: int | None = None
+    direction: str | None = None
+    raw: dict[str, Any] = field(default_factory=dict)
+
+
+def _parse_device_time(value: Any) -> datetime | None:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        parsed = datetime.fromtimestamp(float(value), UTC)
+    else:
+        text = str(value).strip()
+        if text.isdigit():
+            parsed = datetime.fromtimestamp(int(text), UTC)
+        else:
+            try:
+                parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+    if parsed.tzinfo is None:
+        # Devices without a timezone are configured on office (Tashkent) time.
+        return attendance_service.local_to_utc_naive(parsed)
+    return parsed.astimezone(UTC).replace(tzinfo=None)
 
 
 class HardwareBridge:
     """
-    Abstract bridge for biometric, face-recognition, RFID, and other attendance hardware.
-    Phase 1 only ships the interface so hardware adapters can plug into the same attendance pipeline later.
+    Base adapter for biometric, face-recognition, RFID, and other attendance hardware.
+    Adapters translate vendor payloads into `HardwareEvent`s. Push-mode devices call
+    `push_attendance_event`; poll-mode transports override `get_pending_events`.
     """
 
-    async def push_attendance_event(self, raw_event: dict):
-        raise NotImplementedError
+    vendor = "generic"
+
+    def __init__(
+        self,
+        *,
+        company_id: int,
+        device_id: str,
+        location_id: int | None = None,
+        user_map: dict[str, int] | None = None,
+        pipeline: HardwareEventPipeline | None = None,
+    ):
+        self.company_id = int(company_id)
+        self.device_id = str(device_id)
+        self.location_id = location_id
+        self.user_map = {str(key): int(value) for key, value in (user_map or {}).items()}
+        self.pipeline = pipeline
+        self._pending: list[dict] = []
+
+    def resolve_employee_id(self, device_user_id: Any) -> int | None:
+        key = str(device_user_id or "").strip()
+        if not key:
+            return None
+        if key in self.user_map:
+            return self.user_map[key]
+        # Devices are enrolled with the Benela employee ID unless an explicit map is given.
+        return int(key) if key.isdigit() else None
+
+    def extract(self, raw_event: dict) -> tuple[Any, Any, str | None]:
+        return raw_event.get("employee_id"), raw_event.get("timestamp"), raw_event.get("direction")
+
+    def normalize_event(self, raw_event: dict) -> HardwareEvent | None:
+        device_user_id, raw_time, direction = self.extract(raw_event)
+        employee_id = self.resolve_employee_id(device_user_id)
+        punched_at = _parse_device_time(raw_time)
+        if employee_id is None or punched_at is None:
+            return None
+        return HardwareEvent(
+            company_id=self.company_id,
+            employee_id=employee_id,
+            punched_at=punched_at,
+            device_id=self.device_id,
+            vendor=self.vendor,
+            location_id=self.location_id,
+            direction=direction,
+            raw=raw_event,
+        )
+
+    async def push_attendance_event(self, raw_event: dict) -> HardwareEvent | None:
+        event = self.normalize_event(raw_event)
+        if event is None:
+            logger.warning("Dropping unrecognized %s event from device %s: %s", self.vendor, self.device_id, raw_event)
+            return None
+        if self.pipeline is not None:
+            await self.pipeline.submit(event)
+        else:
+            self._pending.append(raw_event)
+        return event
 
     async def get_pending_events(self) -> List[dict]:
-        raise NotImplementedError
+        pending, self._pending = self._pending, []
+        return pending
 
 
 class ZKTecoAdapter(HardwareBridge):
-    pass
+    """ZKTeco attendance logs (`user_id`, `timestamp`, `punch` 0=in/1=out)."""
+
+    vendor = "zkteco"
+
+    def extract(self, raw_event: dict) -> tuple[Any, Any, str | None]:
+        punch = raw_event.get("punch", raw_event.get("status"))
+        direction = {"0": "in", "1": "out"}.get(str(punch).strip()) if punch is not None else None
+        return raw_event.get("user_id") or raw_event.get("uid"), raw_event.get("timestamp"), direction
 
 
 class HikvisionAdapter(HardwareBridge):
-    pass
+    """Hikvision ISAPI `AccessControllerEvent` payloads."""
+
+    vendor = "hikvision"
+
+    def extract(self, raw_event: dict) -> tuple[Any, Any, str | None]:
+        payload = raw_event.get("AccessControllerEvent") or raw_event
+        direction = {"checkIn": "in", "checkOut": "out"}.get(str(payload.get("attendanceStatus") or ""))
+        return payload.get("employeeNoString") or payload.get("employeeNo"), raw_event.get("dateTime") or payload.get("time"), direction
 
 
 class DahuaAdapter(HardwareBridge):
-    pass
+    """Dahua `AccessControlCardRec` records (`UserID`, epoch `CreateTime`)."""
+
+    vendor = "dahua"
+
+    def extract(self, raw_event: dict) -> tuple[Any, Any, str | None]:
+        direction = {"1": "in", "2": "out"}.get(str(raw_event.get("Type") or raw_event.get("AttendanceState") or ""))
+        return raw_event.get("UserID"), raw_event.get("CreateTime"), direction
 
 
 class RFIDAdapter(HardwareBridge):
-    pass
+    """RFID readers report card UIDs; `user_map` maps card UID to employee ID."""
+
+    vendor = "rfid"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.user_map = {key.upper(): value for key, value in self.user_map.items()}
+
+    def resolve_employee_id(self, device_user_id: Any) -> int | None:
+        key = str(device_user_id or "").strip().upper()
+        return self.user_map.get(key) if key else None
+
+    def extract(self, raw_event: dict) -> tuple[Any, Any, str | None]:
+        return raw_event.get("card_uid") or raw_event.get("tag"), raw_event.get("read_at") or raw_event.get("timestamp"), None
+
+
+class SimulatedDeviceAdapter(HardwareBridge):
+    """
+    Local stand-in for a busy device. Each poll returns `events_per_poll` punches for
+    random employees, with a configurable share of immediate repeats to exercise dedup.
+    """
+
+    vendor = "simulated"
+
+    def __init__(
+        self,
+        *,
+        employee_ids: list[int],
+        events_per_poll: int = 100,
+        repeat_ratio: float = 0.1,
+        clock: Callable[[], datetime] | None = None,
+        seed: int | None = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.employee_ids = list(employee_ids)
+        self.events_per_poll = max(1, int(events_per_poll))
+        self.repeat_ratio = min(max(float(repeat_ratio), 0.0), 1.0)
+        self.clock = clock or attendance_service.utcnow
+        self._random = random.Random(seed)
+
+    def extract(self, raw_event: dict) -> tuple[Any, Any, str | None]:
+        return raw_event.get("employee_id"), raw_event.get("timestamp"), None
+
+    async def get_pending_events(self) -> List[dict]:
+        now = self.clock()
+        events: list[dict] = []
+        for _ in range(self.events_per_poll):
+            if events and self._random.random() < self.repeat_ratio:
+                events.append(dict(events[-1]))
+                continue
+            punched_at = now - timedelta(seconds=self._random.randint(0, 59))
+            events.append(
+                {
+                    "employee_id": self._random.choice(self.employee_ids),
+                    "timestamp": punched_at.replace(tzinfo=UTC).isoformat(),
+                }
+            )
+        return events
+
+
+class HardwareEventPipeline:
+    """
+    Bounded async queue between device adapters and the database.
+
+    `submit` blocks once the queue is full, so slow writes push back on pollers and
+    push endpoints instead of growing memory. A single consumer drains events into
+    batches (by size or flush interval) and upserts each batch in a worker thread.
+    Repeated punches by the same employee within the dedup window are dropped.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        *,
+        queue_size: int = HARDWARE_QUEUE_SIZE,
+        batch_size: int = HARDWARE_BATCH_SIZE,
+        flush_seconds: float = HARDWARE_FLUSH_SECONDS,
+        dedup_seconds: int = HARDWARE_DEDUP_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.dedup_window = timedelta(seconds=dedup_seconds)
+        self.stats = {"received": 0, "duplicates": 0, "batches": 0, "created": 0, "updated": 0, "ignored": 0, "failed": 0}
+        self._queue: asyncio.Queue[HardwareEvent] | None = None
+        self._consumer: asyncio.Task | None = None
+        self._last_punch: dict[tuple[int, int], datetime] = {}
+
+    @property
+    def queue(self) -> asyncio.Queue[HardwareEvent]:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        return self._queue
+
+    def _is_duplicate(self, event: HardwareEvent) -> bool:
+        key = (event.company_id, event.employee_id)
+        previous = self._last_punch.get(key)
+        if previous is not None and abs(event.punched_at - previous) < self.dedup_window:
+            return True
+        self._last_punch[key] = event.punched_at
+        if len(self._last_punch) > self.queue_size * 4:
+            horizon = event.punched_at - self.dedup_window
+            self._last_punch = {k: v for k, v in self._last_punch.items() if v >= horizon}
+        return False
+
+    async def submit(self, event: HardwareEvent) -> bool:
+        self.stats["received"] += 1
+        if self._is_duplicate(event):
+            self.stats["duplicates"] += 1
+            return False
+        await self.queue.put(event)
+        return True
+
+    async def start(self) -> None:
+        if self._consumer is None or self._consumer.done():
+            self._consumer = asyncio.create_task(self._consume(), name="attendance-hardware-pipeline")
+
+    async def stop(self) -> None:
+        """Flush everything already queued, then stop the consumer."""
+        if self._consumer is None:
+            return
+        await self.queue.join()
+        self._consumer.cancel()
+        try:
+            await self._consumer
+        except asyncio.CancelledError:
+            pass
+        self._consumer = None
+
+    async def run_adapter(self, adapter: HardwareBridge, *, poll_seconds: float = 5.0, stop_event: asyncio.Event | None = None) -> None:
+        stop_event = stop_event or asyncio.Event()
+        while not stop_event.is_set():
+            try:
+                for raw_event in await adapter.get_pending_events():
+                    event = adapter.normalize_event(raw_event)
+                    if event is not None:
+                        await self.submit(event)
+            except Exception:
+                logger.exception("Polling %s device %s failed", adapter.vendor, adapter.device_id)
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _consume(self) -> None:
+        queue = self.queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(self.flush, batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def flush(self, batch: list[HardwareEvent]) -> None:
+        by_company: dict[int, list[HardwareEvent]] = {}
+        for event in batch:
+            by_company.setdefault(event.company_id, []).append(event)
+        db = self.session_factory()
+        try:
+            for company_id, events in by_company.items():
+                for attempt in range(2):
+                    try:
+                        result = attendance_service.record_hardware_punches(db, company_id, events)
+                        break
+                    except IntegrityError:
+                        # A concurrent scan created the same (employee, date) row; re-read and merge.
+                        db.rollback()
+                        if attempt:
+                            raise
+                for key, value in result.items():
+                    self.stats[key] += value
+            self.stats["batches"] += 1
+        except Exception:
+            db.rollback()
+            self.stats["failed"] += len(batch)
+            logger.exception("Failed to persist %s hardware attendance event(s)", len(batch))
+        finally:
+            db.close()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time as monotonic_clock
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from database import models
+from database.attendance_models import AttendanceRecord
+from database.attendance_schemas import TodayPresenceOut
+from integrations.attendance.attendance_service import AttendanceRecordChange, attendance_service
+
+PRESENCE_REFRESH_SECONDS = max(10.0, float(os.getenv("ATTENDANCE_PRESENCE_REFRESH_SECONDS", "300")))
+PRESENCE_SUBSCRIBER_QUEUE_SIZE = max(16, int(os.getenv("ATTENDANCE_PRESENCE_STREAM_QUEUE_SIZE", "256")))
+
+
+@dataclass(slots=True)
+class _EmployeeView:
+    id: int
+    full_name: str
+    role: str
+    department: str
+
+
+@dataclass(slots=True)
+class _CompanyPresence:
+    work_date: date
+    built_at: float
+    employees: list[_EmployeeView]
+    shifts: dict[int, Any]
+    records: dict[int, AttendanceRecordChange] = field(default_factory=dict)
+    version: int = 0
+
+
+@dataclass(slots=True)
+class _Subscriber:
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+
+
+class PresenceBoard:
+    """
+    In-memory today's-presence state per company.
+
+    The first read (or a read after the date rolls over, an invalidation, or the refresh
+    interval) rebuilds a company from the database. After that, every committed scan,
+    correction, manual entry, hardware punch, or absent mark updates only the affected
+    employee through `AttendanceService` record listeners, and the change is fanned out
+    to stream subscribers. The periodic rebuild keeps replicas that missed another
+    replica's writes from drifting for long.
+    """
+
+    def __init__(self, refresh_seconds: float = PRESENCE_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._companies: dict[int, _CompanyPresence] = {}
+        self._subscribers: dict[int, list[_Subscriber]] = {}
+        self._versions: dict[int, int] = {}
+
+    def _build(self, db: Session, company_id: int) -> _CompanyPresence:
+        today = attendance_service.local_now().date()
+        employees = (
+            db.query(models.Employee)
+            .filter(models.Employee.company_id == company_id, models.Employee.status != models.EmployeeStatus.terminated)
+            .order_by(models.Employee.full_name)
+            .all()
+        )
+        records = (
+            db.query(AttendanceRecord)
+            .filter(AttendanceRecord.company_id == company_id, AttendanceRecord.work_date == today)
+            .all()
+        )
+        return _CompanyPresence(
+            work_date=today,
+            built_at=monotonic_clock.monotonic(),
+            employees=[_EmployeeView(row.id, row.full_name, row.role, row.department) for row in employees],
+            shifts=attendance_service.shift_windows_for_date(db, employees, today),
+            records={row.employee_id: AttendanceRecordChange.from_record(row) for row in records},
+        )
+
+    def _state(self, db: Session, company_id: int) -> _CompanyPresence:
+        today = attendance_service.local_now().date()
+        with self._lock:
+            state = self._companies.get(company_id)
+            if state and state.work_date == today and monotonic_clock.monotonic() - state.built_at < self.refresh_seconds:
+                return state
+        state = self._build(db, company_id)
+        with self._lock:
+            state.version = self._versions.get(company_id, 0) + 1
+            self._versions[company_id] = state.version
+            self._companies[company_id] = state
+        return state
+
+    def snapshot(self, db: Session, company_id: int) -> TodayPresenceOut:
+        state = self._state(db, company_id)
+        with self._lock:
+            rows = [(employee, state.records.get(employee.id), state.shifts[employee.id]) for employee in state.employees]
+        return attendance_service.build_presence(rows, state.work_date, attendance_service.local_now())
+
+    def summary(self, company_id: int) -> dict[str, Any] | None:
+        """Counters from memory only; None when the company has not been loaded yet."""
+        now_local = attendance_service.local_now()
+        with self._lock:
+            state = self._companies.get(company_id)
+            if not state or state.work_date != now_local.date():
+                return None
+            present = expected = done = 0
+            for employee in state.employees:
+                buckets, counts, _ = attendance_service.presence_buckets(
+                    state.records.get(employee.id), state.shifts[employee.id], state.work_date, now_local
+                )
+                expected += int(counts)
+                if "currently_in" in buckets:
+                    present += 1
+                elif "clocked_out" in buckets:
+                    present += 1
+                    done += 1
+            return {"version": state.version, **attendance_service.presence_summary(present, expected, done)}
+
+    def invalidate(self, company_id: int | None = None) -> None:
+        with self._lock:
+            if company_id is None:
+                companies = list(self._companies)
+                self._companies.clear()
+            else:
+                companies = [company_id] if self._companies.pop(company_id, None) else []
+        for item in companies:
+            self._publish(item, {"type": "resync"})
+
+    def apply_changes(self, company_id: int, changes: list[AttendanceRecordChange]) -> None:
+        now_local = attendance_service.local_now()
+        deltas: list[dict[str, Any]] = []
+        stale = False
+        with self._lock:
+            state = self._companies.get(company_id)
+            if not state or state.work_date != now_local.date():
+                return
+            employees = {employee.id: employee for employee in state.employees}
+            for change in changes:
+                if change.work_date != state.work_date:
+                    continue
+                employee = employees.get(change.employee_id)
+                if employee is None:
+                    stale = True
+                    continue
+                state.records[change.employee_id] = change
+                state.version += 1
+                self._versions[company_id] = state.version
+                buckets, _, fallback_status = attendance_service.presence_buckets(
+                    change, state.shifts[change.employee_id], state.work_date, now_local
+                )
+                item = attendance_service.serialize_presence(employee, change, fallback_status) if buckets else None
+                deltas.append(
+                    {
+                        "type": "delta",
+                        "version": state.version,
+                        "employee_id": change.employee_id,
+                        "buckets": list(buckets),
+                        "presence": item.model_dump(mode="json") if item else None,
+                    }
+                )
+        if stale:
+            # An employee created after the last build; reload on the next read.
+            self.invalidate(company_id)
+            return
+        if deltas and self._subscribers.get(company_id):
+            summary = self.summary(company_id)
+            for delta in deltas:
+                self._publish(company_id, {**delta, "summary": summary})
+
+    def subscribe(self, company_id: int) -> asyncio.Queue:
+        subscriber = _Subscriber(asyncio.get_running_loop(), asyncio.Queue(maxsize=PRESENCE_SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(company_id, []).append(subscriber)
+        return subscriber.queue
+
+    def unsubscribe(self, company_id: int, queue: asyncio.Queue) -> None:
+        with self._lock:
+            remaining = [item for item in self._subscribers.get(company_id, []) if item.queue is not queue]
+            if remaining:
+                self._subscribers[company_id] = remaining
+            else:
+                self._subscribers.pop(company_id, None)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, payload: dict[str, Any]) -> None:
+        if queue.full():
+            # A slow consumer gets a single resync marker instead of an unbounded backlog.
+            while not queue.empty():
+                queue.get_nowait()
+            payload = {"type": "resync"}
+        queue.put_nowait(payload)
+
+    def _publish(self, company_id: int, payload: dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(company_id, []))
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._offer, subscriber.queue, payload)
+            except RuntimeError:
+                self.unsubscribe(company_id, subscriber.queue)
+
+
+presence_board = PresenceBoard()
+attendance_service.add_record_listener(presence_board.apply_changes)
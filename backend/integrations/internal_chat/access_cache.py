@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import os
+import threading
+import time as monotonic_clock
+from dataclasses import dataclass
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from database import models
+
+THREAD_ACCESS_CACHE_SECONDS = max(0.0, float(os.getenv("INTERNAL_CHAT_ACCESS_CACHE_SECONDS", "30")))
+THREAD_ACCESS_CACHE_MAX_ENTRIES = max(100, int(os.getenv("INTERNAL_CHAT_ACCESS_CACHE_MAX_ENTRIES", "10000")))
+
+_MEMO_KEY = "internal_chat_thread_access"
+_PENDING_KEY = "internal_chat_thread_access_pending"
+_ALL_THREADS = -1
+
+OWNER_USER_ID = "benela-owner"
+JUDITH_USER_ID = "judith-ai"
+
+# Judith and owner-direct threads are readable only while they hold exactly the reader and this counterpart.
+EXACT_PAIR_COUNTERPARTS = {"judith_assistant": JUDITH_USER_ID, "owner_direct": OWNER_USER_ID}
+
+
+@dataclass(slots=True)
+class ParticipantView:
+    email: str | None
+    display_name: str
+    role: str
+
+
+@dataclass(slots=True)
+class ThreadAccess:
+    scope: str
+    participants: dict[str, ParticipantView]
+
+    @property
+    def participant_ids(self) -> set[str]:
+        return set(self.participants)
+
+
+class ThreadAccessCache:
+    """
+    thread_id -> (scope, participants) for access checks.
+
+    Lookups are memoized on the request's session and shared between requests for a short
+    TTL. Participant writes drop the session memo immediately and the shared entry when the
+    transaction commits; the generation counter keeps a load that raced a commit from
+    re-publishing what it read before the change.
+    """
+
+    def __init__(self, ttl_seconds: float = THREAD_ACCESS_CACHE_SECONDS, max_entries: int = THREAD_ACCESS_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: dict[int, tuple[float, ThreadAccess]] = {}
+        self._generation = 0
+
+    @staticmethod
+    def _load(db: Session, thread_id: int) -> ThreadAccess | None:
+        rows = db.execute(
+            select(
+                models.InternalChatThread.scope,
+                models.InternalChatParticipant.user_id,
+                models.InternalChatParticipant.email,
+                models.InternalChatParticipant.display_name,
+                models.InternalChatParticipant.role,
+            )
+            .outerjoin(
+                models.InternalChatParticipant,
+                models.InternalChatParticipant.thread_id == models.InternalChatThread.id,
+            )
+            .where(models.InternalChatThread.id == thread_id)
+        ).all()
+        if not rows:
+            return None
+        return ThreadAccess(
+            scope=rows[0].scope,
+            participants={
+                row.user_id: ParticipantView(row.email, row.display_name, row.role) for row in rows if row.user_id
+            },
+        )
+
+    def get(self, db: Session, thread_id: int) -> ThreadAccess | None:
+        memo: dict[int, ThreadAccess] = db.info.setdefault(_MEMO_KEY, {})
+        if thread_id in memo:
+            return memo[thread_id]
+        now = monotonic_clock.monotonic()
+        with self._lock:
+            cached = self._entries.get(thread_id)
+            generation = self._generation
+        if cached and cached[0] > now:
+            memo[thread_id] = cached[1]
+            return cached[1]
+
+        access = self._load(db, thread_id)
+        if access is None:
+            return None
+        memo[thread_id] = access
+        pending = db.info.get(_PENDING_KEY, ())
+        # Uncommitted participant changes in this session must not leak to other requests.
+        if self.ttl_seconds > 0 and thread_id not in pending and _ALL_THREADS not in pending:
+            with self._lock:
+                if generation == self._generation:
+                    if len(self._entries) >= self.max_entries:
+                        self._entries.clear()
+                    self._entries[thread_id] = (now + self.ttl_seconds, access)
+        return access
+
+    def invalidate(self, thread_ids: set[int] | None = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if thread_ids is None or _ALL_THREADS in thread_ids:
+                self._entries.clear()
+                return
+            for thread_id in thread_ids:
+                self._entries.pop(thread_id, None)
+
+    def clear(self) -> None:
+        self.invalidate(None)
+
+
+thread_access_cache = ThreadAccessCache()
+
+
+def thread_readers(scope: str, participant_ids: set[str]) -> set[str]:
+    """Participants who may read a thread, leaving super admins aside."""
+    counterpart = EXACT_PAIR_COUNTERPARTS.get(scope)
+    if counterpart is None:
+        return set(participant_ids)
+    return {user_id for user_id in participant_ids if participant_ids == {user_id, counterpart}}
+
+
+def _mark_changed(session: Session, thread_ids: set[int]) -> None:
+    session.info.setdefault(_PENDING_KEY, set()).update(thread_ids)
+    memo: dict[int, ThreadAccess] = session.info.get(_MEMO_KEY, {})
+    if _ALL_THREADS in thread_ids:
+        memo.clear()
+    for thread_id in thread_ids:
+        memo.pop(thread_id, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_participant_changes(session: Session, flush_context) -> None:
+    changed: set[int] = set()
+    for row in session.new:
+        if isinstance(row, models.InternalChatParticipant):
+            changed.add(row.__dict__["thread_id"])
+    for row in session.deleted:
+        if isinstance(row, (models.InternalChatParticipant, models.InternalChatThread)):
+            changed.add(row.__dict__.get("thread_id") or row.__dict__.get("id"))
+    for row in session.dirty:
+        if isinstance(row, models.InternalChatParticipant) and session.is_modified(row, include_collections=False):
+            changed.add(row.__dict__["thread_id"])
+    if changed:
+        _mark_changed(session, changed)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_participant_changes(orm_execute_state: ORMExecuteState) -> None:
+    # query(...).delete()/update() skip the flush; the affected threads are not known up front.
+    if not (orm_execute_state.is_delete or orm_execute_state.is_update):
+        return
+    mapper = orm_execute_state.bind_arguments.get("mapper")
+    if mapper is None:
+        return
+    if mapper.class_ is models.InternalChatParticipant or (
+        mapper.class_ is models.InternalChatThread and orm_execute_state.is_delete
+    ):
+        _mark_changed(orm_execute_state.session, {_ALL_THREADS})
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_changes(session: Session) -> None:
+    changed = session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_MEMO_KEY, None)
+    if changed:
+        thread_access_cache.invalidate(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_participant_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_MEMO_KEY, None)
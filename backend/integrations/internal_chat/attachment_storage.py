@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterator
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+INTERNAL_CHAT_STORAGE_BACKEND = (os.getenv("INTERNAL_CHAT_STORAGE_BACKEND", "local").strip().lower() or "local")
+INTERNAL_CHAT_S3_BUCKET = os.getenv("INTERNAL_CHAT_S3_BUCKET", "").strip()
+INTERNAL_CHAT_S3_PREFIX = os.getenv("INTERNAL_CHAT_S3_PREFIX", "internal-chat").strip().strip("/")
+INTERNAL_CHAT_S3_ENDPOINT_URL = os.getenv("INTERNAL_CHAT_S3_ENDPOINT_URL", "").strip()
+UPLOAD_CHUNK_BYTES = max(64 * 1024, int(os.getenv("INTERNAL_CHAT_UPLOAD_CHUNK_BYTES", str(1024 * 1024))))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class StagedUpload:
+    path: Path
+    size_bytes: int
+    sha256: str
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def blob_key(sha256: str) -> str:
+    return f"blobs/{sha256[:2]}/{sha256}"
+
+
+class AttachmentStorage(ABC):
+    """
+    Content-addressed blob store for chat attachments.
+
+    Uploads are staged to a local file first, then `put_file` moves them under a key
+    derived from their SHA-256, so identical files share one blob. Backends that can
+    expose a local path return it from `local_path` and downloads are served with
+    `FileResponse` (sendfile/pathsend); the rest stream through `iter_range`.
+    """
+
+    staging_dir: Path
+
+    @abstractmethod
+    def put_file(self, staged_path: Path, sha256: str) -> str:
+        ...
+
+    def local_path(self, key: str) -> Path | None:
+        return None
+
+    @abstractmethod
+    def size(self, key: str) -> int | None:
+        ...
+
+    @abstractmethod
+    def iter_range(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+
+class LocalAttachmentStorage(AttachmentStorage):
+    """Filesystem backend; also the stand-in for object storage in development and tests."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.staging_dir = root / ".staging"
+
+    def _resolve(self, key: str) -> Path:
+        path = Path(key)
+        # Rows written before content addressing store absolute file paths.
+        return path if path.is_absolute() else self.root / path
+
+    def put_file(self, staged_path: Path, sha256: str) -> str:
+        key = blob_key(sha256)
+        target = self._resolve(key)
+        if target.exists():
+            staged_path.unlink(missing_ok=True)
+            return key
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Same filesystem as the staging dir, so this is an atomic rename.
+        os.replace(staged_path, target)
+        return key
+
+    def local_path(self, key: str) -> Path | None:
+        return self._resolve(key)
+
+    def size(self, key: str) -> int | None:
+        path = self._resolve(key)
+        return path.stat().st_size if path.is_file() else None
+
+    def iter_range(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        with self._resolve(key).open("rb") as handle:
+            handle.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = handle.read(min(UPLOAD_CHUNK_BYTES, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        self._resolve(key).unlink(missing_ok=True)
+
+
+class S3AttachmentStorage(AttachmentStorage):
+    """S3-compatible backend. Needs `boto3`, which is only installed where this backend is enabled."""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str | None = None):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.prefix = f"{prefix}/" if prefix else ""
+        self.staging_dir = Path(tempfile.gettempdir()) / "internal-chat-staging"
+        self._client = boto3.client("s3", endpoint_url=endpoint_url or None)
+        self._client_error = ClientError
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def size(self, key: str) -> int | None:
+        try:
+            head = self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self._client_error:
+            return None
+        return int(head["ContentLength"])
+
+    def put_file(self, staged_path: Path, sha256: str) -> str:
+        key = blob_key(sha256)
+        try:
+            if self.size(key) is None:
+                self._client.upload_file(str(staged_path), self.bucket, self._object_key(key))
+        finally:
+            staged_path.unlink(missing_ok=True)
+        return key
+
+    def iter_range(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        response = self._client.get_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Range=f"bytes={start}-{end}",
+        )
+        yield from response["Body"].iter_chunks(UPLOAD_CHUNK_BYTES)
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+
+def build_attachment_storage(local_root: Path) -> AttachmentStorage:
+    if INTERNAL_CHAT_STORAGE_BACKEND == "s3":
+        if not INTERNAL_CHAT_S3_BUCKET:
+            raise RuntimeError("INTERNAL_CHAT_S3_BUCKET is required when INTERNAL_CHAT_STORAGE_BACKEND=s3")
+        return S3AttachmentStorage(INTERNAL_CHAT_S3_BUCKET, INTERNAL_CHAT_S3_PREFIX, INTERNAL_CHAT_S3_ENDPOINT_URL)
+    if INTERNAL_CHAT_STORAGE_BACKEND != "local":
+        logger.warning("Unknown INTERNAL_CHAT_STORAGE_BACKEND=%s; using local storage", INTERNAL_CHAT_STORAGE_BACKEND)
+    return LocalAttachmentStorage(local_root)
+
+
+def _write_chunk(handle: BinaryIO, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    handle.write(chunk)
+
+
+async def stage_upload(upload, staging_dir: Path, max_bytes: int, chunk_bytes: int = UPLOAD_CHUNK_BYTES) -> StagedUpload:
+    """
+    Copy an upload to a staging file chunk by chunk, hashing as it goes.
+
+    Disk writes and hashing run in a worker thread so large files never block the event
+    loop. Raises `UploadTooLarge` (and removes the partial file) once `max_bytes` is exceeded.
+    """
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    path = staging_dir / f"{uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    handle = await asyncio.to_thread(path.open, "wb")
+    try:
+        while True:
+            chunk = await upload.read(chunk_bytes)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+            await asyncio.to_thread(_write_chunk, handle, digest, chunk)
+    except BaseException:
+        handle.close()
+        path.unlink(missing_ok=True)
+        raise
+    await asyncio.to_thread(handle.close)
+    return StagedUpload(path=path, size_bytes=size, sha256=digest.hexdigest())
+
+
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=` range into inclusive offsets; None means serve the whole file."""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if not start_text:
+            length = int(end_text)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = min(int(end_text), size - 1) if end_text else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
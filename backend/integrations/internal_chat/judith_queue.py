@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import time as monotonic_clock
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+JUDITH_WORKER_COUNT = max(1, int(os.getenv("JUDITH_WORKER_COUNT", "4")))
+JUDITH_JOB_TIMEOUT_SECONDS = max(5.0, float(os.getenv("JUDITH_JOB_TIMEOUT_SECONDS", "90")))
+JUDITH_QUEUE_MAX_PENDING = max(1, int(os.getenv("JUDITH_QUEUE_MAX_PENDING", "500")))
+
+_SIDE_EFFECTS_KEY = "judith_side_effects"
+
+
+@dataclass(slots=True)
+class JudithJob:
+    thread_id: int
+    run: Callable[["JudithJob"], None]
+    on_timeout: Callable[["JudithJob"], None] | None = None
+    enqueued_at: float = field(default_factory=monotonic_clock.monotonic)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+
+@dataclass(slots=True)
+class _QueueStats:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    rejected: int = 0
+    last_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+    total_wait_ms: float = 0.0
+    total_run_ms: float = 0.0
+
+
+class JudithWorkQueue:
+    """
+    Worker pool for Judith replies.
+
+    Jobs for the same thread run one at a time in submission order; different threads run
+    in parallel. A job that outlives its timeout is flagged as cancelled so it discards its
+    own writes, its `on_timeout` callback runs, and the thread's next job starts.
+    """
+
+    def __init__(
+        self,
+        workers: int = JUDITH_WORKER_COUNT,
+        timeout_seconds: float = JUDITH_JOB_TIMEOUT_SECONDS,
+        max_pending: int = JUDITH_QUEUE_MAX_PENDING,
+    ):
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: dict[int, deque[JudithJob]] = {}
+        self._pending_count = 0
+        self._ready: queue.Queue[int | None] = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._runner: ThreadPoolExecutor | None = None
+        self._stats = _QueueStats()
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        # Jobs that time out keep their runner thread until the provider call returns; their
+        # Telegram and Zoom calls are held until commit and dropped once cancelled.
+        self._runner = ThreadPoolExecutor(max_workers=self.workers * 2, thread_name_prefix="judith-job")
+        for index in range(self.workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"judith-worker-{index}", daemon=True)
+            worker.start()
+            self._threads.append(worker)
+
+    def submit(self, job: JudithJob) -> bool:
+        """Queue a job; False when the backlog is full and the caller should handle it inline."""
+        with self._lock:
+            if self._pending_count >= self.max_pending:
+                self._stats.rejected += 1
+                return False
+            self._ensure_started()
+            backlog = self._pending.get(job.thread_id)
+            self._pending_count += 1
+            self._stats.submitted += 1
+            if backlog is not None:
+                # The thread is already scheduled; its worker picks this up after the current job.
+                backlog.append(job)
+                return True
+            self._pending[job.thread_id] = deque([job])
+        self._ready.put(job.thread_id)
+        return True
+
+    def _worker_loop(self) -> None:
+        while True:
+            thread_id = self._ready.get()
+            if thread_id is None:
+                return
+            with self._lock:
+                job = self._pending[thread_id][0]
+            self._execute(job)
+            with self._lock:
+                backlog = self._pending[thread_id]
+                backlog.popleft()
+                self._pending_count -= 1
+                if not backlog:
+                    del self._pending[thread_id]
+                    continue
+            self._ready.put(thread_id)
+
+    def _execute(self, job: JudithJob) -> None:
+        started = monotonic_clock.monotonic()
+        wait_ms = (started - job.enqueued_at) * 1000
+        with self._lock:
+            self._stats.last_wait_ms = wait_ms
+            self._stats.max_wait_ms = max(self._stats.max_wait_ms, wait_ms)
+            self._stats.total_wait_ms += wait_ms
+        outcome = "completed"
+        future = self._runner.submit(job.run, job)
+        try:
+            future.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            outcome = "timed_out"
+            job.cancelled.set()
+            # A job still waiting behind hung runs never starts; a running one notices the flag.
+            future.cancel()
+            logger.warning("Judith job for thread=%s timed out after %.1fs", job.thread_id, self.timeout_seconds)
+            if job.on_timeout:
+                try:
+                    job.on_timeout(job)
+                except Exception:
+                    logger.exception("Judith timeout handler failed for thread=%s", job.thread_id)
+        except Exception:
+            outcome = "failed"
+            logger.exception("Judith job failed for thread=%s", job.thread_id)
+        run_ms = (monotonic_clock.monotonic() - started) * 1000
+        with self._lock:
+            setattr(self._stats, outcome, getattr(self._stats, outcome) + 1)
+            self._stats.total_run_ms += run_ms
+        logger.info(
+            "Judith job thread=%s %s queue_wait_ms=%.0f run_ms=%.0f",
+            job.thread_id,
+            outcome,
+            wait_ms,
+            run_ms,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = self._stats
+            finished = stats.completed + stats.failed + stats.timed_out
+            return {
+                "workers": self.workers,
+                "pending": self._pending_count,
+                "active_threads": len(self._pending),
+                "submitted": stats.submitted,
+                "completed": stats.completed,
+                "failed": stats.failed,
+                "timed_out": stats.timed_out,
+                "rejected": stats.rejected,
+                "queue_wait_ms_last": round(stats.last_wait_ms, 1),
+                "queue_wait_ms_max": round(stats.max_wait_ms, 1),
+                "queue_wait_ms_avg": round(stats.total_wait_ms / finished, 1) if finished else 0.0,
+                "run_ms_avg": round(stats.total_run_ms / finished, 1) if finished else 0.0,
+            }
+
+    def join(self, timeout: float = 10.0) -> bool:
+        """Wait until the backlog drains; used by shutdown and tests."""
+        deadline = monotonic_clock.monotonic() + timeout
+        while monotonic_clock.monotonic() < deadline:
+            with self._lock:
+                if not self._pending_count:
+                    return True
+            monotonic_clock.sleep(0.01)
+        return False
+
+    def stop(self, timeout: float = 3.0) -> None:
+        self.join(timeout)
+        for _ in self._threads:
+            self._ready.put(None)
+        for worker in self._threads:
+            worker.join(timeout=timeout)
+        self._threads = []
+        if self._runner:
+            self._runner.shutdown(wait=False, cancel_futures=True)
+            self._runner = None
+
+
+def hold_side_effects(db: Session) -> None:
+    """Make the session collect Judith's Telegram and Zoom calls instead of running them."""
+    db.info[_SIDE_EFFECTS_KEY] = []
+
+
+def defer_side_effect(db: Session, call: Callable[[], None]) -> bool:
+    """Park `call` until the job's commit; False when the session is not collecting calls."""
+    held = db.info.get(_SIDE_EFFECTS_KEY)
+    if held is None:
+        return False
+    held.append(call)
+    return True
+
+
+def pop_side_effects(db: Session) -> list[Callable[[], None]]:
+    return db.info.pop(_SIDE_EFFECTS_KEY, None) or []
+
+
+judith_queue = JudithWorkQueue()
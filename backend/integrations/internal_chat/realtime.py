@@ -0,0 +1,399 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import select as select_module
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable
+
+from sqlalchemy import event, select, text
+from sqlalchemy.orm import Session
+
+from database import models, schemas
+from integrations.internal_chat.access_cache import thread_readers
+
+logger = logging.getLogger(__name__)
+
+REALTIME_BROKER = (os.getenv("INTERNAL_CHAT_REALTIME_BROKER", "memory").strip().lower() or "memory")
+REALTIME_PG_CHANNEL = (os.getenv("INTERNAL_CHAT_REALTIME_CHANNEL", "internal_chat_events").strip() or "internal_chat_events")
+REALTIME_SUBSCRIBER_QUEUE_SIZE = max(16, int(os.getenv("INTERNAL_CHAT_STREAM_QUEUE_SIZE", "256")))
+# pg_notify payloads are capped at 8000 bytes; larger events go out without the message body.
+_PG_NOTIFY_MAX_BYTES = 7900
+_PENDING_KEY = "internal_chat_realtime_pending"
+
+ChatEvent = dict[str, Any]
+
+
+def _attachment_payload(row: models.InternalChatAttachment) -> dict[str, Any]:
+    values = row.__dict__
+    return schemas.InternalChatAttachmentOut(
+        id=values["id"],
+        thread_id=values["thread_id"],
+        file_name=values.get("file_name") or "attachment",
+        mime_type=values.get("mime_type"),
+        size_bytes=int(values.get("size_bytes") or 0),
+        transcription_status=values.get("transcription_status"),
+        created_at=values.get("created_at") or datetime.utcnow(),
+        download_url=f"/internal-chat/attachments/{values['id']}",
+    ).model_dump(mode="json")
+
+
+def _message_payload(row: models.InternalChatMessage, include_attachments: bool = False) -> dict[str, Any]:
+    # Read straight from the instance state: touching an unloaded attribute inside a flush
+    # would emit a SELECT, and server defaults such as created_at are not loaded yet.
+    values = row.__dict__
+    attachments = []
+    if include_attachments:
+        # New messages get their attachments from the pending list at commit; edits reuse whatever is loaded.
+        attachments = [_attachment_payload(item) for item in sorted(values.get("attachments") or [], key=lambda item: item.id)]
+    return schemas.InternalChatMessageOut(
+        id=values["id"],
+        thread_id=values["thread_id"],
+        sender_user_id=values.get("sender_user_id") or "",
+        sender_name=values.get("sender_name") or "User",
+        sender_email=values.get("sender_email"),
+        sender_role=values.get("sender_role") or "client",
+        body=values.get("body") or "",
+        attachments=attachments,
+        created_at=values.get("created_at") or datetime.utcnow(),
+    ).model_dump(mode="json")
+
+
+class ChatBroker(ABC):
+    """Carries committed chat events to every replica's hub."""
+
+    @abstractmethod
+    def start(self, deliver: Callable[[ChatEvent], None]) -> None:
+        ...
+
+    @abstractmethod
+    def publish(self, events: list[ChatEvent]) -> None:
+        ...
+
+    def stop(self) -> None:
+        return None
+
+
+class InProcessChatBroker(ChatBroker):
+    def __init__(self):
+        self._deliver: Callable[[ChatEvent], None] | None = None
+
+    def start(self, deliver: Callable[[ChatEvent], None]) -> None:
+        self._deliver = deliver
+
+    def publish(self, events: list[ChatEvent]) -> None:
+        if not self._deliver:
+            return
+        for item in events:
+            self._deliver(item)
+
+
+class PostgresNotifyChatBroker(ChatBroker):
+    """
+    Fan-out across replicas with LISTEN/NOTIFY.
+
+    Needs a session-mode connection; transaction poolers such as Supabase's port 6543 drop
+    LISTEN registrations, so point INTERNAL_CHAT_REALTIME_DATABASE_URL at a direct connection there.
+    """
+
+    def __init__(self, database_url: str | None = None, channel: str = REALTIME_PG_CHANNEL):
+        self.database_url = database_url
+        self.channel = channel
+        self._deliver: Callable[[ChatEvent], None] | None = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _connect(self):
+        import psycopg2
+
+        from database.connection import DATABASE_URL
+
+        url = self.database_url or os.getenv("INTERNAL_CHAT_REALTIME_DATABASE_URL") or DATABASE_URL
+        connection = psycopg2.connect(url.replace("postgresql+psycopg2://", "postgresql://", 1))
+        connection.set_session(autocommit=True)
+        return connection
+
+    def start(self, deliver: Callable[[ChatEvent], None]) -> None:
+        self._deliver = deliver
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._listen_loop, name="internal-chat-realtime-listener", daemon=True)
+        self._thread.start()
+
+    def _listen_loop(self) -> None:
+        while not self._stop_event.is_set():
+            connection = None
+            try:
+                connection = self._connect()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                while not self._stop_event.is_set():
+                    if select_module.select([connection], [], [], 5.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notice = connection.notifies.pop(0)
+                        try:
+                            payload = json.loads(notice.payload)
+                        except ValueError:
+                            continue
+                        if self._deliver:
+                            self._deliver(payload)
+            except Exception:
+                logger.exception("Internal chat realtime listener failed; reconnecting")
+                self._stop_event.wait(5.0)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def publish(self, events: list[ChatEvent]) -> None:
+        from database.connection import engine
+
+        with engine.connect() as connection:
+            for item in events:
+                payload = json.dumps(item, default=str)
+                if len(payload.encode("utf-8")) > _PG_NOTIFY_MAX_BYTES:
+                    payload = json.dumps({**item, "message": None}, default=str)
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+            connection.commit()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+@dataclass(slots=True)
+class _Subscriber:
+    user_id: str
+    is_admin: bool
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue
+
+
+class ChatHub:
+    """
+    Per-user push channel for internal chat.
+
+    Committed message inserts and deletes are captured from the ORM session (so every code
+    path that writes a message publishes, including Judith replies and reminders), handed to
+    the broker, and delivered by each replica to the local subscribers that participate in
+    the thread. Super admins receive every event.
+    """
+
+    def __init__(self, broker: ChatBroker | None = None):
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, list[_Subscriber]] = {}
+        self._admins: list[_Subscriber] = []
+        self._broker = broker or self._default_broker()
+        self._started = False
+
+    @staticmethod
+    def _default_broker() -> ChatBroker:
+        if REALTIME_BROKER == "postgres":
+            return PostgresNotifyChatBroker()
+        return InProcessChatBroker()
+
+    def set_broker(self, broker: ChatBroker) -> None:
+        with self._lock:
+            previous, self._broker, started = self._broker, broker, self._started
+        if started:
+            previous.stop()
+            broker.start(self.deliver)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            broker = self._broker
+        broker.start(self.deliver)
+
+    def publish(self, events: list[ChatEvent]) -> None:
+        if not events:
+            return
+        self._ensure_started()
+        try:
+            self._broker.publish(events)
+        except Exception:
+            logger.exception("Internal chat realtime publish failed for %s event(s)", len(events))
+
+    def subscribe(self, user_id: str, *, is_admin: bool = False) -> asyncio.Queue:
+        self._ensure_started()
+        subscriber = _Subscriber(user_id, is_admin, asyncio.get_running_loop(), asyncio.Queue(maxsize=REALTIME_SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            if is_admin:
+                self._admins.append(subscriber)
+            else:
+                self._subscribers.setdefault(user_id, []).append(subscriber)
+        return subscriber.queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._admins = [item for item in self._admins if item.queue is not queue]
+            remaining = [item for item in self._subscribers.get(user_id, []) if item.queue is not queue]
+            if remaining:
+                self._subscribers[user_id] = remaining
+            else:
+                self._subscribers.pop(user_id, None)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._admins) + sum(len(items) for items in self._subscribers.values())
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, payload: ChatEvent) -> None:
+        if queue.full():
+            # A stalled client gets one resync marker and reloads from its last message id.
+            while not queue.empty():
+                queue.get_nowait()
+            payload = {"type": "resync"}
+        queue.put_nowait(payload)
+
+    def deliver(self, item: ChatEvent) -> None:
+        recipients = set(item.get("recipients") or [])
+        payload = {key: value for key, value in item.items() if key != "recipients"}
+        with self._lock:
+            targets = list(self._admins)
+            for user_id in recipients:
+                targets.extend(self._subscribers.get(user_id, []))
+        for subscriber in targets:
+            try:
+                subscriber.loop.call_soon_threadsafe(self._offer, subscriber.queue, payload)
+            except RuntimeError:
+                self.unsubscribe(subscriber.user_id, subscriber.queue)
+
+
+chat_hub = ChatHub()
+
+
+def _pending(session: Session) -> dict[str, Any]:
+    return session.info.setdefault(
+        _PENDING_KEY,
+        {"messages": {}, "attachments": [], "updated": {}, "deleted": [], "threads": set()},
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_chat_changes(session: Session, flush_context) -> None:
+    touched = False
+    for row in session.new:
+        if isinstance(row, models.InternalChatMessage):
+            payload = _message_payload(row)
+            _pending(session)["messages"][payload["id"]] = payload
+            _pending(session)["threads"].add(payload["thread_id"])
+            touched = True
+        elif isinstance(row, models.InternalChatAttachment):
+            _pending(session)["attachments"].append((row.__dict__.get("message_id"), _attachment_payload(row)))
+            touched = True
+    for row in session.dirty:
+        if isinstance(row, models.InternalChatMessage) and session.is_modified(row, include_collections=False):
+            payload = _message_payload(row, include_attachments=True)
+            _pending(session)["updated"][payload["id"]] = payload
+            _pending(session)["threads"].add(payload["thread_id"])
+            touched = True
+    for row in session.deleted:
+        if isinstance(row, models.InternalChatMessage):
+            _pending(session)["deleted"].append((row.__dict__.get("thread_id"), row.__dict__.get("id")))
+            _pending(session)["threads"].add(row.__dict__.get("thread_id"))
+            touched = True
+    if touched:
+        session.info[_PENDING_KEY + ":resolve"] = True
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _resolve_chat_recipients(session: Session, flush_context) -> None:
+    if not session.info.pop(_PENDING_KEY + ":resolve", False):
+        return
+    pending = _pending(session)
+    recipients: dict[int, set[str]] = pending.setdefault("recipients", {})
+    missing = [thread_id for thread_id in pending["threads"] if thread_id not in recipients]
+    if not missing:
+        return
+    rows = session.execute(
+        select(models.InternalChatThread.id, models.InternalChatThread.scope, models.InternalChatParticipant.user_id)
+        .join(models.InternalChatParticipant, models.InternalChatParticipant.thread_id == models.InternalChatThread.id)
+        .where(models.InternalChatThread.id.in_(missing))
+    ).all()
+    scopes: dict[int, str] = {}
+    members: dict[int, set[str]] = {thread_id: set() for thread_id in missing}
+    for thread_id, scope, user_id in rows:
+        scopes[thread_id] = scope
+        members[thread_id].add(user_id)
+    # Same rule as the resume replay, so live delivery never shows what a reconnect would withhold.
+    for thread_id in missing:
+        recipients[thread_id] = thread_readers(scopes.get(thread_id, ""), members[thread_id])
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_chat_changes(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    recipients: dict[int, set[str]] = pending.get("recipients", {})
+    messages: dict[int, dict[str, Any]] = pending["messages"]
+    for message_id, attachment in pending["attachments"]:
+        if message_id in messages:
+            messages[message_id]["attachments"].append(attachment)
+    events: list[ChatEvent] = []
+    for message_id in sorted(messages):
+        message = messages[message_id]
+        events.append(
+            {
+                "type": "message",
+                "thread_id": message["thread_id"],
+                "message_id": message_id,
+                "message": message,
+                "recipients": sorted(recipients.get(message["thread_id"], ())),
+            }
+        )
+    for message_id in sorted(pending["updated"]):
+        if message_id in messages:
+            continue
+        message = pending["updated"][message_id]
+        events.append(
+            {
+                "type": "message_updated",
+                "thread_id": message["thread_id"],
+                "message_id": message_id,
+                "message": message,
+                "recipients": sorted(recipients.get(message["thread_id"], ())),
+            }
+        )
+    for thread_id, message_id in pending["deleted"]:
+        if message_id in messages:
+            continue
+        events.append(
+            {
+                "type": "message_deleted",
+                "thread_id": thread_id,
+                "message_id": message_id,
+                "recipients": sorted(recipients.get(thread_id, ())),
+            }
+        )
+    chat_hub.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_chat_changes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_PENDING_KEY + ":resolve", None)
+
+
+def publish_thread_cleared(db: Session, thread_id: int) -> None:
+    """Bulk deletes bypass the session hooks, so clearing a thread announces itself."""
+    rows = (
+        db.query(models.InternalChatThread.scope, models.InternalChatParticipant.user_id)
+        .join(models.InternalChatParticipant, models.InternalChatParticipant.thread_id == models.InternalChatThread.id)
+        .filter(models.InternalChatThread.id == thread_id)
+        .all()
+    )
+    readers = thread_readers(rows[0][0], {user_id for _, user_id in rows}) if rows else set()
+    chat_hub.publish([{"type": "thread_cleared", "thread_id": thread_id, "recipients": sorted(readers)}])
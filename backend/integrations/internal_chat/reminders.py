@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import threading
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+REMINDER_MIN_WAIT_SECONDS = max(0.1, float(os.getenv("INTERNAL_CHAT_REMINDER_MIN_WAIT_SECONDS", "1")))
+
+_PENDING_KEY = "internal_chat_reminder_wakeups"
+_OUTBOX_KEY = "internal_chat_reminder_outbox"
+
+
+class ReminderWakeup:
+    """
+    Next-due timer for the reminder dispatcher.
+
+    The dispatcher sleeps until the earliest pending `remind_at` it read from the database,
+    capped at `max_idle_seconds` so reminders written by other replicas are still picked
+    up. Reminders scheduled in this process move the deadline forward once their
+    transaction commits. A due time read from the database that is already past still
+    waits `min_wait_seconds`: rows another replica holds locked, or a backlog beyond one
+    run's batches, must not turn the dispatcher into a busy loop.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._earliest: datetime | None = None
+        self._interrupted = False
+
+    def notify(self, due_at: datetime) -> None:
+        with self._condition:
+            if self._earliest is None or due_at < self._earliest:
+                self._earliest = due_at
+                self._condition.notify_all()
+
+    def interrupt(self) -> None:
+        with self._condition:
+            self._interrupted = True
+            self._condition.notify_all()
+
+    def wait(
+        self,
+        next_due: datetime | None,
+        max_idle_seconds: float,
+        min_wait_seconds: float = REMINDER_MIN_WAIT_SECONDS,
+    ) -> None:
+        with self._condition:
+            self._interrupted = False
+            while not self._interrupted:
+                now = datetime.utcnow()
+                if self._earliest is not None and self._earliest <= now:
+                    self._earliest = None
+                    return
+                timeout = max_idle_seconds
+                if next_due is not None:
+                    timeout = min(timeout, max(min_wait_seconds, (next_due - now).total_seconds()))
+                if self._earliest is not None:
+                    timeout = min(timeout, (self._earliest - now).total_seconds())
+                if not self._condition.wait(timeout) and not self._interrupted:
+                    # Timed out: either the deadline arrived or the idle cap did.
+                    return
+
+
+class ReminderStats:
+    """Dispatch counters and lag (dispatch time minus remind_at) for the admin stats route."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.dispatched = 0
+        self.batches = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self._total_lag_seconds = 0.0
+        self.last_run_at: datetime | None = None
+
+    def record(self, lags_seconds: list[float]) -> None:
+        with self._lock:
+            self.last_run_at = datetime.utcnow()
+            if not lags_seconds:
+                return
+            self.batches += 1
+            self.dispatched += len(lags_seconds)
+            self.last_lag_seconds = max(lags_seconds)
+            self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+            self._total_lag_seconds += sum(lags_seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "dispatched": self.dispatched,
+                "batches": self.batches,
+                "lag_seconds_last": round(self.last_lag_seconds, 2),
+                "lag_seconds_max": round(self.max_lag_seconds, 2),
+                "lag_seconds_avg": round(self._total_lag_seconds / self.dispatched, 2) if self.dispatched else 0.0,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            }
+
+
+reminder_wakeup = ReminderWakeup()
+reminder_stats = ReminderStats()
+
+
+def schedule_wakeup(db: Session, remind_at: datetime) -> None:
+    """Wake the dispatcher for `remind_at` once the current transaction commits."""
+    db.info.setdefault(_PENDING_KEY, []).append(remind_at)
+
+
+def park_notification(db: Session, item: dict[str, Any]) -> None:
+    """Hold a Telegram notification until the reminder batch that produced it commits."""
+    db.info.setdefault(_OUTBOX_KEY, []).append(item)
+
+
+def pop_notifications(db: Session) -> list[dict[str, Any]]:
+    return db.info.pop(_OUTBOX_KEY, None) or []
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed_reminders(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        reminder_wakeup.notify(min(pending))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_reminder_wakeups(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+    # The reminders behind these notifications were not marked sent; the next run retries them.
+    session.info.pop(_OUTBOX_KEY, None)
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time as monotonic_clock
+from abc import ABC, abstractmethod
+from copy import deepcopy
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.connection import SessionLocal
+from database.models import InternalChatStateEntry
+
+logger = logging.getLogger(__name__)
+
+INTERNAL_CHAT_STATE_BACKEND = (os.getenv("INTERNAL_CHAT_STATE_BACKEND", "memory").strip().lower() or "memory")
+_DB_PURGE_INTERVAL_SECONDS = 60.0
+
+
+class StateStore(ABC):
+    """
+    Small TTL key/value store for Telegram bot state.
+
+    The memory backend suits a single process. The database backend shares state across
+    replicas with Redis-style semantics: `set` with an expiry, atomic `pop`, and
+    `acquire_lease` for electing a single Telegram poller.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> dict[str, Any] | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: dict[str, Any], ttl_seconds: float | None = None) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, key: str) -> dict[str, Any] | None:
+        ...
+
+    @abstractmethod
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """Take or renew `name` for `holder`; False while another holder's lease is live."""
+
+    @abstractmethod
+    def release_lease(self, name: str, holder: str) -> None:
+        ...
+
+
+class MemoryStateStore(StateStore):
+    def __init__(self, clock: Callable[[], float] = monotonic_clock.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, expires_at, sequence); the sequence tells live heap entries from stale ones.
+        self._values: dict[str, tuple[Any, float | None, int]] = {}
+        self._expiry_heap: list[tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+
+    def _purge_expired(self, now: float) -> None:
+        # Only entries that are actually due are popped: O(log n) each, no full scan.
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, sequence, key = heapq.heappop(self._expiry_heap)
+            current = self._values.get(key)
+            if current is not None and current[2] == sequence:
+                del self._values[key]
+
+    def _put(self, key: str, value: Any, ttl_seconds: float | None, now: float) -> None:
+        sequence = next(self._sequence)
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        self._values[key] = (value, expires_at, sequence)
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, sequence, key))
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            self._purge_expired(self._clock())
+            current = self._values.get(key)
+            return deepcopy(current[0]) if current else None
+
+    def set(self, key: str, value: dict[str, Any], ttl_seconds: float | None = None) -> None:
+        with self._lock:
+            now = self._clock()
+            self._purge_expired(now)
+            self._put(key, deepcopy(value), ttl_seconds, now)
+
+    def pop(self, key: str) -> dict[str, Any] | None:
+        with self._lock:
+            self._purge_expired(self._clock())
+            current = self._values.pop(key, None)
+            return current[0] if current else None
+
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        lease_key = f"lease:{name}"
+        with self._lock:
+            now = self._clock()
+            self._purge_expired(now)
+            current = self._values.get(lease_key)
+            if current and current[0] != holder:
+                return False
+            self._put(lease_key, holder, ttl_seconds, now)
+            return True
+
+    def release_lease(self, name: str, holder: str) -> None:
+        lease_key = f"lease:{name}"
+        with self._lock:
+            current = self._values.get(lease_key)
+            if current and current[0] == holder:
+                del self._values[lease_key]
+
+
+class DatabaseStateStore(StateStore):
+    """Backend on the `internal_chat_state` table, so every replica sees the same state."""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self._last_purge = 0.0
+
+    @staticmethod
+    def _live(now: datetime):
+        return or_(InternalChatStateEntry.expires_at.is_(None), InternalChatStateEntry.expires_at > now)
+
+    @staticmethod
+    def _expires_at(now: datetime, ttl_seconds: float | None) -> datetime | None:
+        return now + timedelta(seconds=ttl_seconds) if ttl_seconds is not None else None
+
+    def _maybe_purge(self, db: Session, now: datetime) -> None:
+        if monotonic_clock.monotonic() - self._last_purge < _DB_PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = monotonic_clock.monotonic()
+        # Range delete on the expires_at index.
+        db.execute(delete(InternalChatStateEntry).where(InternalChatStateEntry.expires_at <= now))
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self._session_factory() as db:
+            return (
+                db.query(InternalChatStateEntry.value)
+                .filter(InternalChatStateEntry.key == key, self._live(datetime.utcnow()))
+                .scalar()
+            )
+
+    def set(self, key: str, value: dict[str, Any], ttl_seconds: float | None = None) -> None:
+        now = datetime.utcnow()
+        values = {"value": value, "holder": None, "expires_at": self._expires_at(now, ttl_seconds), "updated_at": now}
+        with self._session_factory() as db:
+            self._maybe_purge(db, now)
+            updated = db.execute(
+                update(InternalChatStateEntry).where(InternalChatStateEntry.key == key).values(**values)
+            ).rowcount
+            if not updated:
+                db.add(InternalChatStateEntry(key=key, **values))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another replica inserted the key first; last writer wins.
+                db.rollback()
+                db.execute(update(InternalChatStateEntry).where(InternalChatStateEntry.key == key).values(**values))
+                db.commit()
+
+    def pop(self, key: str) -> dict[str, Any] | None:
+        with self._session_factory() as db:
+            # DELETE ... RETURNING, so two replicas cannot both take the same pending action.
+            row = db.execute(
+                delete(InternalChatStateEntry)
+                .where(InternalChatStateEntry.key == key, self._live(datetime.utcnow()))
+                .returning(InternalChatStateEntry.value)
+            ).first()
+            db.commit()
+            return row[0] if row else None
+
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        lease_key = f"lease:{name}"
+        now = datetime.utcnow()
+        expires_at = self._expires_at(now, ttl_seconds)
+        with self._session_factory() as db:
+            renewed = db.execute(
+                update(InternalChatStateEntry)
+                .where(
+                    InternalChatStateEntry.key == lease_key,
+                    or_(
+                        InternalChatStateEntry.holder == holder,
+                        InternalChatStateEntry.expires_at <= now,
+                    ),
+                )
+                .values(holder=holder, expires_at=expires_at, updated_at=now)
+            ).rowcount
+            if renewed:
+                db.commit()
+                return True
+            db.add(InternalChatStateEntry(key=lease_key, holder=holder, expires_at=expires_at, updated_at=now))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return False
+            return True
+
+    def release_lease(self, name: str, holder: str) -> None:
+        with self._session_factory() as db:
+            db.execute(
+                delete(InternalChatStateEntry).where(
+                    InternalChatStateEntry.key == f"lease:{name}",
+                    InternalChatStateEntry.holder == holder,
+                )
+            )
+            db.commit()
+
+
+def build_state_store() -> StateStore:
+    if INTERNAL_CHAT_STATE_BACKEND == "database":
+        return DatabaseStateStore()
+    if INTERNAL_CHAT_STATE_BACKEND != "memory":
+        logger.warning("Unknown INTERNAL_CHAT_STATE_BACKEND=%s; using in-memory state", INTERNAL_CHAT_STATE_BACKEND)
+    return MemoryStateStore()
+
+
+telegram_state = build_state_store()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time as monotonic_clock
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_BASE = (os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").strip().rstrip("/") or "https://api.telegram.org")
+TELEGRAM_GLOBAL_RATE_PER_SECOND = max(1, int(os.getenv("TELEGRAM_GLOBAL_RATE_PER_SECOND", "30")))
+TELEGRAM_CHAT_INTERVAL_SECONDS = max(0.0, float(os.getenv("TELEGRAM_CHAT_INTERVAL_SECONDS", "1.0")))
+TELEGRAM_GROUP_INTERVAL_SECONDS = max(0.0, float(os.getenv("TELEGRAM_GROUP_INTERVAL_SECONDS", "3.0")))
+TELEGRAM_MAX_RETRIES = max(0, int(os.getenv("TELEGRAM_MAX_RETRIES", "3")))
+TELEGRAM_MAX_QUEUE_WAIT_SECONDS = max(1.0, float(os.getenv("TELEGRAM_MAX_QUEUE_WAIT_SECONDS", "30")))
+
+# Methods that post into a chat count against Telegram's per-chat and global send limits.
+_CHAT_SEND_METHODS = {
+    "sendMessage",
+    "sendPhoto",
+    "sendDocument",
+    "sendAudio",
+    "sendVoice",
+    "editMessageText",
+    "editMessageReplyMarkup",
+}
+_CHAT_STATE_PRUNE_THRESHOLD = 5_000
+
+
+class TelegramSender:
+    """
+    Bot API client shared by every Telegram call in the process.
+
+    Calls run on one background event loop over a keep-alive `httpx.AsyncClient`, so
+    synchronous callers (request handlers, the reminder worker) can either wait for a
+    result with `call` or fire off sends with `submit` and move on. Chat sends are paced
+    to the global per-second budget and a minimum interval per chat (longer for groups);
+    a 429 pauses that chat (or everything, for non-chat methods) for `retry_after`
+    seconds before retrying.
+    """
+
+    def __init__(
+        self,
+        api_base: str = TELEGRAM_API_BASE,
+        rate_per_second: int = TELEGRAM_GLOBAL_RATE_PER_SECOND,
+        chat_interval_seconds: float = TELEGRAM_CHAT_INTERVAL_SECONDS,
+        group_interval_seconds: float = TELEGRAM_GROUP_INTERVAL_SECONDS,
+        max_retries: int = TELEGRAM_MAX_RETRIES,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.api_base = api_base
+        self.rate_per_second = rate_per_second
+        self.chat_interval_seconds = chat_interval_seconds
+        self.group_interval_seconds = group_interval_seconds
+        self.max_retries = max_retries
+        self._transport = transport
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._client: httpx.AsyncClient | None = None
+        # Touched only from the loop thread.
+        self._window: deque[float] = deque()
+        self._chat_next: dict[str, float] = {}
+        self._paused_until = 0.0
+        self.stats = {"sent": 0, "failed": 0, "rate_limited": 0}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop and self._thread and self._thread.is_alive():
+                return self._loop
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run() -> None:
+                asyncio.set_event_loop(loop)
+                self._client = httpx.AsyncClient(
+                    base_url=self.api_base,
+                    transport=self._transport,
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+                )
+                ready.set()
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="telegram-sender", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+            return loop
+
+    def submit(self, token: str, method: str, payload: dict, timeout: float = 10.0) -> Future:
+        """Schedule a Bot API call and return a future resolving to Telegram's JSON reply."""
+        if not token:
+            future: Future = Future()
+            future.set_result({"ok": False, "description": "Missing telegram bot token"})
+            return future
+        return asyncio.run_coroutine_threadsafe(self._request(token, method, payload, timeout), self._ensure_loop())
+
+    def call(self, token: str, method: str, payload: dict, timeout: float = 10.0) -> dict:
+        future = self.submit(token, method, payload, timeout)
+        try:
+            return future.result(timeout=timeout + TELEGRAM_MAX_QUEUE_WAIT_SECONDS)
+        except FutureTimeoutError:
+            future.cancel()
+            return {"ok": False, "description": f"Telegram {method} timed out"}
+
+    def _chat_interval(self, chat_id: str) -> float:
+        return self.group_interval_seconds if chat_id.startswith("-") else self.chat_interval_seconds
+
+    async def _acquire(self, chat_id: str | None) -> None:
+        while True:
+            now = monotonic_clock.monotonic()
+            delay = self._paused_until - now
+            if chat_id is not None:
+                delay = max(delay, self._chat_next.get(chat_id, 0.0) - now)
+            if delay <= 0:
+                while self._window and now - self._window[0] >= 1.0:
+                    self._window.popleft()
+                if len(self._window) < self.rate_per_second:
+                    # No await between the checks and the reservation, so loop tasks cannot interleave here.
+                    self._window.append(now)
+                    if chat_id is not None:
+                        self._chat_next[chat_id] = now + self._chat_interval(chat_id)
+                        if len(self._chat_next) > _CHAT_STATE_PRUNE_THRESHOLD:
+                            self._chat_next = {key: value for key, value in self._chat_next.items() if value > now}
+                    return
+                delay = 1.0 - (now - self._window[0])
+            await asyncio.sleep(delay)
+
+    async def _request(self, token: str, method: str, payload: dict, timeout: float) -> dict:
+        chat_id = str(payload.get("chat_id")) if method in _CHAT_SEND_METHODS and payload.get("chat_id") is not None else None
+        for attempt in range(self.max_retries + 1):
+            if chat_id is not None:
+                await self._acquire(chat_id)
+            try:
+                response = await self._client.post(f"/bot{token}/{method}", json=payload, timeout=timeout)
+                parsed = response.json()
+            except (httpx.HTTPError, ValueError) as exc:
+                self.stats["failed"] += 1
+                return {"ok": False, "description": str(exc)}
+            if not isinstance(parsed, dict):
+                self.stats["failed"] += 1
+                return {"ok": False, "description": "Invalid Telegram response"}
+            if response.status_code == 429 or parsed.get("error_code") == 429:
+                self.stats["rate_limited"] += 1
+                retry_after = float((parsed.get("parameters") or {}).get("retry_after") or 1)
+                resume_at = monotonic_clock.monotonic() + retry_after
+                if chat_id is not None:
+                    self._chat_next[chat_id] = max(self._chat_next.get(chat_id, 0.0), resume_at)
+                else:
+                    self._paused_until = max(self._paused_until, resume_at)
+                if attempt < self.max_retries:
+                    logger.info("Telegram %s throttled; retrying in %.1fs", method, retry_after)
+                    if chat_id is None:
+                        await asyncio.sleep(retry_after)
+                    continue
+            self.stats["sent" if parsed.get("ok") else "failed"] += 1
+            return parsed
+        return parsed
+
+    def close(self) -> None:
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = None
+            self._client = None
+        if not loop:
+            return
+        if client:
+            try:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=3)
+            except Exception:
+                pass
+        loop.call_soon_threadsafe(loop.stop)
+
+
+telegram_sender = TelegramSender()
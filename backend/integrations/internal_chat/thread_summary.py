@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import event, func, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from database import models
+
+_PENDING_KEY = "internal_chat_thread_summary_expire"
+
+_threads = models.InternalChatThread.__table__
+_participants = models.InternalChatParticipant.__table__
+_messages = models.InternalChatMessage.__table__
+
+_THREAD_SUMMARY_ATTRIBUTES = ["last_message_id", "last_message_preview", "last_sender", "last_message_at", "updated_at"]
+_PARTICIPANT_SUMMARY_ATTRIBUTES = ["unread_count", "last_read_message_id", "last_read_at", "thread_updated_at"]
+
+
+def message_preview(body: str | None) -> str:
+    text = (body or "").strip()
+    return f"{text[:117]}..." if len(text) > 120 else text
+
+
+def _refresh_last_message(connection: Connection, thread_id: int) -> None:
+    latest = connection.execute(
+        select(_messages.c.id, _messages.c.body, _messages.c.sender_name, _messages.c.created_at)
+        .where(_messages.c.thread_id == thread_id)
+        .order_by(_messages.c.id.desc())
+        .limit(1)
+    ).first()
+    connection.execute(
+        update(_threads)
+        .where(_threads.c.id == thread_id)
+        .values(
+            last_message_id=latest.id if latest else None,
+            last_message_preview=message_preview(latest.body) if latest else None,
+            last_sender=latest.sender_name if latest else None,
+            last_message_at=latest.created_at if latest else None,
+        )
+    )
+
+
+def _sync_thread_updated_at(connection: Connection, thread_ids: set[int]) -> None:
+    if not thread_ids:
+        return
+    connection.execute(
+        update(_participants)
+        .where(_participants.c.thread_id.in_(sorted(thread_ids)))
+        .values(
+            thread_updated_at=select(_threads.c.updated_at)
+            .where(_threads.c.id == _participants.c.thread_id)
+            .scalar_subquery()
+        )
+    )
+
+
+def _record_new_message(connection: Connection, values: dict[str, Any], now_utc: datetime) -> None:
+    thread_id, message_id = values["thread_id"], values["id"]
+    sender_user_id = values.get("sender_user_id") or ""
+    connection.execute(
+        update(_threads)
+        .where(
+            _threads.c.id == thread_id,
+            or_(_threads.c.last_message_id.is_(None), _threads.c.last_message_id < message_id),
+        )
+        .values(
+            last_message_id=message_id,
+            last_message_preview=message_preview(values.get("body")),
+            last_sender=values.get("sender_name") or "User",
+            last_message_at=select(_messages.c.created_at).where(_messages.c.id == message_id).scalar_subquery(),
+            updated_at=now_utc,
+        )
+    )
+    connection.execute(
+        update(_participants)
+        .where(_participants.c.thread_id == thread_id, _participants.c.user_id != sender_user_id)
+        .values(unread_count=_participants.c.unread_count + 1)
+    )
+    # Sending implies having read everything before it.
+    connection.execute(
+        update(_participants)
+        .where(_participants.c.thread_id == thread_id, _participants.c.user_id == sender_user_id)
+        .values(unread_count=0, last_read_message_id=message_id, last_read_at=now_utc)
+    )
+
+
+def _record_deleted_message(connection: Connection, values: dict[str, Any]) -> None:
+    connection.execute(
+        update(_participants)
+        .where(
+            _participants.c.thread_id == values["thread_id"],
+            _participants.c.user_id != (values.get("sender_user_id") or ""),
+            _participants.c.unread_count > 0,
+            or_(
+                _participants.c.last_read_message_id.is_(None),
+                _participants.c.last_read_message_id < values["id"],
+            ),
+        )
+        .values(unread_count=_participants.c.unread_count - 1)
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_thread_summaries(session: Session, flush_context) -> None:
+    """
+    Keep the denormalized thread and participant summaries in the same transaction as the
+    message writes, so listing threads never has to scan messages.
+    """
+    created: list[dict[str, Any]] = []
+    deleted: list[dict[str, Any]] = []
+    touched: set[int] = set()
+    for row in session.new:
+        if isinstance(row, models.InternalChatMessage):
+            created.append(row.__dict__)
+        elif isinstance(row, models.InternalChatParticipant):
+            touched.add(row.__dict__["thread_id"])
+    for row in session.deleted:
+        if isinstance(row, models.InternalChatMessage):
+            deleted.append(row.__dict__)
+    for row in session.dirty:
+        if isinstance(row, models.InternalChatThread) and session.is_modified(row, include_collections=False):
+            touched.add(row.__dict__["id"])
+    if not (created or deleted or touched):
+        return
+
+    connection = session.connection()
+    now_utc = datetime.utcnow()
+    for values in sorted(created, key=lambda item: item["id"]):
+        _record_new_message(connection, values, now_utc)
+        touched.add(values["thread_id"])
+
+    deleted_by_thread: dict[int, set[int]] = {}
+    for values in deleted:
+        _record_deleted_message(connection, values)
+        deleted_by_thread.setdefault(values["thread_id"], set()).add(values["id"])
+    if deleted_by_thread:
+        current = connection.execute(
+            select(_threads.c.id, _threads.c.last_message_id).where(_threads.c.id.in_(sorted(deleted_by_thread)))
+        ).all()
+        for thread_id, last_message_id in current:
+            if last_message_id in deleted_by_thread[thread_id]:
+                _refresh_last_message(connection, thread_id)
+        touched.update(deleted_by_thread)
+
+    _sync_thread_updated_at(connection, touched)
+    session.info.setdefault(_PENDING_KEY, set()).update(touched)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_thread_summaries(session: Session, flush_context) -> None:
+    thread_ids = session.info.pop(_PENDING_KEY, None)
+    if not thread_ids:
+        return
+    # The summaries were written with Core statements; drop any stale copies already loaded.
+    for row in list(session.identity_map.values()):
+        if isinstance(row, models.InternalChatThread) and row.__dict__.get("id") in thread_ids:
+            session.expire(row, _THREAD_SUMMARY_ATTRIBUTES)
+        elif isinstance(row, models.InternalChatParticipant) and row.__dict__.get("thread_id") in thread_ids:
+            session.expire(row, _PARTICIPANT_SUMMARY_ATTRIBUTES)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_thread_summaries(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def reset_thread_summary(db: Session, thread_id: int) -> None:
+    """Bulk message deletes bypass the flush hooks, so they rebuild the summary explicitly."""
+    connection = db.connection()
+    _refresh_last_message(connection, thread_id)
+    connection.execute(
+        update(_participants)
+        .where(_participants.c.thread_id == thread_id)
+        .values(
+            unread_count=select(func.count(_messages.c.id))
+            .where(
+                _messages.c.thread_id == thread_id,
+                _messages.c.sender_user_id != _participants.c.user_id,
+                _messages.c.id > func.coalesce(_participants.c.last_read_message_id, 0),
+            )
+            .scalar_subquery()
+        )
+    )
+    _sync_thread_updated_at(connection, {thread_id})
+    _expire_loaded(db, {thread_id})
+
+
+def mark_thread_read(db: Session, thread_id: int, user_id: str) -> None:
+    connection = db.connection()
+    connection.execute(
+        update(_participants)
+        .where(_participants.c.thread_id == thread_id, _participants.c.user_id == user_id)
+        .values(
+            unread_count=0,
+            last_read_message_id=select(_threads.c.last_message_id).where(_threads.c.id == thread_id).scalar_subquery(),
+            last_read_at=datetime.utcnow(),
+        )
+    )
+    _expire_loaded(db, {thread_id})
+
+
+def _expire_loaded(db: Session, thread_ids: set[int]) -> None:
+    db.info.setdefault(_PENDING_KEY, set()).update(thread_ids)
+    _expire_thread_summaries(db, None)
@@ -18,6 +18,7 @@ from integrations.onec.db_connector import OneCDatabaseConnector
 from integrations.onec.file_parser import OneCFileParser
 from integrations.onec.http_client import OneCHTTPClient
 from integrations.onec.normalizer import OneCNormalizer
+from integrations.onec.summary import add_record, empty_summary
 
 
 PARSER = OneCFileParser()
@@ -84,6 +85,7 @@ def _process_import_job(db: Session, job_id: int) -> None:
     period_dates = []
     row_failures = 0
     anomaly_count = 0
+    summary = empty_summary()
     for raw_row, normalized in zip(parsed.rows, normalized_rows):
         try:
             deduped = asyncio.run(NORMALIZER.deduplicate([normalized], existing_hashes, record_type=_record_type_for_report(parsed.report_type)))
@@ -98,13 +100,14 @@ def _process_import_job(db: Session, job_id: int) -> None:
                 period_dates.append(raw_date.date())
             elif hasattr(raw_date, "year"):
                 period_dates.append(raw_date)
+            normalized_data = _json_safe(normalized_payload)
             db.add(
                 OneCRecord(
                     import_job_id=job.id,
                     company_id=job.company_id,
                     record_type=_record_type_for_report(parsed.report_type),
                     raw_data=_json_safe(raw_row),
-                    normalized_data=_json_safe(normalized_payload),
+                    normalized_data=normalized_data,
                     benela_table=_benela_table_for_record_type(_record_type_for_report(parsed.report_type)),
                     import_hash=import_hash,
                     row_status=row_status,
@@ -112,6 +115,7 @@ def _process_import_job(db: Session, job_id: int) -> None:
             )
             if not is_duplicate:
                 existing_hashes.add(import_hash)
+                add_record(summary, _record_type_for_report(parsed.report_type), normalized_data)
         except Exception as exc:
             row_failures += 1
             anomaly_count += 1
@@ -135,6 +139,7 @@ def _process_import_job(db: Session, job_id: int) -> None:
     job.records_failed = int(db.query(OneCRecord).filter(OneCRecord.import_job_id == job.id, OneCRecord.row_status == "failed").count()) + row_failures
     job.records_imported = 0
     job.anomaly_count = anomaly_count
+    job.ai_summary = summary
     job.period_start = min(period_dates) if period_dates else None
     job.period_end = max(period_dates) if period_dates else None
     job.status = "completed"
@@ -272,6 +277,7 @@ async def _run_connection_sync(db: Session, connection: OneCConnection) -> int:
     normalized_rows = _normalize_rows(report_type, rows, company_id=connection.company_id)
     existing_hashes = {value for (value,) in db.query(OneCRecord.import_hash).filter(OneCRecord.company_id == connection.company_id).all()}
     created = 0
+    summary = empty_summary()
     for raw_row, normalized in zip(rows, normalized_rows):
         deduped = await NORMALIZER.deduplicate([normalized], existing_hashes, record_type=_record_type_for_report(report_type))
         normalized_payload = deduped[0]
@@ -290,6 +296,7 @@ async def _run_connection_sync(db: Session, connection: OneCConnection) -> int:
         )
         db.add(record)
         existing_hashes.add(import_hash)
+        add_record(summary, record.record_type, record.normalized_data)
         created += 1
 
     job.report_type = report_type
@@ -297,6 +304,7 @@ async def _run_connection_sync(db: Session, connection: OneCConnection) -> int:
     job.records_imported = 0
     job.records_skipped = max(0, len(rows) - created)
     job.records_failed = 0
+    job.ai_summary = summary
     job.status = "completed"
     job.completed_at = _utcnow()
     imported, skipped, failed = confirm_import_job(db, job.id)
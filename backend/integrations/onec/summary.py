@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+from sqlalchemy.orm import Session
+
+from database.onec_models import OneCImportJob, OneCRecord
+
+# Bump when the summary shape changes; older summaries are rebuilt from their records.
+SUMMARY_VERSION = 1
+COUNTED_ROW_STATUSES = ("ready", "imported")
+_RECORD_TYPES = ("trial_balance", "transaction", "invoice", "inventory_item", "employee")
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def empty_summary() -> dict[str, Any]:
+    return {
+        "version": SUMMARY_VERSION,
+        "counts": {record_type: 0 for record_type in _RECORD_TYPES},
+        "cash_total": 0.0,
+        "receivables_total": 0.0,
+        "payables_total": 0.0,
+        "revenue_total": 0.0,
+        "payroll_total": 0.0,
+        "low_stock": 0,
+        "negative_stock": 0,
+        "round_transactions": 0,
+        "transactions_without_counterparty": 0,
+        "inflow_total": 0.0,
+        "inflow_count": 0,
+        "outflow_total": 0.0,
+        "outflow_count": 0,
+        "revenue_by_customer": {},
+    }
+
+
+def add_record(summary: dict[str, Any], record_type: str, data: dict[str, Any] | None) -> None:
+    """Fold one counted record into `summary`; the arithmetic matches the old per-call scans."""
+    data = data or {}
+    counts = summary["counts"]
+    if record_type in counts:
+        counts[record_type] += 1
+
+    if record_type == "trial_balance":
+        account = str(data.get("account") or "")
+        balance = _number(data.get("closing_balance"))
+        if account.startswith(("50", "51")):
+            summary["cash_total"] += balance
+        elif account.startswith("40"):
+            summary["receivables_total"] += balance
+        elif account.startswith("60"):
+            summary["payables_total"] += balance
+    elif record_type == "invoice":
+        amount = _number(data.get("amount"))
+        customer = data.get("client_name") or "Unknown"
+        summary["revenue_total"] += amount
+        summary["revenue_by_customer"][customer] = summary["revenue_by_customer"].get(customer, 0.0) + amount
+    elif record_type == "employee":
+        summary["payroll_total"] += _number(data.get("net_pay") or data.get("salary"))
+    elif record_type == "inventory_item":
+        closing_stock = _number(data.get("closing_stock"))
+        if closing_stock <= 0:
+            summary["low_stock"] += 1
+        if closing_stock < 0:
+            summary["negative_stock"] += 1
+    elif record_type == "transaction":
+        amount = _number(data.get("amount"))
+        if amount and abs(amount) % 1000 == 0:
+            summary["round_transactions"] += 1
+        if not data.get("source_counterparty") and not data.get("counterparty"):
+            summary["transactions_without_counterparty"] += 1
+        if data.get("type") == "income":
+            summary["inflow_total"] += amount
+            summary["inflow_count"] += 1
+        elif data.get("type") == "expense":
+            summary["outflow_total"] += amount
+            summary["outflow_count"] += 1
+
+
+def merge_summaries(summaries: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    merged = empty_summary()
+    for summary in summaries:
+        for key, value in summary.items():
+            if key == "version":
+                continue
+            if key in {"counts", "revenue_by_customer"}:
+                for name, amount in value.items():
+                    merged[key][name] = merged[key].get(name, 0) + amount
+            else:
+                merged[key] += value
+    return merged
+
+
+def summarize_job_records(db: Session, job_id: int) -> dict[str, Any]:
+    """Build a job's summary from its stored records; used for jobs imported before summaries existed."""
+    summary = empty_summary()
+    rows = db.query(OneCRecord.record_type, OneCRecord.normalized_data).filter(
+        OneCRecord.import_job_id == job_id,
+        OneCRecord.row_status.in_(COUNTED_ROW_STATUSES),
+    )
+    for record_type, data in rows.yield_per(1000):
+        add_record(summary, record_type, data)
+    return summary
+
+
+def company_onec_summary(db: Session, company_id: int) -> dict[str, Any] | None:
+    """
+    Totals over every counted 1C record of a company, read from per-job summaries.
+
+    Each import job stores its summary when it is parsed, so an agent call reads one small
+    row per job instead of the records themselves. Returns None when nothing is imported.
+    """
+    jobs = (
+        db.query(OneCImportJob.id, OneCImportJob.ai_summary)
+        .filter(OneCImportJob.company_id == company_id, OneCImportJob.status == "completed")
+        .all()
+    )
+    summaries: list[dict[str, Any]] = []
+    backfilled = False
+    for job_id, summary in jobs:
+        if not summary or summary.get("version") != SUMMARY_VERSION:
+            summary = summarize_job_records(db, job_id)
+            db.query(OneCImportJob).filter(OneCImportJob.id == job_id).update(
+                {"ai_summary": summary}, synchronize_session=False
+            )
+            backfilled = True
+        summaries.append(summary)
+    if backfilled:
+        db.commit()
+    merged = merge_summaries(summaries)
+    if not any(merged["counts"].values()):
+        return None
+    return merged
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTION_MAX_CONCURRENCY = max(1, int(os.getenv("TRANSCRIPTION_MAX_CONCURRENCY", "3")))
+TRANSCRIPTION_CACHE_SIZE = max(0, int(os.getenv("TRANSCRIPTION_CACHE_SIZE", "2000")))
+
+
+class TranscriptionQueue:
+    """
+    Worker pool for speech-to-text calls shared by internal chat and the agents API.
+
+    At most `max_workers` provider calls run at once. Jobs are keyed by the SHA-256 of the
+    audio: a transcript already in the cache is returned without a call, and a second
+    submission of audio that is still being transcribed joins the running job.
+    """
+
+    def __init__(self, max_workers: int = TRANSCRIPTION_MAX_CONCURRENCY, cache_size: int = TRANSCRIPTION_CACHE_SIZE):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._inflight: dict[str, Future] = {}
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._stats = {"submitted": 0, "cache_hits": 0, "joined": 0, "completed": 0, "failed": 0}
+
+    def cached(self, content_hash: str) -> str | None:
+        with self._lock:
+            text = self._cache.get(content_hash)
+            if text is not None:
+                self._cache.move_to_end(content_hash)
+                self._stats["cache_hits"] += 1
+            return text
+
+    def remember(self, content_hash: str, text: str) -> None:
+        if not text or not self.cache_size:
+            return
+        with self._lock:
+            self._remember_locked(content_hash, text)
+
+    def _remember_locked(self, content_hash: str, text: str) -> None:
+        self._cache[content_hash] = text
+        self._cache.move_to_end(content_hash)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def submit(self, content_hash: str, transcribe: Callable[[], str]) -> Future:
+        """Return a future for the transcript of the audio identified by `content_hash`."""
+        with self._lock:
+            text = self._cache.get(content_hash)
+            if text is not None:
+                self._cache.move_to_end(content_hash)
+                self._stats["cache_hits"] += 1
+                future: Future = Future()
+                future.set_result(text)
+                return future
+            running = self._inflight.get(content_hash)
+            if running is not None:
+                self._stats["joined"] += 1
+                return running
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcription")
+            self._stats["submitted"] += 1
+            future = self._executor.submit(self._run, content_hash, transcribe)
+            self._inflight[content_hash] = future
+            return future
+
+    def _run(self, content_hash: str, transcribe: Callable[[], str]) -> str:
+        try:
+            text = (transcribe() or "").strip()
+        except BaseException:
+            with self._lock:
+                self._inflight.pop(content_hash, None)
+                self._stats["failed"] += 1
+            raise
+        with self._lock:
+            # Empty results are not cached: they can come from a provider error as well as silence.
+            if text and self.cache_size:
+                self._remember_locked(content_hash, text)
+            self._inflight.pop(content_hash, None)
+            self._stats["completed"] += 1
+        return text
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "max_workers": self.max_workers,
+                "in_flight": len(self._inflight),
+                "cached": len(self._cache),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+transcription_queue = TranscriptionQueue()
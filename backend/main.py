@@ -1,9 +1,11 @@
 import logging
 import os
+import socket
 import time
 import threading
 from datetime import date, datetime, timedelta
 from typing import Callable
+from uuid import uuid4
 from zoneinfo import ZoneInfo
 
 from fastapi import Depends, FastAPI, Request
@@ -13,6 +15,9 @@ from sqlalchemy import text, inspect, func
 from sqlalchemy.exc import DBAPIError, SQLAlchemyError, TimeoutError as SATimeoutError
 from core.auth import require_admin_user, require_authenticated_user, require_client_user
 from core.config import settings
+from agents.context_pool import context_fetch_pool
+from agents.data_fetcher import warm_context_snapshots
+from agents.provider_clients import provider_clients
 from api.agents import router as agents_router
 from api.finance import router as finance_router
 from api.sales import router as sales_router
@@ -32,10 +37,24 @@ from api.chat import router as chat_router
 from api.notifications import router as notifications_router
 from api.client_account import router as client_account_router
 from api.internal_chat import router as internal_chat_router
-from api.internal_chat import dispatch_due_reminders_job, process_telegram_bot_updates_job
+from api.internal_chat import telegram_webhook_router
+from api.internal_chat import (
+    TELEGRAM_POLLER_LEASE,
+    dispatch_due_reminders_job,
+    next_reminder_due_at,
+    recover_pending_transcriptions,
+    run_telegram_poll_cycle,
+)
 from api.onec import router as onec_router
 from api.platform_content import router as platform_content_router
+from integrations.ai_trainer.ingestion import ai_trainer_ingestion
 from integrations.attendance.attendance_service import attendance_service
+from integrations.internal_chat.judith_queue import judith_queue
+from integrations.internal_chat.reminders import reminder_wakeup
+from integrations.internal_chat.state_store import DatabaseStateStore, telegram_state
+from integrations.internal_chat.thread_summary import message_preview
+from integrations.internal_chat.telegram_sender import telegram_sender
+from integrations.transcription.service import transcription_queue
 from integrations.onec.scheduler import sync_all_active_connections
 from database.connection import Base, engine, SessionLocal
 from database.models import (
@@ -65,10 +84,12 @@ from database.models import (
     InternalChatParticipant,
     InternalChatMessage,
     InternalChatAttachment,
+    InternalChatBlob,
     InternalChatTask,
     InternalChatTaskReminder,
     InternalChatTelegramLink,
     InternalChatZoomLink,
+    InternalChatStateEntry,
     ClientWorkspaceAccount,
     ClientBusinessDocument,
     ClientPlatformReport,
@@ -78,6 +99,7 @@ from database.models import (
     AITrainerProfile,
     AITrainerSource,
     AITrainerChunk,
+    AITrainerPosting,
     PlatformSettings,
     PlatformAboutPage,
     PlatformBlogPost,
@@ -91,11 +113,19 @@ _db_bootstrap_ok = False
 _attendance_schema_ready = False
 _reminder_worker_thread = None
 _reminder_worker_stop_event = threading.Event()
+_reminder_dispatch_thread = None
+_reminder_dispatch_stop_event = threading.Event()
 _onec_sync_worker_thread = None
 _onec_sync_worker_stop_event = threading.Event()
 _attendance_worker_thread = None
 _attendance_worker_stop_event = threading.Event()
-_telegram_updates_offset = None
+# Always database-backed: an in-memory key would be gone after a restart and widen the
+# absent backfill window again.
+_attendance_scheduler_state = DatabaseStateStore()
+ATTENDANCE_ABSENT_CLOSE_STATE_KEY = "attendance:last_absent_close"
+_context_warmer_thread = None
+_context_warmer_stop_event = threading.Event()
+_worker_instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
 _maintenance_state_lock = threading.Lock()
 _maintenance_state_checked_at = 0.0
 _maintenance_state_cached = False
@@ -275,10 +305,105 @@ def _ensure_internal_chat_schema():
     InternalChatParticipant.__table__.create(bind=engine, checkfirst=True)
     InternalChatMessage.__table__.create(bind=engine, checkfirst=True)
     InternalChatAttachment.__table__.create(bind=engine, checkfirst=True)
+    InternalChatBlob.__table__.create(bind=engine, checkfirst=True)
     InternalChatTask.__table__.create(bind=engine, checkfirst=True)
     InternalChatTaskReminder.__table__.create(bind=engine, checkfirst=True)
     InternalChatTelegramLink.__table__.create(bind=engine, checkfirst=True)
     InternalChatZoomLink.__table__.create(bind=engine, checkfirst=True)
+    InternalChatStateEntry.__table__.create(bind=engine, checkfirst=True)
+
+    column_statements = {
+        "internal_chat_threads": {
+            "last_message_id": "ALTER TABLE internal_chat_threads ADD COLUMN last_message_id INTEGER",
+            "last_message_preview": "ALTER TABLE internal_chat_threads ADD COLUMN last_message_preview VARCHAR(160)",
+            "last_sender": "ALTER TABLE internal_chat_threads ADD COLUMN last_sender VARCHAR(120)",
+            "last_message_at": "ALTER TABLE internal_chat_threads ADD COLUMN last_message_at TIMESTAMP",
+        },
+        "internal_chat_participants": {
+            "last_read_message_id": "ALTER TABLE internal_chat_participants ADD COLUMN last_read_message_id INTEGER",
+            "unread_count": "ALTER TABLE internal_chat_participants ADD COLUMN unread_count INTEGER NOT NULL DEFAULT 0",
+            "thread_updated_at": "ALTER TABLE internal_chat_participants ADD COLUMN thread_updated_at TIMESTAMP",
+        },
+        "internal_chat_attachments": {
+            "content_sha256": "ALTER TABLE internal_chat_attachments ADD COLUMN content_sha256 VARCHAR(64)",
+            "transcription_status": "ALTER TABLE internal_chat_attachments ADD COLUMN transcription_status VARCHAR(20)",
+            "transcript": "ALTER TABLE internal_chat_attachments ADD COLUMN transcript TEXT",
+        },
+    }
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        for table_name, statements in column_statements.items():
+            if dialect == "postgresql":
+                for statement in statements.values():
+                    conn.execute(text(statement.replace(" ADD COLUMN ", " ADD COLUMN IF NOT EXISTS ", 1)))
+                continue
+            if dialect == "sqlite":
+                existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table_name})")).fetchall()}
+            else:
+                existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+            for column_name, statement in statements.items():
+                if column_name not in existing:
+                    conn.execute(text(statement))
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_internal_chat_messages_thread_id_id "
+                "ON internal_chat_messages (thread_id, id)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_internal_chat_participants_user_id_thread_updated_at "
+                "ON internal_chat_participants (user_id, thread_updated_at)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_internal_chat_attachments_storage_key "
+                "ON internal_chat_attachments (storage_key)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_internal_chat_attachments_content_sha256 "
+                "ON internal_chat_attachments (content_sha256)"
+            )
+        )
+        # One-time backfill for rows written before the summary columns existed.
+        conn.execute(
+            text(
+                "UPDATE internal_chat_threads SET last_message_id = "
+                "(SELECT MAX(m.id) FROM internal_chat_messages m WHERE m.thread_id = internal_chat_threads.id) "
+                "WHERE last_message_id IS NULL"
+            )
+        )
+        # Previews go through message_preview so backfilled rows match the ones written live.
+        preview_rows = conn.execute(
+            text(
+                "SELECT t.id, m.body FROM internal_chat_threads t "
+                "JOIN internal_chat_messages m ON m.id = t.last_message_id "
+                "WHERE t.last_message_at IS NULL"
+            )
+        ).fetchall()
+        if preview_rows:
+            conn.execute(
+                text("UPDATE internal_chat_threads SET last_message_preview = :preview WHERE id = :thread_id"),
+                [{"thread_id": thread_id, "preview": message_preview(body)} for thread_id, body in preview_rows],
+            )
+        conn.execute(
+            text(
+                "UPDATE internal_chat_threads SET "
+                "last_sender = (SELECT m.sender_name FROM internal_chat_messages m WHERE m.id = internal_chat_threads.last_message_id), "
+                "last_message_at = (SELECT m.created_at FROM internal_chat_messages m WHERE m.id = internal_chat_threads.last_message_id) "
+                "WHERE last_message_id IS NOT NULL AND last_message_at IS NULL"
+            )
+        )
+        conn.execute(
+            text(
+                "UPDATE internal_chat_participants SET thread_updated_at = "
+                "(SELECT t.updated_at FROM internal_chat_threads t WHERE t.id = internal_chat_participants.thread_id) "
+                "WHERE thread_updated_at IS NULL"
+            )
+        )
 
 
 def _should_auto_create_ai_trainer_tables() -> bool:
@@ -293,6 +418,32 @@ def _ensure_ai_trainer_schema():
     AITrainerProfile.__table__.create(bind=engine, checkfirst=True)
     AITrainerSource.__table__.create(bind=engine, checkfirst=True)
     AITrainerChunk.__table__.create(bind=engine, checkfirst=True)
+    AITrainerPosting.__table__.create(bind=engine, checkfirst=True)
+
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "postgresql":
+            conn.execute(text("ALTER TABLE ai_trainer_chunks ADD COLUMN IF NOT EXISTS term_count INTEGER"))
+        elif dialect == "sqlite":
+            chunk_columns = {row[1] for row in conn.execute(text("PRAGMA table_info(ai_trainer_chunks)")).fetchall()}
+            if "term_count" not in chunk_columns:
+                conn.execute(text("ALTER TABLE ai_trainer_chunks ADD COLUMN term_count INTEGER"))
+        else:
+            inspector = inspect(conn)
+            chunk_columns = {column["name"] for column in inspector.get_columns("ai_trainer_chunks")}
+            if "term_count" not in chunk_columns:
+                conn.execute(text("ALTER TABLE ai_trainer_chunks ADD COLUMN term_count INTEGER"))
+
+    # Chunks stored before the inverted index existed get their postings once.
+    from database.admin_crud import backfill_ai_trainer_index
+
+    session = SessionLocal()
+    try:
+        indexed = backfill_ai_trainer_index(session)
+        if indexed:
+            logger.info("Indexed %s AI trainer chunks for retrieval", indexed)
+    finally:
+        session.close()
 
 
 def _should_auto_create_client_account_tables() -> bool:
@@ -377,21 +528,28 @@ def _ensure_onec_schema():
         if dialect == "postgresql":
             conn.execute(text("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS company_id INTEGER"))
             conn.execute(text("ALTER TABLE invoices ADD COLUMN IF NOT EXISTS company_id INTEGER"))
+            conn.execute(text("ALTER TABLE onec_import_jobs ADD COLUMN IF NOT EXISTS ai_summary JSON"))
         elif dialect == "sqlite":
             transaction_columns = {row[1] for row in conn.execute(text("PRAGMA table_info(transactions)")).fetchall()}
             invoice_columns = {row[1] for row in conn.execute(text("PRAGMA table_info(invoices)")).fetchall()}
+            job_columns = {row[1] for row in conn.execute(text("PRAGMA table_info(onec_import_jobs)")).fetchall()}
             if "company_id" not in transaction_columns:
                 conn.execute(text("ALTER TABLE transactions ADD COLUMN company_id INTEGER"))
             if "company_id" not in invoice_columns:
                 conn.execute(text("ALTER TABLE invoices ADD COLUMN company_id INTEGER"))
+            if "ai_summary" not in job_columns:
+                conn.execute(text("ALTER TABLE onec_import_jobs ADD COLUMN ai_summary JSON"))
         else:
             inspector = inspect(conn)
             transaction_columns = {column["name"] for column in inspector.get_columns("transactions")}
             invoice_columns = {column["name"] for column in inspector.get_columns("invoices")}
+            job_columns = {column["name"] for column in inspector.get_columns("onec_import_jobs")}
             if "company_id" not in transaction_columns:
                 conn.execute(text("ALTER TABLE transactions ADD COLUMN company_id INTEGER"))
             if "company_id" not in invoice_columns:
                 conn.execute(text("ALTER TABLE invoices ADD COLUMN company_id INTEGER"))
+            if "ai_summary" not in job_columns:
+                conn.execute(text("ALTER TABLE onec_import_jobs ADD COLUMN ai_summary JSON"))
 
 
 def _should_auto_create_attendance_tables() -> bool:
@@ -466,6 +624,8 @@ def _ensure_attendance_schema():
         LeaveRequest.__table__,
         AttendanceRecord.__table__,
         PayrollRecord.__table__,
+        # The scheduler keeps its last closed day there across restarts.
+        InternalChatStateEntry.__table__,
     ]
     Base.metadata.create_all(bind=engine, tables=attendance_tables, checkfirst=True)
 
@@ -474,6 +634,7 @@ def _ensure_attendance_schema():
         if dialect == "postgresql":
             conn.execute(text("ALTER TABLE employees ADD COLUMN IF NOT EXISTS company_id INTEGER"))
             conn.execute(text("ALTER TABLE employees ADD COLUMN IF NOT EXISTS employee_pin VARCHAR(255)"))
+            conn.execute(text("ALTER TABLE employees ADD COLUMN IF NOT EXISTS employee_pin_lookup VARCHAR(64)"))
             conn.execute(text("ALTER TABLE employees ADD COLUMN IF NOT EXISTS shift_start TIME"))
             conn.execute(text("ALTER TABLE employees ADD COLUMN IF NOT EXISTS shift_end TIME"))
             conn.execute(text("ALTER TABLE employees ADD COLUMN IF NOT EXISTS late_grace_minutes INTEGER NOT NULL DEFAULT 15"))
@@ -490,6 +651,7 @@ def _ensure_attendance_schema():
             statements = {
                 "company_id": "ALTER TABLE employees ADD COLUMN company_id INTEGER",
                 "employee_pin": "ALTER TABLE employees ADD COLUMN employee_pin VARCHAR(255)",
+                "employee_pin_lookup": "ALTER TABLE employees ADD COLUMN employee_pin_lookup VARCHAR(64)",
                 "shift_start": "ALTER TABLE employees ADD COLUMN shift_start TIME",
                 "shift_end": "ALTER TABLE employees ADD COLUMN shift_end TIME",
                 "late_grace_minutes": "ALTER TABLE employees ADD COLUMN late_grace_minutes INTEGER NOT NULL DEFAULT 15",
@@ -511,6 +673,7 @@ def _ensure_attendance_schema():
             fallback_statements = {
                 "company_id": "ALTER TABLE employees ADD COLUMN company_id INTEGER",
                 "employee_pin": "ALTER TABLE employees ADD COLUMN employee_pin VARCHAR(255)",
+                "employee_pin_lookup": "ALTER TABLE employees ADD COLUMN employee_pin_lookup VARCHAR(64)",
                 "shift_start": "ALTER TABLE employees ADD COLUMN shift_start TIME",
                 "shift_end": "ALTER TABLE employees ADD COLUMN shift_end TIME",
                 "late_grace_minutes": "ALTER TABLE employees ADD COLUMN late_grace_minutes INTEGER NOT NULL DEFAULT 15",
@@ -526,6 +689,9 @@ def _ensure_attendance_schema():
             for column_name, statement in fallback_statements.items():
                 if column_name not in employee_columns:
                     conn.execute(text(statement))
+        conn.execute(
+            text("CREATE UNIQUE INDEX IF NOT EXISTS ix_employees_employee_pin_lookup ON employees (employee_pin_lookup)")
+        )
 
     _seed_attendance_holidays()
     _attendance_schema_ready = _is_attendance_schema_ready()
@@ -538,6 +704,13 @@ def _should_run_internal_chat_reminder_worker() -> bool:
     return True
 
 
+def _should_run_internal_chat_reminder_dispatcher() -> bool:
+    raw = os.getenv("INTERNAL_CHAT_REMINDER_DISPATCHER_ENABLED")
+    if raw is not None:
+        return _env_bool("INTERNAL_CHAT_REMINDER_DISPATCHER_ENABLED", True)
+    return True
+
+
 def _should_run_onec_sync_worker() -> bool:
     raw = os.getenv("ONEC_SYNC_WORKER_ENABLED")
     if raw is not None:
@@ -553,13 +726,15 @@ def _should_run_attendance_scheduler_worker() -> bool:
 
 
 def _internal_chat_reminder_worker_loop():
-    global _telegram_updates_offset
     poll_seconds = max(15, int(os.getenv("INTERNAL_CHAT_REMINDER_POLL_SECONDS", "30")))
     max_backoff_seconds = max(
         poll_seconds,
         int(os.getenv("INTERNAL_CHAT_REMINDER_MAX_BACKOFF_SECONDS", "300")),
     )
+    # A lost leader is replaced after a few missed renewals.
+    lease_seconds = poll_seconds * 3
     failure_count = 0
+    is_leader = False
     logger.info(
         "Internal chat reminder worker started (interval=%ss, max_backoff=%ss).",
         poll_seconds,
@@ -570,15 +745,14 @@ def _internal_chat_reminder_worker_loop():
         wait_seconds = poll_seconds
         db = SessionLocal()
         try:
-            _telegram_updates_offset = process_telegram_bot_updates_job(db, _telegram_updates_offset)
-            processed = dispatch_due_reminders_job(db)
-            force_commit = bool(db.info.pop("force_commit", False))
-            if processed or db.new or db.dirty or db.deleted or force_commit:
-                db.commit()
-                if processed:
-                    logger.info("Internal chat reminder worker dispatched %s due reminder(s).", processed)
-            else:
-                db.rollback()
+            leader_now = run_telegram_poll_cycle(db, _worker_instance_id, lease_seconds)
+            if leader_now != is_leader:
+                logger.info(
+                    "Telegram updates poller %s on %s.",
+                    "acquired" if leader_now else "held by another replica",
+                    _worker_instance_id,
+                )
+                is_leader = leader_now
             failure_count = 0
         except DBAPIError as exc:
             db.rollback()
@@ -600,7 +774,7 @@ def _internal_chat_reminder_worker_loop():
             failure_count += 1
             wait_seconds = min(max_backoff_seconds, poll_seconds * (2 ** min(6, max(0, failure_count - 1))))
             logger.exception(
-                "Internal chat reminder worker failed during reminder dispatch (attempt=%s, retry_in=%ss)",
+                "Internal chat reminder worker failed during Telegram updates (attempt=%s, retry_in=%ss)",
                 failure_count,
                 wait_seconds,
             )
@@ -611,6 +785,58 @@ def _internal_chat_reminder_worker_loop():
             break
 
 
+def _reminder_dispatch_worker_loop():
+    max_idle_seconds = max(5, int(os.getenv("INTERNAL_CHAT_REMINDER_MAX_IDLE_SECONDS", "60")))
+    max_backoff_seconds = max(
+        max_idle_seconds,
+        int(os.getenv("INTERNAL_CHAT_REMINDER_MAX_BACKOFF_SECONDS", "300")),
+    )
+    failure_count = 0
+    logger.info("Internal chat reminder dispatcher started (max_idle=%ss).", max_idle_seconds)
+
+    while not _reminder_dispatch_stop_event.is_set():
+        next_due = None
+        wait_seconds = None
+        db = SessionLocal()
+        try:
+            processed = dispatch_due_reminders_job(db)
+            if processed:
+                logger.info("Internal chat reminder dispatcher sent %s due reminder(s).", processed)
+            next_due = next_reminder_due_at(db)
+            db.rollback()
+            failure_count = 0
+        except Exception as exc:
+            db.rollback()
+            failure_count += 1
+            wait_seconds = min(max_backoff_seconds, 5 * (2 ** min(6, max(0, failure_count - 1))))
+            if isinstance(exc, DBAPIError):
+                logger.warning(
+                    "Internal chat reminder dispatcher DB unavailable (attempt=%s, retry_in=%ss): %s",
+                    failure_count,
+                    wait_seconds,
+                    exc,
+                )
+                try:
+                    engine.dispose()
+                except Exception:
+                    logger.exception("Failed to dispose SQLAlchemy engine after dispatcher DB failure")
+            else:
+                logger.exception(
+                    "Internal chat reminder dispatcher failed (attempt=%s, retry_in=%ss)",
+                    failure_count,
+                    wait_seconds,
+                )
+        finally:
+            db.close()
+
+        if wait_seconds is not None:
+            if _reminder_dispatch_stop_event.wait(wait_seconds):
+                break
+            continue
+        # Sleep until the next reminder is due, a new one is scheduled, or the idle cap passes.
+        reminder_wakeup.wait(next_due, max_idle_seconds)
+
+
 def _onec_sync_worker_loop():
     poll_seconds = max(60, int(os.getenv("ONEC_SYNC_WORKER_INTERVAL_SECONDS", "60")))
     logger.info("1C sync worker started (interval=%ss).", poll_seconds)
@@ -633,6 +859,28 @@ def _onec_sync_worker_loop():
             break
 
 
+def _agent_context_warmer_loop():
+    interval_seconds = max(5, int(os.getenv("AGENT_CONTEXT_WARM_INTERVAL_SECONDS", "20")))
+    active_seconds = max(interval_seconds, int(os.getenv("AGENT_CONTEXT_WARM_ACTIVE_SECONDS", "900")))
+    logger.info(
+        "Agent context warmer started (interval=%ss, active_window=%ss).",
+        interval_seconds,
+        active_seconds,
+    )
+
+    while not _context_warmer_stop_event.is_set():
+        try:
+            # Refresh anything that would expire before the next pass.
+            refreshed = warm_context_snapshots(active_seconds, refresh_ahead_seconds=interval_seconds)
+            if refreshed:
+                logger.debug("Agent context warmer refreshed %s snapshot(s).", refreshed)
+        except Exception:
+            logger.exception("Agent context warmer failed")
+
+        if _context_warmer_stop_event.wait(interval_seconds):
+            break
+
+
 def _local_tashkent_now() -> datetime:
     return datetime.now(TASHKENT_TZ)
 
@@ -695,9 +943,26 @@ def _send_payroll_reminders(db, current_date: date) -> int:
     return created
 
 
+def _load_last_absent_close() -> date | None:
+    try:
+        value = _attendance_scheduler_state.get(ATTENDANCE_ABSENT_CLOSE_STATE_KEY)
+        return date.fromisoformat(value["date"]) if value else None
+    except (SQLAlchemyError, KeyError, TypeError, ValueError) as exc:
+        logger.warning("Attendance scheduler could not read its last closed day: %s", exc)
+        return None
+
+
+def _store_last_absent_close(day: date) -> None:
+    try:
+        _attendance_scheduler_state.set(ATTENDANCE_ABSENT_CLOSE_STATE_KEY, {"date": day.isoformat()})
+    except SQLAlchemyError as exc:
+        logger.warning("Attendance scheduler could not store its last closed day: %s", exc)
+
+
 def _attendance_scheduler_loop():
     global _attendance_schema_ready
     poll_seconds = max(30, int(os.getenv("ATTENDANCE_SCHEDULER_POLL_SECONDS", "60")))
+    absent_backfill_days = max(1, int(os.getenv("ATTENDANCE_ABSENT_BACKFILL_DAYS", "7")))
     logger.info("Attendance scheduler worker started (interval=%ss).", poll_seconds)
     last_hourly_cleanup_key: tuple[int, int, int, int] | None = None
     last_absent_mark_key: date | None = None
@@ -731,14 +996,29 @@ def _attendance_scheduler_loop():
                 if deleted:
                     logger.info("Attendance scheduler deleted %s expired QR token(s).", deleted)
 
-            if now_local.hour >= 20 and last_absent_mark_key != now_local.date():
+            # Today closes at 20:00. After a restart the first pass catches up from the stored last
+            # closed day, never further back than the backfill window; closing an already-closed
+            # day inserts nothing.
+            close_through = now_local.date() if now_local.hour >= 20 else now_local.date() - timedelta(days=1)
+            if last_absent_mark_key is None:
+                last_absent_mark_key = _load_last_absent_close()
+            if last_absent_mark_key is None or last_absent_mark_key < close_through:
+                close_from = close_through - timedelta(days=absent_backfill_days - 1)
+                if last_absent_mark_key:
+                    close_from = max(close_from, last_absent_mark_key + timedelta(days=1))
                 company_ids = [row[0] for row in db.query(ClientOrg.id).filter(ClientOrg.is_active.is_(True)).all()]
                 marked_total = 0
                 for company_id in company_ids:
-                    marked_total += attendance_service.bulk_mark_absent(db, int(company_id), now_local.date())
-                last_absent_mark_key = now_local.date()
+                    marked_total += attendance_service.close_attendance_days(db, int(company_id), close_from, close_through)
+                last_absent_mark_key = close_through
+                _store_last_absent_close(close_through)
                 if marked_total:
-                    logger.info("Attendance scheduler created %s absent attendance row(s).", marked_total)
+                    logger.info(
+                        "Attendance scheduler created %s absent attendance row(s) for %s..%s.",
+                        marked_total,
+                        close_from.isoformat(),
+                        close_through.isoformat(),
+                    )
 
             if _is_last_day_of_month(now_local.date()) and now_local.hour >= 10 and last_payroll_reminder_key != now_local.date():
                 reminder_count = _send_payroll_reminders(db, now_local.date())
@@ -855,6 +1135,7 @@ def _register_routes(prefix: str = ""):
     app.include_router(notifications_router, prefix=prefix, dependencies=[Depends(require_client_user)])
     app.include_router(client_account_router, prefix=prefix, dependencies=[Depends(require_client_user)])
     app.include_router(internal_chat_router, prefix=prefix, dependencies=[Depends(require_authenticated_user)])
+    app.include_router(telegram_webhook_router, prefix=prefix)
     app.include_router(onec_router, prefix=prefix, dependencies=[Depends(require_client_user)])
     app.include_router(platform_content_router, prefix=prefix)
 
@@ -1031,6 +1312,70 @@ def start_internal_chat_reminder_worker():
     _reminder_worker_thread.start()
 
 
+@app.on_event("startup")
+def start_internal_chat_reminder_dispatcher():
+    global _reminder_dispatch_thread
+
+    if not _should_run_internal_chat_reminder_dispatcher():
+        logger.info("Internal chat reminder dispatcher disabled by INTERNAL_CHAT_REMINDER_DISPATCHER_ENABLED.")
+        return
+
+    if _reminder_dispatch_thread and _reminder_dispatch_thread.is_alive():
+        return
+
+    _reminder_dispatch_stop_event.clear()
+    _reminder_dispatch_thread = threading.Thread(
+        target=_reminder_dispatch_worker_loop,
+        name="internal-chat-reminder-dispatcher",
+        daemon=True,
+    )
+    _reminder_dispatch_thread.start()
+
+
+@app.on_event("startup")
+def recover_ai_trainer_ingestion():
+    # Later passes also heartbeat live sources; this first one reclaims orphans right away.
+    ai_trainer_ingestion.start_sweeper()
+    try:
+        requeued = ai_trainer_ingestion.recover()
+    except SQLAlchemyError as exc:
+        logger.warning("AI trainer ingestion recovery skipped: %s", str(exc))
+        return
+    if requeued:
+        logger.info("Queued %s interrupted AI trainer website sources again", requeued)
+
+
+@app.on_event("startup")
+def recover_internal_chat_transcriptions():
+    try:
+        recovered = recover_pending_transcriptions()
+    except SQLAlchemyError as exc:
+        logger.warning("Internal chat transcription recovery skipped: %s", str(exc))
+        return
+    if recovered:
+        logger.info("Recovered %s voice attachments left mid-transcription", recovered)
+
+
+@app.on_event("startup")
+def start_agent_context_warmer():
+    global _context_warmer_thread
+
+    if not _env_bool("AGENT_CONTEXT_WARMER_ENABLED", True):
+        logger.info("Agent context warmer disabled by AGENT_CONTEXT_WARMER_ENABLED.")
+        return
+
+    if _context_warmer_thread and _context_warmer_thread.is_alive():
+        return
+
+    _context_warmer_stop_event.clear()
+    _context_warmer_thread = threading.Thread(
+        target=_agent_context_warmer_loop,
+        name="agent-context-warmer",
+        daemon=True,
+    )
+    _context_warmer_thread.start()
+
+
 @app.on_event("startup")
 def start_onec_sync_worker():
     global _onec_sync_worker_thread
@@ -1079,6 +1424,22 @@ def stop_internal_chat_reminder_worker():
     if _reminder_worker_thread and _reminder_worker_thread.is_alive():
         _reminder_worker_thread.join(timeout=3)
     _reminder_worker_thread = None
+    try:
+        # Let another replica take over polling without waiting for the lease to lapse.
+        telegram_state.release_lease(TELEGRAM_POLLER_LEASE, _worker_instance_id)
+    except Exception:
+        logger.warning("Could not release the Telegram poller lease", exc_info=True)
+
+
+@app.on_event("shutdown")
+def stop_internal_chat_reminder_dispatcher():
+    global _reminder_dispatch_thread
+
+    _reminder_dispatch_stop_event.set()
+    reminder_wakeup.interrupt()
+    if _reminder_dispatch_thread and _reminder_dispatch_thread.is_alive():
+        _reminder_dispatch_thread.join(timeout=3)
+    _reminder_dispatch_thread = None
 
 
 @app.on_event("shutdown")
@@ -1101,6 +1462,46 @@ def stop_attendance_scheduler_worker():
     _attendance_worker_thread = None
 
 
+@app.on_event("shutdown")
+def stop_judith_queue():
+    judith_queue.stop()
+
+
+@app.on_event("shutdown")
+def stop_transcription_queue():
+    transcription_queue.shutdown()
+
+
+@app.on_event("shutdown")
+def stop_ai_trainer_ingestion():
+    ai_trainer_ingestion.stop()
+
+
+@app.on_event("shutdown")
+def close_ai_provider_clients():
+    provider_clients.close()
+
+
+@app.on_event("shutdown")
+def stop_agent_context_warmer():
+    global _context_warmer_thread
+
+    _context_warmer_stop_event.set()
+    if _context_warmer_thread and _context_warmer_thread.is_alive():
+        _context_warmer_thread.join(timeout=3)
+    _context_warmer_thread = None
+
+
+@app.on_event("shutdown")
+def stop_context_fetch_pool():
+    context_fetch_pool.shutdown()
+
+
+@app.on_event("shutdown")
+def stop_telegram_sender():
+    telegram_sender.close()
+
+
 @app.exception_handler(DBAPIError)
 async def sqlalchemy_error_handler(request, exc: DBAPIError):
     # Reset the pool so stale sockets are dropped after transient network failures.
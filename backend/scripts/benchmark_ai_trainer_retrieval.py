@@ -0,0 +1,156 @@
+"""
+Benchmark AI trainer retrieval: full-section scan vs. the BM25 inverted index.
+
+Builds a throwaway SQLite database with synthetic trainer chunks, indexes them, and
+times both retrieval paths for a handful of queries.
+
+Usage:
+  python scripts/benchmark_ai_trainer_retrieval.py --chunks 100000
+"""
+
+from pathlib import Path
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+_TMP_DIR = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP_DIR.name}/trainer_benchmark.db"
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from database import admin_crud
+from database.models import AITrainerChunk, AITrainerPosting, AITrainerSource
+
+QUERIES = [
+    "cash flow forecast for next quarter",
+    "overdue receivables collection policy",
+    "vat invoice correction",
+    "payroll tax deadline",
+    "inventory write off approval",
+]
+
+_VOCABULARY = [
+    "cash", "flow", "forecast", "quarter", "receivables", "overdue", "collection", "policy",
+    "vat", "invoice", "correction", "payroll", "tax", "deadline", "inventory", "approval",
+    "budget", "ledger", "account", "balance", "expense", "revenue", "supplier", "contract",
+    "audit", "reconciliation", "depreciation", "asset", "liability", "equity", "margin",
+    "discount", "currency", "exchange", "payment", "transfer", "bank", "statement", "report",
+] + [f"term{index}" for index in range(5000)]
+
+
+def _synthetic_chunk(rng: random.Random) -> str:
+    words = rng.choices(_VOCABULARY, k=rng.randint(120, 220))
+    return " ".join(words).capitalize() + "."
+
+
+def _legacy_scan(db, section: str, query: str, max_chunks: int = 8) -> list[str]:
+    """The retrieval this index replaced: load every chunk of the section and count substrings."""
+    query_tokens = [token for token in admin_crud._tokenize_text(query) if token not in admin_crud._STOPWORDS]
+    query_phrase = " ".join(query_tokens).strip()
+    rows = (
+        db.query(AITrainerChunk.content)
+        .join(AITrainerSource, AITrainerSource.id == AITrainerChunk.source_id)
+        .filter(AITrainerChunk.section == section, AITrainerSource.status == "ready")
+        .all()
+    )
+    ranked = []
+    for (content,) in rows:
+        content_lower = content.lower()
+        score = 10 if query_phrase and query_phrase in content_lower else 0
+        for token in query_tokens:
+            score += min(5, content_lower.count(token))
+        if score > 0:
+            ranked.append((score, content))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    return [content for _, content in ranked[:max_chunks]]
+
+
+def _seed(SessionLocal, chunk_count: int, chunks_per_source: int = 50) -> None:
+    rng = random.Random(7)
+    with SessionLocal() as db:
+        for start in range(0, chunk_count, chunks_per_source):
+            source = AITrainerSource(
+                section="finance",
+                source_type="text",
+                title=f"Benchmark source {start // chunks_per_source + 1}",
+                status="ready",
+            )
+            db.add(source)
+            db.flush()
+            db.execute(
+                insert(AITrainerChunk),
+                [
+                    {
+                        "source_id": source.id,
+                        "section": "finance",
+                        "chunk_index": index,
+                        "content": _synthetic_chunk(rng),
+                        "token_estimate": 0,
+                    }
+                    for index in range(min(chunks_per_source, chunk_count - start))
+                ],
+            )
+            db.commit()
+
+
+def _time(label: str, run, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started_at = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started_at) * 1000)
+    median = statistics.median(timings)
+    print(f"  {label:<10} median {median:9.1f}ms  (min {min(timings):.1f}ms, max {max(timings):.1f}ms)")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine(os.environ["DATABASE_URL"], connect_args={"check_same_thread": False})
+    for model in (AITrainerSource, AITrainerChunk, AITrainerPosting):
+        model.__table__.create(bind=engine, checkfirst=True)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    started_at = time.perf_counter()
+    _seed(SessionLocal, args.chunks)
+    print(f"Seeded {args.chunks} chunks in {time.perf_counter() - started_at:.1f}s")
+
+    started_at = time.perf_counter()
+    with SessionLocal() as db:
+        indexed = admin_crud.backfill_ai_trainer_index(db)
+        postings = db.query(AITrainerPosting).count()
+    print(f"Indexed {indexed} chunks ({postings} postings) in {time.perf_counter() - started_at:.1f}s")
+
+    scan_total = index_total = 0.0
+    with SessionLocal() as db:
+        for query in QUERIES:
+            print(f"\nQuery: {query!r}")
+            scan_total += _time("scan", lambda: _legacy_scan(db, "finance", query), args.repeats)
+            index_total += _time(
+                "bm25",
+                lambda: admin_crud.get_ai_trainer_training_context(db, "finance", query),
+                args.repeats,
+            )
+
+    print(f"\nMedian total over {len(QUERIES)} queries: scan {scan_total:.0f}ms, bm25 {index_total:.0f}ms")
+    if index_total:
+        print(f"Speed-up: {scan_total / index_total:.1f}x")
+    engine.dispose()
+    _TMP_DIR.cleanup()
+
+
+if __name__ == "__main__":
+    main()
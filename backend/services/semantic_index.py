@@ -0,0 +1,403 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Protocol
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+SEMANTIC_SEARCH_ENABLED = _env_bool("SEMANTIC_SEARCH_ENABLED", True)
+SEMANTIC_INDEX_DIR = Path(os.getenv("SEMANTIC_INDEX_DIR") or Path(tempfile.gettempdir()) / "semantic-index")
+SEMANTIC_INDEX_DIMENSIONS = max(64, int(os.getenv("SEMANTIC_INDEX_DIMENSIONS", "384")))
+SEMANTIC_INDEX_SYNC_SECONDS = max(0.0, float(os.getenv("SEMANTIC_INDEX_SYNC_SECONDS", "30")))
+SEMANTIC_INDEX_SYNC_BATCH = max(50, int(os.getenv("SEMANTIC_INDEX_SYNC_BATCH", "2000")))
+# Rows a search may embed before answering; keeps a cold or lagging index off the request budget.
+SEMANTIC_INDEX_REQUEST_BATCH = max(0, int(os.getenv("SEMANTIC_INDEX_REQUEST_BATCH", "64")))
+SEMANTIC_MIN_SIMILARITY = float(os.getenv("SEMANTIC_MIN_SIMILARITY", "0.2"))
+# Optional local model (e.g. "intfloat/multilingual-e5-small"); needs `sentence-transformers`.
+SEMANTIC_EMBEDDING_MODEL = os.getenv("SEMANTIC_EMBEDDING_MODEL", "").strip()
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+_EMBED_TEXT_MAX_CHARS = 4000
+_SEARCH_BATCH_ROWS = 65536
+_COMPACT_DELTA_ROWS = 1024
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class Embedder(Protocol):
+    name: str
+    dimensions: int
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Return L2-normalised float32 vectors, one row per text."""
+        ...
+
+
+@lru_cache(maxsize=200_000)
+def _feature_slot(feature: str, dimensions: int) -> tuple[int, float]:
+    # The sign bit keeps colliding features from always adding up (the "hashing trick").
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+class HashedNgramEmbedder:
+    """
+    Dependency-free fallback: words plus their character 3-5-grams hashed into a fixed vector.
+
+    Shared sub-word grams let inflected Uzbek/Russian forms and close spellings meet
+    ("hisobot"/"hisobotlar", "договор"/"договора"), which pure token matching misses.
+    """
+
+    def __init__(self, dimensions: int = SEMANTIC_INDEX_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashed-ngram-{dimensions}"
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in _WORD_RE.findall((text or "")[:_EMBED_TEXT_MAX_CHARS].lower()):
+            if len(word) < 2:
+                continue
+            slot, sign = _feature_slot(word, self.dimensions)
+            vector[slot] += 2.0 * sign
+            padded = f"#{word}#"
+            for size in (3, 4, 5):
+                for start in range(len(padded) - size + 1):
+                    slot, sign = _feature_slot(padded[start:start + size], self.dimensions)
+                    vector[slot] += sign
+        # Dampen very frequent features so one repeated word does not dominate.
+        vector = np.sign(vector) * np.sqrt(np.abs(vector))
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        return np.vstack([self._vector(text) for text in texts])
+
+
+class SentenceTransformerEmbedder:
+    """CPU sentence-transformers model, loaded on first use."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self.dimensions = int(self._model.get_sentence_embedding_dimension())
+        self.name = f"st:{model_name}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        vectors = self._model.encode(
+            [(text or "")[:_EMBED_TEXT_MAX_CHARS] for text in texts],
+            batch_size=32,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+def default_embedder() -> Embedder:
+    if SEMANTIC_EMBEDDING_MODEL and SENTENCE_TRANSFORMERS_AVAILABLE:
+        try:
+            return SentenceTransformerEmbedder(SEMANTIC_EMBEDDING_MODEL)
+        except Exception as exc:
+            logger.warning("Embedding model %s unavailable, using hashed n-grams: %s", SEMANTIC_EMBEDDING_MODEL, str(exc))
+    elif SEMANTIC_EMBEDDING_MODEL:
+        logger.warning("SEMANTIC_EMBEDDING_MODEL is set but sentence-transformers is not installed")
+    return HashedNgramEmbedder()
+
+
+class _Namespace:
+    """
+    One searchable collection: a memory-mapped float16 matrix on disk plus an in-memory
+    delta of rows added since the last compaction and a mask of removed rows.
+    """
+
+    def __init__(self, path: Path, dimensions: int):
+        self.path = path
+        self.dimensions = dimensions
+        self.lock = threading.Lock()
+        self.vectors = np.zeros((0, dimensions), dtype=np.float16)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.versions = np.zeros(0, dtype=np.int64)
+        self.live = np.zeros(0, dtype=bool)
+        self.delta_vectors: list[np.ndarray] = []
+        self.delta_ids: list[int] = []
+        self.delta_versions: list[int] = []
+        self.synced_at: float | None = None
+
+    def load(self, embedder_name: str) -> None:
+        try:
+            meta = json.loads((self.path / "meta.json").read_text())
+            if meta.get("embedder") != embedder_name:
+                return
+            self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+            self.ids = np.load(self.path / "ids.npy")
+            self.versions = np.load(self.path / "versions.npy")
+            self.live = np.ones(len(self.ids), dtype=bool)
+        except (OSError, ValueError):
+            return
+
+    def indexed_versions(self) -> dict[int, int]:
+        current = {int(i): int(v) for i, v, alive in zip(self.ids, self.versions, self.live) if alive}
+        current.update(zip(self.delta_ids, self.delta_versions))
+        return current
+
+    def remove(self, ids: set[int]) -> None:
+        if not ids:
+            return
+        self.live &= ~np.isin(self.ids, np.fromiter(ids, dtype=np.int64, count=len(ids)))
+        keep = [index for index, row_id in enumerate(self.delta_ids) if row_id not in ids]
+        self.delta_vectors = [self.delta_vectors[index] for index in keep]
+        self.delta_ids = [self.delta_ids[index] for index in keep]
+        self.delta_versions = [self.delta_versions[index] for index in keep]
+
+    def add(self, ids: list[int], versions: list[int], vectors: np.ndarray) -> None:
+        self.delta_vectors.extend(vectors.astype(np.float16))
+        self.delta_ids.extend(ids)
+        self.delta_versions.extend(versions)
+
+    def needs_compaction(self) -> bool:
+        removed = len(self.live) - int(self.live.sum())
+        return len(self.delta_ids) >= _COMPACT_DELTA_ROWS or removed > max(_COMPACT_DELTA_ROWS, len(self.live) // 10)
+
+    def compact(self, embedder_name: str) -> None:
+        """Fold the delta into a new on-disk matrix and re-open it memory-mapped."""
+        vectors = np.asarray(self.vectors[self.live], dtype=np.float16)
+        ids = self.ids[self.live]
+        versions = self.versions[self.live]
+        if self.delta_ids:
+            vectors = np.vstack([vectors, np.vstack(self.delta_vectors)])
+            ids = np.concatenate([ids, np.asarray(self.delta_ids, dtype=np.int64)])
+            versions = np.concatenate([versions, np.asarray(self.delta_versions, dtype=np.int64)])
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f"{self.path.name}-", dir=self.path.parent))
+        np.save(staging / "vectors.npy", vectors)
+        np.save(staging / "ids.npy", ids)
+        np.save(staging / "versions.npy", versions)
+        (staging / "meta.json").write_text(json.dumps({"embedder": embedder_name, "rows": int(len(ids))}))
+        retired = self.path.with_name(f"{self.path.name}.old")
+        shutil.rmtree(retired, ignore_errors=True)
+        if self.path.exists():
+            self.path.rename(retired)
+        staging.rename(self.path)
+        shutil.rmtree(retired, ignore_errors=True)
+
+        self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+        self.ids = ids
+        self.versions = versions
+        self.live = np.ones(len(ids), dtype=bool)
+        self.delta_vectors, self.delta_ids, self.delta_versions = [], [], []
+
+    def search(self, query: np.ndarray, limit: int) -> list[tuple[int, float]]:
+        candidate_ids: list[np.ndarray] = []
+        candidate_scores: list[np.ndarray] = []
+        for start in range(0, len(self.ids), _SEARCH_BATCH_ROWS):
+            stop = start + _SEARCH_BATCH_ROWS
+            scores = np.asarray(self.vectors[start:stop], dtype=np.float32) @ query
+            scores[~self.live[start:stop]] = -np.inf
+            candidate_ids.append(self.ids[start:stop])
+            candidate_scores.append(scores)
+        if self.delta_ids:
+            candidate_ids.append(np.asarray(self.delta_ids, dtype=np.int64))
+            candidate_scores.append(np.vstack(self.delta_vectors).astype(np.float32) @ query)
+        if not candidate_ids:
+            return []
+
+        ids = np.concatenate(candidate_ids)
+        scores = np.concatenate(candidate_scores)
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[index]), float(scores[index])) for index in top if np.isfinite(scores[index])]
+
+
+class SemanticIndex:
+    """
+    Vector search over database rows, kept as a derived cache on local disk.
+
+    The database stays the source of truth. Before a search the caller's `versions` loader
+    lists the rows that should be searchable (id -> version); rows that are new or changed
+    are embedded and appended, missing ones are masked out. Syncs are throttled per
+    namespace and `mark_stale` forces the next one, so writes show up on the next search
+    without rebuilding the matrix. Writers call `sync` to embed their rows up front, in
+    `sync_batch` steps; a search embeds at most `request_batch` rows, so a cold index or one
+    another process wrote to fills over a few searches while lexical ranking covers the gap.
+    """
+
+    def __init__(
+        self,
+        root: Path = SEMANTIC_INDEX_DIR,
+        embedder_factory: Callable[[], Embedder] = default_embedder,
+        sync_interval_seconds: float = SEMANTIC_INDEX_SYNC_SECONDS,
+        sync_batch: int = SEMANTIC_INDEX_SYNC_BATCH,
+        request_batch: int = SEMANTIC_INDEX_REQUEST_BATCH,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.root = Path(root)
+        self.sync_interval_seconds = sync_interval_seconds
+        self.sync_batch = sync_batch
+        self.request_batch = request_batch
+        self._embedder_factory = embedder_factory
+        self._embedder: Embedder | None = None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._namespaces: dict[str, _Namespace] = {}
+        self._stats = {"searches": 0, "embedded_rows": 0, "compactions": 0}
+
+    @property
+    def embedder(self) -> Embedder:
+        with self._lock:
+            if self._embedder is None:
+                self._embedder = self._embedder_factory()
+            return self._embedder
+
+    def _namespace(self, name: str) -> _Namespace:
+        embedder = self.embedder
+        with self._lock:
+            namespace = self._namespaces.get(name)
+            if namespace is None:
+                safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+                namespace = _Namespace(self.root / safe_name, embedder.dimensions)
+                namespace.load(embedder.name)
+                self._namespaces[name] = namespace
+            return namespace
+
+    def mark_stale(self, name: str) -> None:
+        with self._lock:
+            namespace = self._namespaces.get(name)
+        if namespace is not None:
+            namespace.synced_at = None
+
+    def _sync(
+        self,
+        namespace: _Namespace,
+        versions: Callable[[], dict[int, int]],
+        texts: Callable[[list[int]], dict[int, str]],
+        batch_size: int,
+    ) -> int:
+        """Embed up to `batch_size` pending rows; returns how many are still waiting."""
+        now = self._clock()
+        if namespace.synced_at is not None and now - namespace.synced_at < self.sync_interval_seconds:
+            return 0
+        wanted = versions()
+        indexed = namespace.indexed_versions()
+        stale = {row_id for row_id, version in indexed.items() if wanted.get(row_id) != version}
+        pending = [row_id for row_id, version in wanted.items() if indexed.get(row_id) != version]
+        namespace.remove(stale)
+
+        batch = pending[:batch_size]
+        if batch:
+            loaded = texts(batch)
+            batch = [row_id for row_id in batch if row_id in loaded]
+            namespace.add(batch, [wanted[row_id] for row_id in batch], self.embedder.embed([loaded[row_id] for row_id in batch]))
+            with self._lock:
+                self._stats["embedded_rows"] += len(batch)
+        if namespace.needs_compaction():
+            try:
+                namespace.compact(self.embedder.name)
+            except OSError as exc:
+                # Another worker sharing the directory may be compacting; the delta stays in memory.
+                logger.warning("Semantic index compaction for %s failed: %s", namespace.path.name, str(exc))
+            else:
+                with self._lock:
+                    self._stats["compactions"] += 1
+        # Leave the namespace due for another sync while rows are still waiting to be embedded.
+        remaining = max(0, len(pending) - batch_size)
+        namespace.synced_at = None if remaining else now
+        return remaining
+
+    def sync(
+        self,
+        name: str,
+        versions: Callable[[], dict[int, int]],
+        texts: Callable[[list[int]], dict[int, str]],
+    ) -> bool:
+        """
+        Bring a namespace fully up to date; meant for write paths and background workers.
+
+        The namespace lock is released between batches so searches are not held up for the
+        whole catch-up. Best-effort like `search`: False when it failed.
+        """
+        try:
+            namespace = self._namespace(name)
+            namespace.synced_at = None
+            remaining = None
+            while True:
+                with namespace.lock:
+                    left = self._sync(namespace, versions, texts, self.sync_batch)
+                # Rows whose text no longer loads stay pending; stop once a pass makes no progress.
+                if not left or (remaining is not None and left >= remaining):
+                    break
+                remaining = left
+        except Exception as exc:
+            logger.warning("Semantic index sync of %s failed: %s", name, str(exc))
+            return False
+        return True
+
+    def search(
+        self,
+        name: str,
+        query: str,
+        limit: int,
+        versions: Callable[[], dict[int, int]],
+        texts: Callable[[list[int]], dict[int, str]],
+        min_similarity: float = SEMANTIC_MIN_SIMILARITY,
+    ) -> list[tuple[int, float]]:
+        """
+        Return up to `limit` `(row_id, cosine similarity)` pairs, best first.
+
+        Best-effort: a failure is logged and yields no hits, leaving callers with their
+        lexical ranking.
+        """
+        if not (query or "").strip() or limit <= 0:
+            return []
+        try:
+            namespace = self._namespace(name)
+            query_vector = self.embedder.embed([query])[0]
+            with namespace.lock:
+                self._sync(namespace, versions, texts, self.request_batch)
+                hits = namespace.search(query_vector, limit)
+        except Exception as exc:
+            logger.warning("Semantic search in %s failed: %s", name, str(exc))
+            return []
+        with self._lock:
+            self._stats["searches"] += 1
+        return [(row_id, score) for row_id, score in hits if score >= min_similarity]
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = dict(self._namespaces)
+            stats = dict(self._stats)
+        stats["namespaces"] = {
+            name: int(namespace.live.sum()) + len(namespace.delta_ids) for name, namespace in namespaces.items()
+        }
+        stats["embedder"] = self._embedder.name if self._embedder else None
+        return stats
+
+
+semantic_index = SemanticIndex()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import agents
+from database.connection import get_db
+
+
+class _FakeStreamingAgent:
+    name = "HR Agent"
+
+    def __init__(self, failing_providers: set[str]):
+        self.failing_providers = failing_providers
+        self.calls: list[str] = []
+
+    async def astream(self, user_message, provider=None, **kwargs):
+        self.calls.append(provider)
+        if provider in self.failing_providers:
+            raise RuntimeError("Claude API connection error: upstream reset")
+        for chunk in ("Hello", ", ", "Aziza"):
+            yield chunk
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        parsed.append((lines["event"], json.loads(lines["data"])))
+    return parsed
+
+
+class AgentStreamRouteTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.save_exchange = MagicMock()
+        self.patches = [
+            patch.object(agents.settings, "ANTHROPIC_API_KEY", "test-key"),
+            patch.object(agents.settings, "OPENAI_API_KEY", "test-key"),
+            patch.object(agents, "AGENT_PROVIDER_FAILOVER_ENABLED", True),
+            patch.object(agents, "_safe_get_section_context", return_value="Employees: 12"),
+            patch.object(agents.admin_crud, "get_ai_trainer_runtime_profile", return_value=None),
+            patch.object(agents, "_assert_session_access"),
+            patch.object(agents, "SessionLocal", MagicMock()),
+            patch.object(agents.crud, "save_chat_exchange", self.save_exchange),
+        ]
+        for item in self.patches:
+            item.start()
+        app = FastAPI()
+        app.include_router(agents.router, prefix="/agents")
+        app.dependency_overrides[get_db] = lambda: None
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        for item in reversed(self.patches):
+            item.stop()
+
+    def test_fails_over_before_the_first_token_and_saves_the_exchange(self):
+        agent = _FakeStreamingAgent(failing_providers={"anthropic"})
+        with patch.object(agents, "get_agent", return_value=agent):
+            response = self.client.post(
+                "/agents/hr/stream",
+                json={"message": "Who is late today?", "session_id": "u:user-a:w:default:s:hr:t:1"},
+            )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+
+        events = _events(response.text)
+        self.assertEqual([name for name, _ in events], ["start", "delta", "delta", "delta", "done"])
+        self.assertEqual(events[0][1]["provider"], "openai")
+        self.assertEqual(events[-1][1]["response"], "Hello, Aziza")
+        self.assertIn("ttft_ms", events[-1][1])
+        self.assertEqual(agent.calls, ["anthropic", "openai"])
+        self.save_exchange.assert_called_once()
+        self.assertEqual(self.save_exchange.call_args.args[1:], ("u:user-a:w:default:s:hr:t:1", "hr", "Who is late today?", "Hello, Aziza"))
+
+    def test_failure_on_every_provider_returns_an_http_error(self):
+        agent = _FakeStreamingAgent(failing_providers={"anthropic", "openai"})
+        with patch.object(agents, "get_agent", return_value=agent):
+            response = self.client.post("/agents/hr/stream", json={"message": "Who is late today?"})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("unreachable", response.json()["detail"])
+        self.save_exchange.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime, timedelta
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import admin_crud, admin_schemas
+from database.models import AITrainerChunk, AITrainerPosting, AITrainerProfile, AITrainerSource
+from integrations.ai_trainer.ingestion import AITrainerIngestionQueue
+from services.semantic_index import SemanticIndex
+
+PAGE = (
+    "<html><head><title>Tax calendar</title><script>var x = 1;</script></head><body>"
+    "<p>Quarterly VAT returns are filed by the 20th of the following month.</p>"
+    "<p>Payroll tax is paid monthly together with the personal income tax withheld.</p>"
+    "</body></html>"
+)
+
+
+class AITrainerIngestionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self._tmp.name}/trainer.db", connect_args={"check_same_thread": False})
+        for model in (AITrainerProfile, AITrainerSource, AITrainerChunk, AITrainerPosting):
+            model.__table__.create(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.db = self.SessionLocal()
+        index_patch = patch.object(admin_crud, "semantic_index", SemanticIndex(root=f"{self._tmp.name}/vectors"))
+        index_patch.start()
+        self.addCleanup(index_patch.stop)
+
+    def tearDown(self) -> None:
+        self.db.close()
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def _queue(self, processes: int = 0) -> AITrainerIngestionQueue:
+        queue = AITrainerIngestionQueue(session_factory=self.SessionLocal, workers=2, processes=processes)
+        self.addCleanup(queue.stop)
+        return queue
+
+    def test_url_source_is_fetched_and_indexed_in_the_background(self):
+        source = admin_crud.create_ai_trainer_source_from_url(
+            self.db, admin_schemas.AITrainerSourceCreateURL(section="finance", url="https://example.com/tax")
+        )
+        self.assertEqual(source.status, "queued")
+
+        response = MagicMock(text=PAGE, url="https://example.com/tax", status_code=200)
+        queue = self._queue()
+        with patch.object(admin_crud, "_fetch_ai_trainer_url", return_value=response):
+            self.assertTrue(queue.submit(source.id))
+            self.assertTrue(queue.join(timeout=10))
+
+        self.db.expire_all()
+        source = self.db.get(AITrainerSource, source.id)
+        self.assertEqual((source.status, source.title), ("ready", "Tax calendar"))
+        self.assertNotIn("var x", source.raw_text)
+        chunk = self.db.query(AITrainerChunk).filter(AITrainerChunk.source_id == source.id).one()
+        self.assertIn("payroll", chunk.keywords.split(","))
+        self.assertEqual(queue.stats()["completed"], 1)
+        # Embedded by the ingest worker, not by the first agent request.
+        self.assertEqual(admin_crud.semantic_index.stats()["namespaces"], {"ai_trainer:finance": 1})
+
+    def test_file_is_extracted_in_a_worker_process_and_failures_are_recorded(self):
+        good = admin_crud.create_ai_trainer_source_from_file(self.db, "legal", "policy.txt", "text/plain")
+        bad = admin_crud.create_ai_trainer_source_from_file(self.db, "legal", "scan.exe", "application/octet-stream")
+        queue = self._queue(processes=1)
+        queue.submit(good.id, b"Contracts above the approval limit need two signatures from directors.")
+        queue.submit(bad.id, b"\x00\x01")
+        self.assertTrue(queue.join(timeout=60))
+
+        self.db.expire_all()
+        self.assertEqual(self.db.get(AITrainerSource, good.id).status, "ready")
+        failed = self.db.get(AITrainerSource, bad.id)
+        self.assertEqual(failed.status, "failed")
+        self.assertIn("Unsupported file format", failed.error_message)
+        self.assertIn("[Source: policy.txt]", admin_crud.get_ai_trainer_training_context(self.db, "legal", "approval limit"))
+
+    def test_reindex_of_unchanged_content_keeps_existing_chunks(self):
+        source = admin_crud.create_ai_trainer_source_from_text(
+            self.db,
+            admin_schemas.AITrainerSourceCreateText(
+                section="finance", title="Close", text="Month-end close starts on the last working day of the month."
+            ),
+        )
+        self.db.query(AITrainerChunk).update({"keywords": "kept"})
+        self.db.commit()
+        admin_crud.reindex_ai_trainer_source(self.db, source.id)
+        self.assertEqual([row.keywords for row in self.db.query(AITrainerChunk)], ["kept"])
+
+        # A chunk missing from the index means the stored chunks cannot be trusted.
+        self.db.query(AITrainerChunk).update({"term_count": None})
+        self.db.commit()
+        admin_crud.reindex_ai_trainer_source(self.db, source.id)
+        self.assertNotEqual([row.keywords for row in self.db.query(AITrainerChunk)], ["kept"])
+
+    def test_restart_requeues_websites_and_fails_lost_uploads(self):
+        url_source = admin_crud.create_ai_trainer_source_from_url(
+            self.db, admin_schemas.AITrainerSourceCreateURL(section="finance", url="https://example.com/a")
+        )
+        file_source = admin_crud.create_ai_trainer_source_from_file(self.db, "finance", "a.pdf", "application/pdf")
+        fresh = admin_crud.create_ai_trainer_source_from_file(self.db, "finance", "b.pdf", "application/pdf")
+        self.db.query(AITrainerSource).filter(AITrainerSource.id != fresh.id).update(
+            {"updated_at": datetime.now() - timedelta(days=1)}
+        )
+        self.db.commit()
+
+        self.assertEqual(admin_crud.fail_interrupted_ai_trainer_sources(self.db, 900), [url_source.id])
+        self.db.expire_all()
+        self.assertEqual(self.db.get(AITrainerSource, file_source.id).status, "failed")
+        self.assertEqual(self.db.get(AITrainerSource, fresh.id).status, "queued")
+        # The reclaimed website is fresh again, so a second sweep does not queue it twice.
+        self.assertEqual(admin_crud.fail_interrupted_ai_trainer_sources(self.db, 900), [])
+
+    def test_sweep_keeps_held_sources_alive_and_reclaims_orphans(self):
+        held = admin_crud.create_ai_trainer_source_from_url(
+            self.db, admin_schemas.AITrainerSourceCreateURL(section="finance", url="https://example.com/held")
+        )
+        orphan = admin_crud.create_ai_trainer_source_from_url(
+            self.db, admin_schemas.AITrainerSourceCreateURL(section="finance", url="https://example.com/orphan")
+        )
+        self.db.query(AITrainerSource).update({"updated_at": datetime.now() - timedelta(days=1)})
+        self.db.commit()
+
+        queue = self._queue()
+        queue._active.add(held.id)
+        with patch.object(queue, "submit", return_value=True) as submit:
+            self.assertEqual(queue.recover(60), 1)
+        submit.assert_called_once_with(orphan.id)
+        self.db.expire_all()
+        self.assertGreater(self.db.get(AITrainerSource, held.id).updated_at, datetime.now() - timedelta(hours=12))
+
+
+if __name__ == "__main__":
+    unittest.main()
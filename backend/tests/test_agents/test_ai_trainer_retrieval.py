@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import unittest
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import admin_crud, admin_schemas
+from database.models import AITrainerChunk, AITrainerPosting, AITrainerProfile, AITrainerSource
+from services.semantic_index import SemanticIndex
+
+FILLER = "General guidance about how the team keeps records tidy and up to date every week."
+
+
+class AITrainerRetrievalTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self._tmp.name}/trainer.db", connect_args={"check_same_thread": False})
+        for model in (AITrainerProfile, AITrainerSource, AITrainerChunk, AITrainerPosting):
+            model.__table__.create(bind=self.engine)
+        self.db = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)()
+        index_patch = patch.object(admin_crud, "semantic_index", SemanticIndex(root=f"{self._tmp.name}/vectors"))
+        index_patch.start()
+        self.addCleanup(index_patch.stop)
+
+    def tearDown(self) -> None:
+        self.db.close()
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def _add_text(self, title: str, text: str) -> AITrainerSource:
+        return admin_crud.create_ai_trainer_source_from_text(
+            self.db, admin_schemas.AITrainerSourceCreateText(section="finance", title=title, text=text)
+        )
+
+    def test_rare_terms_and_phrases_rank_first(self):
+        self._add_text("Filler", f"{FILLER} Invoices are reviewed monthly.")
+        self._add_text("VAT", f"{FILLER} A VAT refund claim needs the original invoice and the VAT refund form.")
+        self._add_text("Refund", f"{FILLER} Customer refund requests go through the support desk.")
+
+        context = admin_crud.get_ai_trainer_training_context(self.db, "finance", "How do I file a VAT refund?")
+        self.assertLess(context.index("[Source: VAT]"), context.index("[Source: Refund]"))
+        self.assertNotIn("[Source: Filler]", context)
+
+    def test_postings_follow_reindex_and_delete(self):
+        source = self._add_text("Payroll", f"{FILLER} Payroll tax is paid before the fifteenth.")
+        chunk = self.db.query(AITrainerChunk).filter(AITrainerChunk.source_id == source.id).one()
+        self.assertEqual(
+            chunk.term_count,
+            sum(row.term_frequency for row in self.db.query(AITrainerPosting).filter(AITrainerPosting.chunk_id == chunk.id)),
+        )
+
+        admin_crud.reindex_ai_trainer_source(self.db, source.id)
+        self.assertEqual(self.db.query(AITrainerPosting.chunk_id).distinct().count(), 1)
+
+        admin_crud.delete_ai_trainer_source(self.db, source.id)
+        self.assertEqual(self.db.query(AITrainerPosting).count(), 0)
+
+    def test_unindexed_chunks_are_backfilled_and_unmatched_queries_fall_back_to_recent(self):
+        source = self._add_text("Ledger", f"{FILLER} Ledger balances are reconciled with the bank statement.")
+        self.db.query(AITrainerPosting).delete()
+        self.db.query(AITrainerChunk).update({"term_count": None})
+        self.db.commit()
+
+        context = admin_crud.get_ai_trainer_training_context(self.db, "finance", "ledger reconciliation")
+        self.assertIn("[Source: Ledger]", context)  # recent-chunk fallback
+
+        self.assertEqual(admin_crud.backfill_ai_trainer_index(self.db), source.chunk_count)
+        self.assertEqual(admin_crud.backfill_ai_trainer_index(self.db), 0)
+        context = admin_crud.get_ai_trainer_training_context(self.db, "finance", "bank statement")
+        self.assertIn("[Source: Ledger]", context)
+        self.assertIn("[Source: Ledger]", admin_crud.get_ai_trainer_training_context(self.db, "finance", "zebra"))
+
+    def test_inflected_paraphrase_is_found_without_a_shared_token(self):
+        self._add_text("Soliq", "Choraklik soliq hisobotlarini topshirish muddati keyingi oyning 20-sanasi.")
+        self._add_text("Ofis", "Ofisdagi gullarga har juma kuni suv quyiladi, kalitlar qorovulda turadi.")
+
+        context = admin_crud.get_ai_trainer_training_context(
+            self.db, "finance", "hisobot topshiriladigan muddat", max_chunks=1
+        )
+        self.assertIn("[Source: Soliq]", context)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from agents import data_fetcher
+from agents.context_budget import ContextAssembler, ContextBlock, estimate_tokens
+from database.models import TransactionType
+
+SECTION = "REAL FINANCE DATA:\nNet Profit: $4,000.00\nPayroll tax is paid monthly together with the income tax withheld."
+TRAINER = (
+    "SECTION TRAINING KNOWLEDGE:\n[Source: Tax guide]\n"
+    "Payroll tax is paid monthly together with the income tax withheld. "
+    "Quarterly VAT returns are filed by the 20th of the following month. "
+    "Late filing is fined at one percent of the unpaid amount per day of delay."
+)
+
+
+class ContextAssemblerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.assembler = ContextAssembler(budget_tokens=1000)
+
+    def test_a_fact_repeated_by_a_lower_priority_block_is_sent_once(self):
+        assembled = self.assembler.assemble(
+            [ContextBlock("section", SECTION, priority=0), ContextBlock("trainer", TRAINER, priority=2)]
+        )
+        self.assertEqual(assembled.text.count("Payroll tax is paid monthly"), 1)
+        self.assertLess(assembled.text.index("Payroll tax"), assembled.text.index("[Source: Tax guide]"))
+        self.assertIn("Quarterly VAT returns", assembled.text)
+        self.assertEqual(assembled.duplicates_removed, 1)
+        self.assertEqual(assembled.trimmed_tokens, {})
+
+    def test_a_block_keeps_its_own_repeated_rows_and_lines(self):
+        rows = "date|description|type|amount_usd|category|status\n" + "\n".join(
+            ["2026-10-19|Taxi to the airport|expense|25.00|Travel|completed"] * 3
+        )
+        notes = "Reminder: submit receipts by Friday.\nReminder: submit receipts by Friday."
+        assembled = self.assembler.assemble(
+            [
+                ContextBlock("section", f"Transactions:\n{rows}\n{notes}", priority=0),
+                ContextBlock("trainer", "2026-10-19|Taxi to the airport|expense|25.00|Travel|completed", priority=2),
+            ]
+        )
+        self.assertEqual(assembled.text.count("Taxi to the airport"), 4)
+        self.assertEqual(assembled.text.count("submit receipts by Friday"), 2)
+        self.assertEqual(assembled.duplicates_removed, 0)
+
+    def test_budget_is_shared_by_floor_then_priority(self):
+        rows = "\n".join(f"2026-10-{day:02d}|Supplier payment {day}|expense|{day * 10}.00|ops|paid" for day in range(1, 31))
+        attachment = "\n".join(f"Attached line {line} with unrelated notes about the audit." for line in range(200))
+        assembled = self.assembler.assemble(
+            [
+                ContextBlock("section", f"Transactions:\n{rows}", priority=0, min_tokens=100),
+                ContextBlock("attachments", attachment, priority=1, min_tokens=300),
+            ],
+            budget_tokens=500,
+        )
+        self.assertLessEqual(assembled.tokens, 520)
+        self.assertIn("2026-10-01|Supplier payment 1", assembled.text)
+        self.assertIn("Attached line 0 ", assembled.text)
+        self.assertIn("more lines omitted to fit the prompt budget", assembled.text)
+        self.assertEqual(set(assembled.trimmed_tokens), {"section", "attachments"})
+        self.assertEqual(self.assembler.stats()["trimmed_blocks"], 2)
+
+    def test_token_estimate_counts_non_latin_text_as_denser(self):
+        self.assertEqual(estimate_tokens("abcd" * 10), 10)
+        self.assertEqual(estimate_tokens("абвг" * 10), 20)
+
+
+class CompactFinanceContextTests(unittest.TestCase):
+    def test_transactions_and_invoices_are_tabular(self):
+        today = datetime(2026, 10, 19)
+        transactions = [
+            SimpleNamespace(
+                date=today - timedelta(days=index),
+                description=f"Payment to supplier number {index}",
+                type=TransactionType.expense,
+                amount=1250.5 + index,
+                category="Operations",
+                status="completed",
+            )
+            for index in range(20)
+        ]
+        invoices = [
+            SimpleNamespace(
+                invoice_number=f"INV-{index:04d}",
+                client_name="Acme | Trading",
+                amount=9800,
+                due_date=today + timedelta(days=index),
+                status="pending",
+            )
+            for index in range(10)
+        ]
+        summary = {"total_income": 5000, "total_expenses": 1000, "net_profit": 4000, "pending_invoices": 10}
+        with patch.object(data_fetcher, "SessionLocal", MagicMock()), patch.object(
+            data_fetcher.crud, "get_finance_summary", return_value=summary
+        ), patch.object(data_fetcher.crud, "get_transactions", return_value=transactions) as get_transactions, patch.object(
+            data_fetcher.crud, "get_invoices", return_value=invoices
+        ):
+            context = data_fetcher.get_finance_context(company_id=3)
+
+        self.assertEqual(get_transactions.call_args.kwargs["limit"], 20)
+        self.assertIn("date|description|type|amount_usd|category|status", context)
+        self.assertIn("2026-10-19|Payment to supplier number 0|expense|1250.50|Operations|completed", context)
+        self.assertIn("INV-0000|Acme / Trading|9800.00|2026-10-19|pending", context)
+        self.assertIn("Net Profit: $4,000.00", context)
+
+        bullets = "\n".join(
+            f"  - {tx.date:%Y-%m-%d}: {tx.description} | EXPENSE | ${tx.amount:,.2f} | {tx.category} | {tx.status}"
+            for tx in transactions
+        )
+        table = context[context.index("date|description") : context.index("Recent Invoices")]
+        self.assertLess(estimate_tokens(table), estimate_tokens(bullets) * 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import unittest
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agents import data_fetcher
+from agents.context_cache import ContextSnapshotCache, context_snapshots
+from database.models import InternalChatStateEntry
+
+STATE_TABLES = frozenset({InternalChatStateEntry.__tablename__})
+
+
+class ContextSnapshotCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 100.0
+        self.cache = ContextSnapshotCache(ttl_seconds=30, max_entries=10, clock=lambda: self.now)
+
+    def test_snapshot_expires_and_is_invalidated_by_its_tables(self):
+        tables = frozenset({"employees"})
+        self.cache.put(("hr", 1), tables, "HR", self.cache.token(tables))
+        self.assertEqual(self.cache.get(("hr", 1), tables), "HR")
+
+        self.cache.invalidate_tables(["invoices"])
+        self.assertEqual(self.cache.get(("hr", 1), tables), "HR")
+        self.cache.invalidate_tables(["employees"])
+        self.assertIsNone(self.cache.get(("hr", 1), tables))
+
+        self.cache.put(("hr", 1), tables, "HR v2", self.cache.token(tables))
+        self.now += 31
+        self.assertIsNone(self.cache.get(("hr", 1), tables))
+
+    def test_result_fetched_across_a_write_is_not_stored(self):
+        tables = frozenset({"transactions"})
+        token = self.cache.token(tables)
+        self.cache.invalidate_tables(["transactions"])
+        self.cache.put(("finance", 1), tables, "stale", token)
+        self.assertIsNone(self.cache.get(("finance", 1), tables))
+
+    def test_keys_to_warm_covers_recent_requests_only(self):
+        tables = frozenset({"employees"})
+        self.cache.get(("hr", 1), tables)
+        self.cache.get(("hr", 2), tables)
+        self.cache.put(("hr", 2), tables, "HR", self.cache.token(tables))
+        self.assertEqual(self.cache.keys_to_warm(active_within_seconds=60, refresh_ahead_seconds=5), [("hr", 1)])
+        self.now += 26
+        self.assertEqual(self.cache.keys_to_warm(60, 5), [("hr", 1), ("hr", 2)])
+        self.now += 100
+        self.assertEqual(self.cache.keys_to_warm(60, 5), [])
+
+
+class SessionInvalidationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self._tmp.name}/cache.db")
+        InternalChatStateEntry.__table__.create(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        context_snapshots.clear()
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def _cache_snapshot(self) -> None:
+        context_snapshots.put(("state", None), STATE_TABLES, "snapshot", context_snapshots.token(STATE_TABLES))
+
+    def test_commits_invalidate_and_rollbacks_do_not(self):
+        self._cache_snapshot()
+        with self.SessionLocal() as db:
+            db.add(InternalChatStateEntry(key="a", value={}))
+            db.flush()
+            db.rollback()
+        self.assertEqual(context_snapshots.get(("state", None), STATE_TABLES), "snapshot")
+
+        with self.SessionLocal() as db:
+            db.add(InternalChatStateEntry(key="a", value={}))
+            db.commit()
+        self.assertIsNone(context_snapshots.get(("state", None), STATE_TABLES))
+
+        self._cache_snapshot()
+        with self.SessionLocal() as db:
+            db.query(InternalChatStateEntry).update({"holder": "replica-1"})
+            db.commit()
+        self.assertIsNone(context_snapshots.get(("state", None), STATE_TABLES))
+
+
+class SectionSnapshotTests(unittest.TestCase):
+    def setUp(self) -> None:
+        context_snapshots.clear()
+
+    def test_repeat_requests_are_served_from_snapshots(self):
+        with patch.object(data_fetcher, "get_hr_context", return_value="REAL HR DATA") as hr, patch.object(
+            data_fetcher, "get_attendance_context", return_value="ATTENDANCE DATA"
+        ) as attendance:
+            first = data_fetcher.get_context_for_section("hr", company_id=7)
+            second = data_fetcher.get_context_for_section("hr", company_id=7)
+            self.assertEqual(first, second)
+            self.assertEqual((hr.call_count, attendance.call_count), (1, 1))
+
+            context_snapshots.invalidate_tables(["attendance_records"])
+            self.assertEqual(data_fetcher.warm_context_snapshots(60, 5), 1)
+            data_fetcher.get_context_for_section("hr", company_id=7)
+            self.assertEqual((hr.call_count, attendance.call_count), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
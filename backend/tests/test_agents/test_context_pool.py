@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from agents import data_fetcher
+from agents.context_cache import context_snapshots
+from agents.context_pool import ContextFetchPool, bind_fetch_deadline
+
+
+class ContextFetchPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = ContextFetchPool(max_workers=4)
+
+    def tearDown(self) -> None:
+        self.pool.shutdown()
+
+    def test_fetchers_run_concurrently(self):
+        def slow(label: str):
+            def fetch() -> str:
+                time.sleep(0.2)
+                return label
+            return fetch
+
+        started_at = time.monotonic()
+        results, failures = self.pool.gather({name: slow(name) for name in ("finance", "hr", "projects")}, 5)
+        self.assertLess(time.monotonic() - started_at, 0.5)
+        self.assertEqual(results, {"finance": "finance", "hr": "hr", "projects": "projects"})
+        self.assertEqual(failures, {})
+
+    def test_fetchers_past_the_deadline_never_open_a_session(self):
+        pool = ContextFetchPool(max_workers=1)
+        release = threading.Event()
+        sessions: list[MagicMock] = []
+
+        def stuck() -> str:
+            release.wait(2)
+            return "late"
+
+        def queued() -> str:
+            session = MagicMock()
+            sessions.append(session)
+            bind_fetch_deadline(session)
+            return "never"
+
+        try:
+            results, failures = pool.gather({"stuck": stuck, "queued": queued}, 0.1)
+            self.assertEqual(results, {})
+            self.assertEqual(failures, {"stuck": "timed out", "queued": "timed out"})
+            release.set()
+            time.sleep(0.1)
+            # "queued" was still waiting for a worker at the deadline, so it was cancelled outright.
+            self.assertEqual(sessions, [])
+        finally:
+            pool.shutdown()
+
+    def test_late_start_is_refused_and_session_closed(self):
+        session = MagicMock()
+        results, failures = self.pool.gather({"late": lambda: (time.sleep(0.15), bind_fetch_deadline(session))}, 0.1)
+        time.sleep(0.1)
+        self.assertEqual(failures, {"late": "timed out"})
+        session.close.assert_called_once()
+        self.assertFalse(session.execute.called)
+
+    def test_sessions_outside_a_gather_are_left_alone(self):
+        session = MagicMock()
+        self.assertIs(bind_fetch_deadline(session), session)
+        self.assertFalse(session.close.called)
+
+
+class SectionContextTests(unittest.TestCase):
+    def setUp(self) -> None:
+        context_snapshots.clear()
+
+    def test_one_failed_fetcher_keeps_the_rest_of_the_context(self):
+        with patch.object(data_fetcher, "get_hr_context", side_effect=RuntimeError("hr db down")), patch.object(
+            data_fetcher, "get_attendance_context", return_value="ATTENDANCE TODAY: 3 late"
+        ):
+            context = data_fetcher.get_context_for_section("hr", timeout_seconds=2)
+        self.assertTrue(context.startswith("ATTENDANCE TODAY: 3 late"))
+        self.assertIn("hr (hr db down)", context)
+
+    def test_all_fetchers_failing_returns_the_fallback_note(self):
+        with patch.object(data_fetcher, "get_projects_context", side_effect=RuntimeError("boom")):
+            context = data_fetcher.get_context_for_section("projects", timeout_seconds=2)
+        self.assertEqual(context, "Note: Could not fetch live data (boom). Answering based on general knowledge.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agents.provider_clients import ProviderClientPool
+from api import agents
+
+
+class _ProviderStub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    overloaded_responses = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        if type(self).overloaded_responses:
+            type(self).overloaded_responses -= 1
+            self._reply(529, {"type": "error", "error": {"type": "overloaded_error"}}, {"Retry-After": "0"})
+            return
+        self._reply(200, {"content": [{"text": "ok"}]})
+
+    def _reply(self, status: int, body: dict, headers: dict[str, str] | None = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class ProviderClientPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        _ProviderStub.overloaded_responses = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ProviderStub)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/messages"
+        self.pool = ProviderClientPool(max_retries=2)
+
+    def tearDown(self) -> None:
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_overloaded_responses_are_retried_on_a_reused_connection(self):
+        _ProviderStub.overloaded_responses = 2
+        response = self.pool.post_json(self.url, {"q": 1}, {}, timeout_seconds=10)
+        self.assertEqual(response.json(), {"content": [{"text": "ok"}]})
+        self.pool.post_json(self.url, {"q": 2}, {}, timeout_seconds=10)
+
+        stats = self.pool.stats()
+        self.assertEqual((stats["requests"], stats["retries"], stats["new_connections"]), (4, 2, 1))
+        self.assertEqual(stats["reuse_rate"], 0.75)
+
+    def test_retries_stop_at_the_limit(self):
+        _ProviderStub.overloaded_responses = 5
+        response = self.pool.post_json(self.url, {}, {}, timeout_seconds=10)
+        self.assertEqual(response.status_code, 529)
+        self.assertEqual(self.pool.stats()["retries"], 2)
+
+    def test_streams_share_the_async_client_of_their_event_loop(self):
+        async def fetch_twice() -> list[int]:
+            statuses = []
+            for _ in range(2):
+                response = await self.pool.open_stream(self.url, {}, {}, timeout_seconds=10)
+                await response.aread()
+                await response.aclose()
+                statuses.append(response.status_code)
+            await self.pool.async_client.aclose()
+            return statuses
+
+        self.assertEqual(asyncio.run(fetch_twice()), [200, 200])
+        stats = self.pool.stats()
+        self.assertEqual((stats["requests"], stats["new_connections"]), (2, 1))
+
+
+class SharedAgentTests(unittest.TestCase):
+    def test_only_known_sections_share_a_cached_agent(self):
+        self.assertIs(agents.get_agent("finance"), agents.get_agent("finance"))
+        self.assertIsNot(agents.get_agent("no-such-section"), agents.get_agent("no-such-section"))
+        self.assertNotIn("no-such-section", agents._agents)
+
+
+if __name__ == "__main__":
+    unittest.main()
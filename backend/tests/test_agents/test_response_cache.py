@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from agents.response_cache import AgentResponseCache
+from api import agents
+from database.connection import get_db
+
+
+class AgentResponseCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 100.0
+        self.cache = AgentResponseCache(enabled=True, ttl_seconds=60, max_entries=10, clock=lambda: self.now)
+
+    def _key(self, message: str = "Summarize this month's finances", company_id: int | None = 1, context: str = "Revenue: 10"):
+        return self.cache.key("finance", company_id, message, "anthropic", "claude", context)
+
+    def test_equivalent_questions_share_an_answer_within_a_tenant(self):
+        self.cache.put(self._key(), "Revenue is 10.", provider_ms=800)
+        self.assertEqual(self.cache.get(self._key("  summarize this MONTH'S finances?")), "Revenue is 10.")
+        self.assertIsNone(self.cache.get(self._key(company_id=2)))
+
+        self.now += 61
+        self.assertIsNone(self.cache.get(self._key()))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["saved_provider_ms"]), (1, 2, 800.0))
+
+    def test_new_context_drops_answers_built_on_the_old_one(self):
+        self.cache.put(self._key(), "Revenue is 10.", provider_ms=800)
+        self.cache.put(self._key("Top expenses?"), "Rent.", provider_ms=500)
+        self.assertIsNone(self.cache.get(self._key(context="Revenue: 12")))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+        # An answer computed against the old data is not stored once the new data was seen.
+        self.cache.put(self._key(), "Revenue is 10.", provider_ms=800)
+        self.assertIsNone(self.cache.get(self._key()))
+
+    def test_per_question_context_and_data_sources_do_not_evict_each_other(self):
+        def key(message: str, data_source: str = "benela"):
+            context = f"Revenue: 10\nTrainer notes for {message}"
+            return self.cache.key("finance", 1, message, "anthropic", "claude", context, data="Revenue: 10", data_source=data_source)
+
+        self.cache.put(key("Top expenses?"), "Rent.", provider_ms=500)
+        self.assertIsNone(self.cache.get(key("Cash runway?")))
+        self.assertIsNone(self.cache.get(key("Top expenses?", data_source="onec_combined")))
+        self.assertEqual(self.cache.get(key("Top expenses?")), "Rent.")
+        self.assertEqual(self.cache.stats()["invalidations"], 0)
+
+
+class RunAgentResponseCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache = AgentResponseCache(enabled=True, ttl_seconds=60)
+        self.agent = MagicMock()
+        self.agent.name = "Finance Agent"
+        self.agent.run.return_value = "Revenue is 10."
+        self.patches = [
+            patch.object(agents.settings, "ANTHROPIC_API_KEY", "test-key"),
+            patch.object(agents.settings, "OPENAI_API_KEY", "test-key"),
+            patch.object(agents, "agent_responses", self.cache),
+            patch.object(agents, "_safe_get_section_context", return_value="Revenue: 10"),
+            patch.object(agents, "_resolve_agent_company", return_value=(7, "user-a")),
+            patch.object(agents, "_audit_agent_onec_query"),
+            patch.object(agents.admin_crud, "get_ai_trainer_runtime_profile", return_value=None),
+            patch.object(agents, "get_agent", return_value=self.agent),
+        ]
+        for item in self.patches:
+            item.start()
+        app = FastAPI()
+        app.include_router(agents.router, prefix="/agents")
+        app.dependency_overrides[get_db] = lambda: None
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        for item in reversed(self.patches):
+            item.stop()
+
+    def _ask(self, **extra) -> str:
+        response = self.client.post("/agents/finance", json={"message": "Summarize this month", **extra})
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()["response"]
+
+    def test_repeated_question_skips_the_provider_unless_attachments_are_sent(self):
+        self.assertEqual(self._ask(), "Revenue is 10.")
+        self.assertEqual(self._ask(), "Revenue is 10.")
+        self.assertEqual(self.agent.run.call_count, 1)
+
+        self._ask(attachments=[{"file_name": "march.txt", "text_content": "Revenue: 99"}])
+        self.assertEqual(self.agent.run.call_count, 2)
+        self.assertEqual(self.cache.stats()["bypassed"], 1)
+
+        with patch.object(agents, "_safe_get_section_context", return_value="Revenue: 12"):
+            self._ask()
+        self.assertEqual(self.agent.run.call_count, 3)
+
+    def test_trainer_chunks_and_data_sources_do_not_thrash_the_cache(self):
+        profile = SimpleNamespace(
+            id=1,
+            is_enabled=True,
+            updated_at=datetime(2026, 10, 1),
+            created_at=datetime(2026, 10, 1),
+            system_instructions="",
+            temperature=0.2,
+            model=None,
+            provider="auto",
+            max_context_chars=12000,
+        )
+        section_context = lambda section, company_id=None, include_onec=True: "Revenue: 10" + ("\n1C revenue: 4" if include_onec else "")
+        training_context = lambda section, query, **kwargs: f"SECTION TRAINING KNOWLEDGE:\nNotes matching {query}"
+        with patch.object(agents.admin_crud, "get_ai_trainer_runtime_profile", return_value=profile), patch.object(
+            agents, "_safe_get_section_context", side_effect=section_context
+        ), patch.object(agents, "_safe_get_training_context", side_effect=training_context):
+            for message, data_source in [
+                ("Summarize this month", "benela"),
+                ("Top expenses?", "benela"),
+                ("Summarize this month", "onec_combined"),
+                ("Summarize this month", "benela"),
+                ("Top expenses?", "benela"),
+                ("Summarize this month", "onec_combined"),
+            ]:
+                response = self.client.post("/agents/finance", json={"message": message, "data_source": data_source})
+                self.assertEqual(response.status_code, 200, response.text)
+
+        self.assertEqual(self.agent.run.call_count, 3)
+        self.assertEqual(self.cache.stats()["hits"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
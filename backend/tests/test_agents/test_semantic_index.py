@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import unittest
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import crud, schemas
+from database.models import LegalDocument
+from services.semantic_index import HashedNgramEmbedder, SemanticIndex
+
+DOCUMENTS = {
+    1: "Soliq hisobotlarini topshirish muddati har oyning 15-sanasigacha.",
+    2: "Договора поставки подписываются директором и главным бухгалтером.",
+    3: "Office plants are watered every Friday by the facilities team.",
+}
+
+
+class HashedNgramEmbedderTests(unittest.TestCase):
+    def test_inflected_forms_are_closer_than_unrelated_text(self):
+        embedder = HashedNgramEmbedder(dimensions=256)
+        query, related, unrelated = embedder.embed(["договор поставки", DOCUMENTS[2], DOCUMENTS[3]])
+        self.assertAlmostEqual(float(np.linalg.norm(query)), 1.0, places=5)
+        self.assertGreater(float(query @ related), float(query @ unrelated) + 0.2)
+
+
+class SemanticIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.documents = dict(DOCUMENTS)
+        self.versions = {row_id: 0 for row_id in self.documents}
+        self.loaded: list[list[int]] = []
+        self.index = self._index()
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _index(self, **kwargs) -> SemanticIndex:
+        return SemanticIndex(
+            root=self._tmp.name,
+            embedder_factory=lambda: HashedNgramEmbedder(dimensions=256),
+            sync_interval_seconds=3600,
+            **kwargs,
+        )
+
+    def _texts(self, ids: list[int]) -> dict[int, str]:
+        self.loaded.append(sorted(ids))
+        return {row_id: self.documents[row_id] for row_id in ids if row_id in self.documents}
+
+    def _search(self, index: SemanticIndex, query: str) -> list[int]:
+        hits = index.search("legal", query, 2, versions=lambda: dict(self.versions), texts=self._texts, min_similarity=0.1)
+        return [row_id for row_id, _ in hits]
+
+    def test_updates_are_incremental_and_survive_a_restart(self):
+        self.assertEqual(self._search(self.index, "soliq hisoboti muddati")[0], 1)
+        self.assertEqual(self.loaded, [[1, 2, 3]])
+
+        self.documents[4] = "Hisobot shakllari soliq qo'mitasi saytida e'lon qilinadi."
+        self.versions[4] = 0
+        self.documents[2] = "Ish haqi oyning oxirida to'lanadi."
+        self.versions[2] = 1
+        del self.versions[1]
+        self.index.mark_stale("legal")
+        hits = self._search(self.index, "soliq hisoboti")
+        self.assertEqual(hits[0], 4)
+        self.assertNotIn(1, hits)
+        self.assertEqual(self.loaded[-1], [2, 4])
+
+        self.index._namespace("legal").compact(self.index.embedder.name)
+        restarted = self._index()
+        self.assertEqual(self._search(restarted, "ish haqi to'lanadi")[0], 2)
+        self.assertEqual(len(self.loaded), 2)  # nothing re-embedded after the restart
+
+    def test_a_cold_index_fills_in_small_batches_on_the_request_path(self):
+        index = self._index(request_batch=2)
+        self._search(index, "договор")
+        self._search(index, "договор")
+        self.assertEqual(self.loaded, [[1, 2], [3]])
+
+    def test_sync_embeds_everything_up_front_so_searches_only_search(self):
+        index = self._index(sync_batch=2, request_batch=0)
+        self.assertTrue(index.sync("legal", versions=lambda: dict(self.versions), texts=self._texts))
+        self.assertEqual(self.loaded, [[1, 2], [3]])
+        self.assertEqual(self._search(index, "договор поставки")[0], 2)
+        self.assertEqual(len(self.loaded), 2)
+
+
+class LegalDocumentIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self._tmp.name}/legal.db")
+        LegalDocument.__table__.create(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.index = SemanticIndex(root=f"{self._tmp.name}/vectors", embedder_factory=lambda: HashedNgramEmbedder(dimensions=256))
+        index_patch = patch.object(crud, "semantic_index", self.index)
+        index_patch.start()
+        self.addCleanup(index_patch.stop)
+
+    def tearDown(self) -> None:
+        self.db.close()
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def test_writes_are_embedded_before_the_next_search(self):
+        row = crud.create_legal_document(self.db, schemas.LegalDocumentCreate(title="Soliq kodeksi", summary=DOCUMENTS[1]))
+        self.assertEqual(self.index.stats()["namespaces"], {crud.LEGAL_SEMANTIC_NAMESPACE: 1})
+        crud.delete_legal_document(self.db, row.id)
+        self.assertEqual(self.index.stats()["namespaces"], {crud.LEGAL_SEMANTIC_NAMESPACE: 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from datetime import datetime, time
+from tempfile import TemporaryDirectory
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import ClientActivity, ClientOrg, Employee, EmployeeStatus
+from database.attendance_models import AttendanceRecord, OfficeLocation, LeaveRequest, PayrollRecord, QRToken, UzbekHoliday
+
+TASHKENT = ZoneInfo("Asia/Tashkent")
+
+
+class AttendanceHarness:
+    def __init__(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self._tmp.name}/attendance-test.db", connect_args={"check_same_thread": False})
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        ClientOrg.__table__.create(bind=self.engine, checkfirst=True)
+        ClientActivity.__table__.create(bind=self.engine, checkfirst=True)
+        Employee.__table__.create(bind=self.engine, checkfirst=True)
+        OfficeLocation.__table__.create(bind=self.engine, checkfirst=True)
+        AttendanceRecord.__table__.create(bind=self.engine, checkfirst=True)
+        LeaveRequest.__table__.create(bind=self.engine, checkfirst=True)
+        PayrollRecord.__table__.create(bind=self.engine, checkfirst=True)
+        QRToken.__table__.create(bind=self.engine, checkfirst=True)
+        UzbekHoliday.__table__.create(bind=self.engine, checkfirst=True)
+
+        with self.SessionLocal() as db:
+            db.add(
+                ClientOrg(
+                    id=1,
+                    name="Test Company",
+                    slug="test-company",
+                    owner_name="Owner",
+                    owner_email="owner@test-company.local",
+                    country="Uzbekistan",
+                    created_at=datetime(2025, 1, 1),
+                )
+            )
+            db.add(
+                Employee(
+                    id=1,
+                    company_id=1,
+                    full_name="Jasur Karimov",
+                    email="jasur@test-company.local",
+                    department="Engineering",
+                    role="Senior Developer",
+                    salary=4_400_000,
+                    shift_start=time(9, 0),
+                    shift_end=time(18, 0),
+                    late_grace_minutes=15,
+                    contract_type="monthly",
+                    work_days=[1, 2, 3, 4, 5],
+                    status=EmployeeStatus.active,
+                    start_date=datetime(2025, 1, 1),
+                )
+            )
+            db.add(
+                OfficeLocation(
+                    id=1,
+                    company_id=1,
+                    name="Main Office",
+                    geofence_radius_meters=300,
+                    qr_rotation_seconds=30,
+                    require_pin=False,
+                    allow_remote_flag=True,
+                    is_active=True,
+                )
+            )
+            db.commit()
+
+    def close(self) -> None:
+        self.engine.dispose()
+        self._tmp.cleanup()
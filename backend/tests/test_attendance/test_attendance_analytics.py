@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import time as clock
+import unittest
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import insert
+
+from database.attendance_models import AttendanceRecord, AttendanceSource, AttendanceStatus, LeaveRequest, UzbekHoliday
+from database.models import ClientOrg, Employee, EmployeeStatus
+from integrations.attendance.attendance_service import attendance_service
+from tests.test_attendance._helpers import TASHKENT, AttendanceHarness
+
+
+def _employee(employee_id: int, name: str, department: str, work_days: list[int], **kwargs) -> Employee:
+    return Employee(
+        id=employee_id,
+        company_id=1,
+        full_name=name,
+        email=f"employee{employee_id}@test-company.local",
+        department=department,
+        role="Specialist",
+        shift_start=time(9, 0),
+        shift_end=time(18, 0),
+        work_days=work_days,
+        status=kwargs.pop("status", EmployeeStatus.active),
+        start_date=kwargs.pop("start_date", datetime(2025, 1, 1)),
+        **kwargs,
+    )
+
+
+def _record(employee_id: int, work_date: date, *, late: int = 0, overtime: float | None = None, present: bool = True) -> dict:
+    clock_in = datetime.combine(work_date, time(4, 0)) + timedelta(minutes=late) if present else None
+    return {
+        "employee_id": employee_id,
+        "company_id": 1,
+        "work_date": work_date,
+        "clock_in": clock_in,
+        "clock_out": clock_in + timedelta(hours=9 + (overtime or 0)) if clock_in else None,
+        "hours_worked": round(8.0 + (overtime or 0), 2) if present else None,
+        "overtime_hours": overtime,
+        "late_minutes": late,
+        "early_leave_minutes": 0,
+        "status": (AttendanceStatus.late if late else AttendanceStatus.on_time) if present else AttendanceStatus.absent,
+        "source": AttendanceSource.qr_code,
+        "location_verified": True,
+        "is_remote_flag": False,
+        "is_corrected": False,
+    }
+
+
+class AttendanceAnalyticsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = AttendanceHarness()
+        self.now_patch = patch.object(attendance_service, "local_now", return_value=datetime(2026, 3, 16, 10, 0, tzinfo=TASHKENT))
+        self.now_patch.start()
+
+    def tearDown(self) -> None:
+        self.now_patch.stop()
+        self.harness.close()
+
+    def _seed_month(self) -> None:
+        with self.harness.SessionLocal() as db:
+            db.add_all(
+                [
+                    _employee(2, "Dilnoza Rahimova", "Finance", [1, 2, 3, 4, 5, 6], salary=5_000_000),
+                    _employee(3, "Bekzod Aliyev", "Engineering", [1, 2, 3, 4, 5], status=EmployeeStatus.terminated),
+                    _employee(4, "Malika Yusupova", "", [1, 2, 3, 4, 5]),
+                    _employee(5, "Timur Nazarov", "Finance", [1, 3, 5]),
+                    _employee(6, "Zarina Tursunova", "Sales", [1], salary=3_200_000),
+                ]
+            )
+            db.add(UzbekHoliday(date=date(2026, 3, 21), name_uz="Navro'z", name_ru="Навруз", is_work_day=False))
+            db.add(UzbekHoliday(date=date(2026, 3, 23), name_uz="Navro'z", name_ru="Навруз", is_work_day=False))
+            db.add(UzbekHoliday(date=date(2026, 3, 8), name_uz="Xotin-qizlar kuni", name_ru="Женский день", is_work_day=True))
+            db.add(
+                LeaveRequest(
+                    employee_id=4,
+                    company_id=1,
+                    leave_type="vacation",
+                    date_from=date(2026, 3, 9),
+                    date_to=date(2026, 3, 13),
+                    days_count=5,
+                    status="approved",
+                )
+            )
+            db.add(
+                LeaveRequest(
+                    employee_id=2,
+                    company_id=1,
+                    leave_type="sick",
+                    date_from=date(2026, 3, 2),
+                    date_to=date(2026, 3, 3),
+                    days_count=2,
+                    status="pending",
+                )
+            )
+            rows = []
+            for day in range(1, 16):
+                work_date = date(2026, 3, day)
+                weekday = work_date.isoweekday()
+                if weekday <= 5:
+                    rows.append(_record(1, work_date, late=20 if day % 4 == 0 else 0, overtime=0.5 if day % 3 == 0 else None))
+                    rows.append(_record(3, work_date, late=30 if day % 2 else 0, overtime=1.0))
+                    if not 9 <= day <= 13:
+                        rows.append(_record(4, work_date, present=day != 5))
+                if weekday <= 6 or day == 8:
+                    rows.append(_record(2, work_date, late=17 if day in {2, 10, 11} else 0, overtime=1.25 if weekday == 6 else None))
+                if weekday in {1, 3, 5}:
+                    rows.append(_record(5, work_date, late=25 if day in {4, 6} else 0))
+            rows.extend(_record(6, date(2026, 3, day), overtime=0.75) for day in (2, 8, 9, 16, 30))
+            db.execute(insert(AttendanceRecord), rows)
+            db.commit()
+
+    def test_monthly_stats_and_summary_match_per_employee_reference(self):
+        self._seed_month()
+        with self.harness.SessionLocal() as db:
+            stats = attendance_service.get_monthly_stats(db, 1, 3, 2026)
+            summary = attendance_service.analytics_summary(db, 1, 3, 2026)
+
+        self.assertEqual(
+            stats.model_dump(),
+            {
+                "avg_rate": 58.5,
+                "total_overtime": 8.2,
+                "most_late_employee": "Dilnoza Rahimova",
+                "most_late_count": 3,
+                "perfect_attendance_count": 1,
+                "working_days_total": 82,
+                "working_days_remaining": 42,
+                "estimated_payroll_uzs": 12600000.0,
+                "last_approved_month": "Not approved yet",
+            },
+        )
+        self.assertEqual(summary.avg_attendance_rate, 58.5)
+        self.assertEqual(summary.total_overtime_hours, 8.2)
+        self.assertEqual(
+            summary.top_overtime_employees,
+            [
+                {"name": "Zarina Tursunova", "hours": 3.75},
+                {"name": "Dilnoza Rahimova", "hours": 2.5},
+                {"name": "Jasur Karimov", "hours": 2.0},
+                {"name": "Malika Yusupova", "hours": 0.0},
+                {"name": "Timur Nazarov", "hours": 0.0},
+            ],
+        )
+        self.assertEqual(
+            summary.most_late_employees,
+            [
+                {"name": "Dilnoza Rahimova", "count": 3},
+                {"name": "Jasur Karimov", "count": 2},
+                {"name": "Timur Nazarov", "count": 2},
+                {"name": "Malika Yusupova", "count": 0},
+                {"name": "Zarina Tursunova", "count": 0},
+            ],
+        )
+        self.assertEqual(len(summary.absent_trend), 30)
+        self.assertEqual(summary.absent_trend[0], {"date": "2026-03-02", "count": 0})
+        self.assertEqual([item["date"] for item in summary.absent_trend if item["count"]], ["2026-03-05"])
+        self.assertEqual(
+            summary.department_breakdown,
+            [
+                {"dept": "Engineering", "rate": 100.0, "avg_hours": 8.2},
+                {"dept": "Unassigned", "rate": 80.0, "avg_hours": 8.0},
+                {"dept": "Finance", "rate": 100.0, "avg_hours": 8.13},
+                {"dept": "Sales", "rate": 100.0, "avg_hours": 8.75},
+            ],
+        )
+
+    def test_close_attendance_days_backfills_once_and_skips_leave_and_holidays(self):
+        self._seed_month()
+        changes = []
+        listener = lambda company_id, items: changes.extend(items)
+        attendance_service.add_record_listener(listener)
+        try:
+            with self.harness.SessionLocal() as db:
+                created = attendance_service.close_attendance_days(db, 1, date(2026, 3, 16), date(2026, 3, 24))
+                again = attendance_service.bulk_mark_absent(db, 1, date(2026, 3, 20))
+                on_leave = attendance_service.close_attendance_days(db, 1, date(2026, 3, 9), date(2026, 3, 13))
+                absent = {
+                    (employee_id, work_date)
+                    for employee_id, work_date in db.query(AttendanceRecord.employee_id, AttendanceRecord.work_date)
+                    .filter(AttendanceRecord.status == AttendanceStatus.absent, AttendanceRecord.work_date >= date(2026, 3, 16))
+                    .all()
+                }
+        finally:
+            attendance_service.remove_record_listener(listener)
+
+        # 16-24 March: 21 and 23 are holidays, so employees 1, 2 and 4 owe 16-20 and 24, Timur
+        # owes Mon/Wed/Fri, Zarina already has the 16th and the terminated employee is skipped.
+        self.assertEqual(again, 0)
+        self.assertEqual(on_leave, 0)
+        self.assertEqual(created, len(absent))
+        self.assertEqual(len(changes), created)
+        self.assertNotIn((3, date(2026, 3, 17)), absent)
+        self.assertNotIn((1, date(2026, 3, 21)), absent)
+        self.assertNotIn((6, date(2026, 3, 16)), absent)
+        self.assertNotIn((1, date(2026, 3, 22)), absent)
+        self.assertIn((2, date(2026, 3, 24)), absent)
+        self.assertEqual(sorted(day.day for employee_id, day in absent if employee_id == 5), [16, 18, 20])
+        self.assertEqual(created, 3 * 6 + 3)
+
+    def test_close_attendance_days_starts_at_hire_and_company_creation(self):
+        with self.harness.SessionLocal() as db:
+            db.add(_employee(2, "Dilnoza Rahimova", "Finance", [1, 2, 3, 4, 5], start_date=datetime(2026, 3, 19, 6, 0)))
+            db.get(ClientOrg, 1).created_at = datetime(2026, 3, 17, 12, 0)
+            db.commit()
+            created = attendance_service.close_attendance_days(db, 1, date(2026, 3, 9), date(2026, 3, 20))
+            absent = sorted(
+                (employee_id, work_date.day)
+                for employee_id, work_date in db.query(AttendanceRecord.employee_id, AttendanceRecord.work_date).all()
+            )
+
+        self.assertEqual(created, 6)
+        self.assertEqual(absent, [(1, 17), (1, 18), (1, 19), (1, 20), (2, 19), (2, 20)])
+
+    def test_month_summary_for_thousand_employees_stays_fast(self):
+        with self.harness.SessionLocal() as db:
+            db.execute(
+                insert(Employee),
+                [
+                    {
+                        "id": employee_id,
+                        "company_id": 1,
+                        "full_name": f"Employee {employee_id:04d}",
+                        "email": f"employee{employee_id}@test-company.local",
+                        "department": f"Department {employee_id % 12}",
+                        "role": "Operator",
+                        "salary": 3_000_000,
+                        "shift_start": time(9, 0),
+                        "shift_end": time(18, 0),
+                        "late_grace_minutes": 15,
+                        "contract_type": "monthly",
+                        "work_days": [1, 2, 3, 4, 5, 6] if employee_id % 3 == 0 else [1, 2, 3, 4, 5],
+                        "status": EmployeeStatus.active,
+                    }
+                    for employee_id in range(2, 1001)
+                ],
+            )
+            db.execute(
+                insert(AttendanceRecord),
+                [
+                    _record(
+                        employee_id,
+                        date(2026, 3, day),
+                        late=(employee_id + day) % 40 if (employee_id + day) % 7 == 0 else 0,
+                        overtime=0.5 if (employee_id * day) % 5 == 0 else None,
+                        present=(employee_id + day) % 23 != 0,
+                    )
+                    for employee_id in range(1, 1001)
+                    for day in range(1, 32)
+                ],
+            )
+            db.commit()
+
+            started = clock.perf_counter()
+            stats = attendance_service.get_monthly_stats(db, 1, 3, 2026)
+            summary = attendance_service.analytics_summary(db, 1, 3, 2026)
+            elapsed = clock.perf_counter() - started
+
+        self.assertEqual(stats.working_days_total, 1000 * 22 + 333 * 4)
+        self.assertEqual(len(summary.department_breakdown), 13)
+        self.assertEqual(len(summary.most_late_employees), 5)
+        self.assertLess(elapsed, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
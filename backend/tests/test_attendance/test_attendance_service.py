@@ -1,82 +1,17 @@
 from __future__ import annotations
 
 import unittest
-from datetime import UTC, date, datetime, time
-from tempfile import TemporaryDirectory
+from datetime import date, datetime
 from unittest.mock import patch
-from zoneinfo import ZoneInfo
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import bcrypt
 
-from database.models import ClientOrg, Employee, EmployeeStatus
-from database.attendance_models import AttendanceRecord, OfficeLocation, LeaveRequest, PayrollRecord, QRToken, UzbekHoliday, AttendanceStatus
+from database.models import Employee
+from database.attendance_models import AttendanceRecord, OfficeLocation, AttendanceStatus
+from database.crud import employee_pin_lookup_digest
 from integrations.attendance.attendance_service import attendance_service
 from integrations.attendance.payroll_engine import payroll_engine
-
-TASHKENT = ZoneInfo("Asia/Tashkent")
-
-
-class AttendanceHarness:
-    def __init__(self) -> None:
-        self._tmp = TemporaryDirectory()
-        self.engine = create_engine(f"sqlite:///{self._tmp.name}/attendance-test.db", connect_args={"check_same_thread": False})
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-
-        ClientOrg.__table__.create(bind=self.engine, checkfirst=True)
-        Employee.__table__.create(bind=self.engine, checkfirst=True)
-        OfficeLocation.__table__.create(bind=self.engine, checkfirst=True)
-        AttendanceRecord.__table__.create(bind=self.engine, checkfirst=True)
-        LeaveRequest.__table__.create(bind=self.engine, checkfirst=True)
-        PayrollRecord.__table__.create(bind=self.engine, checkfirst=True)
-        QRToken.__table__.create(bind=self.engine, checkfirst=True)
-        UzbekHoliday.__table__.create(bind=self.engine, checkfirst=True)
-
-        with self.SessionLocal() as db:
-            db.add(
-                ClientOrg(
-                    id=1,
-                    name="Test Company",
-                    slug="test-company",
-                    owner_name="Owner",
-                    owner_email="owner@test-company.local",
-                    country="Uzbekistan",
-                )
-            )
-            db.add(
-                Employee(
-                    id=1,
-                    company_id=1,
-                    full_name="Jasur Karimov",
-                    email="jasur@test-company.local",
-                    department="Engineering",
-                    role="Senior Developer",
-                    salary=4_400_000,
-                    shift_start=time(9, 0),
-                    shift_end=time(18, 0),
-                    late_grace_minutes=15,
-                    contract_type="monthly",
-                    work_days=[1, 2, 3, 4, 5],
-                    status=EmployeeStatus.active,
-                )
-            )
-            db.add(
-                OfficeLocation(
-                    id=1,
-                    company_id=1,
-                    name="Main Office",
-                    geofence_radius_meters=300,
-                    qr_rotation_seconds=30,
-                    require_pin=False,
-                    allow_remote_flag=True,
-                    is_active=True,
-                )
-            )
-            db.commit()
-
-    def close(self) -> None:
-        self.engine.dispose()
-        self._tmp.cleanup()
+from tests.test_attendance._helpers import TASHKENT, AttendanceHarness
 
 
 class AttendanceServiceTests(unittest.TestCase):
@@ -169,6 +104,54 @@ class AttendanceServiceTests(unittest.TestCase):
             self.assertAlmostEqual(record.jshdssh, expected_tax, places=2)
             self.assertAlmostEqual(record.net_salary, expected_net, places=2)
 
+    def test_find_employee_by_pin_uses_lookup_digest_and_backfills_legacy_hashes(self):
+        with self.harness.SessionLocal() as db:
+            employee = db.query(Employee).filter(Employee.id == 1).first()
+            employee.employee_pin = bcrypt.hashpw(b"4321", bcrypt.gensalt()).decode("utf-8")
+            db.commit()
+
+            found = attendance_service.find_employee_by_pin(db, 1, "4321")
+            self.assertEqual(found.id, 1)
+            self.assertEqual(found.employee_pin_lookup, employee_pin_lookup_digest(1, "4321"))
+
+            with patch.object(attendance_service, "_hash_matches", side_effect=AssertionError("bcrypt should not run")):
+                self.assertEqual(attendance_service.find_employee_by_pin(db, 1, "4321").id, 1)
+                self.assertIsNone(attendance_service.find_employee_by_pin(db, 2, "4321"))
+
+    def test_digest_under_a_retired_key_is_verified_with_bcrypt_and_rewritten(self):
+        attendance_service.clear_employee_lookup_cache()
+        with self.harness.SessionLocal() as db:
+            employee = db.query(Employee).filter(Employee.id == 1).first()
+            employee.employee_pin = bcrypt.hashpw(b"4321", bcrypt.gensalt()).decode("utf-8")
+            employee.employee_pin_lookup = employee_pin_lookup_digest(1, "4321", "old-key")
+            db.commit()
+
+            with patch("integrations.attendance.attendance_service.EMPLOYEE_PIN_LOOKUP_RETIRED_SECRETS", ("old-key",)):
+                self.assertIsNone(attendance_service.find_employee_by_pin(db, 1, "1234"))
+                self.assertEqual(attendance_service.find_employee_by_pin(db, 1, "4321").id, 1)
+            self.assertEqual(employee.employee_pin_lookup, employee_pin_lookup_digest(1, "4321"))
+
+            employee.employee_pin_lookup = employee_pin_lookup_digest(1, "4321", "old-key")
+            db.commit()
+            self.assertIsNone(attendance_service.find_employee_by_email_and_pin(db, "jasur@test-company.local", "1234"))
+            self.assertEqual(attendance_service.find_employee_by_email_and_pin(db, "jasur@test-company.local", "4321").id, 1)
+            self.assertEqual(employee.employee_pin_lookup, employee_pin_lookup_digest(1, "4321"))
+
+    def test_email_and_telegram_lookups_are_cached_and_revalidated(self):
+        attendance_service.clear_employee_lookup_cache()
+        with self.harness.SessionLocal() as db:
+            employee = db.query(Employee).filter(Employee.id == 1).first()
+            attendance_service.link_employee_telegram(db, employee=employee, chat_id="555", username="jasur", first_name="Jasur")
+            self.assertEqual(attendance_service.find_employee_by_telegram_chat(db, "555").id, 1)
+            self.assertEqual(attendance_service.find_employee_by_email(db, 1, "JASUR@test-company.local").id, 1)
+
+            attendance_service.unlink_employee_telegram(db, employee)
+            self.assertIsNone(attendance_service.find_employee_by_telegram_chat(db, "555"))
+
+            employee.email = "jasur.karimov@test-company.local"
+            db.commit()
+            self.assertIsNone(attendance_service.find_employee_by_email(db, 1, "jasur@test-company.local"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import time as clock
+import unittest
+from datetime import date, datetime, time
+
+from database.models import Employee, EmployeeStatus
+from database.attendance_models import AttendanceRecord, AttendanceSource, AttendanceStatus
+from integrations.attendance.hardware_bridge import (
+    HardwareEventPipeline,
+    HikvisionAdapter,
+    RFIDAdapter,
+    SimulatedDeviceAdapter,
+    ZKTecoAdapter,
+)
+from tests.test_attendance._helpers import AttendanceHarness
+
+
+class HardwareBridgeTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.harness = AttendanceHarness()
+
+    def tearDown(self) -> None:
+        self.harness.close()
+
+    def _pipeline(self, **kwargs) -> HardwareEventPipeline:
+        return HardwareEventPipeline(self.harness.SessionLocal, flush_seconds=0.05, **kwargs)
+
+    def test_adapters_normalize_vendor_payloads(self):
+        zk = ZKTecoAdapter(company_id=1, device_id="zk-1")
+        event = zk.normalize_event({"user_id": "1", "timestamp": "2026-03-16 09:05:00", "punch": 0})
+        self.assertEqual(event.employee_id, 1)
+        self.assertEqual(event.punched_at, datetime(2026, 3, 16, 4, 5))
+        self.assertEqual(event.direction, "in")
+
+        hik = HikvisionAdapter(company_id=1, device_id="hik-1")
+        event = hik.normalize_event({"dateTime": "2026-03-16T09:05:00+05:00", "AccessControllerEvent": {"employeeNoString": "1"}})
+        self.assertEqual(event.punched_at, datetime(2026, 3, 16, 4, 5))
+
+        rfid = RFIDAdapter(company_id=1, device_id="rfid-1", user_map={"ab12": 1})
+        self.assertEqual(rfid.normalize_event({"card_uid": "AB12", "read_at": 1773633900}).employee_id, 1)
+        self.assertIsNone(rfid.normalize_event({"card_uid": "unknown", "read_at": 1773633900}))
+
+    async def test_pipeline_merges_punches_and_drops_repeats(self):
+        pipeline = self._pipeline()
+        adapter = ZKTecoAdapter(company_id=1, device_id="zk-1", location_id=1, pipeline=pipeline)
+        await pipeline.start()
+        await adapter.push_attendance_event({"user_id": "1", "timestamp": "2026-03-16 09:05:00"})
+        await adapter.push_attendance_event({"user_id": "1", "timestamp": "2026-03-16 09:05:20"})
+        await adapter.push_attendance_event({"user_id": "1", "timestamp": "2026-03-16 18:30:00"})
+        await adapter.push_attendance_event({"user_id": "999", "timestamp": "2026-03-16 09:00:00"})
+        await pipeline.stop()
+
+        self.assertEqual(pipeline.stats["duplicates"], 1)
+        self.assertEqual(pipeline.stats["ignored"], 1)
+        with self.harness.SessionLocal() as db:
+            record = db.query(AttendanceRecord).filter(AttendanceRecord.employee_id == 1).one()
+            self.assertEqual(record.work_date, date(2026, 3, 16))
+            self.assertEqual(record.clock_in, datetime(2026, 3, 16, 4, 5))
+            self.assertEqual(record.clock_out, datetime(2026, 3, 16, 13, 30))
+            self.assertEqual(record.source, AttendanceSource.hardware)
+            self.assertEqual(record.status, AttendanceStatus.overtime)
+
+    async def test_simulated_device_sustains_thousands_of_events_per_minute(self):
+        with self.harness.SessionLocal() as db:
+            for employee_id in range(2, 201):
+                db.add(
+                    Employee(
+                        id=employee_id,
+                        company_id=1,
+                        full_name=f"Employee {employee_id}",
+                        email=f"employee{employee_id}@test-company.local",
+                        department="Operations",
+                        role="Operator",
+                        shift_start=time(9, 0),
+                        shift_end=time(18, 0),
+                        work_days=[1, 2, 3, 4, 5],
+                        status=EmployeeStatus.active,
+                    )
+                )
+            db.commit()
+
+        pipeline = self._pipeline(dedup_seconds=0)
+        device = SimulatedDeviceAdapter(
+            company_id=1,
+            device_id="sim-1",
+            employee_ids=list(range(1, 201)),
+            events_per_poll=500,
+            clock=lambda: datetime(2026, 3, 16, 5, 0),
+            seed=7,
+        )
+        await pipeline.start()
+        started = clock.perf_counter()
+        for _ in range(10):
+            for raw_event in await device.get_pending_events():
+                await pipeline.submit(device.normalize_event(raw_event))
+        await pipeline.stop()
+        elapsed = clock.perf_counter() - started
+
+        self.assertEqual(pipeline.stats["received"], 5000)
+        self.assertEqual(pipeline.stats["failed"], 0)
+        self.assertLess(elapsed, 60.0)
+        with self.harness.SessionLocal() as db:
+            self.assertEqual(db.query(AttendanceRecord).count(), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from datetime import date, datetime
+from unittest.mock import patch
+
+from database.attendance_models import AttendanceRecord
+from database.models import Employee
+from integrations.attendance.attendance_service import attendance_service
+from integrations.attendance.presence_board import PresenceBoard
+from tests.test_attendance._helpers import TASHKENT, AttendanceHarness
+
+
+class PresenceBoardTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.harness = AttendanceHarness()
+        self.board = PresenceBoard()
+        attendance_service.add_record_listener(self.board.apply_changes)
+        self.now_patch = patch.object(attendance_service, "local_now", return_value=datetime(2026, 3, 16, 10, 0, tzinfo=TASHKENT))
+        self.now_patch.start()
+
+    def tearDown(self) -> None:
+        self.now_patch.stop()
+        attendance_service.remove_record_listener(self.board.apply_changes)
+        self.harness.close()
+
+    def test_snapshot_matches_database_presence(self):
+        with self.harness.SessionLocal() as db:
+            expected = attendance_service.get_todays_presence(db, 1)
+            self.assertEqual(self.board.snapshot(db, 1), expected)
+        self.assertEqual([item.employee_id for item in expected.not_arrived], [1])
+
+    async def test_committed_records_update_board_and_stream_deltas(self):
+        with self.harness.SessionLocal() as db:
+            self.board.snapshot(db, 1)
+            queue = self.board.subscribe(1)
+            attendance_service.create_manual_record(
+                db,
+                employee=db.get(Employee, 1),
+                work_date=date(2026, 3, 16),
+                clock_in=datetime(2026, 3, 16, 4, 30),
+                clock_out=None,
+                note="Forgot badge",
+                corrected_by="hr-1",
+            )
+            # The board is served from memory now; deleting the row must not change it.
+            db.query(AttendanceRecord).delete()
+            db.commit()
+            board = self.board.snapshot(db, 1)
+
+        self.assertEqual([item.employee_id for item in board.currently_in], [1])
+        self.assertEqual(board.present_count, 1)
+        delta = await asyncio.wait_for(queue.get(), timeout=1)
+        self.assertEqual(delta["type"], "delta")
+        self.assertEqual(delta["buckets"], ["currently_in"])
+        self.assertEqual(delta["summary"]["present_count"], 1)
+
+        self.board.invalidate(1)
+        self.assertEqual((await asyncio.wait_for(queue.get(), timeout=1))["type"], "resync")
+        self.board.unsubscribe(1, queue)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from tempfile import TemporaryDirectory
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models import (
+    InternalChatAttachment,
+    InternalChatBlob,
+    InternalChatMessage,
+    InternalChatParticipant,
+    InternalChatTask,
+    InternalChatTaskReminder,
+    InternalChatThread,
+)
+from integrations.internal_chat.access_cache import thread_access_cache
+
+
+class InternalChatHarness:
+    def __init__(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self._tmp.name}/internal-chat-test.db", connect_args={"check_same_thread": False})
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        InternalChatThread.__table__.create(bind=self.engine, checkfirst=True)
+        InternalChatParticipant.__table__.create(bind=self.engine, checkfirst=True)
+        InternalChatMessage.__table__.create(bind=self.engine, checkfirst=True)
+        InternalChatAttachment.__table__.create(bind=self.engine, checkfirst=True)
+        InternalChatBlob.__table__.create(bind=self.engine, checkfirst=True)
+        InternalChatTask.__table__.create(bind=self.engine, checkfirst=True)
+        InternalChatTaskReminder.__table__.create(bind=self.engine, checkfirst=True)
+
+        with self.SessionLocal() as db:
+            db.add(InternalChatThread(id=1, workspace_id="ws-1", scope="direct", title="Ops", created_by_user_id="user-a"))
+            db.add(InternalChatThread(id=2, workspace_id="ws-1", scope="judith_assistant", title="Judith", created_by_user_id="user-a"))
+            db.add_all(
+                [
+                    InternalChatParticipant(thread_id=1, user_id="user-a", display_name="Aziza", role="client"),
+                    InternalChatParticipant(thread_id=1, user_id="user-b", display_name="Bobur", role="employee"),
+                    InternalChatParticipant(thread_id=2, user_id="user-a", display_name="Aziza", role="client"),
+                    InternalChatParticipant(thread_id=2, user_id="judith-ai", display_name="Judith", role="assistant"),
+                ]
+            )
+            db.commit()
+        # Thread ids repeat across harness databases.
+        thread_access_cache.clear()
+
+    def add_message(self, thread_id: int, sender_user_id: str, body: str) -> int:
+        with self.SessionLocal() as db:
+            row = InternalChatMessage(
+                thread_id=thread_id,
+                sender_user_id=sender_user_id,
+                sender_name=sender_user_id,
+                sender_role="client",
+                body=body,
+            )
+            db.add(row)
+            db.commit()
+            return row.id
+
+    def close(self) -> None:
+        self.engine.dispose()
+        self._tmp.cleanup()
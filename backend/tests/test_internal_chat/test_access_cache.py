@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import unittest
+
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from api import internal_chat
+from database.models import InternalChatParticipant
+from integrations.internal_chat.access_cache import thread_access_cache
+from tests.test_internal_chat._helpers import InternalChatHarness
+
+
+class ThreadAccessCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self.statements: list[str] = []
+        event.listen(self.harness.engine, "before_cursor_execute", self._record)
+
+    def tearDown(self) -> None:
+        event.remove(self.harness.engine, "before_cursor_execute", self._record)
+        thread_access_cache.clear()
+        self.harness.close()
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+
+    def test_repeat_checks_and_unchanged_participant_skip_queries(self):
+        with self.harness.SessionLocal() as db:
+            internal_chat._assert_thread_access(db, thread_id=1, user_id="user-a", is_super_admin=False)
+            self.assertEqual(len(self.statements), 1)
+            internal_chat._assert_thread_access(db, thread_id=1, user_id="user-a", is_super_admin=False)
+            internal_chat._ensure_participant(db, 1, "user-a", None, "Aziza", "client")
+            self.assertEqual(len(self.statements), 1)
+
+        with self.harness.SessionLocal() as db:
+            internal_chat._assert_thread_access(db, thread_id=1, user_id="user-b", is_super_admin=False)
+            self.assertEqual(len(self.statements), 1)
+
+    def test_changed_participant_is_written_and_invalidates(self):
+        with self.harness.SessionLocal() as db:
+            internal_chat._assert_thread_access(db, thread_id=1, user_id="user-a", is_super_admin=False)
+            internal_chat._ensure_participant(db, 1, "user-a", None, "Aziza K.", "client")
+            db.commit()
+        with self.harness.SessionLocal() as db:
+            self.assertEqual(thread_access_cache.get(db, 1).participants["user-a"].display_name, "Aziza K.")
+
+    def test_bulk_participant_delete_revokes_access_after_commit(self):
+        with self.harness.SessionLocal() as db:
+            internal_chat._assert_thread_access(db, thread_id=1, user_id="user-b", is_super_admin=False)
+            (
+                db.query(InternalChatParticipant)
+                .filter(InternalChatParticipant.thread_id == 1, InternalChatParticipant.user_id == "user-b")
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        with self.harness.SessionLocal() as db:
+            with self.assertRaises(HTTPException) as raised:
+                internal_chat._assert_thread_access(db, thread_id=1, user_id="user-b", is_super_admin=False)
+            self.assertEqual(raised.exception.status_code, 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
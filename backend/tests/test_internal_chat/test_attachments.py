@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import unittest
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from api import internal_chat
+from database.connection import get_db
+from database.models import InternalChatAttachment
+from integrations.internal_chat.attachment_storage import (
+    AttachmentStorage,
+    LocalAttachmentStorage,
+    UploadTooLarge,
+    blob_key,
+    parse_byte_range,
+    stage_upload,
+)
+from tests.test_internal_chat._helpers import InternalChatHarness
+
+
+def _upload(data: bytes, name: str = "report.pdf", content_type: str = "application/pdf") -> UploadFile:
+    return UploadFile(BytesIO(data), filename=name, headers=Headers({"content-type": content_type}))
+
+
+class AttachmentStorageTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.storage = LocalAttachmentStorage(Path(self._tmp.name))
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_staged_uploads_are_hashed_and_deduplicated(self):
+        data = b"x" * 300_000
+        first = asyncio.run(stage_upload(_upload(data), self.storage.staging_dir, 1_000_000, chunk_bytes=64 * 1024))
+        second = asyncio.run(stage_upload(_upload(data), self.storage.staging_dir, 1_000_000, chunk_bytes=64 * 1024))
+        self.assertEqual((first.size_bytes, first.sha256), (len(data), hashlib.sha256(data).hexdigest()))
+
+        key = self.storage.put_file(first.path, first.sha256)
+        self.assertEqual(self.storage.put_file(second.path, second.sha256), key)
+        self.assertEqual(self.storage.local_path(key).read_bytes(), data)
+        self.assertEqual(list(self.storage.staging_dir.iterdir()), [])
+        self.assertEqual(b"".join(self.storage.iter_range(key, 10, 19)), data[10:20])
+
+    def test_oversized_upload_leaves_no_partial_file(self):
+        with self.assertRaises(UploadTooLarge):
+            asyncio.run(stage_upload(_upload(b"y" * 5000), self.storage.staging_dir, 4096, chunk_bytes=1024))
+        self.assertEqual(list(self.storage.staging_dir.iterdir()), [])
+
+    def test_parse_byte_range(self):
+        self.assertEqual(parse_byte_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_byte_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_byte_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_byte_range("bytes=990-2000", 1000), (990, 999))
+        self.assertIsNone(parse_byte_range("bytes=0-1,5-9", 1000))
+        self.assertIsNone(parse_byte_range(None, 1000))
+        with self.assertRaises(ValueError):
+            parse_byte_range("bytes=1000-", 1000)
+
+
+class _RemoteOnlyStorage(AttachmentStorage):
+    """Wraps the local backend without exposing file paths, like an object store."""
+
+    def __init__(self, inner: LocalAttachmentStorage):
+        self.inner = inner
+        self.staging_dir = inner.staging_dir
+
+    def put_file(self, staged_path, sha256):
+        return self.inner.put_file(staged_path, sha256)
+
+    def size(self, key):
+        return self.inner.size(key)
+
+    def iter_range(self, key, start, end):
+        return self.inner.iter_range(key, start, end)
+
+    def delete(self, key):
+        self.inner.delete(key)
+
+
+class AttachmentRouteTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self._tmp = TemporaryDirectory()
+        self.storage = LocalAttachmentStorage(Path(self._tmp.name))
+        self.patches = [
+            patch.object(internal_chat, "_resolve_verified_actor", return_value=SimpleNamespace(is_admin=False, email=None, role="client")),
+            patch.object(internal_chat, "_queue_judith_instruction"),
+            patch.object(internal_chat, "attachment_storage", self.storage),
+        ]
+        for item in self.patches:
+            item.start()
+        app = FastAPI()
+        app.include_router(internal_chat.router)
+
+        def override_db():
+            with self.harness.SessionLocal() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_db
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        for item in reversed(self.patches):
+            item.stop()
+        self.harness.close()
+        self._tmp.cleanup()
+
+    def _send(self, data: bytes) -> dict:
+        response = self.client.post(
+            "/internal-chat/threads/2/attachments",
+            data={"sender_user_id": "user-a", "sender_name": "Aziza"},
+            files={"file": ("report.pdf", data, "application/pdf")},
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_identical_uploads_share_a_blob_until_both_are_deleted(self):
+        data = bytes(range(256)) * 40
+        first = self._send(data)
+        second = self._send(data)
+        with self.harness.SessionLocal() as db:
+            keys = {row.storage_key for row in db.query(InternalChatAttachment).all()}
+        self.assertEqual(len(keys), 1)
+        blob = self.storage.local_path(keys.pop())
+
+        self.client.delete(f"/internal-chat/messages/{first['id']}", params={"user_id": "user-a"})
+        self.assertTrue(blob.exists())
+        self.client.delete(f"/internal-chat/messages/{second['id']}", params={"user_id": "user-a"})
+        self.assertFalse(blob.exists())
+
+    def test_release_during_an_upload_keeps_the_reused_blob(self):
+        data = bytes(range(256)) * 40
+        first = self._send(data)
+        # The only reference is gone; its blob release runs while the next upload is in flight.
+        with self.harness.SessionLocal() as db:
+            db.query(InternalChatAttachment).filter(InternalChatAttachment.message_id == first["id"]).delete()
+            db.commit()
+        put_file = self.storage.put_file
+        key = blob_key(hashlib.sha256(data).hexdigest())
+        blocked: list[bool] = []
+
+        def release() -> None:
+            # A separate connection, like a delete handled by another replica.
+            with self.harness.SessionLocal() as db:
+                internal_chat._release_attachment_blobs(db, {key})
+
+        releaser = threading.Thread(target=release)
+
+        def put_file_then_release(staged_path, sha256):
+            stored = put_file(staged_path, sha256)
+            releaser.start()
+            releaser.join(0.3)
+            blocked.append(releaser.is_alive())
+            return stored
+
+        with patch.object(self.storage, "put_file", put_file_then_release):
+            second = self._send(data)
+        releaser.join(5)
+        self.assertEqual(blocked, [True])
+        self.assertTrue(self.storage.local_path(key).exists())
+        self.assertEqual(self.client.get(second["attachments"][0]["download_url"], params={"user_id": "user-a"}).content, data)
+
+    def test_download_supports_range_and_etag(self):
+        data = bytes(range(256)) * 40
+        attachment = self._send(data)["attachments"][0]
+        url = attachment["download_url"]
+        params = {"user_id": "user-a"}
+
+        full = self.client.get(url, params=params)
+        self.assertEqual(full.content, data)
+        etag = full.headers["etag"]
+        self.assertEqual(etag, f'"{hashlib.sha256(data).hexdigest()}"')
+        self.assertEqual(self.client.get(url, params=params, headers={"If-None-Match": etag}).status_code, 304)
+
+        partial = self.client.get(url, params=params, headers={"Range": "bytes=100-199"})
+        self.assertEqual((partial.status_code, partial.content), (206, data[100:200]))
+
+        with patch.object(internal_chat, "attachment_storage", _RemoteOnlyStorage(self.storage)):
+            streamed = self.client.get(url, params=params, headers={"Range": "bytes=-50"})
+            self.assertEqual((streamed.status_code, streamed.content), (206, data[-50:]))
+            self.assertEqual(streamed.headers["content-range"], f"bytes {len(data) - 50}-{len(data) - 1}/{len(data)}")
+            unsatisfiable = self.client.get(url, params=params, headers={"Range": f"bytes={len(data)}-"})
+            self.assertEqual(unsatisfiable.status_code, 416)
+
+
+if __name__ == "__main__":
+    unittest.main()
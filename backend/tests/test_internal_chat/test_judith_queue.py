@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from starlette.requests import Request
+
+from api import internal_chat
+from database import schemas
+from database.models import InternalChatMessage, InternalChatTask
+from integrations.internal_chat.judith_queue import JudithJob, JudithWorkQueue
+from tests.test_internal_chat._helpers import InternalChatHarness
+
+
+class JudithWorkQueueTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.queue = JudithWorkQueue(workers=3, timeout_seconds=0.3, max_pending=50)
+
+    def tearDown(self) -> None:
+        self.queue.stop()
+
+    def test_jobs_keep_order_per_thread_and_run_threads_in_parallel(self):
+        seen: list[tuple[int, int]] = []
+        lock = threading.Lock()
+        gate = threading.Barrier(2, timeout=2)
+
+        def job(thread_id: int, index: int):
+            def run(_job: JudithJob) -> None:
+                if index == 0:
+                    # Both threads' first jobs must be running at the same time to pass the barrier.
+                    gate.wait()
+                time.sleep(0.01)
+                with lock:
+                    seen.append((thread_id, index))
+
+            return JudithJob(thread_id=thread_id, run=run)
+
+        for index in range(4):
+            self.assertTrue(self.queue.submit(job(1, index)))
+            self.assertTrue(self.queue.submit(job(2, index)))
+        self.assertTrue(self.queue.join(5))
+        self.assertEqual([index for thread_id, index in seen if thread_id == 1], [0, 1, 2, 3])
+        self.assertEqual([index for thread_id, index in seen if thread_id == 2], [0, 1, 2, 3])
+        stats = self.queue.stats()
+        self.assertEqual((stats["completed"], stats["pending"]), (8, 0))
+        self.assertGreater(stats["queue_wait_ms_max"], 0)
+
+    def test_timeout_cancels_job_and_releases_thread(self):
+        release = threading.Event()
+        timed_out: list[int] = []
+        ran_after: list[int] = []
+
+        def slow(job: JudithJob) -> None:
+            release.wait(2)
+
+        self.queue.submit(JudithJob(thread_id=7, run=slow, on_timeout=lambda job: timed_out.append(job.thread_id)))
+        follow_up = JudithJob(thread_id=7, run=lambda job: ran_after.append(job.thread_id))
+        self.queue.submit(follow_up)
+        self.assertTrue(self.queue.join(3))
+        release.set()
+        self.assertEqual((timed_out, ran_after), ([7], [7]))
+        self.assertFalse(follow_up.cancelled.is_set())
+        self.assertEqual(self.queue.stats()["timed_out"], 1)
+
+    def test_full_backlog_is_rejected(self):
+        queue = JudithWorkQueue(workers=1, timeout_seconds=5, max_pending=1)
+        release = threading.Event()
+        try:
+            self.assertTrue(queue.submit(JudithJob(thread_id=1, run=lambda job: release.wait(2))))
+            self.assertFalse(queue.submit(JudithJob(thread_id=2, run=lambda job: None)))
+        finally:
+            release.set()
+            queue.stop()
+
+
+class SendMessageQueueTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self.queue = JudithWorkQueue(workers=1, timeout_seconds=5)
+        self.patches = [
+            patch.object(internal_chat, "_resolve_verified_actor", return_value=SimpleNamespace(is_admin=False, email=None, role="client")),
+            patch.object(internal_chat, "SessionLocal", self.harness.SessionLocal),
+            patch.object(internal_chat, "judith_queue", self.queue),
+            patch.object(internal_chat, "JUDITH_ASYNC_ENABLED", True),
+        ]
+        for item in self.patches:
+            item.start()
+
+    def tearDown(self) -> None:
+        self.queue.stop()
+        for item in reversed(self.patches):
+            item.stop()
+        self.harness.close()
+
+    def test_send_returns_before_judith_reply(self):
+        release = threading.Event()
+
+        def reply(db, thread, sender_user_id, body):
+            release.wait(2)
+            internal_chat._create_judith_message(db, thread_id=thread.id, body=f"Noted: {body}")
+            return True
+
+        request = Request({"type": "http", "method": "POST", "path": "/", "headers": [], "query_string": b""})
+        with patch.object(internal_chat, "_process_judith_instruction", side_effect=reply):
+            with self.harness.SessionLocal() as db:
+                sent = internal_chat.send_message(
+                    2,
+                    schemas.InternalChatMessageCreate(sender_user_id="user-a", sender_name="Aziza", body="buy milk"),
+                    request,
+                    db=db,
+                )
+            with self.harness.SessionLocal() as db:
+                self.assertEqual([row.id for row in db.query(InternalChatMessage).all()], [sent.id])
+            release.set()
+            self.assertTrue(self.queue.join(3))
+
+        with self.harness.SessionLocal() as db:
+            bodies = [row.body for row in db.query(InternalChatMessage).order_by(InternalChatMessage.id).all()]
+        self.assertEqual(bodies, ["buy milk", "Noted: buy milk"])
+
+
+class JudithSideEffectTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self.sent: list[tuple[str, bool]] = []
+        self.patches = [
+            patch.object(internal_chat, "SessionLocal", self.harness.SessionLocal),
+            patch.object(internal_chat.settings, "INTERNAL_CHAT_TELEGRAM_ENABLED", True),
+            patch.object(internal_chat.settings, "TELEGRAM_BOT_TOKEN", "bot-token"),
+            patch.object(internal_chat, "_resolve_telegram_chat_ids", return_value=["100"]),
+            patch.object(internal_chat, "_get_active_zoom_link", return_value=None),
+            patch.object(internal_chat, "_telegram_send_message", side_effect=self._record_send),
+        ]
+        for item in self.patches:
+            item.start()
+
+    def tearDown(self) -> None:
+        for item in reversed(self.patches):
+            item.stop()
+        self.harness.close()
+
+    def _record_send(self, token, chat_id, text, reply_markup=None):
+        with self.harness.SessionLocal() as db:
+            committed = db.query(InternalChatTask).count() > 0
+        self.sent.append((text, committed))
+        return True
+
+    def _run(self, cancel: bool) -> MagicMock:
+        job = JudithJob(thread_id=2, run=lambda item: None)
+
+        def reply(db, thread, sender_user_id, body):
+            internal_chat._create_meeting_task_from_instruction(
+                db, thread=thread, sender_user_id=sender_user_id, source_text=body, use_zoom=True
+            )
+            if cancel:
+                job.cancelled.set()
+            return True
+
+        zoom = MagicMock(return_value=("https://zoom.test/j/1", None, None))
+        with patch.object(internal_chat, "_process_judith_instruction", side_effect=reply), patch.object(
+            internal_chat, "_zoom_create_meeting", zoom
+        ):
+            internal_chat._run_judith_job(job, "user-a", "meeting with finance tomorrow")
+        return zoom
+
+    def test_telegram_and_zoom_calls_wait_for_the_commit(self):
+        zoom = self._run(cancel=False)
+
+        zoom.assert_called_once()
+        self.assertEqual(len(self.sent), 1)
+        text, committed = self.sent[0]
+        self.assertTrue(committed)
+        self.assertIn("Zoom join link: https://zoom.test/j/1", text)
+        with self.harness.SessionLocal() as db:
+            bodies = [row.body for row in db.query(InternalChatMessage).all()]
+        self.assertEqual(len(bodies), 1)
+        self.assertIn("https://zoom.test/j/1", bodies[0])
+
+    def test_cancelled_job_makes_no_outside_calls(self):
+        zoom = self._run(cancel=True)
+
+        zoom.assert_not_called()
+        self.assertEqual(self.sent, [])
+        with self.harness.SessionLocal() as db:
+            self.assertEqual((db.query(InternalChatTask).count(), db.query(InternalChatMessage).count()), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
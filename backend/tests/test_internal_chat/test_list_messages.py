@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi import Response
+from starlette.requests import Request
+
+from api import internal_chat
+from tests.test_internal_chat._helpers import InternalChatHarness
+
+
+def _request(if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+class ListMessagesTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self.ids = [self.harness.add_message(1, "user-a", f"message {index}") for index in range(6)]
+        self.actor_patch = patch.object(internal_chat, "_resolve_verified_actor", return_value=SimpleNamespace(is_admin=False))
+        self.actor_patch.start()
+
+    def tearDown(self) -> None:
+        self.actor_patch.stop()
+        self.harness.close()
+
+    def _list(self, request: Request | None = None, **params):
+        response = Response()
+        with self.harness.SessionLocal() as db:
+            result = internal_chat.list_messages(
+                request or _request(),
+                response,
+                thread_id=1,
+                user_id="user-b",
+                user_role="client",
+                limit=params.pop("limit", 200),
+                since_id=params.pop("since_id", None),
+                before_id=params.pop("before_id", None),
+                db=db,
+            )
+        return result, response
+
+    def test_cursor_pages(self):
+        newest, _ = self._list(limit=2)
+        self.assertEqual([row.id for row in newest], self.ids[-2:])
+        older, _ = self._list(limit=3, before_id=self.ids[-2])
+        self.assertEqual([row.id for row in older], self.ids[1:4])
+        gap, _ = self._list(since_id=self.ids[3])
+        self.assertEqual([row.id for row in gap], self.ids[4:])
+        caught_up, _ = self._list(since_id=self.ids[-1])
+        self.assertEqual(caught_up, [])
+
+    def test_etag_short_circuits_until_thread_changes(self):
+        _, response = self._list(since_id=self.ids[-1])
+        etag = response.headers["etag"]
+        not_modified, _ = self._list(_request(etag), since_id=self.ids[-1])
+        self.assertEqual(not_modified.status_code, 304)
+
+        new_id = self.harness.add_message(1, "user-b", "fresh")
+        rows, response = self._list(_request(etag), since_id=self.ids[-1])
+        self.assertEqual([row.id for row in rows], [new_id])
+        self.assertNotEqual(response.headers["etag"], etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from api import internal_chat
+from database.models import InternalChatAttachment, InternalChatMessage, InternalChatParticipant
+from integrations.internal_chat.realtime import ChatHub, InProcessChatBroker
+from tests.test_internal_chat._helpers import InternalChatHarness
+
+
+class ChatRealtimeTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self.hub = ChatHub(InProcessChatBroker())
+        self.hub_patch = patch("integrations.internal_chat.realtime.chat_hub", self.hub)
+        self.hub_patch.start()
+
+    def tearDown(self) -> None:
+        self.hub_patch.stop()
+        self.harness.close()
+
+    async def test_committed_messages_reach_thread_participants_only(self):
+        queue_b = self.hub.subscribe("user-b")
+        queue_c = self.hub.subscribe("user-c")
+        admin = self.hub.subscribe("admin", is_admin=True)
+
+        with self.harness.SessionLocal() as db:
+            message = InternalChatMessage(thread_id=1, sender_user_id="user-a", sender_name="Aziza", sender_role="client", body="Hi")
+            db.add(message)
+            db.flush()
+            db.add(
+                InternalChatAttachment(
+                    message_id=message.id,
+                    thread_id=1,
+                    file_name="plan.pdf",
+                    mime_type="application/pdf",
+                    size_bytes=10,
+                    storage_key="/tmp/plan.pdf",
+                )
+            )
+            db.commit()
+            message_id = message.id
+
+            rolled_back = InternalChatMessage(thread_id=1, sender_user_id="user-a", body="draft")
+            db.add(rolled_back)
+            db.flush()
+            db.rollback()
+
+        event = await asyncio.wait_for(queue_b.get(), timeout=1)
+        self.assertEqual(event["type"], "message")
+        self.assertEqual(event["message_id"], message_id)
+        self.assertEqual(event["message"]["body"], "Hi")
+        self.assertEqual([item["file_name"] for item in event["message"]["attachments"]], ["plan.pdf"])
+        self.assertNotIn("recipients", event)
+        self.assertEqual((await asyncio.wait_for(admin.get(), timeout=1))["message_id"], message_id)
+        self.assertTrue(queue_c.empty())
+        await asyncio.sleep(0)
+        self.assertTrue(queue_b.empty())
+
+        with self.harness.SessionLocal() as db:
+            db.delete(db.get(InternalChatMessage, message_id))
+            db.commit()
+        deleted = await asyncio.wait_for(queue_b.get(), timeout=1)
+        self.assertEqual((deleted["type"], deleted["message_id"]), ("message_deleted", message_id))
+
+    async def test_resume_replays_only_the_gap_from_readable_threads(self):
+        first = self.harness.add_message(1, "user-a", "one")
+        self.harness.add_message(2, "user-a", "private to judith thread")
+        second = self.harness.add_message(1, "user-b", "two")
+
+        with patch.object(internal_chat, "SessionLocal", self.harness.SessionLocal):
+            replay_b = internal_chat._stream_resume_events("user-b", False, first)
+            replay_a = internal_chat._stream_resume_events("user-a", False, 0)
+            with patch.object(internal_chat, "STREAM_RESUME_LIMIT", 1):
+                overflow = internal_chat._stream_resume_events("user-a", False, 0)
+
+        self.assertEqual([item["message_id"] for item in replay_b], [second])
+        self.assertEqual(len(replay_a), 3)
+        self.assertEqual(overflow, [{"type": "resync"}])
+
+    async def test_live_delivery_applies_the_replay_scope_rule(self):
+        queue_a = self.hub.subscribe("user-a")
+        self.harness.add_message(2, "user-a", "just between me and Judith")
+        self.assertEqual((await asyncio.wait_for(queue_a.get(), timeout=1))["thread_id"], 2)
+
+        with self.harness.SessionLocal() as db:
+            db.add(InternalChatParticipant(thread_id=2, user_id="user-b", display_name="Bobur", role="employee"))
+            db.commit()
+        queue_b = self.hub.subscribe("user-b")
+        message_id = self.harness.add_message(2, "judith-ai", "no longer a private pair")
+        await asyncio.sleep(0.05)
+        self.assertTrue(queue_a.empty())
+        self.assertTrue(queue_b.empty())
+
+        with patch.object(internal_chat, "SessionLocal", self.harness.SessionLocal):
+            for user_id in ("user-a", "user-b"):
+                replay = internal_chat._stream_resume_events(user_id, False, message_id - 1)
+                self.assertEqual(replay, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from api import internal_chat
+from database.models import InternalChatMessage, InternalChatTask, InternalChatTaskReminder, InternalChatThread
+from integrations.internal_chat.reminders import ReminderStats, ReminderWakeup, reminder_wakeup, schedule_wakeup
+from tests.test_internal_chat._helpers import InternalChatHarness
+
+
+class ReminderDispatchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self.sent: list[dict] = []
+        self.patches = [
+            patch.object(internal_chat, "_deactivate_conflicting_telegram_links", return_value=0),
+            patch.object(internal_chat, "_send_telegram_reminder", side_effect=self._record_send),
+            patch.object(internal_chat, "reminder_stats", ReminderStats()),
+        ]
+        for item in self.patches:
+            item.start()
+
+    def tearDown(self) -> None:
+        for item in reversed(self.patches):
+            item.stop()
+        self.harness.close()
+
+    def _record_send(self, db, *args, **kwargs) -> int:
+        self.sent.append(kwargs)
+        return 1
+
+    def _add_task(self, title: str, due_at: datetime, remind_at: datetime) -> None:
+        with self.harness.SessionLocal() as db:
+            task = InternalChatTask(
+                thread_id=2,
+                workspace_id="ws-1",
+                title=title,
+                due_at=due_at,
+                created_by_user_id="user-a",
+            )
+            db.add(task)
+            db.flush()
+            db.add(InternalChatTaskReminder(task_id=task.id, thread_id=2, workspace_id="ws-1", remind_at=remind_at))
+            db.commit()
+
+    def test_due_reminders_are_processed_in_batches(self):
+        now = datetime.utcnow()
+        for index in range(5):
+            self._add_task(f"task {index}", due_at=now - timedelta(minutes=index), remind_at=now - timedelta(minutes=index + 1))
+        self._add_task("later", due_at=now + timedelta(hours=2), remind_at=now + timedelta(hours=1))
+
+        with patch.object(internal_chat, "REMINDER_DISPATCH_BATCH_SIZE", 2):
+            with self.harness.SessionLocal() as db:
+                processed = internal_chat.dispatch_due_reminders_job(db)
+                next_due = internal_chat.next_reminder_due_at(db)
+
+        self.assertEqual(processed, 5)
+        self.assertEqual(len(self.sent), 5)
+        self.assertTrue(all(item["thread_id"] == 2 and item["user_id"] == "user-a" for item in self.sent))
+        self.assertAlmostEqual((next_due - now).total_seconds(), 3600, delta=1)
+        with self.harness.SessionLocal() as db:
+            self.assertEqual(db.query(InternalChatTaskReminder).filter(InternalChatTaskReminder.sent_at.is_(None)).count(), 1)
+            self.assertEqual(db.query(InternalChatMessage).filter(InternalChatMessage.sender_user_id == "judith-ai").count(), 5)
+        stats = internal_chat.reminder_stats.snapshot()
+        self.assertEqual((stats["dispatched"], stats["batches"]), (5, 3))
+        self.assertGreaterEqual(stats["lag_seconds_max"], 300)
+
+    def test_notifications_wait_for_commit(self):
+        now = datetime.utcnow()
+        self._add_task("call bank", due_at=now + timedelta(hours=1), remind_at=now - timedelta(seconds=5))
+
+        with self.harness.SessionLocal() as db:
+            self.assertEqual(internal_chat._dispatch_due_reminders(db, workspace_id=None), 1)
+            self.assertEqual(self.sent, [])
+            # Pre-deadline reminder backfills the due-at reminder.
+            self.assertEqual(db.query(InternalChatTaskReminder).filter(InternalChatTaskReminder.sent_at.is_(None)).count(), 1)
+            db.rollback()
+            self.assertEqual(internal_chat._flush_reminder_notifications(db), 0)
+
+    def test_complete_all_settles_reminders_so_the_next_due_time_is_not_past(self):
+        now = datetime.utcnow()
+        self._add_task("call bank", due_at=now, remind_at=now - timedelta(minutes=5))
+        self._add_task("pay rent", due_at=now, remind_at=now - timedelta(minutes=1))
+
+        with self.harness.SessionLocal() as db:
+            thread = db.get(InternalChatThread, 2)
+            self.assertTrue(internal_chat._handle_task_control_command(db, thread, "Judith, complete all tasks"))
+            db.commit()
+            self.assertIsNone(internal_chat.next_reminder_due_at(db))
+            self.assertEqual(db.query(InternalChatTaskReminder).filter(InternalChatTaskReminder.sent_at.is_(None)).count(), 0)
+
+        # A reminder left pending on a completed task is skipped by both queries.
+        self._add_task("file report", due_at=now, remind_at=now - timedelta(minutes=2))
+        with self.harness.SessionLocal() as db:
+            db.query(InternalChatTask).update({InternalChatTask.is_completed: True})
+            db.commit()
+            self.assertIsNone(internal_chat.next_reminder_due_at(db))
+
+
+class ReminderWakeupTests(unittest.TestCase):
+    def test_a_past_due_time_still_waits_the_minimum(self):
+        started = time.monotonic()
+        ReminderWakeup().wait(datetime.utcnow() - timedelta(minutes=1), max_idle_seconds=5, min_wait_seconds=0.2)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+    def test_notify_wakes_waiter_before_idle_cap(self):
+        wakeup = ReminderWakeup()
+        finished = threading.Event()
+
+        def wait() -> None:
+            wakeup.wait(None, max_idle_seconds=5)
+            finished.set()
+
+        started = time.monotonic()
+        threading.Thread(target=wait, daemon=True).start()
+        time.sleep(0.05)
+        wakeup.notify(datetime.utcnow() + timedelta(milliseconds=100))
+        self.assertTrue(finished.wait(2))
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_scheduled_wakeup_fires_only_after_commit(self):
+        harness = InternalChatHarness()
+        due_at = datetime.utcnow() + timedelta(minutes=5)
+        try:
+            with patch.object(reminder_wakeup, "notify") as notify:
+                with harness.SessionLocal() as db:
+                    schedule_wakeup(db, due_at)
+                    db.rollback()
+                    notify.assert_not_called()
+                    schedule_wakeup(db, due_at)
+                    db.commit()
+                notify.assert_called_once_with(due_at)
+        finally:
+            harness.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
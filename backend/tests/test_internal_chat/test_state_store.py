@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime, timedelta
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import internal_chat
+from database.models import InternalChatStateEntry
+from integrations.internal_chat.state_store import DatabaseStateStore, MemoryStateStore
+
+
+class MemoryStateStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 1000.0
+        self.store = MemoryStateStore(clock=lambda: self.now)
+
+    def test_entries_expire_and_overwrites_reset_the_ttl(self):
+        self.store.set("a", {"mode": "add_task"}, ttl_seconds=10)
+        self.store.set("b", {"mode": "reschedule"}, ttl_seconds=30)
+        self.store.set("offset", {"offset": 7})
+        self.now += 5
+        self.store.set("a", {"mode": "add_task", "thread_id": 2}, ttl_seconds=10)
+        self.now += 6
+        # The first heap entry for "a" is stale and must not evict the rewritten value.
+        self.assertEqual(self.store.get("a"), {"mode": "add_task", "thread_id": 2})
+        self.now += 20
+        self.assertIsNone(self.store.get("a"))
+        self.assertIsNone(self.store.pop("b"))
+        self.assertEqual(self.store.get("offset"), {"offset": 7})
+        self.assertEqual(self.store._expiry_heap, [])
+
+    def test_lease_belongs_to_one_holder_until_it_lapses(self):
+        self.assertTrue(self.store.acquire_lease("poller", "replica-1", 30))
+        self.assertFalse(self.store.acquire_lease("poller", "replica-2", 30))
+        self.now += 20
+        self.assertTrue(self.store.acquire_lease("poller", "replica-1", 30))
+        self.now += 31
+        self.assertTrue(self.store.acquire_lease("poller", "replica-2", 30))
+        self.store.release_lease("poller", "replica-1")
+        self.assertFalse(self.store.acquire_lease("poller", "replica-1", 30))
+        self.store.release_lease("poller", "replica-2")
+        self.assertTrue(self.store.acquire_lease("poller", "replica-1", 30))
+
+
+class DatabaseStateStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self._tmp.name}/state.db", connect_args={"check_same_thread": False})
+        InternalChatStateEntry.__table__.create(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.store = DatabaseStateStore(self.SessionLocal)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        self._tmp.cleanup()
+
+    def test_set_get_pop_and_expiry(self):
+        self.store.set("telegram:pending:1", {"mode": "add_task", "thread_id": 2}, ttl_seconds=60)
+        self.store.set("telegram:pending:1", {"mode": "reschedule", "thread_id": 2}, ttl_seconds=60)
+        self.assertEqual(self.store.get("telegram:pending:1"), {"mode": "reschedule", "thread_id": 2})
+        self.assertEqual(self.store.pop("telegram:pending:1")["mode"], "reschedule")
+        self.assertIsNone(self.store.pop("telegram:pending:1"))
+
+        self.store.set("telegram:pending:2", {"mode": "add_task"}, ttl_seconds=60)
+        with self.SessionLocal() as db:
+            db.query(InternalChatStateEntry).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+            db.commit()
+        self.assertIsNone(self.store.get("telegram:pending:2"))
+
+    def test_lease_is_shared_between_store_instances(self):
+        other_replica = DatabaseStateStore(self.SessionLocal)
+        self.assertTrue(self.store.acquire_lease("poller", "replica-1", 60))
+        self.assertFalse(other_replica.acquire_lease("poller", "replica-2", 60))
+        self.assertTrue(self.store.acquire_lease("poller", "replica-1", 60))
+        with self.SessionLocal() as db:
+            db.query(InternalChatStateEntry).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+            db.commit()
+        self.assertTrue(other_replica.acquire_lease("poller", "replica-2", 60))
+        self.assertFalse(self.store.acquire_lease("poller", "replica-1", 60))
+
+
+class TelegramPollCycleTests(unittest.TestCase):
+    def test_only_the_leader_polls_and_the_offset_carries_over(self):
+        store = MemoryStateStore()
+        offsets: list[int | None] = []
+
+        def poll(db, offset):
+            offsets.append(offset)
+            return (offset or 100) + 1
+
+        db = MagicMock(new=[], dirty=[], deleted=[], info={})
+        with patch.object(internal_chat, "telegram_state", store), patch.object(
+            internal_chat, "process_telegram_bot_updates_job", side_effect=poll
+        ):
+            self.assertTrue(internal_chat.run_telegram_poll_cycle(db, "replica-1", 60))
+            self.assertFalse(internal_chat.run_telegram_poll_cycle(db, "replica-2", 60))
+            store.release_lease(internal_chat.TELEGRAM_POLLER_LEASE, "replica-1")
+            self.assertTrue(internal_chat.run_telegram_poll_cycle(db, "replica-2", 60))
+        self.assertEqual(offsets, [None, 101])
+        self.assertEqual(store.get(internal_chat.TELEGRAM_OFFSET_STATE_KEY), {"offset": 102})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastapi import BackgroundTasks, HTTPException
+from starlette.requests import Request
+
+from api import internal_chat
+from integrations.internal_chat.telegram_sender import TelegramSender
+
+
+class TelegramSenderTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.requests: list[tuple[float, str, dict]] = []
+        self.throttle_once = True
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            payload = json.loads(request.content or b"{}")
+            self.requests.append((time.monotonic(), request.url.path, payload))
+            if payload.get("chat_id") == "42" and self.throttle_once:
+                self.throttle_once = False
+                return httpx.Response(429, json={"ok": False, "error_code": 429, "parameters": {"retry_after": 0.2}})
+            return httpx.Response(200, json={"ok": True, "result": {"message_id": len(self.requests)}})
+
+        self.sender = TelegramSender(
+            api_base="https://telegram.test",
+            rate_per_second=5,
+            chat_interval_seconds=0.1,
+            transport=httpx.MockTransport(handler),
+        )
+
+    def tearDown(self) -> None:
+        self.sender.close()
+
+    def test_retry_after_is_respected(self):
+        started = time.monotonic()
+        response = self.sender.call("token", "sendMessage", {"chat_id": "42", "text": "hi"})
+        self.assertTrue(response["ok"])
+        self.assertEqual(len(self.requests), 2)
+        self.assertGreaterEqual(self.requests[1][0] - started, 0.2)
+        self.assertEqual(self.requests[0][1], "/bottoken/sendMessage")
+        self.assertEqual(self.sender.stats["rate_limited"], 1)
+
+    def test_burst_is_paced_globally_and_per_chat(self):
+        self.throttle_once = False
+        futures = [self.sender.submit("token", "sendMessage", {"chat_id": str(index % 10), "text": "x"}) for index in range(10)]
+        futures += [self.sender.submit("token", "sendMessage", {"chat_id": "0", "text": "again"})]
+        self.assertTrue(all(future.result(5)["ok"] for future in futures))
+        times = sorted(sent_at for sent_at, _, _ in self.requests)
+        # Five per second globally: the sixth send waits for the first second to pass.
+        self.assertGreaterEqual(times[5] - times[0], 0.95)
+        chat_zero = [sent_at for sent_at, _, payload in self.requests if payload["chat_id"] == "0"]
+        self.assertGreaterEqual(chat_zero[1] - chat_zero[0], 0.1)
+
+
+def _webhook_request(body: dict, secret: str | None) -> Request:
+    encoded = json.dumps(body).encode()
+    headers = [(b"content-type", b"application/json")]
+    if secret is not None:
+        headers.append((b"x-telegram-bot-api-secret-token", secret.encode()))
+
+    async def receive():
+        return {"type": "http.request", "body": encoded, "more_body": False}
+
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers, "query_string": b""}, receive)
+
+
+class TelegramWebhookTests(unittest.IsolatedAsyncioTestCase):
+    async def test_webhook_checks_secret_and_dedupes_updates(self):
+        with patch.object(internal_chat, "TELEGRAM_WEBHOOK_SECRET", "s3cret"):
+            with self.assertRaises(HTTPException) as raised:
+                await internal_chat.telegram_webhook(_webhook_request({"update_id": 1}, "wrong"), BackgroundTasks())
+            self.assertEqual(raised.exception.status_code, 403)
+
+            tasks = BackgroundTasks()
+            update = {"update_id": 987_654, "message": {"chat": {"id": 5}, "text": "/start"}}
+            self.assertEqual(await internal_chat.telegram_webhook(_webhook_request(update, "s3cret"), tasks), {"ok": True})
+            await internal_chat.telegram_webhook(_webhook_request(update, "s3cret"), tasks)
+        self.assertEqual(len(tasks.tasks), 1)
+        self.assertEqual(tasks.tasks[0].args, (update,))
+
+    async def test_webhook_is_closed_without_a_secret(self):
+        with patch.object(internal_chat, "TELEGRAM_WEBHOOK_SECRET", ""):
+            with self.assertRaises(HTTPException):
+                await internal_chat.telegram_webhook(_webhook_request({"update_id": 2}, ""), BackgroundTasks())
+
+
+if __name__ == "__main__":
+    unittest.main()
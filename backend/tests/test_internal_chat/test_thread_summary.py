@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from starlette.requests import Request
+
+from api import internal_chat
+from database.models import InternalChatMessage, InternalChatParticipant, InternalChatThread
+from tests.test_internal_chat._helpers import InternalChatHarness
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+
+class ThreadSummaryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self.actor_patch = patch.object(internal_chat, "_resolve_verified_actor", return_value=SimpleNamespace(is_admin=False))
+        self.actor_patch.start()
+
+    def tearDown(self) -> None:
+        self.actor_patch.stop()
+        self.harness.close()
+
+    def _participant(self, db, thread_id: int, user_id: str) -> InternalChatParticipant:
+        return (
+            db.query(InternalChatParticipant)
+            .filter(InternalChatParticipant.thread_id == thread_id, InternalChatParticipant.user_id == user_id)
+            .one()
+        )
+
+    def _list(self, user_id: str):
+        with self.harness.SessionLocal() as db:
+            return internal_chat.list_threads(_request(), user_id=user_id, user_role="client", workspace_id=None, limit=60, db=db)
+
+    def test_send_updates_summary_and_unread_counts(self):
+        self.harness.add_message(1, "user-a", "first")
+        second = self.harness.add_message(1, "user-a", "x" * 200)
+        with self.harness.SessionLocal() as db:
+            thread = db.get(InternalChatThread, 1)
+            self.assertEqual(thread.last_message_id, second)
+            self.assertEqual(thread.last_message_preview, "x" * 117 + "...")
+            self.assertEqual(thread.last_sender, "user-a")
+            self.assertIsNotNone(thread.last_message_at)
+            self.assertEqual(self._participant(db, 1, "user-b").unread_count, 2)
+            sender = self._participant(db, 1, "user-a")
+            self.assertEqual((sender.unread_count, sender.last_read_message_id), (0, second))
+
+        reply = self.harness.add_message(1, "user-b", "reply")
+        with self.harness.SessionLocal() as db:
+            self.assertEqual(self._participant(db, 1, "user-b").unread_count, 0)
+            self.assertEqual(self._participant(db, 1, "user-a").unread_count, 1)
+            self.assertEqual(db.get(InternalChatThread, 1).last_message_id, reply)
+
+    def test_delete_adjusts_unread_and_last_message(self):
+        first = self.harness.add_message(1, "user-a", "first")
+        second = self.harness.add_message(1, "user-a", "second")
+        with self.harness.SessionLocal() as db:
+            db.delete(db.get(InternalChatMessage, second))
+            db.commit()
+            thread = db.get(InternalChatThread, 1)
+            self.assertEqual((thread.last_message_id, thread.last_message_preview), (first, "first"))
+            self.assertEqual(self._participant(db, 1, "user-b").unread_count, 1)
+
+            internal_chat.mark_thread_read(db, 1, "user-b")
+            db.commit()
+            self.assertEqual(self._participant(db, 1, "user-b").last_read_message_id, first)
+            db.delete(db.get(InternalChatMessage, first))
+            db.commit()
+            self.assertEqual(self._participant(db, 1, "user-b").unread_count, 0)
+            self.assertIsNone(db.get(InternalChatThread, 1).last_message_id)
+
+    def test_list_threads_orders_by_activity_with_badges(self):
+        self.harness.add_message(2, "judith-ai", "Noted.")
+        self.harness.add_message(1, "user-b", "ping")
+        rows = self._list("user-a")
+        self.assertEqual([row.id for row in rows], [1, 2])
+        self.assertEqual([row.unread_count for row in rows], [1, 1])
+
+        self.harness.add_message(2, "user-a", "thanks")
+        rows = self._list("user-a")
+        self.assertEqual([(row.id, row.unread_count) for row in rows], [(2, 0), (1, 1)])
+        self.assertEqual(rows[0].last_message_preview, "thanks")
+
+    def test_list_threads_hides_leaked_judith_participants(self):
+        with self.harness.SessionLocal() as db:
+            db.add(InternalChatParticipant(thread_id=2, user_id="user-b", display_name="Bobur", role="employee"))
+            db.commit()
+        self.assertEqual([row.id for row in self._list("user-a")], [1])
+        self.assertEqual([row.id for row in self._list("user-b")], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
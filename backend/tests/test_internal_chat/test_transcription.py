@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import internal_chat
+from database.connection import get_db
+from database.models import InternalChatAttachment, InternalChatMessage
+from integrations.internal_chat.attachment_storage import LocalAttachmentStorage
+from integrations.transcription.service import TranscriptionQueue
+from tests.test_internal_chat._helpers import InternalChatHarness
+
+
+class TranscriptionQueueTests(unittest.TestCase):
+    def test_identical_audio_is_transcribed_once(self):
+        queue = TranscriptionQueue(max_workers=2)
+        calls: list[str] = []
+        release = threading.Event()
+
+        def transcribe() -> str:
+            calls.append("call")
+            release.wait(2)
+            return "buy milk"
+
+        try:
+            first = queue.submit("hash-1", transcribe)
+            second = queue.submit("hash-1", transcribe)
+            release.set()
+            self.assertEqual((first.result(2), second.result(2)), ("buy milk", "buy milk"))
+            self.assertEqual(queue.submit("hash-1", transcribe).result(0), "buy milk")
+            self.assertEqual(len(calls), 1)
+            stats = queue.stats()
+            self.assertEqual((stats["joined"], stats["cache_hits"]), (1, 1))
+        finally:
+            queue.shutdown()
+
+    def test_concurrency_is_capped_and_empty_results_are_not_cached(self):
+        queue = TranscriptionQueue(max_workers=2)
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def transcribe() -> str:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return ""
+
+        try:
+            futures = [queue.submit(f"hash-{index}", transcribe) for index in range(6)]
+            self.assertEqual([future.result(2) for future in futures], [""] * 6)
+            self.assertEqual(peak, 2)
+            self.assertIsNone(queue.cached("hash-0"))
+        finally:
+            queue.shutdown()
+
+
+class AttachmentTranscriptionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.harness = InternalChatHarness()
+        self._tmp = TemporaryDirectory()
+        self.queue = TranscriptionQueue(max_workers=1)
+        self.release = threading.Event()
+        self.provider_calls: list[bytes] = []
+        self.judith_calls: list[str] = []
+
+        def transcribe(payload, file_name, mime_type):
+            self.provider_calls.append(payload)
+            self.release.wait(2)
+            return "call the bank"
+
+        self.patches = [
+            patch.object(internal_chat, "_resolve_verified_actor", return_value=SimpleNamespace(is_admin=False, email=None, role="client")),
+            patch.object(internal_chat, "_queue_judith_instruction", side_effect=lambda db, thread, sender_user_id, body: self.judith_calls.append(body)),
+            patch.object(internal_chat, "_transcribe_audio_bytes", side_effect=transcribe),
+            patch.object(internal_chat, "attachment_storage", LocalAttachmentStorage(Path(self._tmp.name))),
+            patch.object(internal_chat, "transcription_queue", self.queue),
+            patch.object(internal_chat, "SessionLocal", self.harness.SessionLocal),
+            patch.object(internal_chat.settings, "OPENAI_API_KEY", "test-key"),
+        ]
+        for item in self.patches:
+            item.start()
+        app = FastAPI()
+        app.include_router(internal_chat.router)
+
+        def override_db():
+            with self.harness.SessionLocal() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_db
+        self.client = TestClient(app)
+
+    def tearDown(self) -> None:
+        self.queue.shutdown(wait=True)
+        for item in reversed(self.patches):
+            item.stop()
+        self.harness.close()
+        self._tmp.cleanup()
+
+    def _send_voice(self) -> dict:
+        response = self.client.post(
+            "/internal-chat/threads/2/attachments",
+            data={"sender_user_id": "user-a", "caption": "Voice message"},
+            files={"file": ("note.webm", b"voice-bytes" * 100, "audio/webm")},
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def _wait_for_queue(self) -> None:
+        deadline = time.monotonic() + 3
+        while self.queue.stats()["in_flight"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The transcript is applied in a done-callback right after the job leaves the queue.
+        time.sleep(0.1)
+
+    def test_voice_note_posts_before_transcript_and_judith_gets_it_later(self):
+        sent = self._send_voice()
+        self.assertEqual(sent["body"], "Voice message")
+        self.assertEqual(sent["attachments"][0]["transcription_status"], "transcribing")
+        self.assertEqual(self.judith_calls, [])
+
+        self.release.set()
+        self._wait_for_queue()
+        with self.harness.SessionLocal() as db:
+            message = db.get(InternalChatMessage, sent["id"])
+            attachment = db.query(InternalChatAttachment).one()
+            self.assertEqual(message.body, "Voice message\nTranscript: call the bank")
+            self.assertEqual((attachment.transcription_status, attachment.transcript), ("done", "call the bank"))
+        self.assertEqual(self.judith_calls, ["call the bank"])
+        self.assertEqual(self.provider_calls, [b"voice-bytes" * 100])
+
+    def test_transcript_invalidates_the_messages_etag(self):
+        sent = self._send_voice()
+        # A later message keeps the thread preview from being rewritten by the transcript.
+        self.harness.add_message(2, "judith-ai", "Noted.")
+        url, params = "/internal-chat/threads/2/messages", {"user_id": "user-a"}
+        etag = self.client.get(url, params=params).headers["etag"]
+        self.assertEqual(self.client.get(url, params=params, headers={"If-None-Match": etag}).status_code, 304)
+
+        self.release.set()
+        self._wait_for_queue()
+        refreshed = self.client.get(url, params=params, headers={"If-None-Match": etag})
+        self.assertEqual(refreshed.status_code, 200)
+        message = next(item for item in refreshed.json() if item["id"] == sent["id"])
+        self.assertEqual(message["body"], "Voice message\nTranscript: call the bank")
+        self.assertEqual(message["attachments"][0]["transcription_status"], "done")
+
+    def test_resent_audio_reuses_the_stored_transcript(self):
+        self.release.set()
+        self._send_voice()
+        self._wait_for_queue()
+        self.queue._cache.clear()
+
+        again = self._send_voice()
+        self.assertEqual(again["attachments"][0]["transcription_status"], "done")
+        self.assertEqual(again["body"], "Voice message\nTranscript: call the bank")
+        self.assertEqual(len(self.provider_calls), 1)
+        self.assertEqual(self.judith_calls, ["call the bank", "call the bank"])
+
+    def _strand_voice(self) -> dict:
+        # The upload commits its "transcribing" row but the process stops before the queue runs it.
+        with patch.object(internal_chat, "_queue_attachment_transcription"):
+            return self._send_voice()
+
+    def test_recovery_requeues_stranded_transcriptions_once(self):
+        sent = self._strand_voice()
+
+        # A second recovery pass joins the running job instead of applying its result twice.
+        self.assertEqual(internal_chat.recover_pending_transcriptions(), 1)
+        self.assertEqual(internal_chat.recover_pending_transcriptions(), 1)
+        self.release.set()
+        # Both done-callbacks run on the worker thread, so draining the pool waits for them.
+        self.queue.shutdown(wait=True)
+        with self.harness.SessionLocal() as db:
+            message = db.get(InternalChatMessage, sent["id"])
+            attachment = db.query(InternalChatAttachment).one()
+            self.assertEqual(message.body, "Voice message\nTranscript: call the bank")
+            self.assertEqual(attachment.transcription_status, "done")
+        self.assertEqual(self.judith_calls, ["call the bank"])
+        self.assertEqual(internal_chat.recover_pending_transcriptions(), 0)
+
+    def test_recovery_without_a_provider_hands_the_caption_to_judith(self):
+        self._strand_voice()
+
+        with patch.object(internal_chat.settings, "OPENAI_API_KEY", None):
+            self.assertEqual(internal_chat.recover_pending_transcriptions(), 1)
+        with self.harness.SessionLocal() as db:
+            attachment = db.query(InternalChatAttachment).one()
+            self.assertEqual((attachment.transcription_status, attachment.transcript), ("failed", None))
+        self.assertEqual(self.judith_calls, ["Voice message"])
+        self.assertEqual(self.provider_calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
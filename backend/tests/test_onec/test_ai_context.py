@@ -4,6 +4,7 @@ import unittest
 from datetime import UTC, datetime
 from unittest.mock import patch
 
+from agents.context_cache import context_snapshots
 from agents.data_fetcher import (
     get_context_for_section,
     get_onec_anomalies,
@@ -20,6 +21,7 @@ class OneCAIContextTests(unittest.TestCase):
         self.harness = SqliteOneCTestHarness()
         self.session_patch = patch("agents.data_fetcher.SessionLocal", self.harness.SessionLocal)
         self.session_patch.start()
+        context_snapshots.clear()
 
         with self.harness.SessionLocal() as db:
             db.add(
@@ -114,6 +116,43 @@ class OneCAIContextTests(unittest.TestCase):
         self.assertIn("Projected 30-day cash position change", forecast)
         self.assertIn("Imported transaction rows", summary)
 
+    def test_totals_cover_every_record_and_summaries_are_stored(self):
+        with self.harness.SessionLocal() as db:
+            db.add(
+                OneCImportJob(
+                    company_id=1,
+                    filename="cash-flow-2.csv",
+                    storage_path="fixture",
+                    source_hint="file",
+                    report_type="cash_flow",
+                    status="completed",
+                    imported_by="test-user",
+                    completed_at=datetime.now(UTC).replace(tzinfo=None),
+                )
+            )
+            db.flush()
+            db.add_all(
+                OneCRecord(
+                    import_job_id=2,
+                    company_id=1,
+                    record_type="transaction",
+                    row_status="duplicate" if index % 100 == 0 else "ready",
+                    import_hash=f"bulk-{index}",
+                    raw_data={},
+                    normalized_data={"amount": 250, "type": "expense", "counterparty": "OOO Supply"},
+                )
+                for index in range(700)
+            )
+            db.commit()
+
+        summary = get_onec_context(1)
+        self.assertIn("Imported transaction rows: 694", summary)
+        with self.harness.SessionLocal() as db:
+            stored = dict(db.query(OneCImportJob.id, OneCImportJob.ai_summary).all())
+        self.assertEqual(stored[2]["counts"]["transaction"], 693)
+        self.assertEqual(stored[2]["outflow_total"], 693 * 250)
+        self.assertEqual(stored[1]["counts"]["inventory_item"], 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -10,6 +10,7 @@ from fastapi.testclient import TestClient
 from api.onec import router as onec_router
 from database.connection import get_db
 from database.models import Transaction
+from database.onec_models import OneCImportJob
 from integrations.onec import service as onec_service
 from tests.test_onec._helpers import SqliteOneCTestHarness, fake_account
 
@@ -67,7 +68,10 @@ class OneCApiUploadFlowTests(unittest.TestCase):
 
         with self.harness.SessionLocal() as db:
             imported_count = db.query(Transaction).count()
+            summary = db.query(OneCImportJob.ai_summary).filter(OneCImportJob.id == job_id).scalar()
         self.assertEqual(imported_count, 2)
+        self.assertEqual(summary["counts"]["transaction"], 2)
+        self.assertEqual((summary["inflow_count"], summary["outflow_count"]), (1, 1))
 
 
 if __name__ == "__main__":
@@ -48,7 +48,7 @@ type TrainerSource = {
   source_url?: string | null;
   file_name?: string | null;
   mime_type?: string | null;
-  status: "processing" | "ready" | "failed" | string;
+  status: "queued" | "processing" | "ready" | "failed" | string;
   summary?: string | null;
   word_count: number;
   chunk_count: number;
@@ -157,6 +157,11 @@ export default function AdminAITrainerPage() {
     return { total, ready, failed, chunks, words };
   }, [sources]);
 
+  const hasPendingSources = useMemo(
+    () => sources.some((item) => item.status === "queued" || item.status === "processing"),
+    [sources],
+  );
+
   const hydrateProfileForm = (value: TrainerProfile) => {
     setProvider((value.provider as TrainerProvider) || "auto");
     setModel(value.model || "");
@@ -227,6 +232,22 @@ export default function AdminAITrainerPage() {
     void loadSectionData(selectedSection);
   }, [selectedSection, loadSectionData]);
 
+  // Website and file sources are indexed in the background; poll until they settle.
+  useEffect(() => {
+    if (!hasPendingSources || !selectedSection) return;
+    const timer = window.setInterval(async () => {
+      try {
+        const res = await authFetch(
+          `${API}/admin/ai-trainer/sources?section=${encodeURIComponent(selectedSection)}&limit=500`,
+        );
+        setSources(await parseResponse<TrainerSource[]>(res, "Failed to load section training sources."));
+      } catch {
+        // Transient errors are retried on the next tick.
+      }
+    }, 3000);
+    return () => window.clearInterval(timer);
+  }, [hasPendingSources, selectedSection]);
+
   const saveProfile = async () => {
     if (!profile) return;
     setSavingProfile(true);
@@ -741,7 +762,7 @@ function Field({ label, children }: { label: string; children: ReactNode }) {
 
 function statusColor(status: string): string {
   if (status === "ready") return "#34d399";
-  if (status === "processing") return "#fbbf24";
+  if (status === "processing" || status === "queued") return "#fbbf24";
   if (status === "failed") return "#f87171";
   return "var(--text-subtle)";
 }